@@ -0,0 +1,4 @@
+"""Project benchmarks.
+
+Run with `python -m benchmarks.run --help`.
+"""
@@ -0,0 +1,125 @@
+"""Synthetic corpus module.
+
+Generates directories of images with configurable count,
+formats, sizes and share of images with GPS info.
+"""
+
+
+import random
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+
+from PIL.Image import Exif, Image, effect_noise, merge
+
+# Pillow format names and extensions of supported formats.
+FORMATS = {
+    'jpeg': ('JPEG', '.jpg'),
+    'png': ('PNG', '.png'),
+    'webp': ('WEBP', '.webp'),
+    'tiff': ('TIFF', '.tiff'),
+}
+
+# Image dimensions of size classes.
+SIZES = {
+    'small': (640, 480),
+    'medium': (1920, 1080),
+    'large': (4000, 3000),
+    'huge': (8000, 6000),
+}
+
+# Noise deviation of generated images.
+NOISE_SIGMA = 32
+
+
+@dataclass(frozen=True)
+class CorpusSpec(object):
+    """Specification of synthetic corpus."""
+
+    files: int = 100
+    formats: tuple[str, ...] = ('jpeg', 'png', 'webp', 'tiff')
+    sizes: tuple[str, ...] = ('small',)
+    gps_ratio: float = 0.5
+    seed: int = 0
+
+
+def build_exif(rng: random.Random, with_gps: bool) -> Exif:
+    """Build camera-like EXIF data.
+
+    Args:
+        rng (random.Random): Random numbers generator.
+        with_gps (bool): Add GPS info.
+
+    Returns:
+        Exif: EXIF data.
+    """
+    exif = Exif()
+    exif[0x010F] = 'Bench'
+    exif[0x0110] = 'Synthetic {0}'.format(rng.randint(1, 100))
+    exif[0x0132] = '2023:08:30 17:18:51'
+    if with_gps:
+        exif.get_ifd(0x8825).update({
+            1: rng.choice('NS'),
+            2: (float(rng.randint(0, 89)), float(rng.randint(0, 59)), 1.5),
+            3: rng.choice('EW'),
+            4: (float(rng.randint(0, 179)), float(rng.randint(0, 59)), 2.5),
+        })
+
+    # Reload from bytes, so nested GPS IFD is saved by all plugins
+    loaded_exif = Exif()
+    loaded_exif.load(exif.tobytes())
+    return loaded_exif
+
+
+def build_image(size: tuple[int, int]) -> Image:
+    """Build noisy RGB image that compresses like a photo.
+
+    Args:
+        size (tuple[int, int]): Image width and height.
+
+    Returns:
+        Image: Generated image.
+    """
+    return merge('RGB', [
+        effect_noise(size, NOISE_SIGMA)
+        for _ in range(3)
+    ])
+
+
+def generate_corpus(spec: CorpusSpec, target: Path) -> list[Path]:
+    """Generate images corpus.
+
+    Formats and sizes are distributed evenly between files,
+    images with GPS are chosen randomly with provided ratio.
+    Files are spread over nested directories.
+
+    Args:
+        spec (CorpusSpec): Corpus specification.
+        target (Path): Directory to generate corpus in.
+
+    Returns:
+        list[Path]: Generated files.
+    """
+    rng = random.Random(spec.seed)
+    images: dict[str, Image] = {
+        size_name: build_image(SIZES[size_name])
+        for size_name in spec.sizes
+    }
+    file_paths: list[Path] = []
+    for file_index in range(spec.files):
+        format_name = spec.formats[file_index % len(spec.formats)]
+        size_index = file_index // len(spec.formats) % len(spec.sizes)
+        size_name = spec.sizes[size_index]
+        pillow_format, extension = FORMATS[format_name]
+        exif = build_exif(rng, rng.random() < spec.gps_ratio)
+
+        image_stream = BytesIO()
+        images[size_name].save(image_stream, pillow_format, exif=exif)
+        file_path = target / 'dir{0}'.format(file_index % 10) / (
+            'image{0}{1}'.format(file_index, extension)
+        )
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(image_stream.getvalue())
+        file_paths.append(file_path)
+
+    return file_paths
@@ -0,0 +1,325 @@
+"""Files index benchmark.
+
+Compares memory use and operations cost of `FilesIndex` with layout
+of index that keeps `Path` keys and hex hashes in dicts. Pathes are
+generated like in photo libraries: many files in dated directories.
+Saving and loading of index file are measured for `FilesIndex` only.
+
+Usage: python -m benchmarks.index --files 1000000 --json index.json
+"""
+
+
+import json
+import sys
+import tracemalloc
+from argparse import ArgumentParser, Namespace
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Callable, Iterator, Optional, Protocol, Sequence
+
+from image_meta_cleaner.files_index import FilesIndex, FileStat
+
+# Benchmarked index layouts.
+LAYOUTS = ('dict', 'compact')
+
+# Count of files in generated directories.
+FILES_PER_DIR = 200
+
+# Bytes in megabyte.
+MEGABYTE = 1024 * 1024
+
+# Format of results table rows.
+TABLE_ROW = '{0:<10}{1:>10}{2:>12}{3:>12}{4:>12}{5:>12}{6:>12}{7:>12}'
+
+
+class BenchmarkedIndex(Protocol):
+    """Operations of index that are benchmarked."""
+
+    def __getitem__(self, file_path: Path) -> str:
+        """Get file hash."""
+
+    def __setitem__(self, file_path: Path, file_hash: str) -> None:
+        """Set file hash."""
+
+    def get_stat(self, file_path: Path) -> Optional[FileStat]:
+        """Get file stat info."""
+
+    def set_stat(self, file_path: Path, file_stat: FileStat) -> None:
+        """Set file stat info."""
+
+
+class DictFilesIndex(object):
+    """Index layout with `Path` keys and hex hashes in dicts."""
+
+    def __init__(self) -> None:
+        """Init empty index."""
+        self.files_hashes: dict[Path, str] = {}
+        self.files_stats: dict[Path, FileStat] = {}
+
+    def __getitem__(self, file_path: Path) -> str:
+        """Get file hash.
+
+        Args:
+            file_path (Path): File path.
+
+        Returns:
+            str: File hash.
+        """
+        return self.files_hashes[file_path.absolute()]
+
+    def __setitem__(self, file_path: Path, file_hash: str) -> None:
+        """Set file hash.
+
+        Args:
+            file_path (Path): File path.
+            file_hash (str): File hash.
+        """
+        file_path = file_path.absolute()
+        self.files_hashes[file_path] = file_hash
+        self.files_stats.pop(file_path, None)
+
+    def get_stat(self, file_path: Path) -> Optional[FileStat]:
+        """Get file stat info.
+
+        Args:
+            file_path (Path): File path.
+
+        Returns:
+            Optional[FileStat]: File stat info.
+        """
+        return self.files_stats.get(file_path.absolute())
+
+    def set_stat(self, file_path: Path, file_stat: FileStat) -> None:
+        """Set file stat info.
+
+        Args:
+            file_path (Path): File path.
+            file_stat (FileStat): File stat info.
+        """
+        self.files_stats[file_path.absolute()] = file_stat
+
+
+@dataclass
+class IndexResult(object):
+    """Result of index layout benchmark."""
+
+    layout: str
+    files: int
+    memory: int
+    fill_seconds: float
+    lookup_seconds: float
+    stat_seconds: float
+    save_seconds: Optional[float] = None
+    load_seconds: Optional[float] = None
+
+
+def iter_pathes(files: int) -> Iterator[str]:
+    """Generate absolute pathes of files in dated directories.
+
+    Args:
+        files (int): Count of files.
+
+    Yields:
+        str: File path.
+    """
+    for file_index in range(files):
+        dir_index = file_index // FILES_PER_DIR
+        yield '/photos/{0}/{1:02d}/{2:02d}/IMG_{3:06d}.jpg'.format(
+            2000 + dir_index // 372,
+            dir_index // 31 % 12 + 1,
+            dir_index % 31 + 1,
+            file_index,
+        )
+
+
+def get_file_hash(file_index: int) -> str:
+    """Build fake SHA-256 hash of file.
+
+    Args:
+        file_index (int): File number.
+
+    Returns:
+        str: Hash in hex format.
+    """
+    return file_index.to_bytes(32, 'big').hex()
+
+
+def create_index(layout: str) -> BenchmarkedIndex:
+    """Create empty index of layout.
+
+    Args:
+        layout (str): Index layout, one of `LAYOUTS`.
+
+    Returns:
+        BenchmarkedIndex: Empty index.
+    """
+    if layout == 'compact':
+        return FilesIndex()
+    return DictFilesIndex()
+
+
+def time_operation(
+    index: BenchmarkedIndex,
+    file_paths: Sequence[object],
+    operation: Callable[[BenchmarkedIndex, int, Any], object],
+) -> float:
+    """Time operation on every file of index.
+
+    Args:
+        index (BenchmarkedIndex): Benchmarked index.
+        file_paths (Sequence[object]): Files pathes.
+        operation (Callable[[BenchmarkedIndex, int, Any], object]): \
+            Operation with index, file number and path.
+
+    Returns:
+        float: Elapsed seconds.
+    """
+    start_time = perf_counter()
+    for file_index, file_path in enumerate(file_paths):
+        operation(index, file_index, file_path)
+    return perf_counter() - start_time
+
+
+def set_file(index: BenchmarkedIndex, file_index: int, path_str: str) -> None:
+    """Index file with hash and stat info.
+
+    Path is created for every file, as scanner does, so index layout
+    that keeps pathes objects is charged for them.
+
+    Args:
+        index (BenchmarkedIndex): Benchmarked index.
+        file_index (int): File number.
+        path_str (str): File path.
+    """
+    file_path = Path(path_str)
+    index[file_path] = get_file_hash(file_index)
+    index.set_stat(file_path, FileStat(file_index, file_index, file_index))
+
+
+def benchmark_layout(layout: str, files: int) -> IndexResult:
+    """Fill index of layout and time its operations.
+
+    Memory of index is measured with `tracemalloc` on separate filling,
+    as tracing slows down allocations.
+
+    Args:
+        layout (str): Index layout, one of `LAYOUTS`.
+        files (int): Count of files.
+
+    Returns:
+        IndexResult: Index memory and timings.
+    """
+    paths_strs = list(iter_pathes(files))
+    tracemalloc.start()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    index = create_index(layout)
+    time_operation(index, paths_strs, set_file)
+    memory = tracemalloc.get_traced_memory()[0] - start_memory
+    tracemalloc.stop()
+    del index  # noqa: WPS420
+
+    index = create_index(layout)
+    fill_seconds = time_operation(index, paths_strs, set_file)
+    # Lookups are made with new pathes, as ones found by scanner
+    lookup_paths = [Path(path_str) for path_str in paths_strs]
+    index_result = IndexResult(
+        layout=layout,
+        files=files,
+        memory=memory,
+        fill_seconds=fill_seconds,
+        lookup_seconds=time_operation(
+            index,
+            lookup_paths,
+            lambda index, _, file_path: index[file_path],
+        ),
+        stat_seconds=time_operation(
+            index,
+            lookup_paths,
+            lambda index, _, file_path: index.get_stat(file_path),
+        ),
+    )
+    if isinstance(index, FilesIndex):
+        start_time = perf_counter()
+        index_data = index.build_index_file()
+        index_result.save_seconds = perf_counter() - start_time
+        start_time = perf_counter()
+        FilesIndex.from_index_file(index_data)
+        index_result.load_seconds = perf_counter() - start_time
+    return index_result
+
+
+def format_seconds(seconds: Optional[float]) -> str:
+    """Format seconds as milliseconds for results table.
+
+    Args:
+        seconds (Optional[float]): Seconds or None if not measured.
+
+    Returns:
+        str: Milliseconds or dash.
+    """
+    if seconds is None:
+        return '-'
+    return '{0:.1f}'.format(seconds * 1000)
+
+
+def parse_args(argv: list[str]) -> Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv (list[str]): Command line arguments without program name.
+
+    Returns:
+        Namespace: Parsed arguments.
+    """
+    parser = ArgumentParser(prog='python -m benchmarks.index')
+    parser.add_argument('--files', type=int, default=100000)
+    parser.add_argument('--json', type=Path, help='save results to file')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> list[IndexResult]:
+    """Benchmark index layouts.
+
+    Args:
+        argv (list[str]): Command line arguments without program name.
+
+    Returns:
+        list[IndexResult]: Results of layouts.
+    """
+    args = parse_args(argv)
+    results: list[IndexResult] = []
+    print(TABLE_ROW.format(
+        'layout',
+        'files',
+        'memory MB',
+        'fill ms',
+        'lookup ms',
+        'stat ms',
+        'save ms',
+        'load ms',
+    ))
+    for layout in LAYOUTS:
+        result = benchmark_layout(layout, args.files)
+        print(TABLE_ROW.format(
+            result.layout,
+            result.files,
+            '{0:.1f}'.format(result.memory / MEGABYTE),
+            format_seconds(result.fill_seconds),
+            format_seconds(result.lookup_seconds),
+            format_seconds(result.stat_seconds),
+            format_seconds(result.save_seconds),
+            format_seconds(result.load_seconds),
+        ), flush=True)
+        results.append(result)
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(
+            [asdict(result) for result in results],
+            indent=2,
+        ))
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,335 @@
+"""Benchmarks runner.
+
+Times processing functions on a synthetic corpus in cold state
+(nothing is indexed) and warm state (corpus is processed and indexed).
+Every benchmark runs in a fresh process, so peak RSS is measured
+per benchmark.
+
+Usage: python -m benchmarks.run --files 200 --formats jpeg,png --sizes small
+"""
+
+
+import json
+import os
+import shutil
+import sys
+from argparse import ArgumentParser, Namespace
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from functools import partial
+from multiprocessing import get_context
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Callable, Optional
+
+from benchmarks.corpus import FORMATS, SIZES, CorpusSpec, generate_corpus
+
+# Benchmarked functions.
+BENCHMARKS = (
+    'get_dir_images',
+    'process_image',
+    'process_images',
+    'process_dir',
+)
+
+# Corpus states.
+STATES = ('cold', 'warm')
+
+# Bytes in megabyte.
+MEGABYTE = 1024 * 1024
+
+
+@dataclass
+class BenchmarkResult(object):
+    """Result of single benchmark run."""
+
+    name: str
+    state: str
+    files: int
+    size: int
+    seconds: float
+    peak_rss: Optional[int]
+
+    @property
+    def files_per_second(self) -> float:
+        """Processed files per second.
+
+        Returns:
+            float: Files throughput.
+        """
+        return self.files / self.seconds if self.seconds else 0
+
+    @property
+    def megabytes_per_second(self) -> float:
+        """Processed megabytes per second.
+
+        Returns:
+            float: Data throughput.
+        """
+        return self.size / MEGABYTE / self.seconds if self.seconds else 0
+
+
+def get_peak_rss() -> Optional[int]:
+    """Get peak resident set size of current process.
+
+    Returns:
+        Optional[int]: Peak RSS in bytes or None if it is unavailable.
+    """
+    try:
+        import resource  # noqa: WPS433
+    except ImportError:
+        return None
+
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS reports bytes
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def get_corpus_size(source: Path) -> tuple[int, int]:
+    """Get count and total size of images in directory.
+
+    Args:
+        source (Path): Directory path.
+
+    Returns:
+        tuple[int, int]: Count of files and total size in bytes.
+    """
+    from image_meta_cleaner.images import is_image  # noqa: WPS433
+
+    sizes = [
+        file_path.stat().st_size
+        for file_path in source.glob('**/*')
+        if file_path.is_file() and is_image(file_path)
+    ]
+    return len(sizes), sum(sizes)
+
+
+def process_each_image(images: list[tuple[Path, bytes]]) -> None:
+    """Process images one by one with `process_image`.
+
+    Args:
+        images (list[tuple[Path, bytes]]): Images pathes and contents.
+    """
+    from image_meta_cleaner.processing import process_image  # noqa: WPS433
+
+    for file_path, file_data in images:
+        process_image(file_path, file_data)
+
+
+def time_benchmark(name: str, source: Path, workers: int) -> float:
+    """Time benchmarked function.
+
+    Inputs of function are prepared before timing.
+
+    Args:
+        name (str): Benchmark name, one of `BENCHMARKS`.
+        source (Path): Corpus directory.
+        workers (int): Count of worker processes for `process_dir`.
+
+    Returns:
+        float: Elapsed seconds.
+    """
+    from image_meta_cleaner import pipeline  # noqa: WPS433
+    from image_meta_cleaner.index_store import get_files_index  # noqa: WPS433
+    from image_meta_cleaner.processing import process_images  # noqa: WPS433
+    from image_meta_cleaner.settings import Settings  # noqa: WPS433
+
+    index = get_files_index(source)
+    benchmark: Callable[[], object]
+    if name == 'get_dir_images':
+        benchmark = partial(pipeline.get_dir_images, source, index)
+    elif name == 'process_dir':
+        settings = Settings(workers=workers)
+        benchmark = partial(pipeline.process_dir, source, settings)
+    elif name == 'process_image':
+        benchmark = partial(
+            process_each_image,
+            pipeline.get_dir_images(source),
+        )
+    else:
+        benchmark = partial(
+            process_images,
+            pipeline.get_dir_images(source),
+            index,
+        )
+
+    start_time = perf_counter()
+    benchmark()
+    return perf_counter() - start_time
+
+
+def run_benchmark(
+    name: str,
+    state: str,
+    source: Path,
+    workers: int,
+) -> BenchmarkResult:
+    """Run benchmark in current process.
+
+    Args:
+        name (str): Benchmark name.
+        state (str): Corpus state.
+        source (Path): Corpus directory.
+        workers (int): Count of worker processes for `process_dir`.
+
+    Returns:
+        BenchmarkResult: Benchmark result.
+    """
+    # Processing logs are written to `imc.log` in working directory
+    os.chdir(source.parent)
+    files, size = get_corpus_size(source)
+    seconds = time_benchmark(name, source, workers)
+    return BenchmarkResult(
+        name=name,
+        state=state,
+        files=files,
+        size=size,
+        seconds=seconds,
+        peak_rss=get_peak_rss(),
+    )
+
+
+def run_isolated(
+    name: str,
+    state: str,
+    source: Path,
+    workers: int,
+) -> BenchmarkResult:
+    """Run benchmark in a fresh process.
+
+    Args:
+        name (str): Benchmark name.
+        state (str): Corpus state.
+        source (Path): Corpus directory.
+        workers (int): Count of worker processes for `process_dir`.
+
+    Returns:
+        BenchmarkResult: Benchmark result.
+    """
+    with ProcessPoolExecutor(1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(
+            run_benchmark,
+            name,
+            state,
+            source,
+            workers,
+        ).result()
+
+
+def prepare_corpus(corpus: Path, work_dir: Path, state: str) -> Path:
+    """Copy corpus to working directory.
+
+    Warm corpus is processed and indexed.
+
+    Args:
+        corpus (Path): Generated corpus directory.
+        work_dir (Path): Working directory.
+        state (str): Corpus state.
+
+    Returns:
+        Path: Prepared corpus directory.
+    """
+    source = work_dir / 'source'
+    shutil.rmtree(source, ignore_errors=True)
+    shutil.copytree(corpus, source)
+    if state == 'warm':
+        run_isolated('process_dir', state, source, workers=1)
+    return source
+
+
+def format_result(result: BenchmarkResult) -> str:
+    """Format benchmark result as table row.
+
+    Args:
+        result (BenchmarkResult): Benchmark result.
+
+    Returns:
+        str: Table row.
+    """
+    peak_rss = '-'
+    if result.peak_rss is not None:
+        peak_rss = '{0:.1f}'.format(result.peak_rss / MEGABYTE)
+    return '{0:<16}{1:<6}{2:>8}{3:>10.3f}{4:>10.1f}{5:>10.1f}{6:>10}'.format(
+        result.name,
+        result.state,
+        result.files,
+        result.seconds,
+        result.files_per_second,
+        result.megabytes_per_second,
+        peak_rss,
+    )
+
+
+def parse_args(argv: list[str]) -> Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv (list[str]): Command line arguments without program name.
+
+    Returns:
+        Namespace: Parsed arguments.
+    """
+    parser = ArgumentParser(prog='python -m benchmarks.run')
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--formats', default=','.join(FORMATS))
+    parser.add_argument('--sizes', default='small')
+    parser.add_argument('--gps-ratio', type=float, default=0.5)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--benchmarks', default=','.join(BENCHMARKS))
+    parser.add_argument('--json', type=Path, help='save results to file')
+    args = parser.parse_args(argv)
+    if not set(args.formats.split(',')) <= FORMATS.keys():
+        parser.error('Supported formats: {0}'.format(', '.join(FORMATS)))
+    if not set(args.sizes.split(',')) <= SIZES.keys():
+        parser.error('Supported sizes: {0}'.format(', '.join(SIZES)))
+    if not set(args.benchmarks.split(',')) <= set(BENCHMARKS):
+        parser.error('Benchmarks: {0}'.format(', '.join(BENCHMARKS)))
+    return args
+
+
+def main(argv: list[str]) -> list[BenchmarkResult]:
+    """Generate corpus and run benchmarks.
+
+    Args:
+        argv (list[str]): Command line arguments without program name.
+
+    Returns:
+        list[BenchmarkResult]: Benchmarks results.
+    """
+    args = parse_args(argv)
+    spec = CorpusSpec(
+        files=args.files,
+        formats=tuple(args.formats.split(',')),
+        sizes=tuple(args.sizes.split(',')),
+        gps_ratio=args.gps_ratio,
+        seed=args.seed,
+    )
+    results: list[BenchmarkResult] = []
+    print('{0:<16}{1:<6}{2:>8}{3:>10}{4:>10}{5:>10}{6:>10}'.format(
+        'benchmark', 'state', 'files', 'seconds', 'files/s', 'MB/s', 'RSS MB',
+    ))
+    with TemporaryDirectory() as temp_dir:
+        corpus = Path(temp_dir) / 'corpus'
+        generate_corpus(spec, corpus)
+        for state in STATES:
+            for name in args.benchmarks.split(','):
+                source = prepare_corpus(corpus, Path(temp_dir), state)
+                result = run_isolated(name, state, source, args.workers)
+                print(format_result(result), flush=True)
+                results.append(result)
+
+    if args.json is not None:
+        args.json.write_text(json.dumps(
+            {
+                'corpus': asdict(spec),
+                'results': [asdict(result) for result in results],
+            },
+            indent=2,
+        ))
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
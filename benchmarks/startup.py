@@ -0,0 +1,196 @@
+"""Startup benchmark.
+
+Times launches of command line interface in fresh processes:
+import of entry point, usage output and no-op run on indexed corpus.
+Also reports heavy modules imported by entry point, which should be
+imported only when images are actually processed.
+
+Usage: python -m benchmarks.startup --repeat 20 --json startup.json
+"""
+
+
+import json
+import os
+import subprocess  # noqa: S404
+import sys
+from argparse import ArgumentParser, Namespace
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from statistics import median
+from tempfile import TemporaryDirectory
+from time import perf_counter
+
+from benchmarks.corpus import CorpusSpec, generate_corpus
+
+# Timed launches.
+STARTUP_CASES = ('python', 'import', 'help', 'noop')
+
+# Modules that should not be imported by entry point.
+HEAVY_MODULES = (
+    'PIL',
+    'exifread',
+    'sqlite3',
+    'ctypes',
+    'http.server',
+    'concurrent.futures.process',
+)
+
+# Script that prints heavy modules imported by entry point.
+IMPORTED_MODULES_SCRIPT = '''
+import json, sys
+import image_meta_cleaner.main
+print(json.dumps([name for name in {0!r} if name in sys.modules]))
+'''.format(HEAVY_MODULES)
+
+
+@dataclass
+class StartupResult(object):
+    """Result of timed launches."""
+
+    name: str
+    repeat: int
+    min_seconds: float
+    median_seconds: float
+
+
+def get_case_command(name: str, source: Path) -> list[str]:
+    """Build command of timed launch.
+
+    Args:
+        name (str): Case name, one of `STARTUP_CASES`.
+        source (Path): Indexed corpus directory.
+
+    Returns:
+        list[str]: Command line.
+    """
+    if name == 'python':
+        return [sys.executable, '-c', 'pass']
+    if name == 'import':
+        return [sys.executable, '-c', 'import image_meta_cleaner.main']
+    if name == 'help':
+        return [sys.executable, '-m', 'image_meta_cleaner.main', '--help']
+    return [sys.executable, '-m', 'image_meta_cleaner.main', str(source)]
+
+
+def run_command(command: list[str], cwd: Path) -> bytes:
+    """Run command to completion.
+
+    Args:
+        command (list[str]): Command line.
+        cwd (Path): Working directory.
+
+    Returns:
+        bytes: Command output.
+    """
+    return subprocess.run(  # noqa: S603
+        command,
+        env={**os.environ, 'PYTHONPATH': str(Path.cwd())},
+        cwd=cwd,
+        input=b'\n',
+        check=True,
+        capture_output=True,
+    ).stdout
+
+
+def time_case(name: str, source: Path, repeat: int) -> StartupResult:
+    """Time launches of command.
+
+    Args:
+        name (str): Case name, one of `STARTUP_CASES`.
+        source (Path): Indexed corpus directory.
+        repeat (int): Count of launches.
+
+    Returns:
+        StartupResult: Timing of launches.
+    """
+    command = get_case_command(name, source)
+    timings: list[float] = []
+    for _ in range(repeat):
+        start_time = perf_counter()
+        run_command(command, source.parent)
+        timings.append(perf_counter() - start_time)
+    return StartupResult(
+        name=name,
+        repeat=repeat,
+        min_seconds=min(timings),
+        median_seconds=median(timings),
+    )
+
+
+def get_imported_heavy_modules(cwd: Path) -> list[str]:
+    """Get heavy modules imported by entry point.
+
+    Args:
+        cwd (Path): Working directory.
+
+    Returns:
+        list[str]: Names of imported modules from `HEAVY_MODULES`.
+    """
+    heavy_modules: list[str] = json.loads(run_command(
+        [sys.executable, '-c', IMPORTED_MODULES_SCRIPT],
+        cwd,
+    ))
+    return heavy_modules
+
+
+def parse_args(argv: list[str]) -> Namespace:
+    """Parse command line arguments.
+
+    Args:
+        argv (list[str]): Command line arguments without program name.
+
+    Returns:
+        Namespace: Parsed arguments.
+    """
+    parser = ArgumentParser(prog='python -m benchmarks.startup')
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--json', type=Path, help='save results to file')
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str]) -> list[StartupResult]:
+    """Generate and index corpus and time launches.
+
+    Args:
+        argv (list[str]): Command line arguments without program name.
+
+    Returns:
+        list[StartupResult]: Timings of launches.
+    """
+    args = parse_args(argv)
+    results: list[StartupResult] = []
+    print('{0:<10}{1:>8}{2:>12}{3:>12}'.format(
+        'launch', 'repeat', 'min ms', 'median ms',
+    ))
+    with TemporaryDirectory() as temp_dir:
+        source = Path(temp_dir) / 'source'
+        generate_corpus(CorpusSpec(files=args.files), source)
+        run_command(get_case_command('noop', source), source.parent)
+        for name in STARTUP_CASES:
+            result = time_case(name, source, args.repeat)
+            print('{0:<10}{1:>8}{2:>12.1f}{3:>12.1f}'.format(
+                result.name,
+                result.repeat,
+                result.min_seconds * 1000,
+                result.median_seconds * 1000,
+            ), flush=True)
+            results.append(result)
+        heavy_modules = get_imported_heavy_modules(source.parent)
+
+    print('Heavy modules imported at startup: {0}'.format(
+        ', '.join(heavy_modules) or 'none',
+    ))
+    if args.json is not None:
+        args.json.write_text(json.dumps(
+            {
+                'results': [asdict(result) for result in results],
+                'heavy_modules': heavy_modules,
+            },
+            indent=2,
+        ))
+    return results
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
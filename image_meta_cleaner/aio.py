@@ -0,0 +1,334 @@
+"""Asyncio module.
+
+Provides asynchronous API for embedding cleaning in asyncio services.
+Images are processed on executor, so event loop is never blocked, and
+count and size of images in flight are limited by processing budget:
+callers wait for their turn instead of piling up images in memory.
+"""
+
+
+import asyncio
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import replace
+from functools import partial
+from pathlib import Path
+from types import TracebackType
+from typing import AsyncIterator, Callable, Optional, TypeVar
+
+from image_meta_cleaner.checkpoint import replace_file, write_file_atomically
+from image_meta_cleaner.metrics import Metrics
+from image_meta_cleaner.processing import (
+    ImageLimits,
+    InFlightBudget,
+    Ok,
+    ProcessingResult,
+    WorkerResult,
+    get_workers_count,
+    process_image,
+    process_image_file_in_worker,
+)
+from image_meta_cleaner.scanner import DirScanner
+from image_meta_cleaner.settings import Settings
+
+# Result of job run on executor.
+JobResult = TypeVar('JobResult')
+
+
+def clean_image_data(
+    file_path: Path,
+    file_data: bytes,
+    hash_algorithm: str,
+    limits: Optional[ImageLimits] = None,
+) -> tuple[ProcessingResult, Metrics]:
+    """Process image data in worker.
+
+    Args:
+        file_path (Path): File path or name used in result.
+        file_data (bytes): File content.
+        hash_algorithm (str): Algorithm to hash processed file with.
+        limits (Optional[ImageLimits]): Limits of images.
+
+    Returns:
+        ProcessingResult: Result of `process_image`.
+        Metrics: Metrics of processing to merge in main process.
+    """
+    metrics = Metrics()
+    file_result = process_image(
+        file_path,
+        file_data,
+        metrics,
+        hash_algorithm,
+        limits,
+    )
+    return file_result, metrics
+
+
+def clean_image_file(
+    file_path: Path,
+    file_hash: Optional[str],
+    cache_max_bytes: int,
+    hash_algorithm: str,
+    limits: Optional[ImageLimits] = None,
+) -> WorkerResult:
+    """Process image file in worker and write cleaned image.
+
+    Image is written in worker, so cleaned data is not sent back.
+
+    Args:
+        file_path (Path): File path.
+        file_hash (Optional[str]): \
+            Indexed file hash. File is not processed if its content matches.
+        cache_max_bytes (int): Size of worker cache, 0 to disable cache.
+        hash_algorithm (str): Algorithm to hash files with.
+        limits (Optional[ImageLimits]): Limits of images.
+
+    Returns:
+        Optional[ProcessingResult]: \
+            Result of `process_image_file` without cleaned image data.
+        Metrics: Metrics of processing to merge in main process.
+    """
+    file_result, metrics = process_image_file_in_worker(
+        file_path,
+        file_hash,
+        cache_max_bytes,
+        hash_algorithm,
+        limits,
+    )
+    if not isinstance(file_result, Ok):
+        return file_result, metrics
+
+    if file_result.temp_path is not None:
+        replace_file(file_result.temp_path, file_path)
+    elif file_result.is_changed:
+        with metrics.measure('write', len(file_result.file_data)):
+            write_file_atomically(file_path, file_result.file_data)
+    return replace(file_result, file_data=b'', temp_path=None), metrics
+
+
+class InFlightLimiter(object):
+    """Asynchronous limiter of images in flight.
+
+    Single image larger than limit is processed alone.
+    """
+
+    def __init__(self, budget: InFlightBudget, max_files: int) -> None:
+        """Init limiter.
+
+        Args:
+            budget (InFlightBudget): Limits of images in flight.
+            max_files (int): Limit of count of images in flight.
+        """
+        self.max_bytes = budget.max_bytes
+        self.max_files = max_files
+        self.files_count = 0
+        self.bytes_count = 0
+        self._condition = asyncio.Condition()
+
+    async def acquire(self, file_size: int) -> None:
+        """Wait until image fits into budget and take its place.
+
+        Args:
+            file_size (int): Image size.
+        """
+        async with self._condition:
+            await self._condition.wait_for(lambda: not self.files_count or (
+                self.files_count < self.max_files
+                and self.bytes_count + file_size <= self.max_bytes
+            ))
+            self.files_count += 1
+            self.bytes_count += file_size
+
+    async def release(self, file_size: int) -> None:
+        """Free place of processed image.
+
+        Args:
+            file_size (int): Image size.
+        """
+        async with self._condition:
+            self.files_count -= 1
+            self.bytes_count -= file_size
+            self._condition.notify_all()
+
+
+class AsyncCleaner(object):
+    """Asynchronous images cleaner.
+
+    Should be used as asynchronous context manager, so own executor
+    is shut down on exit. Results are not indexed.
+    """
+
+    def __init__(
+        self,
+        settings: Optional[Settings] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """Init cleaner.
+
+        Args:
+            settings (Optional[Settings]): \
+                Processing settings. Count of images processed at once is
+                limited by `budget`, 4 per worker by default.
+            executor (Optional[Executor]): \
+                Executor to process images on. Processes pool with
+                `workers` processes is started on first use by default.
+        """
+        self.settings = settings or Settings()
+        self.metrics = Metrics()
+        self.workers = get_workers_count(self.settings.workers)
+        self.limiter = InFlightLimiter(
+            self.settings.budget,
+            self.settings.budget.max_files or self.workers * 4,
+        )
+        self._executor = executor
+        self._is_own_executor = executor is None
+
+    async def __aenter__(self) -> 'AsyncCleaner':
+        """Enter context.
+
+        Returns:
+            AsyncCleaner: This cleaner.
+        """
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        """Exit context and shut down own executor.
+
+        Args:
+            exc_type (Optional[type[BaseException]]): Exception type.
+            exc_value (Optional[BaseException]): Exception.
+            traceback (Optional[TracebackType]): Exception traceback.
+        """
+        await self.close()
+
+    async def close(self) -> None:
+        """Shut down own executor without blocking event loop."""
+        executor = self._executor
+        if self._is_own_executor and executor is not None:
+            self._executor = None
+            await asyncio.to_thread(executor.shutdown)
+
+    async def clean_bytes(
+        self,
+        file_data: bytes,
+        file_name: str = 'image',
+    ) -> ProcessingResult:
+        """Remove metadata from image data.
+
+        Args:
+            file_data (bytes): Image data.
+            file_name (str): Image name used in result.
+
+        Returns:
+            ProcessingResult: Result with cleaned image data.
+        """
+        await self.limiter.acquire(len(file_data))
+        try:
+            file_result, metrics = await self._run(partial(
+                clean_image_data,
+                Path(file_name),
+                file_data,
+                self.settings.hash_algorithm,
+                self.settings.limits,
+            ))
+        finally:
+            await self.limiter.release(len(file_data))
+        self.metrics.merge(metrics)
+        return file_result
+
+    async def clean_path(
+        self,
+        file_path: Path,
+        file_hash: Optional[str] = None,
+    ) -> Optional[ProcessingResult]:
+        """Remove metadata from image file.
+
+        Image is replaced atomically if it contains metadata.
+
+        Args:
+            file_path (Path): Image path.
+            file_hash (Optional[str]): \
+                Indexed file hash. File is not processed if its content
+                matches.
+
+        Returns:
+            Optional[ProcessingResult]: \
+                Result without cleaned image data or None
+                if image content is not changed.
+        """
+        try:
+            file_size = file_path.stat().st_size
+        except OSError:
+            file_size = 0
+        await self.limiter.acquire(file_size)
+        try:
+            file_result, metrics = await self._run(partial(
+                clean_image_file,
+                file_path,
+                file_hash,
+                self._get_worker_cache_max_bytes(),
+                self.settings.hash_algorithm,
+                self.settings.limits,
+            ))
+        finally:
+            await self.limiter.release(file_size)
+        self.metrics.merge(metrics)
+        return file_result
+
+    async def iter_dir(self, source: Path) -> AsyncIterator[ProcessingResult]:
+        """Remove metadata from images in directory.
+
+        Directory is scanned with `scan` rules of settings in thread.
+        Results are yielded in the order of files, count of scheduled
+        images is limited by budget.
+
+        Args:
+            source (Path): Directory path.
+
+        Yields:
+            ProcessingResult: Result without cleaned image data.
+        """
+        # Archives are cleaned by directory processing only
+        scanner = iter(DirScanner(
+            source,
+            replace(self.settings.scan, archives=False),
+        ))
+        pending: deque[asyncio.Task[Optional[ProcessingResult]]] = deque()
+        try:
+            while True:
+                image_file = await asyncio.to_thread(next, scanner, None)
+                if image_file is None:
+                    break
+
+                if len(pending) >= self.limiter.max_files:
+                    file_result = await pending.popleft()
+                    if file_result is not None:
+                        yield file_result
+                pending.append(asyncio.create_task(
+                    self.clean_path(image_file[0]),
+                ))
+
+            while pending:
+                file_result = await pending.popleft()
+                if file_result is not None:
+                    yield file_result
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _get_worker_cache_max_bytes(self) -> int:
+        cache = self.settings.cache
+        return cache.max_bytes // self.workers if cache is not None else 0
+
+    async def _run(self, job: Callable[[], JobResult]) -> JobResult:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        return await asyncio.get_running_loop().run_in_executor(
+            self._executor,
+            job,
+        )
@@ -0,0 +1,479 @@
+"""Archives module.
+
+Provides cleaning of images in zip and tar archives without extraction.
+Archives are read and written member by member, so only one member is
+kept in memory, and cleaned archive replaces the original atomically.
+Members are indexed by pathes of archive with marker and member name,
+e.g. `photos.zip!/2023/IMG_1.jpg`.
+"""
+
+
+import os
+import shutil
+import struct
+from copy import copy
+from dataclasses import replace
+from io import BytesIO
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Iterable, Iterator, Optional
+
+from image_meta_cleaner.checkpoint import get_temp_path, replace_file
+from image_meta_cleaner.files_index import (
+    DEFAULT_HASH_ALGORITHM,
+    FilesIndex,
+    FileStat,
+    get_file_stat,
+    get_hash_algorithm,
+    hash_file_stream,
+    verify_file_hash,
+)
+from image_meta_cleaner.images import is_image
+from image_meta_cleaner.metrics import Metrics
+from image_meta_cleaner.processing import (
+    Err,
+    ImageLimits,
+    Ok,
+    ProcessingResult,
+    process_image,
+)
+
+if TYPE_CHECKING:
+    from zipfile import ZipFile, ZipInfo
+
+# Extensions of supported archives files.
+ARCHIVE_EXTENSIONS = frozenset(('.zip', '.tar'))
+
+# Marker appended to archive name in pathes of its members.
+ARCHIVE_MEMBER_MARKER = '!'
+
+# Size of chunks of copied members.
+ARCHIVE_CHUNK_SIZE = 1024 * 1024
+
+# Header id of zip64 records of zip extra field.
+ZIP64_EXTRA_ID = 0x0001
+
+# Format of header of zip extra field records: header id and data size.
+ZIP_EXTRA_HEADER = struct.Struct('<HH')
+
+
+def is_archive(file_path: Path) -> bool:
+    """Check that file is a supported archive.
+
+    Args:
+        file_path (Path): Path to the file.
+
+    Returns:
+        bool: True if file of zip or tar type, False otherwise.
+    """
+    return file_path.suffix.lower() in ARCHIVE_EXTENSIONS
+
+
+def get_member_path(archive_path: Path, member_name: str) -> Path:
+    """Build path of archive member used as its index key.
+
+    Args:
+        archive_path (Path): Archive path.
+        member_name (str): Member name in archive.
+
+    Returns:
+        Path: Member path, e.g. `photos.zip!/2023/IMG_1.jpg`.
+    """
+    return archive_path.with_name(
+        archive_path.name + ARCHIVE_MEMBER_MARKER,
+    ) / member_name.lstrip('/')
+
+
+def get_member_archive(member_path: Path) -> Optional[Path]:
+    """Get archive path of archive member path.
+
+    Args:
+        member_path (Path): Path built by `get_member_path`.
+
+    Returns:
+        Optional[Path]: Archive path or None if path is not a member.
+    """
+    for parent in reversed(member_path.parents):
+        if not parent.name.endswith(ARCHIVE_MEMBER_MARKER):
+            continue
+        archive_path = parent.with_name(
+            parent.name[:-len(ARCHIVE_MEMBER_MARKER)],
+        )
+        if is_archive(archive_path):
+            return archive_path
+    return None
+
+
+def iter_archives_members(
+    index: FilesIndex,
+    archive_paths: set[Path],
+) -> Iterator[Path]:
+    """Iterate over indexed members of archives.
+
+    Args:
+        index (FilesIndex): Index with processed files.
+        archive_paths (set[Path]): Absolute pathes of archives.
+
+    Yields:
+        Path: Absolute path of indexed member.
+    """
+    member_dir_marker = ARCHIVE_MEMBER_MARKER + os.sep
+    for file_path in index:
+        # Most files are not members, so pathes are not parsed for them
+        if member_dir_marker not in str(file_path):
+            continue
+        if get_member_archive(file_path) in archive_paths:
+            yield file_path
+
+
+class ArchiveMembersCleaner(object):
+    """Cleaner of images members of single archive.
+
+    Members with data matching indexed hash are not processed.
+    Cleaned members are indexed, failed ones are kept as is.
+    """
+
+    def __init__(
+        self,
+        archive_path: Path,
+        index: FilesIndex,
+        metrics: Metrics,
+        hash_algorithm: str,
+        limits: Optional[ImageLimits] = None,
+    ) -> None:
+        """Init cleaner.
+
+        Args:
+            archive_path (Path): Archive path.
+            index (FilesIndex): Index to update.
+            metrics (Metrics): Metrics to register stages runs in.
+            hash_algorithm (str): Algorithm to hash cleaned members with.
+            limits (Optional[ImageLimits]): Limits of images members.
+        """
+        self.archive_path = archive_path
+        self.index = index
+        self.metrics = metrics
+        self.hash_algorithm = hash_algorithm
+        self.limits = limits
+        self.results: list[ProcessingResult] = []
+        self.member_paths: set[Path] = set()
+        self.is_changed = False
+
+    def clean_member(self, member_name: str, member_data: bytes) -> bytes:
+        """Remove metadata from image member.
+
+        Args:
+            member_name (str): Member name in archive.
+            member_data (bytes): Member content.
+
+        Returns:
+            bytes: Member content to write to cleaned archive.
+        """
+        member_path = get_member_path(self.archive_path, member_name)
+        self.member_paths.add(member_path.absolute())
+        member_hash = self.index.get(member_path)
+        if member_hash is not None:
+            with self.metrics.measure('hash', len(member_data)):
+                is_unchanged = verify_file_hash(member_hash, member_data)
+            if is_unchanged:
+                return member_data
+
+        member_result = process_image(
+            member_path,
+            member_data,
+            self.metrics,
+            self.hash_algorithm,
+            self.limits,
+        )
+        if not isinstance(member_result, Ok):
+            self.results.append(member_result)
+            return member_data
+
+        self.index[member_path] = member_result.file_hash
+        self.results.append(replace(member_result, file_data=b''))
+        self.is_changed = self.is_changed or member_result.is_changed
+        return member_result.file_data
+
+    def prune_index(self) -> None:
+        """Remove members that are not found in archive from index."""
+        missing_paths = [
+            member_path
+            for member_path in iter_archives_members(
+                self.index,
+                {self.archive_path.absolute()},
+            )
+            if member_path not in self.member_paths
+        ]
+        for member_path in missing_paths:
+            del self.index[member_path]  # noqa: WPS420
+
+
+def strip_zip64_extra(extra: bytes) -> bytes:
+    """Remove zip64 records from zip extra field.
+
+    Zip64 records hold sizes and offsets of member, so they are
+    regenerated by `ZipFile` for written member. Truncated record
+    at the end of field is dropped.
+
+    Args:
+        extra (bytes): Extra field of member header.
+
+    Returns:
+        bytes: Extra field with other records, e.g. extended timestamps
+            and unix owners.
+    """
+    kept_records: list[bytes] = []
+    position = 0
+    while position + ZIP_EXTRA_HEADER.size <= len(extra):
+        header_id, data_size = ZIP_EXTRA_HEADER.unpack_from(extra, position)
+        record_end = position + ZIP_EXTRA_HEADER.size + data_size
+        if record_end > len(extra):
+            break
+        if header_id != ZIP64_EXTRA_ID:
+            kept_records.append(extra[position:record_end])
+        position = record_end
+    return b''.join(kept_records)
+
+
+def copy_zip_info(member_info: 'ZipInfo') -> 'ZipInfo':
+    """Copy zip member header without sizes and offsets.
+
+    Extra field is copied without zip64 records, flags that depend
+    on the way of writing are set by `ZipFile` again.
+
+    Args:
+        member_info (ZipInfo): Member header of read archive.
+
+    Returns:
+        ZipInfo: Member header to write.
+    """
+    from zipfile import ZipInfo  # noqa: WPS433
+
+    target_info = ZipInfo(member_info.filename, member_info.date_time)
+    target_info.compress_type = member_info.compress_type
+    target_info.comment = member_info.comment
+    target_info.create_system = member_info.create_system
+    target_info.create_version = member_info.create_version
+    target_info.external_attr = member_info.external_attr
+    target_info.internal_attr = member_info.internal_attr
+    target_info.flag_bits = member_info.flag_bits
+    target_info.extra = strip_zip64_extra(member_info.extra)
+    return target_info
+
+
+def copy_zip_member(
+    source_zip: 'ZipFile',
+    member_info: 'ZipInfo',
+    target_zip: 'ZipFile',
+    cleaner: ArchiveMembersCleaner,
+) -> None:
+    """Copy zip member, images members are cleaned.
+
+    Args:
+        source_zip (ZipFile): Read archive.
+        member_info (ZipInfo): Member header of read archive.
+        target_zip (ZipFile): Written archive.
+        cleaner (ArchiveMembersCleaner): Cleaner of images members.
+    """
+    from zipfile import ZIP64_LIMIT  # noqa: WPS433
+
+    target_info = copy_zip_info(member_info)
+    if member_info.is_dir():
+        target_zip.writestr(target_info, b'')
+        return
+
+    with source_zip.open(member_info) as source_member:
+        if is_image(Path(member_info.filename)):
+            with cleaner.metrics.measure('read', member_info.file_size):
+                member_data = source_member.read()
+            target_zip.writestr(target_info, cleaner.clean_member(
+                member_info.filename,
+                member_data,
+            ))
+            return
+
+        with target_zip.open(
+            target_info,
+            'w',
+            force_zip64=member_info.file_size > ZIP64_LIMIT,
+        ) as target_member:
+            shutil.copyfileobj(
+                source_member,
+                target_member,
+                ARCHIVE_CHUNK_SIZE,
+            )
+
+
+def clean_zip_archive(
+    archive_path: Path,
+    target_file: BinaryIO,
+    cleaner: ArchiveMembersCleaner,
+) -> None:
+    """Write zip archive with cleaned images members.
+
+    Args:
+        archive_path (Path): Source archive path.
+        target_file (BinaryIO): File to write cleaned archive to.
+        cleaner (ArchiveMembersCleaner): Cleaner of images members.
+    """
+    from zipfile import ZipFile  # noqa: WPS433
+
+    with ZipFile(archive_path) as source_zip:
+        with ZipFile(target_file, 'w') as target_zip:
+            target_zip.comment = source_zip.comment
+            for member_info in source_zip.infolist():
+                copy_zip_member(source_zip, member_info, target_zip, cleaner)
+
+
+def clean_tar_archive(
+    archive_path: Path,
+    target_file: BinaryIO,
+    cleaner: ArchiveMembersCleaner,
+) -> None:
+    """Write tar archive with cleaned images members.
+
+    Source archive is read as stream, so members are never seeked.
+
+    Args:
+        archive_path (Path): Source archive path.
+        target_file (BinaryIO): File to write cleaned archive to.
+        cleaner (ArchiveMembersCleaner): Cleaner of images members.
+    """
+    import tarfile  # noqa: WPS433
+
+    source_tar = tarfile.open(archive_path, 'r|')
+    target_tar = tarfile.open(
+        fileobj=target_file,
+        mode='w|',
+        format=tarfile.PAX_FORMAT,
+    )
+    with source_tar, target_tar:
+        for member_info in source_tar:
+            member_file = None
+            if member_info.isfile():
+                member_file = source_tar.extractfile(member_info)
+            if member_file is None or not is_image(Path(member_info.name)):
+                target_tar.addfile(member_info, member_file)
+                continue
+
+            with cleaner.metrics.measure('read', member_info.size):
+                member_data = member_file.read()
+            member_data = cleaner.clean_member(member_info.name, member_data)
+            target_info = copy(member_info)
+            target_info.size = len(member_data)
+            target_tar.addfile(target_info, BytesIO(member_data))
+
+
+def clean_archive(  # noqa: WPS210
+    archive_path: Path,
+    index: FilesIndex,
+    metrics: Optional[Metrics] = None,
+    hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+    limits: Optional[ImageLimits] = None,
+) -> tuple[list[ProcessingResult], bool]:
+    """Remove metadata from images in archive.
+
+    Cleaned archive is written to temporary file and replaces
+    the original only if any member is cleaned. Names and order of
+    members are kept. Members and archive itself are indexed in place,
+    members that are not found in archive anymore are removed from index.
+    Archive with failed members is not indexed, so it is retried.
+
+    Args:
+        archive_path (Path): Archive path.
+        index (FilesIndex): Index with processed files.
+        metrics (Optional[Metrics]): Metrics to register stages runs in.
+        hash_algorithm (str): Algorithm to hash files with.
+        limits (Optional[ImageLimits]): Limits of images members.
+
+    Returns:
+        list[ProcessingResult]: \
+            Results of processed images members without cleaned data.
+        bool: True if archive is rewritten.
+    """
+    from tarfile import TarError  # noqa: WPS433
+    from zipfile import BadZipFile  # noqa: WPS433
+    from zlib import error as ZlibError  # noqa: N812, WPS433
+
+    # Encrypted zip members raise RuntimeError on reading
+    archive_errors = (
+        OSError,
+        EOFError,
+        RuntimeError,
+        NotImplementedError,
+        BadZipFile,
+        TarError,
+        ZlibError,
+    )
+    metrics = metrics or Metrics()
+    archive_hash = index.get(archive_path)
+    if archive_hash is not None:
+        with open(archive_path, 'rb') as archive_file:
+            with metrics.measure('hash', get_file_stat(archive_path).size):
+                is_unchanged = archive_hash == hash_file_stream(
+                    archive_file,
+                    get_hash_algorithm(archive_hash),
+                )
+        if is_unchanged:
+            index.set_stat(archive_path, get_file_stat(archive_path))
+            return [], False
+
+    cleaner = ArchiveMembersCleaner(
+        archive_path,
+        index,
+        metrics,
+        hash_algorithm,
+        limits,
+    )
+    clean_members = clean_tar_archive
+    if archive_path.suffix.lower() == '.zip':
+        clean_members = clean_zip_archive
+    temp_path = get_temp_path(archive_path)
+    try:
+        with open(temp_path, 'wb') as temp_file:
+            clean_members(archive_path, temp_file, cleaner)
+    except archive_errors as archive_error:
+        temp_path.unlink(missing_ok=True)
+        return [Err(
+            file_path=archive_path,
+            message='Cannot read archive',
+            error=archive_error,
+        )], False
+    except BaseException:
+        # Bugs and interruptions do not leave temporary file either
+        temp_path.unlink(missing_ok=True)
+        raise
+
+    if cleaner.is_changed:
+        replace_file(temp_path, archive_path)
+    else:
+        temp_path.unlink()
+    cleaner.prune_index()
+    if not any(isinstance(result, Err) for result in cleaner.results):
+        with open(archive_path, 'rb') as archive_file:  # noqa: WPS440
+            index[archive_path] = hash_file_stream(
+                archive_file,
+                hash_algorithm,
+            )
+        index.set_stat(archive_path, get_file_stat(archive_path))
+    return cleaner.results, cleaner.is_changed
+
+
+def split_archive_files(
+    files: Iterable[tuple[Path, FileStat]],
+    archive_files: list[tuple[Path, FileStat]],
+) -> Iterator[tuple[Path, FileStat]]:
+    """Filter archives out of files.
+
+    Args:
+        files (Iterable[tuple[Path, FileStat]]): Files and stat info.
+        archive_files (list[tuple[Path, FileStat]]): \
+            List to add archives to.
+
+    Yields:
+        tuple[Path, FileStat]: Image file and stat info.
+    """
+    for file_path, file_stat in files:
+        if is_archive(file_path):
+            archive_files.append((file_path, file_stat))
+        else:
+            yield file_path, file_stat
@@ -0,0 +1,344 @@
+"""Audit module.
+
+Reports metadata contained in images without rewriting them.
+Only header segments of images are parsed and files are memory mapped,
+so pixel data is never read from disk.
+"""
+
+
+from dataclasses import dataclass
+from mmap import ACCESS_READ, mmap
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from image_meta_cleaner.formats import ImageBuffer, jpeg, png, tiff, webp
+
+# Prefixes of JPEG APP1 segments with XMP packets.
+JPEG_XMP_HEADERS = (
+    b'http://ns.adobe.com/xap/1.0/\x00',
+    b'http://ns.adobe.com/xmp/extension/\x00',
+)
+
+# Photoshop resources segment with IPTC data.
+JPEG_IPTC_MARKER = 0xED
+
+# Prefix of JPEG APP13 segment with Photoshop resources.
+JPEG_IPTC_HEADER = b'Photoshop 3.0\x00'
+
+# Keyword of PNG `iTXt` chunk with XMP packet.
+PNG_XMP_KEYWORD = b'XML:com.adobe.xmp\x00'
+
+# Keyword of PNG text chunk with IPTC profile written by ImageMagick.
+PNG_IPTC_KEYWORD = b'Raw profile type iptc\x00'
+
+# WebP chunk with XMP packet.
+WEBP_XMP_CHUNK = b'XMP '
+
+# TIFF tags of XMP and IPTC blocks.
+TIFF_XMP_TAG = 700
+TIFF_IPTC_TAG = 33723
+
+# TIFF tag of GPS sub-IFD pointer.
+GPS_IFD_TAG = 34853
+
+# Columns of audit report.
+REPORT_COLUMNS = (
+    'path',
+    'format',
+    'exif',
+    'gps',
+    'xmp',
+    'iptc',
+    'other',
+    'total',
+)
+
+
+@dataclass
+class MetaReport(object):
+    """Metadata found in image.
+
+    Sizes are counted in bytes of containers segments or chunks.
+    """
+
+    image_format: str
+    exif_size: int = 0
+    xmp_size: int = 0
+    iptc_size: int = 0
+    other_size: int = 0
+    has_gps: bool = False
+
+    @property
+    def size(self) -> int:
+        """Total size of metadata.
+
+        Returns:
+            int: Size in bytes.
+        """
+        return self.exif_size + self.xmp_size + self.iptc_size + (
+            self.other_size
+        )
+
+    @property
+    def has_meta(self) -> bool:
+        """Check that image contains any metadata.
+
+        Returns:
+            bool: True if metadata would be removed by cleaning.
+        """
+        return self.size > 0
+
+
+def has_gps_info(exif_data: ImageBuffer) -> bool:
+    """Check that EXIF data has GPS sub-IFD.
+
+    Args:
+        exif_data (ImageBuffer): EXIF data in TIFF format.
+
+    Returns:
+        bool: True if the first directory points to GPS sub-IFD.
+    """
+    try:
+        reader = tiff.TiffReader(exif_data)
+        entries = reader.read_entries(reader.read_int(4, 4))
+    except ValueError:
+        return False
+    return any(
+        entry.tag == GPS_IFD_TAG and reader.read_int(entry.value_offset, 4)
+        for entry in entries
+    )
+
+
+def audit_jpeg_meta(image_data: ImageBuffer) -> MetaReport:
+    """Find metadata segments of JPEG image.
+
+    Only header segments up to the first start of scan are checked.
+
+    Args:
+        image_data (ImageBuffer): JPEG image data.
+
+    Returns:
+        MetaReport: Found metadata.
+    """
+    report = MetaReport('jpeg')
+    for marker, start, end in jpeg.iter_segments(image_data):
+        payload = image_data[start + 4:min(start + 40, end)]
+        if not jpeg.is_meta_segment(marker, payload):
+            continue
+
+        segment_size = end - start
+        if marker == jpeg.EXIF_MARKER and payload.startswith(
+            jpeg.EXIF_HEADER,
+        ):
+            report.exif_size += segment_size
+            report.has_gps = report.has_gps or has_gps_info(
+                jpeg.get_exif_payload(image_data, start, end),
+            )
+        elif marker == jpeg.EXIF_MARKER and payload.startswith(
+            JPEG_XMP_HEADERS,
+        ):
+            report.xmp_size += segment_size
+        elif marker == JPEG_IPTC_MARKER and payload.startswith(
+            JPEG_IPTC_HEADER,
+        ):
+            report.iptc_size += segment_size
+        else:
+            report.other_size += segment_size
+
+    return report
+
+
+def audit_png_meta(image_data: ImageBuffer) -> MetaReport:
+    """Find metadata chunks of PNG image.
+
+    Args:
+        image_data (ImageBuffer): PNG image data.
+
+    Returns:
+        MetaReport: Found metadata.
+    """
+    report = MetaReport('png')
+    for chunk_type, start, end in png.iter_chunks(image_data):
+        if chunk_type not in png.META_CHUNKS:
+            continue
+
+        chunk_size = end - start
+        keyword = image_data[start + 8:min(start + 40, end)]
+        if chunk_type == png.EXIF_CHUNK:
+            report.exif_size += chunk_size
+            report.has_gps = report.has_gps or has_gps_info(
+                png.get_chunk_data(image_data, start, end),
+            )
+        elif keyword.startswith(PNG_XMP_KEYWORD):
+            report.xmp_size += chunk_size
+        elif keyword.startswith(PNG_IPTC_KEYWORD):
+            report.iptc_size += chunk_size
+        else:
+            report.other_size += chunk_size
+
+    return report
+
+
+def audit_webp_meta(image_data: ImageBuffer) -> MetaReport:
+    """Find metadata chunks of WebP image.
+
+    Args:
+        image_data (ImageBuffer): WebP image data.
+
+    Returns:
+        MetaReport: Found metadata.
+    """
+    report = MetaReport('webp')
+    for fourcc, start, end in webp.iter_chunks(image_data):
+        if fourcc == webp.EXIF_CHUNK:
+            report.exif_size += end - start
+            report.has_gps = report.has_gps or has_gps_info(
+                webp.get_exif_payload(image_data, start, end),
+            )
+        elif fourcc == WEBP_XMP_CHUNK:
+            report.xmp_size += end - start
+
+    return report
+
+
+def get_sub_ifd_size(reader: tiff.TiffReader, ifd_offset: int) -> int:
+    """Get size of metadata sub-IFD with its values.
+
+    Args:
+        reader (tiff.TiffReader): TIFF reader.
+        ifd_offset (int): Directory offset.
+
+    Returns:
+        int: Size in bytes, 0 for dangling pointers.
+    """
+    try:
+        entries = reader.read_entries(ifd_offset)
+    except ValueError:
+        return 0
+    return 2 + len(entries) * tiff.ENTRY_SIZE + 4 + sum(
+        entry.value_size
+        for entry in entries
+        if not entry.is_inline
+    )
+
+
+def audit_tiff_meta(image_data: ImageBuffer) -> MetaReport:
+    """Find metadata entries of TIFF image directories.
+
+    Args:
+        image_data (ImageBuffer): TIFF image data.
+
+    Returns:
+        MetaReport: Found metadata.
+    """
+    report = MetaReport('tiff')
+    reader = tiff.TiffReader(image_data)
+    for ifd_offset in reader.read_ifds_offsets():
+        for entry in reader.read_entries(ifd_offset):
+            if entry.tag not in tiff.META_TAGS:
+                continue
+
+            entry_size = tiff.ENTRY_SIZE
+            if not entry.is_inline:
+                entry_size += entry.value_size
+            if entry.tag in tiff.META_IFD_TAGS:
+                report.has_gps = report.has_gps or entry.tag == GPS_IFD_TAG
+                report.exif_size += entry_size + get_sub_ifd_size(
+                    reader,
+                    reader.read_int(entry.value_offset, 4),
+                )
+            elif entry.tag == TIFF_XMP_TAG:
+                report.xmp_size += entry_size
+            elif entry.tag == TIFF_IPTC_TAG:
+                report.iptc_size += entry_size
+            else:
+                report.other_size += entry_size
+
+    return report
+
+
+# Container-level metadata auditors with format checks.
+META_AUDITORS: tuple[tuple[
+    Callable[[ImageBuffer], bool],
+    Callable[[ImageBuffer], MetaReport],
+], ...] = (
+    (jpeg.is_jpeg, audit_jpeg_meta),
+    (png.is_png, audit_png_meta),
+    (webp.is_webp, audit_webp_meta),
+    (tiff.is_tiff, audit_tiff_meta),
+)
+
+
+def audit_image_meta(image_data: ImageBuffer) -> Optional[MetaReport]:
+    """Find metadata of image.
+
+    Args:
+        image_data (ImageBuffer): Image data.
+
+    Returns:
+        Optional[MetaReport]: \
+            Found metadata or None if image container was not parsed.
+    """
+    for is_format, audit_meta in META_AUDITORS:
+        if is_format(image_data):
+            try:
+                return audit_meta(image_data)
+            except ValueError:
+                return None
+
+    return None
+
+
+def audit_image_file(file_path: Path) -> Optional[MetaReport]:
+    """Find metadata of image file.
+
+    File is memory mapped, so only pages with headers are read.
+
+    Args:
+        file_path (Path): Image path.
+
+    Returns:
+        Optional[MetaReport]: \
+            Found metadata or None if image container was not parsed.
+    """
+    with open(file_path, 'rb') as image_file:
+        try:
+            image_data = mmap(image_file.fileno(), 0, access=ACCESS_READ)
+        except ValueError:
+            # Empty files can not be mapped
+            return None
+        with image_data:
+            return audit_image_meta(image_data)
+
+
+def build_audit_report(
+    reports: Iterable[tuple[Path, Optional[MetaReport]]],
+) -> str:
+    """Build tab separated audit report.
+
+    Images which containers were not parsed have `unknown` format.
+
+    Args:
+        reports (Iterable[tuple[Path, Optional[MetaReport]]]): \
+            Images pathes with found metadata.
+
+    Returns:
+        str: Report with header line and line per image.
+    """
+    lines = ['\t'.join(REPORT_COLUMNS)]
+    for file_path, report in reports:
+        if report is None:
+            lines.append('{0}\tunknown'.format(file_path))
+            continue
+
+        lines.append('\t'.join(str(column) for column in (
+            file_path,
+            report.image_format,
+            report.exif_size,
+            int(report.has_gps),
+            report.xmp_size,
+            report.iptc_size,
+            report.other_size,
+            report.size,
+        )))
+    return '\n'.join(lines)
@@ -0,0 +1,206 @@
+"""Checkpoint module.
+
+Provides atomic writing of files and periodic checkpoints of
+processing state. Written files are synced to disk in batches before
+index is saved, so after crash processing is resumed from the last
+checkpoint and no file is left partially written.
+"""
+
+
+import os
+import stat
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from time import monotonic
+from typing import Callable, Iterable, Optional
+
+# Suffix of temporary files written before renaming to target.
+TEMP_FILE_SUFFIX = '.imc-tmp'
+
+
+@dataclass
+class CheckpointPolicy(object):
+    """Frequency of processing state checkpoints.
+
+    Checkpoint is made when either limit is reached. State that is
+    rewritten as a whole on every checkpoint, like text index file,
+    is saved after at least `growth` part of its size is processed
+    and after at least `1 / growth` times duration of its last saving,
+    so total cost of checkpoints stays linear in count of files.
+    """
+
+    files: int = 1000
+    seconds: float = 30
+    growth: float = 0.1
+
+
+def get_temp_path(file_path: Path) -> Path:
+    """Get path of temporary file for atomic writing.
+
+    Args:
+        file_path (Path): Target file path.
+
+    Returns:
+        Path: Temporary file path in the same directory.
+    """
+    return file_path.with_name(
+        '.{0}{1}'.format(file_path.name, TEMP_FILE_SUFFIX),
+    )
+
+
+def write_file_atomically(
+    file_path: Path,
+    file_data: bytes,
+    sync: bool = False,
+) -> None:
+    """Write file through temporary file and rename.
+
+    File is either fully replaced or not changed at all.
+    Permissions of replaced file are kept.
+
+    Args:
+        file_path (Path): File path.
+        file_data (bytes): New file content.
+        sync (bool): \
+            Sync file and directory to disk. Without syncing file
+            can be lost on power failure, but not on process crash.
+    """
+    temp_path = get_temp_path(file_path)
+    with open(temp_path, 'wb') as temp_file:
+        temp_file.write(file_data)
+        if sync:
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+    replace_file(temp_path, file_path, sync)
+
+
+def replace_file(temp_path: Path, file_path: Path, sync: bool = False) -> None:
+    """Replace file with written temporary file.
+
+    Permissions of replaced file are kept.
+
+    Args:
+        temp_path (Path): Temporary file path.
+        file_path (Path): Replaced file path.
+        sync (bool): Sync directory to disk.
+    """
+    try:
+        file_mode = stat.S_IMODE(file_path.stat().st_mode)
+    except FileNotFoundError:
+        pass
+    else:
+        os.chmod(temp_path, file_mode)
+    os.replace(temp_path, file_path)
+    if sync:
+        sync_dirs([file_path.parent])
+
+
+def sync_dirs(dir_paths: Iterable[Path]) -> None:
+    """Sync directories entries to disk.
+
+    Directories can not be opened on Windows, where rename is durable.
+
+    Args:
+        dir_paths (Iterable[Path]): Directories pathes.
+    """
+    if sys.platform == 'win32':
+        return
+
+    for dir_path in dir_paths:
+        dir_fd = os.open(dir_path, os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+
+def sync_files(file_paths: Iterable[Path]) -> None:
+    """Sync files and their directories to disk.
+
+    Args:
+        file_paths (Iterable[Path]): Files pathes.
+    """
+    dir_paths: set[Path] = set()
+    for file_path in file_paths:
+        try:
+            file_fd = os.open(file_path, os.O_RDWR)
+        except FileNotFoundError:
+            continue
+        try:
+            os.fsync(file_fd)
+        finally:
+            os.close(file_fd)
+        dir_paths.add(file_path.parent)
+    sync_dirs(dir_paths)
+
+
+class Checkpointer(object):
+    """Saver of processing state after batches of files.
+
+    Files written since last checkpoint are synced to disk together
+    right before state is saved, so saved state never refers to
+    files that are not on disk.
+    """
+
+    def __init__(
+        self,
+        save_state: Callable[[], None],
+        policy: CheckpointPolicy,
+        state_size: Optional[Callable[[], int]] = None,
+    ) -> None:
+        """Init checkpointer.
+
+        Args:
+            save_state (Callable[[], None]): Function to save state.
+            policy (CheckpointPolicy): Frequency of checkpoints.
+            state_size (Optional[Callable[[], int]]): \
+                Function to get count of entries rewritten on saving
+                of state, or None if state is saved incrementally.
+        """
+        self.save_state = save_state
+        self.policy = policy
+        self.state_size = state_size
+        self.checkpoints_count = 0
+        self._written_files: list[Path] = []
+        self._files_count = 0
+        self._state_entries = 0
+        self._save_seconds = 0.0
+        self._checkpoint_time = monotonic()
+
+    def add_file(self, file_path: Path, is_written: bool) -> None:
+        """Register processed file and make checkpoint if it is time.
+
+        Args:
+            file_path (Path): File path.
+            is_written (bool): File was rewritten.
+        """
+        if is_written:
+            self._written_files.append(file_path)
+        self._files_count += 1
+        files_limit = max(
+            self.policy.files,
+            int(self._state_entries * self.policy.growth),
+        )
+        seconds_limit = max(
+            self.policy.seconds,
+            self._save_seconds / self.policy.growth,
+        )
+        if (
+            self._files_count >= files_limit
+            or monotonic() - self._checkpoint_time >= seconds_limit
+        ):
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Sync written files and save state."""
+        sync_files(self._written_files)
+        save_time = monotonic()
+        self.save_state()
+        self.checkpoints_count += 1
+        self._written_files.clear()
+        self._files_count = 0
+        self._checkpoint_time = monotonic()
+        if self.state_size is not None:
+            self._state_entries = self.state_size()
+            self._save_seconds = self._checkpoint_time - save_time
@@ -0,0 +1,689 @@
+"""Cluster module.
+
+Provides cooperative processing of directory on shared filesystem by
+several nodes. Files are split to shards by their relative pathes and
+node processes only files of shards it holds leases of, taking at most
+its fair part of shards for nodes alive at the moment. Node does not
+write shared index, its changes are saved to delta files which are
+merged into shared index by the node holding merge lease.
+"""
+
+
+import json
+import logging
+from dataclasses import replace
+from math import ceil
+from pathlib import Path
+from time import sleep, time, time_ns
+from typing import Any, Callable, Iterable, Iterator, Optional
+from zlib import crc32
+
+from image_meta_cleaner.checkpoint import Checkpointer, write_file_atomically
+from image_meta_cleaner.files_index import FilesIndex, FileStat, get_file_stat
+from image_meta_cleaner.index_store import (
+    SqliteFilesIndex,
+    get_files_index,
+    save_files_index,
+)
+from image_meta_cleaner.leases import (
+    NODE_LEASE_PREFIX,
+    ClusterSettings,
+    LeaseDir,
+)
+from image_meta_cleaner.location import Location
+from image_meta_cleaner.location_store import (
+    LocationStore,
+    get_location_store,
+)
+from image_meta_cleaner.metrics import Metrics
+from image_meta_cleaner.pipeline import (
+    iter_changed_images,
+    log_result,
+    write_result,
+)
+from image_meta_cleaner.processing import (
+    Err,
+    Ok,
+    ProcessingResult,
+    iter_processed_image_files,
+)
+from image_meta_cleaner.scanner import DirScanner
+from image_meta_cleaner.settings import Settings
+
+# Name of directory with lease files.
+LEASES_DIR_NAME = '.imc-leases'
+
+# Name of directory with index delta files of nodes.
+DELTAS_DIR_NAME = '.imc-deltas'
+
+# Suffix of index delta files.
+DELTA_FILE_SUFFIX = '.jsonl'
+
+# Name of lease that allows merging of deltas into shared index.
+MERGE_LEASE_NAME = 'merge'
+
+# Prefix of shards leases names.
+SHARD_LEASE_PREFIX = 'shard-'
+
+# Count of shards rebalances per lease duration.
+REBALANCES = 4
+
+
+def get_shard(source: Path, file_path: Path, shards: int) -> int:
+    """Get shard of file.
+
+    Args:
+        source (Path): Root directory path.
+        file_path (Path): File path.
+        shards (int): Count of shards.
+
+    Returns:
+        int: Shard number, the same on all nodes.
+    """
+    relative_path = file_path.absolute().relative_to(source.absolute())
+    return crc32(relative_path.as_posix().encode()) % shards
+
+
+class IndexDelta(object):
+    """Index changes of node not yet saved to delta file."""
+
+    def __init__(self, deltas_dir: Path, node_id: str) -> None:
+        """Init delta.
+
+        Args:
+            deltas_dir (Path): Directory of delta files.
+            node_id (str): Id of this node.
+        """
+        self.deltas_dir = deltas_dir
+        self.node_id = node_id
+        self.records: list[dict[str, Any]] = []
+
+    def add_file(
+        self,
+        file_path: Path,
+        file_hash: str,
+        file_stat: Optional[FileStat],
+        file_result: Optional[Ok] = None,
+    ) -> None:
+        """Record indexed file.
+
+        Args:
+            file_path (Path): File path.
+            file_hash (str): File hash.
+            file_stat (Optional[FileStat]): File stat info.
+            file_result (Optional[Ok]): \
+                Processing result with location, None if file content
+                was not changed.
+        """
+        record: dict[str, Any] = {
+            'path': str(file_path.absolute()),
+            'hash': file_hash,
+            'stat': file_stat,
+        }
+        if file_result is not None:
+            location = file_result.location
+            record['location'] = None if location is None else [
+                location.latitude,
+                location.longitude,
+            ]
+        self.records.append(record)
+
+    def remove_file(self, file_path: Path) -> None:
+        """Record file removed from index.
+
+        Args:
+            file_path (Path): File path.
+        """
+        self.records.append({
+            'path': str(file_path.absolute()),
+            'removed': True,
+        })
+
+    def flush(self) -> None:
+        """Save recorded changes to new delta file."""
+        if not self.records:
+            return
+
+        self.deltas_dir.mkdir(parents=True, exist_ok=True)
+        # Names are ordered by time, so deltas are applied in order
+        delta_path = self.deltas_dir / '{0:020d}-{1}{2}'.format(
+            time_ns(),
+            self.node_id,
+            DELTA_FILE_SUFFIX,
+        )
+        write_file_atomically(
+            delta_path,
+            '\n'.join(json.dumps(record) for record in self.records).encode(),
+            sync=True,
+        )
+        self.records.clear()
+
+
+def load_node_index(source: Path, index_backend: str = 'text') -> FilesIndex:
+    """Load copy of shared index that node changes in memory only.
+
+    SQLite index is copied and closed, so node never holds its write
+    lock, which would block merging of deltas.
+
+    Args:
+        source (Path): Root directory path.
+        index_backend (str): Index backend.
+
+    Returns:
+        FilesIndex: Index in memory.
+    """
+    shared_index = get_files_index(source, index_backend)
+    if not isinstance(shared_index, SqliteFilesIndex):
+        return shared_index
+
+    index = FilesIndex()
+    try:
+        for path_str, file_hash, file_stat in shared_index.iter_entries():
+            file_path = Path(path_str)
+            index[file_path] = file_hash
+            if file_stat is not None:
+                index.set_stat(file_path, file_stat)
+    finally:
+        shared_index.close()
+    return index
+
+
+def get_delta_paths(deltas_dir: Path) -> list[Path]:
+    """Get delta files in order of writing.
+
+    Args:
+        deltas_dir (Path): Directory of delta files.
+
+    Returns:
+        list[Path]: Delta files pathes.
+    """
+    return sorted(
+        delta_path
+        for delta_path in deltas_dir.glob('*{0}'.format(DELTA_FILE_SUFFIX))
+        if not delta_path.name.startswith('.')
+    )
+
+
+def apply_delta_file(
+    delta_path: Path,
+    index: FilesIndex,
+    location_store: Optional[LocationStore] = None,
+) -> bool:
+    """Apply changes of delta file to index and location store.
+
+    Args:
+        delta_path (Path): Delta file path.
+        index (FilesIndex): Index to update.
+        location_store (Optional[LocationStore]): Location store to update.
+
+    Returns:
+        bool: False if delta file is already merged and removed.
+    """
+    try:
+        delta_data = delta_path.read_text()
+    except FileNotFoundError:
+        return False
+
+    for line in delta_data.splitlines():
+        record = json.loads(line)
+        file_path = Path(record['path'])
+        if record.get('removed'):
+            index.pop(file_path, None)
+            if location_store is not None:
+                location_store.remove(file_path)
+            continue
+
+        index[file_path] = record['hash']
+        if record['stat'] is not None:
+            index.set_stat(file_path, FileStat(*record['stat']))
+        if location_store is not None and 'location' in record:
+            location = record['location']
+            location_store.add(
+                file_path,
+                record['hash'],
+                None if location is None else Location(*location),
+            )
+    return True
+
+
+def merge_delta_files(
+    source: Path,
+    delta_paths: list[Path],
+    index: FilesIndex,
+    leases: LeaseDir,
+) -> None:
+    """Apply delta files to shared index and remove them.
+
+    Args:
+        source (Path): Root directory path.
+        delta_paths (list[Path]): Delta files in order of writing.
+        index (FilesIndex): Shared index.
+        leases (LeaseDir): Leases of this node to renew.
+    """
+    location_store = get_location_store(source)
+    for delta_path in delta_paths:
+        leases.renew()
+        apply_delta_file(delta_path, index, location_store)
+    save_files_index(source, index)
+    location_store.save()
+    # Deltas applied twice after crash here give the same index
+    for delta_path in delta_paths:  # noqa: WPS440
+        delta_path.unlink(missing_ok=True)
+
+
+def merge_deltas(
+    source: Path,
+    leases: LeaseDir,
+    index_backend: str = 'text',
+) -> int:
+    """Merge delta files of nodes into shared index.
+
+    Deltas are merged only by node that holds merge lease,
+    other nodes return immediately.
+
+    Args:
+        source (Path): Root directory path.
+        leases (LeaseDir): Leases of this node.
+        index_backend (str): Index backend.
+
+    Returns:
+        int: Count of merged delta files.
+    """
+    deltas_dir = source / DELTAS_DIR_NAME
+    if not get_delta_paths(deltas_dir):
+        return 0
+    if not leases.acquire(MERGE_LEASE_NAME):
+        return 0
+
+    try:
+        delta_paths = get_delta_paths(deltas_dir)
+        index = get_files_index(source, index_backend)
+        try:
+            merge_delta_files(source, delta_paths, index, leases)
+        finally:
+            if isinstance(index, SqliteFilesIndex):
+                index.close()
+    finally:
+        leases.release(MERGE_LEASE_NAME)
+    return len(delta_paths)
+
+
+class ShardsClaimer(object):
+    """Claimer of shards leases for one scan.
+
+    Shards are claimed on first file of shard, at most fair part
+    of them for alive nodes. Fair part is recounted several times
+    per lease duration, held shards above it are released for nodes
+    that joined later and refused shards may be claimed again.
+    """
+
+    def __init__(
+        self,
+        source: Path,
+        leases: LeaseDir,
+        shards: int,
+        on_claim: Optional[Callable[[], None]] = None,
+        on_release: Optional[Callable[[], None]] = None,
+    ) -> None:
+        """Init claimer.
+
+        Args:
+            source (Path): Root directory path.
+            leases (LeaseDir): Leases of this node.
+            shards (int): Count of shards.
+            on_claim (Optional[Callable[[], None]]): \
+                Called after shard is claimed, e.g. to load changes
+                of node that held it before.
+            on_release (Optional[Callable[[], None]]): \
+                Called before shards are released, e.g. to save progress.
+        """
+        self.source = source
+        self.leases = leases
+        self.shards = shards
+        self.on_claim = on_claim
+        self.on_release = on_release
+        self.claimed_count = 0
+        self.max_shards = self.count_fair_shards()
+        self._refused: set[int] = set()
+        self._rebalance_time = time() + leases.lease_seconds / REBALANCES
+
+    def count_fair_shards(self) -> int:
+        """Count shards node can hold.
+
+        Returns:
+            int: Fair part of shards for alive nodes.
+        """
+        nodes_count = self.leases.count_alive(NODE_LEASE_PREFIX)
+        return ceil(self.shards / max(nodes_count, 1))
+
+    def get_held_shards(self) -> list[str]:
+        """Get names of held shards leases.
+
+        Returns:
+            list[str]: Shards leases names in order of claiming.
+        """
+        return [
+            lease_name
+            for lease_name in self.leases.held
+            if lease_name.startswith(SHARD_LEASE_PREFIX)
+        ]
+
+    def claim(self, file_path: Path) -> bool:
+        """Check that file belongs to shard held by this node.
+
+        Args:
+            file_path (Path): File path.
+
+        Returns:
+            bool: True if file should be processed by this node.
+        """
+        self.rebalance()
+        shard = get_shard(self.source, file_path, self.shards)
+        lease_name = '{0}{1}'.format(SHARD_LEASE_PREFIX, shard)
+        if lease_name in self.leases.held:
+            return True
+        if shard in self._refused:
+            return False
+        if (
+            len(self.get_held_shards()) >= self.max_shards
+            or not self.leases.acquire(lease_name)
+        ):
+            self._refused.add(shard)
+            return False
+        self.claimed_count += 1
+        if self.on_claim is not None:
+            self.on_claim()
+        return True
+
+    def is_held(self, file_path: Path) -> bool:
+        """Check that shard of file is still held by this node.
+
+        Args:
+            file_path (Path): File path.
+
+        Returns:
+            bool: True if shard lease is held.
+        """
+        shard = get_shard(self.source, file_path, self.shards)
+        return '{0}{1}'.format(SHARD_LEASE_PREFIX, shard) in self.leases.held
+
+    def wait_rebalance(self) -> None:
+        """Sleep until the next rebalance."""
+        sleep(max(self._rebalance_time - time(), 0))
+
+    def rebalance(self) -> None:
+        """Recount fair part of shards and release shards above it.
+
+        Nothing is done until the next rebalance time.
+        """
+        if time() < self._rebalance_time:
+            return
+
+        self._rebalance_time = time() + self.leases.lease_seconds / REBALANCES
+        self.max_shards = self.count_fair_shards()
+        self._refused.clear()
+        released_names = self.get_held_shards()[self.max_shards:]
+        if not released_names:
+            return
+
+        if self.on_release is not None:
+            self.on_release()
+        for lease_name in released_names:
+            self.leases.release(lease_name)
+            # Shards are left for other nodes till the next rebalance
+            self._refused.add(int(lease_name[len(SHARD_LEASE_PREFIX):]))
+
+    def release(self) -> None:
+        """Release shards leases."""
+        for lease_name in self.get_held_shards():
+            self.leases.release(lease_name)
+
+
+def check_claimed_file(
+    file_path: Path,
+    file_stat: FileStat,
+    index: FilesIndex,
+) -> Optional[FileStat]:
+    """Check that file of claimed shard is still changed.
+
+    Indexed file may be processed after it was scanned by node
+    that held its shard before.
+
+    Args:
+        file_path (Path): File path.
+        file_stat (FileStat): File stat info on scanning.
+        index (FilesIndex): Index with changes of other nodes.
+
+    Returns:
+        Optional[FileStat]: Actual stat info or None if file is unchanged.
+    """
+    if file_path not in index:
+        return file_stat
+
+    try:
+        file_stat = get_file_stat(file_path)
+    except OSError:
+        return None
+    if index.verify_stat(file_path, file_stat):
+        return None
+    return file_stat
+
+
+def iter_claimed_files(
+    image_files: Iterable[tuple[Path, FileStat]],
+    claimer: ShardsClaimer,
+    index: FilesIndex,
+) -> Iterator[tuple[Path, FileStat]]:
+    """Filter files of shards held by this node.
+
+    Held leases are renewed while files are consumed. Files of shards
+    held by other nodes are claimed again after scan, as nodes release
+    shards above their fair part, until one lease duration passes
+    without newly claimed files.
+
+    Args:
+        image_files (Iterable[tuple[Path, FileStat]]): Files and stat info.
+        claimer (ShardsClaimer): Claimer of shards leases.
+        index (FilesIndex): Index with changes of other nodes.
+
+    Yields:
+        tuple[Path, FileStat]: File of held shard and stat info.
+    """
+    refused_files: list[tuple[Path, FileStat]] = []
+    for file_path, file_stat in image_files:
+        claimer.leases.renew()
+        if not claimer.claim(file_path):
+            refused_files.append((file_path, file_stat))
+            continue
+        changed_stat = check_claimed_file(file_path, file_stat, index)
+        if changed_stat is not None:
+            yield file_path, changed_stat
+
+    deadline = time() + claimer.leases.lease_seconds
+    while refused_files and time() < deadline:
+        claimer.wait_rebalance()
+        claimer.leases.renew()
+        still_refused: list[tuple[Path, FileStat]] = []
+        for file_path, file_stat in refused_files:  # noqa: WPS440
+            if not claimer.claim(file_path):
+                still_refused.append((file_path, file_stat))
+                continue
+            deadline = time() + claimer.leases.lease_seconds
+            changed_stat = check_claimed_file(file_path, file_stat, index)
+            if changed_stat is not None:
+                yield file_path, changed_stat
+        refused_files = still_refused
+
+
+def apply_new_delta_files(
+    deltas_dir: Path,
+    node_id: str,
+    index: FilesIndex,
+    applied_paths: set[Path],
+) -> None:
+    """Apply delta files of other nodes that are not applied yet.
+
+    Args:
+        deltas_dir (Path): Directory of delta files.
+        node_id (str): Id of this node.
+        index (FilesIndex): Index to update.
+        applied_paths (set[Path]): Applied delta files, updated in place.
+    """
+    own_delta_name = '{0}{1}'.format(node_id, DELTA_FILE_SUFFIX)
+    for delta_path in get_delta_paths(deltas_dir):
+        if delta_path in applied_paths:
+            continue
+        applied_paths.add(delta_path)
+        # Own changes are already in index
+        if delta_path.name.partition('-')[2] != own_delta_name:
+            apply_delta_file(delta_path, index)
+
+
+def discard_result(result: Optional[ProcessingResult]) -> None:
+    """Remove temporary file of result that is not written.
+
+    Args:
+        result (Optional[ProcessingResult]): Processing result.
+    """
+    if isinstance(result, Ok) and result.temp_path is not None:
+        result.temp_path.unlink(missing_ok=True)
+
+
+def process_dir_shared(  # noqa: WPS210, WPS213
+    source: Path,
+    settings: Settings,
+    cluster: ClusterSettings,
+) -> list[ProcessingResult]:
+    """Process part of images in directory shared with other nodes.
+
+    Whole directory is scanned, but only files of shards claimed
+    by this node are processed. Shards above fair part are given
+    to nodes that join later, pending changes are saved before.
+    Shared index with merged and pending deltas, including ones
+    written by other nodes during the scan, is used to skip
+    unchanged files. Changes are saved to delta files at checkpoints
+    and merged into shared index at the end by the last alive node
+    if no other node is merging. Archives are not processed and
+    unchanged directories are not skipped in this mode.
+
+    Args:
+        source (Path): Root directory path.
+        settings (Settings): Processing settings.
+        cluster (ClusterSettings): Settings of this node.
+
+    Returns:
+        list[ProcessingResult]: Results without cleaned images data.
+    """
+    metrics = Metrics()
+    leases = LeaseDir(
+        source / LEASES_DIR_NAME,
+        cluster.node_id,
+        cluster.lease_seconds,
+    )
+    node_lease_name = '{0}{1}'.format(NODE_LEASE_PREFIX, cluster.node_id)
+    leases.acquire(node_lease_name)
+
+    deltas_dir = source / DELTAS_DIR_NAME
+    index = load_node_index(source, settings.index_backend)
+    applied_paths = set(get_delta_paths(deltas_dir))
+    for delta_path in sorted(applied_paths):
+        apply_delta_file(delta_path, index)
+    delta = IndexDelta(deltas_dir, cluster.node_id)
+    checkpointer = Checkpointer(delta.flush, settings.checkpoints)
+    claimer = ShardsClaimer(
+        source,
+        leases,
+        cluster.shards,
+        on_claim=lambda: apply_new_delta_files(
+            deltas_dir,
+            cluster.node_id,
+            index,
+            applied_paths,
+        ),
+        on_release=checkpointer.checkpoint,
+    )
+    scanner = DirScanner(
+        source,
+        replace(settings.scan, archives=False, skip_unchanged_dirs=False),
+        metrics=metrics,
+        # Temporary files can be written by other nodes
+        remove_temp_files=False,
+    )
+    seen_paths: set[Path] = set()
+    processing_results: list[ProcessingResult] = []
+    try:
+        for file_path, file_stat, result in iter_processed_image_files(
+            iter_claimed_files(
+                iter_changed_images(scanner, index, seen_paths, metrics),
+                claimer,
+                index,
+            ),
+            index,
+            settings.workers,
+            settings.budget,
+            metrics,
+            settings.cache,
+            settings.hash_algorithm,
+            settings.limits,
+        ):
+            # Leases are renewed and rebalanced while results are
+            # written too, as all files may be already claimed
+            leases.renew()
+            claimer.rebalance()
+            if not claimer.is_held(file_path):
+                # Shard was released while file was processed
+                discard_result(result)
+                continue
+
+            written_result = write_result(
+                file_path,
+                file_stat,
+                result,
+                index,
+                metrics,
+            )
+            if isinstance(written_result, Err):
+                processing_results.append(written_result)
+                continue
+
+            if written_result is not None:
+                processing_results.append(written_result)
+            delta.add_file(
+                file_path,
+                index[file_path],
+                index.get_stat(file_path),
+                written_result,
+            )
+            checkpointer.add_file(
+                file_path,
+                written_result is not None and written_result.is_changed,
+            )
+
+        missing_paths = [
+            file_path
+            for file_path in index
+            if file_path not in seen_paths and claimer.claim(file_path)
+        ]
+        for file_path in missing_paths:  # noqa: WPS440
+            delta.remove_file(file_path)
+    finally:
+        # Progress is saved before shards are given to other nodes
+        checkpointer.checkpoint()
+        claimer.release()
+        # Node is not counted by other nodes in their fair parts anymore
+        leases.release(node_lease_name)
+
+    merged_count = 0
+    # Deltas are kept while other nodes scan, so they see changes
+    # of shards they take over
+    if not leases.count_alive(NODE_LEASE_PREFIX):
+        merged_count = merge_deltas(source, leases, settings.index_backend)
+    logging.info('Node {0}: shards {1}, merged deltas {2}'.format(
+        cluster.node_id,
+        claimer.claimed_count,
+        merged_count,
+    ))
+    log_result(processing_results)
+    if settings.metrics is not None:
+        settings.metrics.record('cluster', metrics)
+    return processing_results
@@ -0,0 +1,677 @@
+"""Daemon module.
+
+Provides daemon that keeps many directories clean in one process.
+Every root has its own index and settings, but all roots share one
+scheduler and one pool of worker processes. Roots are rescanned
+periodically and files of roots scanned at the same time are submitted
+to workers in fair share weighted by roots priorities. Indexes are
+loaded only while their roots are scanned, so memory usage does not
+grow with count of idle roots. Roots are scanned in background threads,
+so long scan of one root does not delay results of others, and errors
+of root stop only its cycle until the next rescan.
+"""
+
+
+import json
+import logging
+import signal
+import threading
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from dataclasses import dataclass, field, replace
+from functools import partial
+from math import inf
+from pathlib import Path
+from queue import Empty, Full, Queue
+from time import monotonic, sleep
+from typing import Any, Optional
+
+from image_meta_cleaner.archives import split_archive_files
+from image_meta_cleaner.checkpoint import Checkpointer
+from image_meta_cleaner.files_index import HASH_ALGORITHMS, FileStat
+from image_meta_cleaner.index_store import (
+    INDEX_BACKENDS,
+    close_files_index,
+    get_files_index,
+    get_rewritten_size,
+)
+from image_meta_cleaner.location_store import get_location_store
+from image_meta_cleaner.metrics import Metrics
+from image_meta_cleaner.pipeline import (
+    finish_dir,
+    iter_changed_images,
+    log_result,
+    process_archive_files,
+    save_locations,
+    save_state,
+    store_result,
+)
+from image_meta_cleaner.processing import (
+    ProcessingResult,
+    WorkerResult,
+    get_workers_count,
+    process_image_file_in_worker,
+)
+from image_meta_cleaner.scanner import DirScanner, ScanRules
+from image_meta_cleaner.settings import Settings
+
+# Count of roots scanned at the same time by default.
+DEFAULT_MAX_ACTIVE_ROOTS = 4
+
+# Delay between rescans of root in seconds by default.
+DEFAULT_ROOT_DELAY = 60
+
+# Count of changed files found by scan thread ahead of scheduler.
+SCAN_QUEUE_SIZE = 1024
+
+# Interval of checking scans while waiting for results in seconds.
+SCAN_POLL_SECONDS = 0.1
+
+
+def init_worker() -> None:
+    """Leave stopping of worker process to daemon.
+
+    Workers inherit signal handlers of daemon, so interruption would
+    print tracebacks of every worker.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+@dataclass
+class DaemonRoot(object):
+    """Directory kept clean by daemon."""
+
+    # Directory path
+    source: Path
+
+    # Processing settings, workers and budget are shared by daemon
+    settings: Settings = field(default_factory=Settings)
+
+    # Share of workers relative to other roots scanned at the same time
+    priority: int = 1
+
+    # Delay between rescans in seconds
+    delay: float = DEFAULT_ROOT_DELAY
+
+
+class RootCycle(object):  # noqa: WPS230
+    """Single scan and processing of daemon root.
+
+    Root is scanned in background thread that queues changed files
+    for scheduler. Index of root is shared by scan thread and
+    scheduler, so it is accessed only under lock of cycle, which is
+    held by scan thread for one scanned file at a time.
+    """
+
+    def __init__(
+        self,
+        root: DaemonRoot,
+        virtual_time: float,
+        files_event: Optional[threading.Event] = None,
+    ) -> None:
+        """Init cycle, load index of root and start scanning.
+
+        Args:
+            root (DaemonRoot): Scanned root.
+            virtual_time (float): \
+                Initial count of submitted bytes divided by priority.
+            files_event (Optional[threading.Event]): \
+                Event set when changed file is queued or scan is done.
+        """
+        self.root = root
+        self.virtual_time = virtual_time
+        self.pending_count = 0
+        self.metrics = Metrics()
+        self.location_store = get_location_store(root.source)
+        self.index = get_files_index(
+            root.source,
+            root.settings.index_backend,
+        )
+        self.checkpointer = Checkpointer(
+            partial(
+                save_state,
+                root.source,
+                self.index,
+                self.location_store,
+                self.metrics,
+            ),
+            root.settings.checkpoints,
+            partial(get_rewritten_size, self.index),
+        )
+        self.scanner = DirScanner(
+            root.source,
+            root.settings.scan,
+            self.index,
+            self.metrics,
+        )
+        self.seen_paths: set[Path] = set()
+        self.archive_files: list[tuple[Path, FileStat]] = []
+        self.processing_results: list[ProcessingResult] = []
+        self.lock = threading.Lock()
+        self._files_event = files_event or threading.Event()
+        self._queued_files: Queue[Optional[tuple[Path, FileStat]]] = Queue(
+            SCAN_QUEUE_SIZE,
+        )
+        self._next_file: Optional[tuple[Path, FileStat]] = None
+        self._is_scanned = False
+        self._scan_error: Optional[Exception] = None
+        self._stop_event = threading.Event()
+        self._scan_thread = threading.Thread(
+            target=self._scan,
+            name='imc-scan',
+            daemon=True,
+        )
+        self._scan_thread.start()
+
+    @property
+    def is_scanning(self) -> bool:
+        """Check that root is still scanned and no changed file is ready.
+
+        Returns:
+            bool: True if scheduler has to wait for scan thread.
+        """
+        return (
+            not self._is_scanned
+            and self._next_file is None
+            and self._queued_files.empty()
+        )
+
+    @property
+    def is_done(self) -> bool:
+        """Check that all files are scanned and processed.
+
+        Returns:
+            bool: True if cycle can be finished.
+        """
+        return (
+            self.peek_file() is None
+            and self._is_scanned
+            and not self.pending_count
+        )
+
+    def peek_file(self) -> Optional[tuple[Path, FileStat]]:
+        """Get next changed image without taking it.
+
+        Returns:
+            Optional[tuple[Path, FileStat]]: \
+                Image path and stat info or None if no image is ready.
+
+        Raises:
+            Exception: If scanning of root failed.
+        """
+        if self._next_file is None and not self._is_scanned:
+            try:
+                self._next_file = self._queued_files.get_nowait()
+            except Empty:
+                return None
+            self._is_scanned = self._next_file is None
+            if self._scan_error is not None:
+                raise self._scan_error
+        return self._next_file
+
+    def take_file(self, file_stat: FileStat) -> None:
+        """Take peeked image for processing.
+
+        Args:
+            file_stat (FileStat): Image stat info.
+        """
+        self._next_file = None
+        self.pending_count += 1
+        priority = max(self.root.priority, 1)
+        self.virtual_time += max(file_stat.size, 1) / priority
+
+    def add_result(
+        self,
+        file_path: Path,
+        file_stat: FileStat,
+        worker_result: WorkerResult,
+    ) -> None:
+        """Write cleaned image and update index.
+
+        Args:
+            file_path (Path): Image path.
+            file_stat (FileStat): Image stat info before processing.
+            worker_result (WorkerResult): Result of worker.
+        """
+        file_result, metrics = worker_result
+        self.pending_count -= 1
+        with self.lock:
+            self.metrics.merge(metrics)
+            stored_result = store_result(
+                file_path,
+                file_stat,
+                file_result,
+                self.index,
+                self.location_store,
+                self.checkpointer,
+                self.metrics,
+            )
+        if stored_result is not None:
+            self.processing_results.append(stored_result)
+
+    def stop(self) -> None:
+        """Stop scanning, save progress and close index of root."""
+        self._stop_event.set()
+        self._scan_thread.join()
+        try:
+            self.checkpointer.checkpoint()
+        finally:
+            close_files_index(self.index)
+
+    def finish(self) -> None:
+        """Clean archives, prune, save and close index of root."""
+        self._scan_thread.join()
+        settings = self.root.settings
+        try:
+            self.processing_results.extend(process_archive_files(
+                self.archive_files,
+                self.index,
+                settings,
+                self.metrics,
+                self.location_store,
+                self.checkpointer,
+            ))
+            save_locations(self.root.source, self.processing_results)
+            log_result(self.processing_results)
+            finish_dir(
+                self.scanner,
+                self.seen_paths,
+                self.processing_results,
+                self.index,
+                self.location_store,
+                self.checkpointer,
+            )
+        finally:
+            close_files_index(self.index)
+        if settings.metrics is not None:
+            settings.metrics.record('daemon', self.metrics)
+
+    def _scan(self) -> None:
+        try:
+            scanned_files = iter(self.scanner)
+            while not self._stop_event.is_set():
+                with self.lock:
+                    scanned_file = next(scanned_files, None)
+                    if scanned_file is None:
+                        break
+                    changed_files = list(iter_changed_images(
+                        (scanned_file,),
+                        self.index,
+                        self.seen_paths,
+                        self.metrics,
+                    ))
+                for image_file in split_archive_files(
+                    changed_files,
+                    self.archive_files,
+                ):
+                    self._queue_file(image_file)
+        except Exception as scan_error:
+            self._scan_error = scan_error
+        self._queue_file(None)
+
+    def _queue_file(self, image_file: Optional[tuple[Path, FileStat]]) -> None:
+        while not self._stop_event.is_set():
+            try:
+                self._queued_files.put(image_file, timeout=SCAN_POLL_SECONDS)
+            except Full:
+                continue
+            self._files_event.set()
+            return
+
+
+class Daemon(object):
+    """Scheduler of many roots on shared workers.
+
+    Roots that are due to rescan are started in order of priority,
+    at most `max_active_roots` at the same time. Next image is taken
+    from active root with the least bytes submitted per priority,
+    so roots share workers in proportion to their priorities.
+    """
+
+    def __init__(
+        self,
+        roots: list[DaemonRoot],
+        settings: Optional[Settings] = None,
+        executor: Optional[Executor] = None,
+        max_active_roots: int = DEFAULT_MAX_ACTIVE_ROOTS,
+    ) -> None:
+        """Init daemon.
+
+        Args:
+            roots (list[DaemonRoot]): Served roots.
+            settings (Optional[Settings]): \
+                Shared settings: `workers`, `budget` and `cache`
+                divided between workers.
+            executor (Optional[Executor]): \
+                Executor to process images on. Processes pool with
+                `workers` processes is started on first use by default.
+            max_active_roots (int): Count of roots scanned at the same time.
+        """
+        self.roots = roots
+        self.settings = settings or Settings()
+        self.max_active_roots = max(max_active_roots, 1)
+        self.workers = get_workers_count(self.settings.workers)
+        self.max_files = self.settings.budget.max_files or self.workers * 4
+        self.cycles: dict[int, RootCycle] = {}
+        self._executor = executor
+        self._is_own_executor = executor is None
+        self._next_times = [0.0] * len(roots)
+        self._pending: dict[
+            Future[WorkerResult],
+            tuple[RootCycle, Path, FileStat],
+        ] = {}
+        self._pending_bytes = 0
+        self._files_event = threading.Event()
+        self._once = False
+
+    def run(self, once: bool = False) -> None:
+        """Serve roots until interrupted.
+
+        Progress of active roots is saved when interrupted.
+
+        Args:
+            once (bool): Scan every root once and return.
+        """
+        now = monotonic()
+        self._next_times = [now] * len(self.roots)
+        self._once = once
+        try:
+            while self.cycles or min(self._next_times, default=inf) < inf:
+                self._start_cycles()
+                self._submit_files()
+                self._wait_results()
+                self._finish_cycles()
+        except BaseException:
+            for cycle in self.cycles.values():
+                cycle.stop()
+            raise
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """Shut down own executor."""
+        executor = self._executor
+        if self._is_own_executor and executor is not None:
+            self._executor = None
+            executor.shutdown(cancel_futures=True)
+
+    def _start_cycles(self) -> None:
+        now = monotonic()
+        due_roots = sorted(
+            (
+                root_index
+                for root_index, next_time in enumerate(self._next_times)
+                if next_time <= now
+            ),
+            key=lambda root_index: (
+                -self.roots[root_index].priority,
+                self._next_times[root_index],
+            ),
+        )
+        free_count = self.max_active_roots - len(self.cycles)
+        for root_index in due_roots[:max(free_count, 0)]:
+            root = self.roots[root_index]
+            self._next_times[root_index] = inf
+            if not root.source.is_dir():
+                logging.warning('Root is not found: {0}'.format(root.source))
+                self._next_times[root_index] = now + root.delay
+                continue
+
+            # New root does not get share of time it was idle
+            virtual_time = min(
+                (cycle.virtual_time for cycle in self.cycles.values()),
+                default=0,
+            )
+            try:
+                self.cycles[root_index] = RootCycle(
+                    root,
+                    virtual_time,
+                    self._files_event,
+                )
+            except Exception as root_error:
+                self._fail_root(root_index, root_error)
+
+    def _submit_files(self) -> None:
+        max_bytes = self.settings.budget.max_bytes
+        cache = self.settings.cache
+        cache_max_bytes = 0
+        if cache is not None:
+            cache_max_bytes = cache.max_bytes // self.workers
+        while len(self._pending) < self.max_files:
+            next_file = self._pick_file()
+            if next_file is None:
+                return
+
+            cycle, file_path, file_stat = next_file
+            if self._pending and (
+                self._pending_bytes + file_stat.size > max_bytes
+            ):
+                return
+
+            cycle.take_file(file_stat)
+            future = self._get_executor().submit(
+                process_image_file_in_worker,
+                file_path,
+                cycle.index.get(file_path),
+                cache_max_bytes,
+                cycle.root.settings.hash_algorithm,
+                cycle.root.settings.limits,
+            )
+            self._pending[future] = next_file
+            self._pending_bytes += file_stat.size
+
+    def _pick_file(self) -> Optional[tuple[RootCycle, Path, FileStat]]:
+        ready_files: list[tuple[RootCycle, Path, FileStat]] = []
+        for root_index, cycle in list(self.cycles.items()):
+            try:
+                image_file = cycle.peek_file()
+            except Exception as root_error:
+                self._fail_root(root_index, root_error)
+                continue
+            if image_file is not None:
+                ready_files.append((cycle, *image_file))
+        return min(
+            ready_files,
+            key=lambda ready_file: ready_file[0].virtual_time,
+            default=None,
+        )
+
+    def _wait_results(self) -> None:
+        timeout: Optional[float] = None
+        if len(self.cycles) < self.max_active_roots:
+            next_time = min(self._next_times, default=inf)
+            if next_time < inf:
+                timeout = max(next_time - monotonic(), 0)
+        if not self._pending:
+            if self.cycles:
+                self._files_event.wait(timeout)
+                self._files_event.clear()
+            elif timeout is not None:
+                sleep(timeout)
+            return
+
+        if any(cycle.is_scanning for cycle in self.cycles.values()):
+            timeout = min(timeout or inf, SCAN_POLL_SECONDS)
+        done_futures, _ = wait(self._pending, timeout, FIRST_COMPLETED)
+        for future in done_futures:
+            cycle, file_path, file_stat = self._pending.pop(future)
+            self._pending_bytes -= file_stat.size
+            root_index = self._get_root_index(cycle)
+            if root_index is None:
+                continue
+            try:
+                cycle.add_result(file_path, file_stat, future.result())
+            except Exception as root_error:
+                self._fail_root(root_index, root_error)
+
+    def _finish_cycles(self) -> None:
+        for root_index, cycle in list(self.cycles.items()):
+            try:
+                if not cycle.is_done:
+                    continue
+                del self.cycles[root_index]  # noqa: WPS420
+                cycle.finish()
+            except Exception as root_error:
+                self._fail_root(root_index, root_error)
+                continue
+            self._schedule_root(root_index)
+
+    def _fail_root(self, root_index: int, root_error: Exception) -> None:
+        root = self.roots[root_index]
+        logging.error('Root failed: {0}: {1}'.format(root.source, root_error))
+        cycle = self.cycles.pop(root_index, None)
+        if cycle is not None:
+            try:
+                cycle.stop()
+            except Exception as stop_error:
+                logging.error('Root progress is not saved: {0}: {1}'.format(
+                    root.source,
+                    stop_error,
+                ))
+        self._schedule_root(root_index)
+
+    def _schedule_root(self, root_index: int) -> None:
+        if not self._once:
+            self._next_times[root_index] = (
+                monotonic() + self.roots[root_index].delay
+            )
+
+    def _get_root_index(self, cycle: RootCycle) -> Optional[int]:
+        for root_index, active_cycle in self.cycles.items():
+            if active_cycle is cycle:
+                return root_index
+        return None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            # Imported on first use, as it loads multiprocessing
+            from concurrent.futures import (  # noqa: WPS433
+                ProcessPoolExecutor,
+            )
+            self._executor = ProcessPoolExecutor(
+                self.workers,
+                initializer=init_worker,
+            )
+        return self._executor
+
+
+def parse_daemon_root(
+    root_config: dict[str, Any],
+    config_dir: Path,
+    settings: Settings,
+    delay: float,
+) -> DaemonRoot:
+    """Build daemon root from its config.
+
+    Args:
+        root_config (dict[str, Any]): \
+            Root config with required `source` and optional `priority`,
+            `delay`, `include`, `exclude`, `max_depth`,
+            `skip_unchanged_dirs`, `archives`, `index` and `hash` keys.
+        config_dir (Path): Directory relative sources are resolved from.
+        settings (Settings): Default settings of roots.
+        delay (float): Default delay between rescans in seconds.
+
+    Returns:
+        DaemonRoot: Daemon root.
+
+    Raises:
+        ValueError: If source is missing or index or hash is unknown.
+    """
+    if 'source' not in root_config:
+        raise ValueError('Root source is required')
+
+    index_backend = root_config.get('index', settings.index_backend)
+    if index_backend not in INDEX_BACKENDS:
+        raise ValueError('Unknown index backend: {0}'.format(index_backend))
+    hash_algorithm = root_config.get('hash', settings.hash_algorithm)
+    if hash_algorithm not in HASH_ALGORITHMS:
+        raise ValueError('Unknown hash algorithm: {0}'.format(hash_algorithm))
+
+    default_scan = settings.scan
+    return DaemonRoot(
+        source=config_dir / root_config['source'],
+        settings=replace(
+            settings,
+            index_backend=index_backend,
+            hash_algorithm=hash_algorithm,
+            scan=ScanRules(
+                include=tuple(root_config.get(
+                    'include',
+                    default_scan.include,
+                )),
+                exclude=tuple(root_config.get(
+                    'exclude',
+                    default_scan.exclude,
+                )),
+                max_depth=root_config.get('max_depth', default_scan.max_depth),
+                skip_unchanged_dirs=root_config.get(
+                    'skip_unchanged_dirs',
+                    default_scan.skip_unchanged_dirs,
+                ),
+                archives=root_config.get('archives', default_scan.archives),
+            ),
+        ),
+        priority=int(root_config.get('priority', 1)),
+        delay=float(root_config.get('delay', delay)),
+    )
+
+
+def load_daemon_roots(
+    config_path: Path,
+    settings: Optional[Settings] = None,
+    delay: float = DEFAULT_ROOT_DELAY,
+) -> list[DaemonRoot]:
+    """Load daemon roots from JSON config.
+
+    Config is a list of roots configs or an object with `roots` list,
+    see `parse_daemon_root` for roots configs keys.
+
+    Args:
+        config_path (Path): Config file path.
+        settings (Optional[Settings]): Default settings of roots.
+        delay (float): Default delay between rescans in seconds.
+
+    Returns:
+        list[DaemonRoot]: Daemon roots.
+    """
+    config = json.loads(config_path.read_text())
+    if isinstance(config, dict):
+        config = config.get('roots', [])
+    return [
+        parse_daemon_root(
+            root_config,
+            config_path.parent,
+            settings or Settings(),
+            delay,
+        )
+        for root_config in config
+    ]
+
+
+def run_daemon(
+    config_path: Path,
+    settings: Optional[Settings] = None,
+    delay: Optional[float] = None,
+) -> None:
+    """Serve roots from config until interrupted.
+
+    Daemon is stopped gracefully on SIGINT and SIGTERM.
+
+    Args:
+        config_path (Path): Config file path.
+        settings (Optional[Settings]): Shared and default settings.
+        delay (Optional[float]): Default delay between rescans in seconds.
+    """
+    settings = settings or Settings()
+    roots = load_daemon_roots(
+        config_path,
+        settings,
+        DEFAULT_ROOT_DELAY if delay is None else delay,
+    )
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    logging.info('Serving {0} roots'.format(len(roots)))
+    try:
+        Daemon(roots, settings).run()
+    except KeyboardInterrupt:
+        logging.info('Daemon is stopped')
@@ -6,24 +6,264 @@ with information about processed files.
 
 
 import hashlib
+import os
+from array import array
 from pathlib import Path
-from typing import Iterator, Mapping, MutableMapping, Optional
+from typing import (
+    BinaryIO,
+    Callable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Protocol,
+)
 
+try:
+    import xxhash
+except ImportError:  # pragma: no cover
+    xxhash = None  # noqa: WPS440
 
-def hash_file_data(file_data: bytes) -> str:
+
+class Hasher(Protocol):
+    """Incremental hash object, e.g. from `hashlib`."""
+
+    def update(self, file_data: bytes | memoryview, /) -> None:
+        """Hash next chunk of data."""
+
+    def hexdigest(self) -> str:
+        """Return hash of hashed data."""
+
+
+# Hash algorithm of index entries without algorithm prefix.
+DEFAULT_HASH_ALGORITHM = 'sha256'
+
+# Supported hash algorithms. SHA-256 is the fastest one on CPUs with
+# SHA extensions, BLAKE2b on other 64-bit CPUs, and xxHash is the
+# fastest one at all if `xxhash` package is installed.
+HASH_ALGORITHMS: dict[str, Callable[[], Hasher]] = {
+    'sha256': lambda: hashlib.sha256(usedforsecurity=False),
+    'blake2b': lambda: hashlib.blake2b(digest_size=32),
+}
+if xxhash is not None:  # pragma: no cover
+    HASH_ALGORITHMS['xxh3_128'] = xxhash.xxh3_128
+
+# Size of chunks of streamed hashing, large enough to amortize reads.
+HASH_CHUNK_SIZE = 256 * 1024
+
+# Separator of algorithm name and digest in file hash.
+HASH_ALGORITHM_SEPARATOR = ':'
+
+# Count of index file columns with and without file stat.
+INDEX_LINE_COLUMNS = (2, 5)
+
+# Marker in hash column of index file lines with directories mtimes.
+DIR_LINE_MARKER = 'dir'
+
+# Size of digests slots of index buffer, enough for 256-bit hashes.
+DIGEST_SLOT_SIZE = 32
+
+# Code of hashes stored as text, e.g. hashes with too long digests.
+TEXT_HASH_CODE = 0
+
+# Max code of hash format, codes are stored as single bytes.
+MAX_HASH_CODE = 255
+
+
+class FileStat(NamedTuple):
+    """File stat info used to detect file changes without reading it."""
+
+    size: int
+    mtime_ns: int
+    inode: int
+
+
+def get_file_stat(file_path: Path) -> FileStat:
+    """Get file stat info.
+
+    Args:
+        file_path (Path): File path.
+
+    Returns:
+        FileStat: File size, modification time and inode.
+    """
+    stat_result = file_path.stat()
+    return FileStat(
+        size=stat_result.st_size,
+        mtime_ns=stat_result.st_mtime_ns,
+        inode=stat_result.st_ino,
+    )
+
+
+def create_hasher(algorithm: str) -> Hasher:
+    """Create hash object.
+
+    Args:
+        algorithm (str): Hash algorithm, one of `HASH_ALGORITHMS`.
+
+    Returns:
+        Hasher: Hash object.
+
+    Raises:
+        ValueError: If hash algorithm is not supported.
+    """
+    try:
+        return HASH_ALGORITHMS[algorithm]()
+    except KeyError:
+        raise ValueError('Unsupported hash algorithm: {0}'.format(algorithm))
+
+
+def format_file_hash(algorithm: str, hexdigest: str) -> str:
+    """Build file hash with algorithm name.
+
+    Hashes made with default algorithm have no prefix, so they are
+    the same as in index files made before algorithm became selectable.
+
+    Args:
+        algorithm (str): Hash algorithm.
+        hexdigest (str): Hash digest in hex format.
+
+    Returns:
+        str: File hash, e.g. `blake2b:5d1c...`.
+    """
+    if algorithm == DEFAULT_HASH_ALGORITHM:
+        return hexdigest
+    return '{0}{1}{2}'.format(algorithm, HASH_ALGORITHM_SEPARATOR, hexdigest)
+
+
+def get_hash_algorithm(file_hash: str) -> str:
+    """Get algorithm of file hash.
+
+    Args:
+        file_hash (str): File hash.
+
+    Returns:
+        str: Hash algorithm.
+    """
+    algorithm, separator, _ = file_hash.partition(HASH_ALGORITHM_SEPARATOR)
+    return algorithm if separator else DEFAULT_HASH_ALGORITHM
+
+
+def hash_file_data(
+    file_data: bytes,
+    algorithm: str = DEFAULT_HASH_ALGORITHM,
+) -> str:
     """Hash file data.
 
     Args:
         file_data (bytes): File data.
+        algorithm (str): Hash algorithm.
+
+    Returns:
+        str: File data hash.
+    """
+    hasher = create_hasher(algorithm)
+    hasher.update(file_data)
+    return format_file_hash(algorithm, hasher.hexdigest())
+
+
+def hash_file_stream(
+    file_stream: BinaryIO,
+    algorithm: str = DEFAULT_HASH_ALGORITHM,
+) -> str:
+    """Hash file by chunks without reading it into memory.
+
+    Args:
+        file_stream (BinaryIO): Binary file opened for reading.
+        algorithm (str): Hash algorithm.
 
     Returns:
         str: File data hash.
     """
-    return hashlib.sha256(file_data, usedforsecurity=False).hexdigest()
+    hasher = create_hasher(algorithm)
+    chunk = bytearray(HASH_CHUNK_SIZE)
+    chunk_view = memoryview(chunk)
+    while True:
+        chunk_size = file_stream.readinto(chunk)  # type: ignore
+        if not chunk_size:
+            break
+        hasher.update(chunk_view[:chunk_size])
+    return format_file_hash(algorithm, hasher.hexdigest())
+
+
+def verify_file_hash(file_hash: str, file_data: bytes) -> bool:
+    """Verify file data with hash made by any algorithm.
+
+    Args:
+        file_hash (str): File hash.
+        file_data (bytes): File data.
+
+    Returns:
+        bool: True if file data has the same hash.
+    """
+    try:
+        algorithm = get_hash_algorithm(file_hash)
+        return hash_file_data(file_data, algorithm) == file_hash
+    except ValueError:
+        return False
+
+
+class DirRecord(object):
+    """Indexed files of directory and its modification time."""
+
+    __slots__ = ('files', 'mtime_ns')
+
+    def __init__(self) -> None:
+        """Init empty record."""
+        # Files names and their slots in index buffers
+        self.files: dict[str, int] = {}
+        self.mtime_ns: Optional[int] = None
+
+
+def split_file_path(file_path: Path) -> tuple[str, str]:
+    """Split file path to absolute directory prefix and file name.
+
+    Args:
+        file_path (Path): File path.
+
+    Returns:
+        str: Absolute directory path with trailing separator.
+        str: File name.
+    """
+    if not file_path.is_absolute():
+        file_path = file_path.absolute()
+    path_str = str(file_path)
+    file_name = file_path.name
+    return path_str[:len(path_str) - len(file_name)], file_name
 
 
-class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
-    """Files index with processed files content hash."""
+def get_dir_prefix(dir_path: Path) -> str:
+    """Get directory prefix as in `split_file_path`.
+
+    Args:
+        dir_path (Path): Directory path.
+
+    Returns:
+        str: Absolute directory path with trailing separator.
+    """
+    if not dir_path.is_absolute():
+        dir_path = dir_path.absolute()
+    dir_prefix = str(dir_path)
+    if dir_prefix.endswith(os.sep):
+        return dir_prefix
+    return '{0}{1}'.format(dir_prefix, os.sep)
+
+
+class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214, WPS230
+    """Files index with processed files content hash.
+
+    Index also stores stat info of files, so files that were not changed
+    since indexing can be skipped without reading, and modification
+    times of scanned directories, so unchanged directories can be
+    skipped without listing.
+
+    Index is kept compact, as it can contain millions of files.
+    Directories pathes are stored once per directory, files are stored
+    by names in directories records. Hashes digests and stat info are
+    stored in contiguous buffers by slots of files, only hashes that
+    are not hex digests are stored as strings.
+    """
 
     def __init__(
         self,
@@ -35,12 +275,23 @@ class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
             initial_dict (Optional[Mapping[Path, str]]): \
                 Initial index data.
         """
-        self._files_hashes: dict[Path, str] = {}
+        # Records by directories prefixes
+        self._dirs: dict[str, DirRecord] = {}
+        self._files_count = 0
+        self._free_slots: list[int] = []
+        # Buffers of files slots
+        self._digests = bytearray()
+        self._hash_codes = bytearray()
+        self._stat_flags = bytearray()
+        self._sizes_mtimes = array('q')
+        self._inodes = array('Q')
+        # Algorithms and digests sizes of hash codes
+        self._hash_formats: list[tuple[str, int]] = [('', 0)]
+        self._hash_formats_codes: dict[tuple[str, int], int] = {}
+        self._text_hashes: dict[int, str] = {}
         if initial_dict is not None:
-            self._files_hashes.update({
-                file_path.absolute(): file_hash
-                for file_path, file_hash in initial_dict.items()
-            })
+            for file_path, file_hash in initial_dict.items():
+                self[file_path] = file_hash
 
     def __getitem__(self, file_path: Path) -> str:
         """Get file hash by path.
@@ -52,19 +303,40 @@ class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
 
         Returns:
             str: File hash if file exists.
+
+        Raises:
+            KeyError: If file is not in index.
         """
-        return self._files_hashes[file_path.absolute()]
+        slot = self._find_slot(file_path)
+        if slot is None:
+            raise KeyError(file_path)
+        return self._read_hash(slot)
 
     def __setitem__(self, file_path: Path, file_hash: str) -> None:
         """Set hash for file path.
 
         File path is casted to absolute format.
+        Stored stat info of file is reset.
 
         Args:
             file_path (Path): File path.
             file_hash (str): File content hash.
         """
-        self._files_hashes[file_path.absolute()] = file_hash
+        dir_prefix, file_name = split_file_path(file_path)
+        dir_record = self._dirs.get(dir_prefix)
+        if dir_record is None:
+            dir_record = DirRecord()
+            self._dirs[dir_prefix] = dir_record
+
+        slot = dir_record.files.get(file_name)
+        if slot is None:
+            slot = self._allocate_slot()
+            dir_record.files[file_name] = slot
+            self._files_count += 1
+        else:
+            self._text_hashes.pop(slot, None)
+        self._write_hash(slot, file_hash)
+        self._stat_flags[slot] = 0
 
     def __delitem__(self, file_path: Path) -> None:  # noqa: WPS603
         """Remove file path from index.
@@ -73,8 +345,22 @@ class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
 
         Args:
             file_path (Path): File path.
+
+        Raises:
+            KeyError: If file is not in index.
         """
-        self._files_hashes.pop(file_path.absolute())
+        dir_prefix, file_name = split_file_path(file_path)
+        dir_record = self._dirs.get(dir_prefix)
+        if dir_record is None or file_name not in dir_record.files:
+            raise KeyError(file_path)
+
+        slot = dir_record.files.pop(file_name)
+        if not dir_record.files and dir_record.mtime_ns is None:
+            self._dirs.pop(dir_prefix)
+        self._text_hashes.pop(slot, None)
+        self._stat_flags[slot] = 0
+        self._free_slots.append(slot)
+        self._files_count -= 1
 
     def __iter__(self) -> Iterator[Path]:
         """Return iterator over consisted files pathes.
@@ -82,7 +368,11 @@ class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
         Returns:
             Iterator[Path]: Iterator over files pathes
         """
-        return iter(self._files_hashes)
+        return (
+            Path('{0}{1}'.format(dir_prefix, file_name))
+            for dir_prefix, dir_record in self._dirs.items()
+            for file_name in dir_record.files
+        )
 
     def __len__(self) -> int:
         """Return count of files in index.
@@ -90,17 +380,37 @@ class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
         Returns:
             int: Count of files in index.
         """
-        return len(self._files_hashes)
+        return self._files_count
+
+    def __contains__(self, file_path: object) -> bool:
+        """Check that file is in index.
+
+        Args:
+            file_path (object): File path.
+
+        Returns:
+            bool: True if file is in index.
+        """
+        return (
+            isinstance(file_path, Path)
+            and self._find_slot(file_path) is not None
+        )
 
     def __repr__(self) -> str:
-        """Return repr of internal files hashes map.
+        """Return repr of files hashes map.
 
         Returns:
             str: Repr of files index.
         """
-        return repr(self._files_hashes)
+        return repr(dict(self.items()))
 
-    def add_file(self, file_path: Path, file_data: bytes) -> str:
+    def add_file(
+        self,
+        file_path: Path,
+        file_data: bytes,
+        file_stat: Optional[FileStat] = None,
+        hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+    ) -> str:
         """Add file to index.
 
         File path is casted to absolute format and
@@ -109,17 +419,79 @@ class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
         Args:
             file_path (Path): File path.
             file_data (bytes): File content.
+            file_stat (Optional[FileStat]): File stat info.
+            hash_algorithm (str): Hash algorithm.
 
         Returns:
             str: Hashed file data.
         """
-        file_hash = hash_file_data(file_data)
-        self._files_hashes[file_path.absolute()] = file_hash
+        file_hash = hash_file_data(file_data, hash_algorithm)
+        self[file_path] = file_hash
+        if file_stat is not None:
+            self.set_stat(file_path, file_stat)
         return file_hash
 
+    def get_stat(self, file_path: Path) -> Optional[FileStat]:
+        """Get stored stat info of file.
+
+        Args:
+            file_path (Path): File path.
+
+        Returns:
+            Optional[FileStat]: File stat info if it is stored.
+        """
+        slot = self._find_slot(file_path)
+        if slot is None:
+            return None
+        return self._read_stat(slot)
+
+    def set_stat(self, file_path: Path, file_stat: FileStat) -> None:
+        """Store stat info of indexed file.
+
+        Args:
+            file_path (Path): File path.
+            file_stat (FileStat): File stat info.
+
+        Raises:
+            KeyError: If file is not in index.
+        """
+        slot = self._find_slot(file_path)
+        if slot is None:
+            raise KeyError(file_path)
+
+        self._sizes_mtimes[slot * 2] = file_stat.size
+        self._sizes_mtimes[slot * 2 + 1] = file_stat.mtime_ns
+        self._inodes[slot] = file_stat.inode
+        self._stat_flags[slot] = 1
+
+    def verify_stat(self, file_path: Path, file_stat: FileStat) -> bool:
+        """Verify that file was not changed since indexing.
+
+        Cheap check that does not require reading of file. If stat info
+        is not stored or differs, file should be verified by content.
+
+        Args:
+            file_path (Path): File path.
+            file_stat (FileStat): Actual file stat info.
+
+        Returns:
+            bool: True if file in index and stat info is same.
+        """
+        # Stored stat is compared in place, without building tuple
+        slot = self._find_slot(file_path)
+        return (
+            slot is not None
+            and self._stat_flags[slot] == 1
+            and self._sizes_mtimes[slot * 2] == file_stat.size
+            and self._sizes_mtimes[slot * 2 + 1] == file_stat.mtime_ns
+            and self._inodes[slot] == file_stat.inode
+        )
+
     def verify_file(self, file_path: Path, file_data: bytes) -> bool:
         """Verify that index contains actual file data.
 
+        File is hashed with algorithm of its index entry.
+
         Args:
             file_path (Path): File path.
             file_data (bytes): File content.
@@ -127,24 +499,138 @@ class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
         Returns:
             bool: True if file in index and hash is same.
         """
-        return self.get(file_path) == hash_file_data(file_data)
+        file_hash = self.get(file_path)
+        return file_hash is not None and verify_file_hash(file_hash, file_data)
+
+    def prune(self, seen_paths: set[Path]) -> None:
+        """Remove files that were not found from index.
+
+        Args:
+            seen_paths (set[Path]): Absolute pathes of found files.
+        """
+        seen_strs = {str(file_path) for file_path in seen_paths}
+        missing_paths = [
+            Path(path_str)
+            for path_str in (
+                '{0}{1}'.format(dir_prefix, file_name)
+                for dir_prefix, dir_record in self._dirs.items()
+                for file_name in dir_record.files
+            )
+            if path_str not in seen_strs
+        ]
+        for file_path in missing_paths:
+            del self[file_path]  # noqa: WPS420
+
+    def get_dir_mtime(self, dir_path: Path) -> Optional[int]:
+        """Get stored modification time of directory.
+
+        Args:
+            dir_path (Path): Directory path.
+
+        Returns:
+            Optional[int]: Modification time in nanoseconds if it is stored.
+        """
+        dir_record = self._dirs.get(get_dir_prefix(dir_path))
+        return None if dir_record is None else dir_record.mtime_ns
+
+    def set_dir_mtime(self, dir_path: Path, mtime_ns: Optional[int]) -> None:
+        """Store or reset modification time of scanned directory.
+
+        Args:
+            dir_path (Path): Directory path.
+            mtime_ns (Optional[int]): \
+                Modification time in nanoseconds or None to reset it.
+        """
+        dir_prefix = get_dir_prefix(dir_path)
+        dir_record = self._dirs.get(dir_prefix)
+        if dir_record is None:
+            if mtime_ns is None:
+                return
+            dir_record = DirRecord()
+            self._dirs[dir_prefix] = dir_record
+
+        dir_record.mtime_ns = mtime_ns
+        if mtime_ns is None and not dir_record.files:
+            self._dirs.pop(dir_prefix)
+
+    def iter_dirs(self) -> Iterator[Path]:
+        """Iterate over directories with stored modification time.
+
+        Returns:
+            Iterator[Path]: Iterator over directories pathes.
+        """
+        return iter([
+            Path(dir_prefix)
+            for dir_prefix, dir_record in self._dirs.items()
+            if dir_record.mtime_ns is not None
+        ])
+
+    def iter_entries(self) -> Iterator[tuple[str, str, Optional[FileStat]]]:
+        """Iterate over indexed files without building their pathes.
+
+        Returns:
+            Iterator[tuple[str, str, Optional[FileStat]]]: \
+                Iterator over absolute files pathes, hashes and stat info.
+        """
+        for dir_prefix, dir_record in self._dirs.items():
+            for file_name, slot in dir_record.files.items():
+                yield (
+                    '{0}{1}'.format(dir_prefix, file_name),
+                    self._read_hash(slot),
+                    self._read_stat(slot),
+                )
 
     def build_index_file(self) -> str:
         """Build content of index file.
 
         Index file contains absolute pathes to files with
-        hashes separated with tabulation.
+        hashes separated with tabulation. If file stat info is stored,
+        size, modification time and inode follow the hash.
+        Directories lines contain `dir` marker and modification time.
 
         Returns:
             str: Index files content
         """
-        return '\n'.join(
-            '{file_path}\t{file_hash}'.format(
-                file_path=file_path.absolute(),
-                file_hash=file_hash,
+        files_lines = (
+            '\t'.join((path_str, file_hash, *map(str, file_stat or ())))
+            for path_str, file_hash, file_stat in self.iter_entries()
+        )
+        dirs_lines = (
+            '{0}\t{1}\t{2}'.format(
+                dir_path,
+                DIR_LINE_MARKER,
+                self.get_dir_mtime(dir_path),
             )
-            for file_path, file_hash in self._files_hashes.items()
+            for dir_path in self.iter_dirs()
         )
+        return '\n'.join((*files_lines, *dirs_lines))
+
+    def import_index_file(self, file_data: str) -> None:
+        """Add entries of index file to index.
+
+        Args:
+            file_data (str): Content of index file.
+
+        Raises:
+            ValueError: If index file line is malformed.
+        """
+        for line in file_data.splitlines():
+            if not line:
+                continue
+
+            columns = line.split('\t')
+            if len(columns) == 3 and columns[1] == DIR_LINE_MARKER:
+                self.set_dir_mtime(Path(columns[0]), int(columns[2]))
+                continue
+
+            if len(columns) not in INDEX_LINE_COLUMNS:
+                raise ValueError('Invalid index line: {0}'.format(line))
+
+            path_str, file_hash, *file_stat = columns
+            file_path = Path(path_str)
+            self[file_path] = file_hash
+            if file_stat:
+                self.set_stat(file_path, FileStat(*map(int, file_stat)))
 
     @classmethod
     def from_index_file(cls, file_data: str) -> 'FilesIndex':
@@ -157,9 +643,87 @@ class FilesIndex(MutableMapping[Path, str]):  # noqa: WPS214
             FilesIndex: New index object.
         """
         index = FilesIndex()
-        for line in file_data.splitlines():
-            if line:
-                file_path, file_hash = line.split('\t')
-                index[Path(file_path)] = file_hash
-
+        index.import_index_file(file_data)
         return index
+
+    def _find_slot(self, file_path: Path) -> Optional[int]:
+        dir_prefix, file_name = split_file_path(file_path)
+        dir_record = self._dirs.get(dir_prefix)
+        if dir_record is None:
+            return None
+        return dir_record.files.get(file_name)
+
+    def _allocate_slot(self) -> int:
+        if self._free_slots:
+            return self._free_slots.pop()
+
+        slot = len(self._hash_codes)
+        self._digests.extend(bytes(DIGEST_SLOT_SIZE))
+        self._hash_codes.append(TEXT_HASH_CODE)
+        self._stat_flags.append(0)
+        self._sizes_mtimes.extend((0, 0))
+        self._inodes.append(0)
+        return slot
+
+    def _read_stat(self, slot: int) -> Optional[FileStat]:
+        if not self._stat_flags[slot]:
+            return None
+        # Positional arguments are notably faster for named tuples
+        return FileStat(
+            self._sizes_mtimes[slot * 2],
+            self._sizes_mtimes[slot * 2 + 1],
+            self._inodes[slot],
+        )
+
+    def _read_hash(self, slot: int) -> str:
+        hash_code = self._hash_codes[slot]
+        if hash_code == TEXT_HASH_CODE:
+            return self._text_hashes[slot]
+
+        algorithm, digest_size = self._hash_formats[hash_code]
+        digest_offset = slot * DIGEST_SLOT_SIZE
+        return format_file_hash(
+            algorithm,
+            self._digests[digest_offset:digest_offset + digest_size].hex(),
+        )
+
+    def _write_hash(self, slot: int, file_hash: str) -> None:
+        algorithm, separator, hexdigest = file_hash.rpartition(
+            HASH_ALGORITHM_SEPARATOR,
+        )
+        if not separator:
+            algorithm = DEFAULT_HASH_ALGORITHM
+        try:
+            digest = bytes.fromhex(hexdigest)
+        except ValueError:
+            digest = b''
+        hash_code = TEXT_HASH_CODE
+        # Only hashes that are restored from digests as is are packed
+        if digest and digest.hex() == hexdigest and (
+            not separator or algorithm != DEFAULT_HASH_ALGORITHM
+        ):
+            hash_code = self._get_hash_code(algorithm, len(digest))
+        if hash_code == TEXT_HASH_CODE:
+            self._hash_codes[slot] = TEXT_HASH_CODE
+            self._text_hashes[slot] = file_hash
+            return
+
+        digest_offset = slot * DIGEST_SLOT_SIZE
+        self._digests[digest_offset:digest_offset + len(digest)] = digest
+        self._hash_codes[slot] = hash_code
+
+    def _get_hash_code(self, algorithm: str, digest_size: int) -> int:
+        hash_format = (algorithm, digest_size)
+        hash_code = self._hash_formats_codes.get(hash_format)
+        if hash_code is not None:
+            return hash_code
+        if (
+            digest_size > DIGEST_SLOT_SIZE
+            or len(self._hash_formats) > MAX_HASH_CODE
+        ):
+            return TEXT_HASH_CODE
+
+        hash_code = len(self._hash_formats)
+        self._hash_formats.append(hash_format)
+        self._hash_formats_codes[hash_format] = hash_code
+        return hash_code
@@ -0,0 +1,211 @@
+"""Image formats package.
+
+Contains container-level metadata strippers that rewrite image files
+without decoding pixel data.
+
+Every stripper raises `ValueError` on input it cannot parse,
+so caller can fall back to full image re-encoding.
+"""
+
+
+from mmap import mmap
+from typing import Iterable
+
+# Image data read by containers parsers. Files can be memory mapped,
+# so only pages with headers are read from disk.
+ImageBuffer = bytes | mmap
+
+# Parts of stripped image in order: views of source data and
+# rewritten headers. Parts are written without joining,
+# so pixel data of mapped files is never copied to memory.
+ImageParts = list[bytes | memoryview]
+
+# Size of blocks of patched buffer copied on write.
+PATCH_BLOCK_SIZE = 4096
+
+
+def get_ranges_parts(
+    data: ImageBuffer,
+    ranges: Iterable[tuple[int, int]],
+) -> ImageParts:
+    """Get views of data slices.
+
+    Adjacent ranges are merged, so kept parts of file are copied
+    with as few slices as possible.
+
+    Args:
+        data (ImageBuffer): Source data.
+        ranges (Iterable[tuple[int, int]]): Ordered start and end offsets.
+
+    Returns:
+        ImageParts: Views of slices.
+    """
+    merged: list[list[int]] = []
+    for start, end in ranges:
+        if merged and merged[-1][1] == start:
+            merged[-1][1] = end
+        else:
+            merged.append([start, end])
+
+    data_view = memoryview(data)
+    return [data_view[start:end] for start, end in merged]
+
+
+def is_source_data(image_parts: ImageParts, data: ImageBuffer) -> bool:
+    """Check that parts are a single view of whole source data.
+
+    Strippers return such parts when nothing is removed from image,
+    so caller can keep source file as is.
+
+    Args:
+        image_parts (ImageParts): Parts of stripped image.
+        data (ImageBuffer): Source data.
+
+    Returns:
+        bool: True if image is not changed by stripper.
+    """
+    return (
+        len(image_parts) == 1
+        and isinstance(image_parts[0], memoryview)
+        and len(image_parts[0]) == len(data)
+    )
+
+
+def join_ranges(data: ImageBuffer, ranges: Iterable[tuple[int, int]]) -> bytes:
+    """Join data slices.
+
+    Args:
+        data (ImageBuffer): Source data.
+        ranges (Iterable[tuple[int, int]]): Ordered start and end offsets.
+
+    Returns:
+        bytes: Joined slices.
+    """
+    return b''.join(get_ranges_parts(data, ranges))
+
+
+def release_parts(image_parts: ImageParts) -> None:
+    """Release views of source data.
+
+    Mapped file can not be closed while its views exist.
+
+    Args:
+        image_parts (ImageParts): Parts of image.
+    """
+    for part in image_parts:
+        if isinstance(part, memoryview):
+            part.release()
+    image_parts.clear()
+
+
+class PatchedBuffer(object):
+    """Copy-on-write view of image data.
+
+    Written blocks are copied to memory, the rest of data is read
+    from source. Reads see written data, so parsers that rewrite
+    headers in place work with it as with `bytearray`.
+    """
+
+    def __init__(self, data: ImageBuffer) -> None:
+        """Init buffer.
+
+        Args:
+            data (ImageBuffer): Source data.
+        """
+        self.data = data
+        self.blocks: dict[int, bytearray] = {}
+
+    def __len__(self) -> int:
+        """Get size of data.
+
+        Returns:
+            int: Data size.
+        """
+        return len(self.data)
+
+    def __getitem__(self, index: slice) -> bytes:
+        """Read data slice.
+
+        Args:
+            index (slice): Slice without step.
+
+        Returns:
+            bytes: Data of slice with written blocks.
+        """
+        start, end, _ = index.indices(len(self.data))
+        if not self.blocks or start >= end:
+            return self.data[start:end]
+
+        return b''.join(
+            self._get_block(block_index)[
+                max(start - block_start, 0):end - block_start
+            ]
+            for block_index, block_start in self._iter_blocks(start, end)
+        )
+
+    def __setitem__(self, index: slice, block_data: bytes) -> None:
+        """Write data slice.
+
+        Args:
+            index (slice): Slice without step.
+            block_data (bytes): Data of the same size as slice.
+
+        Raises:
+            ValueError: If size of data is changed.
+        """
+        start, end, _ = index.indices(len(self.data))
+        if end - start != len(block_data):
+            raise ValueError('Size of patched data can not be changed')
+
+        for block_index, block_start in self._iter_blocks(start, end):
+            block = self.blocks.get(block_index)
+            if block is None:
+                block = bytearray(self.data[
+                    block_start:block_start + PATCH_BLOCK_SIZE
+                ])
+                self.blocks[block_index] = block
+            block_offset = max(start - block_start, 0)
+            data_offset = block_start + block_offset - start
+            block_end = min(end - block_start, len(block))
+            block[block_offset:block_end] = block_data[
+                data_offset:data_offset + block_end - block_offset
+            ]
+
+    def get_parts(self) -> ImageParts:
+        """Get parts of patched data.
+
+        Returns:
+            ImageParts: Views of unchanged data and written blocks.
+        """
+        data_view = memoryview(self.data)
+        image_parts: ImageParts = []
+        position = 0
+        for block_index in sorted(self.blocks):
+            block_start = block_index * PATCH_BLOCK_SIZE
+            if position < block_start:
+                image_parts.append(data_view[position:block_start])
+            block = self.blocks[block_index]
+            image_parts.append(bytes(block))
+            position = block_start + len(block)
+        if position < len(self.data):
+            image_parts.append(data_view[position:])
+        return image_parts
+
+    def _get_block(self, block_index: int) -> bytes | bytearray:
+        block = self.blocks.get(block_index)
+        if block is not None:
+            return block
+        block_start = block_index * PATCH_BLOCK_SIZE
+        return self.data[block_start:block_start + PATCH_BLOCK_SIZE]
+
+    def _iter_blocks(
+        self,
+        start: int,
+        end: int,
+    ) -> Iterable[tuple[int, int]]:
+        first_block = start // PATCH_BLOCK_SIZE
+        last_block = (end - 1) // PATCH_BLOCK_SIZE
+        return (
+            (block_index, block_index * PATCH_BLOCK_SIZE)
+            for block_index in range(first_block, last_block + 1)
+        )
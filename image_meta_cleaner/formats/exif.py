@@ -0,0 +1,146 @@
+"""EXIF module.
+
+Find EXIF data in image containers and read GPS coordinates from it
+without parsing of other tags, maker notes and thumbnails.
+"""
+
+
+from typing import Callable, Optional
+
+from image_meta_cleaner.formats import ImageBuffer
+from image_meta_cleaner.formats.jpeg import find_jpeg_exif, is_jpeg
+from image_meta_cleaner.formats.png import find_png_exif, is_png
+from image_meta_cleaner.formats.tiff import (
+    IfdEntry,
+    TiffReader,
+    find_tiff_exif,
+    is_tiff,
+)
+from image_meta_cleaner.formats.webp import find_webp_exif, is_webp
+
+# Tag of GPS sub-IFD pointer.
+GPS_IFD_TAG = 34853
+
+# GPS tags of latitude reference, latitude, longitude reference and longitude.
+GPS_LATITUDE_REF_TAG = 1
+GPS_LATITUDE_TAG = 2
+GPS_LONGITUDE_REF_TAG = 3
+GPS_LONGITUDE_TAG = 4
+
+# Size of RATIONAL value numerator and denominator.
+RATIONAL_PART_SIZE = 4
+
+# EXIF data finders with format checks.
+EXIF_FINDERS: tuple[tuple[
+    Callable[[bytes], bool],
+    Callable[[bytes], bytes],
+], ...] = (
+    (is_jpeg, find_jpeg_exif),
+    (is_png, find_png_exif),
+    (is_webp, find_webp_exif),
+    (is_tiff, find_tiff_exif),
+)
+
+
+def find_exif(image_data: bytes) -> bytes:
+    """Find EXIF data of image.
+
+    Args:
+        image_data (bytes): Image data.
+
+    Returns:
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If image format is not supported or file is malformed.
+    """
+    for is_format, find_format_exif in EXIF_FINDERS:
+        if is_format(image_data):
+            return find_format_exif(image_data)
+
+    raise ValueError('Unsupported image format')
+
+
+def read_degrees(reader: TiffReader, entry: IfdEntry) -> float:
+    """Read degrees, minutes and seconds rationals as degrees.
+
+    Args:
+        reader (TiffReader): EXIF data reader.
+        entry (IfdEntry): Coordinate entry.
+
+    Returns:
+        float: Coordinate in degrees.
+    """
+    degrees = 0.0
+    for part_index in range(min(entry.count, 3)):
+        part_offset = entry.value_offset + part_index * RATIONAL_PART_SIZE * 2
+        numerator = reader.read_int(part_offset, RATIONAL_PART_SIZE)
+        denominator = reader.read_int(
+            part_offset + RATIONAL_PART_SIZE,
+            RATIONAL_PART_SIZE,
+        )
+        if denominator:
+            degrees += numerator / denominator / 60 ** part_index
+    return degrees
+
+
+def read_reference(reader: TiffReader, entry: IfdEntry) -> bytes:
+    """Read coordinate reference letter.
+
+    Args:
+        reader (TiffReader): EXIF data reader.
+        entry (IfdEntry): Reference entry.
+
+    Returns:
+        bytes: Reference letter, e.g. `N` or `W`.
+    """
+    return bytes(reader.tiff_data[entry.value_offset:entry.value_offset + 1])
+
+
+def read_gps_coords(
+    exif_data: ImageBuffer,
+) -> Optional[tuple[float, float]]:
+    """Read GPS coordinates from EXIF data.
+
+    Only first directory and GPS sub-IFD are read.
+
+    Args:
+        exif_data (ImageBuffer): EXIF data in TIFF format.
+
+    Returns:
+        Optional[tuple[float, float]]: \
+            Latitude and longitude or None if GPS info is missing.
+
+    Raises:
+        ValueError: If EXIF data is malformed.
+    """
+    if not exif_data:
+        return None
+
+    reader = TiffReader(exif_data)
+    gps_entries = [
+        entry
+        for entry in reader.read_entries(reader.read_int(4, 4))
+        if entry.tag == GPS_IFD_TAG
+    ]
+    if not gps_entries:
+        return None
+
+    gps_ifd_offset = reader.read_int(gps_entries[0].value_offset, 4)
+    entries = {
+        entry.tag: entry
+        for entry in reader.read_entries(gps_ifd_offset)
+    }
+    try:
+        latitude = read_degrees(reader, entries[GPS_LATITUDE_TAG])
+        longitude = read_degrees(reader, entries[GPS_LONGITUDE_TAG])
+        latitude_ref = read_reference(reader, entries[GPS_LATITUDE_REF_TAG])
+        longitude_ref = read_reference(reader, entries[GPS_LONGITUDE_REF_TAG])
+    except KeyError:
+        return None
+
+    if latitude_ref == b'S':
+        latitude = -latitude
+    if longitude_ref == b'W':
+        longitude = -longitude
+    return latitude, longitude
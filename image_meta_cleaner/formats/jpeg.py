@@ -0,0 +1,296 @@
+"""JPEG format module.
+
+Strip metadata segments from JPEG files on the marker stream level.
+Entropy-coded scan data is copied byte-for-byte, so stripping is lossless
+and does not require pixel decoding.
+"""
+
+
+from typing import Iterator
+
+from image_meta_cleaner.formats import (
+    ImageBuffer,
+    ImageParts,
+    get_ranges_parts,
+)
+
+# Start of image marker.
+SOI = b'\xff\xd8'
+
+# Markers that are not followed by segment length.
+STANDALONE_MARKERS = frozenset((0x01, *range(0xD0, 0xD8)))
+
+# Bytes that follow 0xFF inside entropy-coded data: stuffed zero byte
+# and restart markers.
+SCAN_DATA_MARKERS = frozenset((0x00, *range(0xD0, 0xD8)))
+
+# Start of scan marker. Entropy-coded data follows it.
+SOS_MARKER = 0xDA
+
+# End of image marker.
+EOI_MARKER = 0xD9
+
+# Application segments markers range.
+APP_MARKERS = range(0xE0, 0xF0)
+
+# Application segment marker of EXIF and XMP.
+EXIF_MARKER = 0xE1
+
+# Header of EXIF application segment payload.
+EXIF_HEADER = b'Exif\x00\x00'
+
+# Comment segment marker.
+COM_MARKER = 0xFE
+
+# Application segments that do not contain metadata and
+# are required for correct image rendering (marker -> payload prefix).
+# JFIF header, ICC color profile and Adobe color transform.
+KEPT_APP_SEGMENTS = (
+    (0xE0, b'JFIF\x00'),
+    (0xE2, b'ICC_PROFILE\x00'),
+    (0xEE, b'Adobe'),
+)
+
+
+def is_jpeg(image_data: ImageBuffer) -> bool:
+    """Check that data is a JPEG file.
+
+    Args:
+        image_data (ImageBuffer): Image data.
+
+    Returns:
+        bool: True if data starts with JPEG signature.
+    """
+    return image_data[:len(SOI)] == SOI
+
+
+def is_meta_segment(marker: int, payload: bytes) -> bool:
+    """Check that segment contains metadata.
+
+    All application segments (EXIF, XMP, IPTC, MPF, JFXX thumbnails, etc.)
+    and comments are treated as metadata except ones
+    from `KEPT_APP_SEGMENTS`.
+
+    Args:
+        marker (int): Segment marker.
+        payload (bytes): Segment payload (without length).
+
+    Returns:
+        bool: True if segment should be removed.
+    """
+    if marker == COM_MARKER:
+        return True
+
+    if marker not in APP_MARKERS:
+        return False
+
+    return not any(
+        marker == kept_marker and payload.startswith(prefix)
+        for kept_marker, prefix in KEPT_APP_SEGMENTS
+    )
+
+
+def find_scan_end(image_data: ImageBuffer, position: int) -> int:
+    """Find end of entropy-coded data of scan.
+
+    Args:
+        image_data (ImageBuffer): JPEG image data.
+        position (int): Offset of scan data start.
+
+    Returns:
+        int: Offset of marker that follows scan data \
+            or data size if scan data is truncated.
+    """
+    data_size = len(image_data)
+    while True:
+        position = image_data.find(b'\xff', position)
+        if position < 0 or position + 1 >= data_size:
+            return data_size
+
+        # Fill bytes before marker are not scan data too
+        if image_data[position + 1] not in SCAN_DATA_MARKERS:
+            return position
+        position += 2
+
+
+def iter_segments(  # noqa: C901, WPS231
+    image_data: ImageBuffer,
+    scans: bool = False,
+) -> Iterator[tuple[int, int, int]]:
+    """Iterate over JPEG segments.
+
+    By default iteration stops after the first start of scan segment,
+    which is enough to read header. With `scans` enabled entropy-coded
+    data is included into start of scan segments and iteration continues
+    to the end of image, so segments between progressive scans are found.
+    Data after end of image is never iterated.
+
+    Args:
+        image_data (ImageBuffer): JPEG image data.
+        scans (bool): Iterate over all scans up to end of image.
+
+    Yields:
+        tuple[int, int, int]: Segment marker, start and end offsets. \
+            Start offset points to the marker (fill bytes are skipped), \
+            end offset points to the first byte after segment.
+
+    Raises:
+        ValueError: If data is not a valid JPEG stream.
+    """
+    if not is_jpeg(image_data):
+        raise ValueError('Not a JPEG file')
+
+    position = len(SOI)
+    data_size = len(image_data)
+    has_scan = False
+    while position < data_size:
+        if image_data[position] != 0xFF:
+            raise ValueError('Marker expected at {0}'.format(position))
+
+        # Markers may be preceded by any number of fill bytes,
+        # they are skipped and not included into segment
+        while position < data_size and image_data[position] == 0xFF:
+            position += 1
+
+        if position >= data_size:
+            raise ValueError('Unexpected end of file')
+
+        start = position - 1
+        marker = image_data[position]
+        position += 1
+        if marker in STANDALONE_MARKERS:
+            yield marker, start, position
+            continue
+
+        if marker == EOI_MARKER:
+            yield marker, start, position
+            return
+
+        if position + 2 > data_size:
+            raise ValueError('Unexpected end of file')
+
+        segment_size = int.from_bytes(image_data[position:position + 2])
+        if segment_size < 2 or position + segment_size > data_size:
+            raise ValueError('Invalid segment size at {0}'.format(start))
+
+        position += segment_size
+        if marker != SOS_MARKER:
+            yield marker, start, position
+            continue
+        if not scans:
+            yield marker, start, position
+            return
+
+        has_scan = True
+        position = find_scan_end(image_data, position)
+        yield marker, start, position
+
+    if not has_scan:
+        raise ValueError('Start of scan not found')
+
+
+def get_exif_payload(image_data: ImageBuffer, start: int, end: int) -> bytes:
+    """Get EXIF data from segment.
+
+    Args:
+        image_data (ImageBuffer): JPEG image data.
+        start (int): Segment start offset.
+        end (int): Segment end offset.
+
+    Returns:
+        bytes: EXIF data in TIFF format or empty bytes \
+            if segment is not an EXIF one.
+    """
+    payload_start = start + 4 + len(EXIF_HEADER)
+    if image_data[start + 4:payload_start] != EXIF_HEADER:
+        return b''
+    return image_data[payload_start:end]
+
+
+def find_jpeg_exif(image_data: bytes) -> bytes:
+    """Find EXIF data of JPEG image.
+
+    Only header segments up to the first EXIF one are read.
+
+    Args:
+        image_data (bytes): JPEG image data.
+
+    Returns:
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid JPEG stream.
+    """
+    for marker, start, end in iter_segments(image_data):
+        if marker == EXIF_MARKER:
+            exif_data = get_exif_payload(image_data, start, end)
+            if exif_data:
+                return exif_data
+
+    return b''
+
+
+def split_jpeg_meta_parts(
+    image_data: ImageBuffer,
+) -> tuple[ImageParts, bytes]:
+    """Remove metadata segments from JPEG image and extract EXIF data.
+
+    Segments up to end of image, including ones between progressive
+    scans, are filtered with `is_meta_segment`. Entropy-coded data
+    is kept as is, data after end of image, e.g. appended images
+    with their own metadata, is dropped. Image without metadata
+    is returned as a single view of source data.
+
+    Args:
+        image_data (ImageBuffer): JPEG image data.
+
+    Returns:
+        ImageParts: Parts of JPEG image data without metadata.
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid JPEG stream.
+    """
+    kept_ranges: list[tuple[int, int]] = [(0, len(SOI))]
+    exif_data = b''
+    for marker, start, end in iter_segments(image_data, scans=True):
+        payload = image_data[start + 4:min(start + 16, end)]
+        if not is_meta_segment(marker, payload):
+            kept_ranges.append((start, end))
+        elif marker == EXIF_MARKER and not exif_data:
+            exif_data = get_exif_payload(image_data, start, end)
+
+    return get_ranges_parts(image_data, kept_ranges), exif_data
+
+
+def split_jpeg_meta(image_data: bytes) -> tuple[bytes, bytes]:
+    """Remove metadata segments from JPEG image and extract EXIF data.
+
+    Args:
+        image_data (bytes): JPEG image data.
+
+    Returns:
+        bytes: JPEG image data without metadata.
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid JPEG stream.
+    """
+    no_meta_parts, exif_data = split_jpeg_meta_parts(image_data)
+    return b''.join(no_meta_parts), exif_data
+
+
+def strip_jpeg_meta(image_data: bytes) -> bytes:
+    """Remove metadata segments from JPEG image.
+
+    Args:
+        image_data (bytes): JPEG image data.
+
+    Returns:
+        bytes: JPEG image data without metadata.
+
+    Raises:
+        ValueError: If data is not a valid JPEG stream.
+    """
+    no_meta_image_data, _ = split_jpeg_meta(image_data)
+    return no_meta_image_data
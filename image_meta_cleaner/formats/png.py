@@ -0,0 +1,173 @@
+"""PNG format module.
+
+Strip metadata chunks from PNG files. Image data chunks are copied
+as is together with their CRC, so no recompression is performed.
+"""
+
+
+from typing import Iterator
+
+from image_meta_cleaner.formats import (
+    ImageBuffer,
+    ImageParts,
+    get_ranges_parts,
+)
+
+# PNG file signature.
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Image trailer chunk type. Data after it is ignored.
+IEND = b'IEND'
+
+# Chunk with EXIF data.
+EXIF_CHUNK = b'eXIf'
+
+# Chunks with metadata: EXIF, textual data and modification time.
+META_CHUNKS = frozenset((b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'))
+
+# Size of chunk length, type and CRC fields.
+CHUNK_OVERHEAD = 12
+
+
+def is_png(image_data: ImageBuffer) -> bool:
+    """Check that data is a PNG file.
+
+    Args:
+        image_data (ImageBuffer): Image data.
+
+    Returns:
+        bool: True if data starts with PNG signature.
+    """
+    return image_data[:len(PNG_SIGNATURE)] == PNG_SIGNATURE
+
+
+def iter_chunks(image_data: ImageBuffer) -> Iterator[tuple[bytes, int, int]]:
+    """Iterate over PNG chunks.
+
+    Iteration stops after `IEND` chunk.
+
+    Args:
+        image_data (ImageBuffer): PNG image data.
+
+    Yields:
+        tuple[bytes, int, int]: Chunk type, start and end offsets. \
+            Offsets include chunk length, type and CRC fields.
+
+    Raises:
+        ValueError: If data is not a valid PNG file.
+    """
+    if not is_png(image_data):
+        raise ValueError('Not a PNG file')
+
+    position = len(PNG_SIGNATURE)
+    data_size = len(image_data)
+    while position + CHUNK_OVERHEAD <= data_size:
+        chunk_size = int.from_bytes(image_data[position:position + 4])
+        chunk_type = image_data[position + 4:position + 8]
+        end = position + chunk_size + CHUNK_OVERHEAD
+        if end > data_size:
+            raise ValueError('Invalid chunk size at {0}'.format(position))
+
+        yield chunk_type, position, end
+        if chunk_type == IEND:
+            return
+
+        position = end
+
+    raise ValueError('Image trailer not found')
+
+
+def get_chunk_data(image_data: ImageBuffer, start: int, end: int) -> bytes:
+    """Get chunk data without length, type and CRC fields.
+
+    Args:
+        image_data (ImageBuffer): PNG image data.
+        start (int): Chunk start offset.
+        end (int): Chunk end offset.
+
+    Returns:
+        bytes: Chunk data.
+    """
+    return image_data[start + 8:end - 4]
+
+
+def find_png_exif(image_data: bytes) -> bytes:
+    """Find EXIF data of PNG image.
+
+    Only chunks headers are read until `eXIf` chunk is found.
+
+    Args:
+        image_data (bytes): PNG image data.
+
+    Returns:
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid PNG file.
+    """
+    for chunk_type, start, end in iter_chunks(image_data):
+        if chunk_type == EXIF_CHUNK:
+            return get_chunk_data(image_data, start, end)
+
+    return b''
+
+
+def split_png_meta_parts(
+    image_data: ImageBuffer,
+) -> tuple[ImageParts, bytes]:
+    """Remove metadata chunks from PNG image and extract EXIF data.
+
+    Image without metadata is returned as a single view of source data.
+
+    Args:
+        image_data (ImageBuffer): PNG image data.
+
+    Returns:
+        ImageParts: Parts of PNG image data without metadata.
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid PNG file.
+    """
+    kept_ranges: list[tuple[int, int]] = [(0, len(PNG_SIGNATURE))]
+    exif_data = b''
+    for chunk_type, start, end in iter_chunks(image_data):
+        if chunk_type not in META_CHUNKS:
+            kept_ranges.append((start, end))
+        elif chunk_type == EXIF_CHUNK:
+            exif_data = get_chunk_data(image_data, start, end)
+
+    return get_ranges_parts(image_data, kept_ranges), exif_data
+
+
+def split_png_meta(image_data: bytes) -> tuple[bytes, bytes]:
+    """Remove metadata chunks from PNG image and extract EXIF data.
+
+    Args:
+        image_data (bytes): PNG image data.
+
+    Returns:
+        bytes: PNG image data without metadata.
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid PNG file.
+    """
+    no_meta_parts, exif_data = split_png_meta_parts(image_data)
+    return b''.join(no_meta_parts), exif_data
+
+
+def strip_png_meta(image_data: bytes) -> bytes:
+    """Remove metadata chunks from PNG image.
+
+    Args:
+        image_data (bytes): PNG image data.
+
+    Returns:
+        bytes: PNG image data without metadata.
+
+    Raises:
+        ValueError: If data is not a valid PNG file.
+    """
+    no_meta_image_data, _ = split_png_meta(image_data)
+    return no_meta_image_data
@@ -0,0 +1,482 @@
+"""TIFF format module.
+
+Strip metadata from TIFF files by rewriting image file directories (IFDs)
+in place. Metadata entries are removed from directories and their values,
+as well as EXIF, GPS and Interoperability sub-IFDs, are zeroed out.
+Image data is neither moved nor decoded, so strips and tiles offsets
+stay valid. Mapped files are rewritten through `PatchedBuffer`, so only
+blocks with directories are copied to memory.
+"""
+
+
+from bisect import bisect_right
+from dataclasses import dataclass
+from mmap import mmap
+
+from image_meta_cleaner.formats import ImageBuffer, ImageParts, PatchedBuffer
+
+# Byte order marks with TIFF magic number.
+TIFF_HEADERS = {
+    b'II*\x00': 'little',
+    b'MM\x00*': 'big',
+}
+
+# Size of IFD entry: tag, type, count and value (or offset).
+ENTRY_SIZE = 12
+
+# Max size of value that is stored inside IFD entry.
+INLINE_VALUE_SIZE = 4
+
+# Sizes of TIFF field types.
+TYPE_SIZES = {
+    1: 1,  # BYTE
+    2: 1,  # ASCII
+    3: 2,  # SHORT
+    4: 4,  # LONG
+    5: 8,  # RATIONAL
+    6: 1,  # SBYTE
+    7: 1,  # UNDEFINED
+    8: 2,  # SSHORT
+    9: 4,  # SLONG
+    10: 8,  # SRATIONAL
+    11: 4,  # FLOAT
+    12: 8,  # DOUBLE
+    13: 4,  # IFD
+}
+
+# Tags of sub-IFDs pointers with metadata: EXIF, GPS and Interoperability.
+META_IFD_TAGS = frozenset((34665, 34853, 40965))
+
+# Descriptive tags and metadata blocks stored in image IFDs.
+META_TAGS = frozenset((
+    269,  # DocumentName
+    270,  # ImageDescription
+    271,  # Make
+    272,  # Model
+    305,  # Software
+    306,  # DateTime
+    315,  # Artist
+    316,  # HostComputer
+    700,  # XMP
+    33432,  # Copyright
+    33723,  # IPTC
+    34377,  # Photoshop
+    *META_IFD_TAGS,
+))
+
+# Tags of image data offsets and sizes: strips, tiles and JPEG stream.
+IMAGE_DATA_TAGS = ((273, 279), (324, 325), (513, 514))
+
+# Limit of directories count to protect from IFD loops.
+MAX_IFDS_COUNT = 4096
+
+
+@dataclass
+class IfdEntry(object):
+    """Entry of image file directory."""
+
+    tag: int
+    field_type: int
+    count: int
+    value_offset: int
+    entry_offset: int
+
+    @property
+    def value_size(self) -> int:
+        """Size of entry value in bytes.
+
+        Returns:
+            int: Value size.
+        """
+        return TYPE_SIZES.get(self.field_type, 1) * self.count
+
+    @property
+    def is_inline(self) -> bool:
+        """Check that entry value is stored inside entry.
+
+        Returns:
+            bool: True if value is not stored by offset.
+        """
+        return self.value_size <= INLINE_VALUE_SIZE
+
+
+def is_tiff(image_data: bytes | mmap) -> bool:
+    """Check that data is a TIFF file.
+
+    Args:
+        image_data (bytes | mmap): Image data.
+
+    Returns:
+        bool: True if data starts with TIFF header.
+    """
+    return image_data[:4] in TIFF_HEADERS
+
+
+class TiffReader(object):
+    """Reader of TIFF directories."""
+
+    def __init__(
+        self,
+        tiff_data: bytes | bytearray | mmap | PatchedBuffer,
+    ) -> None:
+        """Init reader.
+
+        Args:
+            tiff_data (bytes | bytearray | mmap | PatchedBuffer): TIFF data.
+
+        Raises:
+            ValueError: If data is not a TIFF file.
+        """
+        if not is_tiff(bytes(tiff_data[:4])):
+            raise ValueError('Not a TIFF file')
+
+        self.tiff_data = tiff_data
+        self.byteorder = TIFF_HEADERS[bytes(tiff_data[:4])]
+
+    def read_int(self, offset: int, size: int) -> int:
+        """Read unsigned integer from data.
+
+        Args:
+            offset (int): Integer offset.
+            size (int): Integer size.
+
+        Returns:
+            int: Read integer.
+
+        Raises:
+            ValueError: If integer is out of data bounds.
+        """
+        if offset < 0 or offset + size > len(self.tiff_data):
+            raise ValueError('Offset {0} is out of file'.format(offset))
+
+        return int.from_bytes(
+            self.tiff_data[offset:offset + size],
+            self.byteorder,  # type: ignore
+        )
+
+    def read_entries(self, ifd_offset: int) -> list[IfdEntry]:
+        """Read entries of directory.
+
+        Args:
+            ifd_offset (int): Directory offset.
+
+        Returns:
+            list[IfdEntry]: Directory entries.
+        """
+        entries_count = self.read_int(ifd_offset, 2)
+        entries: list[IfdEntry] = []
+        for entry_index in range(entries_count):
+            entry_offset = ifd_offset + 2 + entry_index * ENTRY_SIZE
+            entry = IfdEntry(
+                tag=self.read_int(entry_offset, 2),
+                field_type=self.read_int(entry_offset + 2, 2),
+                count=self.read_int(entry_offset + 4, 4),
+                value_offset=entry_offset + 8,
+                entry_offset=entry_offset,
+            )
+            if not entry.is_inline:
+                entry.value_offset = self.read_int(entry_offset + 8, 4)
+            entries.append(entry)
+
+        return entries
+
+    def read_values(self, entry: IfdEntry) -> list[int]:
+        """Read integer values of entry.
+
+        Args:
+            entry (IfdEntry): Directory entry of SHORT or LONG type.
+
+        Returns:
+            list[int]: Entry values.
+        """
+        value_size = TYPE_SIZES.get(entry.field_type, 1)
+        return [
+            self.read_int(value_offset, value_size)
+            for value_offset in range(
+                entry.value_offset,
+                entry.value_offset + entry.count * value_size,
+                value_size,
+            )
+        ]
+
+    def read_ifds_offsets(self) -> list[int]:
+        """Read offsets of image directories chain.
+
+        Returns:
+            list[int]: Directories offsets.
+
+        Raises:
+            ValueError: If directories chain is looped or too long.
+        """
+        ifds_offsets: list[int] = []
+        ifd_offset = self.read_int(4, 4)
+        while ifd_offset:
+            if ifd_offset in ifds_offsets:
+                raise ValueError('Directories loop at {0}'.format(ifd_offset))
+            if len(ifds_offsets) >= MAX_IFDS_COUNT:
+                raise ValueError('Too many directories')
+
+            ifds_offsets.append(ifd_offset)
+            entries_count = self.read_int(ifd_offset, 2)
+            ifd_offset = self.read_int(
+                ifd_offset + 2 + entries_count * ENTRY_SIZE,
+                4,
+            )
+
+        return ifds_offsets
+
+    def read_image_data_ranges(self, ifd_offset: int) -> list[tuple[int, int]]:
+        """Read ranges of strips, tiles and JPEG data of directory.
+
+        Args:
+            ifd_offset (int): Directory offset.
+
+        Returns:
+            list[tuple[int, int]]: Start and end offsets of image data.
+        """
+        entries = {entry.tag: entry for entry in self.read_entries(ifd_offset)}
+        ranges: list[tuple[int, int]] = []
+        for offsets_tag, sizes_tag in IMAGE_DATA_TAGS:
+            if offsets_tag in entries and sizes_tag in entries:
+                ranges.extend(
+                    (data_offset, data_offset + data_size)
+                    for data_offset, data_size in zip(
+                        self.read_values(entries[offsets_tag]),
+                        self.read_values(entries[sizes_tag]),
+                    )
+                )
+
+        return ranges
+
+
+class TiffRewriter(TiffReader):  # noqa: WPS214
+    """In place rewriter of TIFF directories."""
+
+    def __init__(self, image_data: bytearray | PatchedBuffer) -> None:
+        """Init rewriter.
+
+        Args:
+            image_data (bytearray | PatchedBuffer): Mutable TIFF image data.
+        """
+        super().__init__(image_data)
+        self.image_data = image_data
+        self.erased_offsets: set[int] = set()
+        self.image_data_ranges: list[tuple[int, int]] = []
+
+    def write_int(self, offset: int, size: int, number: int) -> None:
+        """Write unsigned integer to data.
+
+        Args:
+            offset (int): Integer offset.
+            size (int): Integer size.
+            number (int): Integer to write.
+        """
+        self.image_data[offset:offset + size] = number.to_bytes(
+            size,
+            self.byteorder,  # type: ignore
+        )
+
+    def is_erasable(self, offset: int, size: int) -> bool:
+        """Check that data region can be zeroed.
+
+        Region must be inside file and must not overlap image data.
+
+        Args:
+            offset (int): Region offset.
+            size (int): Region size.
+
+        Returns:
+            bool: True if region can be zeroed.
+        """
+        if offset < 0 or offset + size > len(self.image_data):
+            return False
+
+        # Ranges are merged, so only the closest preceding one can overlap
+        range_index = bisect_right(self.image_data_ranges, (offset + size, 0))
+        if not range_index:
+            return True
+
+        return self.image_data_ranges[range_index - 1][1] <= offset
+
+    def zero(self, offset: int, size: int) -> None:
+        """Fill data region with zeros.
+
+        Regions out of file or overlapping image data are skipped:
+        they are left by broken writers and contain no metadata.
+
+        Args:
+            offset (int): Region offset.
+            size (int): Region size.
+        """
+        if self.is_erasable(offset, size):
+            self.image_data[offset:offset + size] = bytes(size)
+
+    def erase_entry_value(self, entry: IfdEntry) -> None:
+        """Zero out-of-line value of entry and sub-IFDs it points to.
+
+        Args:
+            entry (IfdEntry): Directory entry.
+        """
+        if entry.tag in META_IFD_TAGS:
+            self.erase_ifd(self.read_int(entry.value_offset, 4))
+        if not entry.is_inline:
+            self.zero(entry.value_offset, entry.value_size)
+
+    def erase_ifd(self, ifd_offset: int) -> None:
+        """Zero metadata sub-IFD with all its values.
+
+        Dangling pointers to sub-IFDs are ignored.
+
+        Args:
+            ifd_offset (int): Directory offset.
+        """
+        if ifd_offset in self.erased_offsets or not self.is_erasable(
+            ifd_offset,
+            2,
+        ):
+            return
+
+        ifd_size = 2 + self.read_int(ifd_offset, 2) * ENTRY_SIZE + 4
+        if not self.is_erasable(ifd_offset, ifd_size):
+            return
+
+        self.erased_offsets.add(ifd_offset)
+        for entry in self.read_entries(ifd_offset):
+            self.erase_entry_value(entry)
+
+        self.zero(ifd_offset, ifd_size)
+
+    def strip_ifd(self, ifd_offset: int) -> None:
+        """Remove metadata entries from image directory.
+
+        Kept entries are moved to the beginning of directory,
+        freed space is zeroed. Directory without metadata entries
+        is not written, so image without metadata is left as is.
+
+        Args:
+            ifd_offset (int): Directory offset.
+        """
+        entries = self.read_entries(ifd_offset)
+        ifd_size = 2 + len(entries) * ENTRY_SIZE
+        next_ifd_offset = self.read_int(ifd_offset + ifd_size, 4)
+
+        if not any(entry.tag in META_TAGS for entry in entries):
+            return
+
+        kept_entries: list[bytes] = []
+        for entry in entries:  # noqa: WPS440
+            if entry.tag in META_TAGS:
+                self.erase_entry_value(entry)
+            else:
+                kept_entries.append(bytes(self.image_data[
+                    entry.entry_offset:entry.entry_offset + ENTRY_SIZE
+                ]))
+
+        self.image_data[ifd_offset:ifd_offset + ifd_size + 4] = bytes(
+            ifd_size + 4,
+        )
+        self.write_int(ifd_offset, 2, len(kept_entries))
+        entries_offset = ifd_offset + 2
+        entries_end = entries_offset + len(kept_entries) * ENTRY_SIZE
+        self.image_data[entries_offset:entries_end] = b''.join(kept_entries)
+        self.write_int(entries_end, 4, next_ifd_offset)
+
+    def strip(self) -> None:
+        """Remove metadata from all image directories."""
+        ifds_offsets = self.read_ifds_offsets()
+        image_data_ranges: list[tuple[int, int]] = []
+        for ifd_offset in ifds_offsets:
+            image_data_ranges.extend(self.read_image_data_ranges(ifd_offset))
+
+        for range_start, range_end in sorted(image_data_ranges):
+            last_ranges = self.image_data_ranges[-1:]
+            if last_ranges and last_ranges[0][1] >= range_start:
+                self.image_data_ranges[-1] = (
+                    last_ranges[0][0],
+                    max(last_ranges[0][1], range_end),
+                )
+            else:
+                self.image_data_ranges.append((range_start, range_end))
+
+        for ifd_offset in ifds_offsets:  # noqa: WPS440
+            self.strip_ifd(ifd_offset)
+
+
+def find_tiff_exif(image_data: bytes) -> bytes:
+    """Find EXIF data of TIFF image.
+
+    TIFF file itself is an EXIF data block.
+
+    Args:
+        image_data (bytes): TIFF image data.
+
+    Returns:
+        bytes: Source TIFF image data.
+
+    Raises:
+        ValueError: If data is not a TIFF file.
+    """
+    if not is_tiff(image_data):
+        raise ValueError('Not a TIFF file')
+    return image_data
+
+
+def split_tiff_meta(image_data: bytes) -> tuple[bytes, bytes]:
+    """Remove metadata from TIFF image and extract EXIF data.
+
+    TIFF file itself is an EXIF data block.
+
+    Args:
+        image_data (bytes): TIFF image data.
+
+    Returns:
+        bytes: TIFF image data without metadata.
+        bytes: Source TIFF image data.
+
+    Raises:
+        ValueError: If data is not a valid TIFF file.
+    """
+    no_meta_image_data = bytearray(image_data)
+    TiffRewriter(no_meta_image_data).strip()
+    return bytes(no_meta_image_data), find_tiff_exif(image_data)
+
+
+def split_tiff_meta_parts(
+    image_data: ImageBuffer,
+) -> tuple[ImageParts, ImageBuffer]:
+    """Remove metadata from TIFF image without copying image data.
+
+    Image without metadata is returned as a single view of source data.
+
+    Args:
+        image_data (ImageBuffer): TIFF image data.
+
+    Returns:
+        ImageParts: Parts of TIFF image data without metadata.
+        ImageBuffer: Source TIFF image data.
+
+    Raises:
+        ValueError: If data is not a valid TIFF file.
+    """
+    if not is_tiff(image_data):
+        raise ValueError('Not a TIFF file')
+
+    patched_data = PatchedBuffer(image_data)
+    TiffRewriter(patched_data).strip()
+    return patched_data.get_parts(), image_data
+
+
+def strip_tiff_meta(image_data: bytes) -> bytes:
+    """Remove metadata from TIFF image.
+
+    Args:
+        image_data (bytes): TIFF image data.
+
+    Returns:
+        bytes: TIFF image data without metadata.
+
+    Raises:
+        ValueError: If data is not a valid TIFF file.
+    """
+    no_meta_image_data, _ = split_tiff_meta(image_data)
+    return no_meta_image_data
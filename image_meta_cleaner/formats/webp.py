@@ -0,0 +1,214 @@
+"""WebP format module.
+
+Strip metadata chunks from WebP RIFF container. Bitstream chunks
+are copied as is and `VP8X` feature flags are updated accordingly.
+"""
+
+
+from typing import Iterator
+
+from image_meta_cleaner.formats import (
+    ImageBuffer,
+    ImageParts,
+    release_parts,
+)
+
+# RIFF container header.
+RIFF = b'RIFF'
+
+# WebP form type.
+WEBP = b'WEBP'
+
+# Size of RIFF header: `RIFF`, file size and `WEBP`.
+HEADER_SIZE = 12
+
+# Size of chunk FourCC and size fields.
+CHUNK_HEADER_SIZE = 8
+
+# Extended format chunk with feature flags.
+VP8X = b'VP8X'
+
+# Chunk with EXIF data.
+EXIF_CHUNK = b'EXIF'
+
+# Optional header of EXIF chunk data.
+EXIF_HEADER = b'Exif\x00\x00'
+
+# Chunks with metadata.
+META_CHUNKS = frozenset((EXIF_CHUNK, b'XMP '))
+
+# `VP8X` flags of metadata presence: EXIF and XMP.
+META_FLAGS = 0x08 | 0x04
+
+
+def is_webp(image_data: ImageBuffer) -> bool:
+    """Check that data is a WebP file.
+
+    Args:
+        image_data (ImageBuffer): Image data.
+
+    Returns:
+        bool: True if data has RIFF WebP header.
+    """
+    return image_data[:4] == RIFF and image_data[8:12] == WEBP
+
+
+def iter_chunks(image_data: ImageBuffer) -> Iterator[tuple[bytes, int, int]]:
+    """Iterate over WebP chunks.
+
+    Args:
+        image_data (ImageBuffer): WebP image data.
+
+    Yields:
+        tuple[bytes, int, int]: Chunk FourCC, start and end offsets. \
+            Offsets include chunk header and padding byte.
+
+    Raises:
+        ValueError: If data is not a valid WebP file.
+    """
+    if not is_webp(image_data):
+        raise ValueError('Not a WebP file')
+
+    riff_end = int.from_bytes(image_data[4:8], 'little') + CHUNK_HEADER_SIZE
+    if riff_end > len(image_data):
+        raise ValueError('Invalid RIFF size')
+
+    position = HEADER_SIZE
+    while position + CHUNK_HEADER_SIZE <= riff_end:
+        fourcc = image_data[position:position + 4]
+        chunk_size = int.from_bytes(
+            image_data[position + 4:position + CHUNK_HEADER_SIZE],
+            'little',
+        )
+        # Chunks are padded to even size
+        end = position + CHUNK_HEADER_SIZE + chunk_size + chunk_size % 2
+        if end > riff_end:
+            raise ValueError('Invalid chunk size at {0}'.format(position))
+
+        yield fourcc, position, end
+        position = end
+
+
+def get_exif_payload(image_data: ImageBuffer, start: int, end: int) -> bytes:
+    """Get EXIF data from chunk.
+
+    Some writers prepend EXIF data with JPEG-like `Exif` header,
+    it is skipped.
+
+    Args:
+        image_data (ImageBuffer): WebP image data.
+        start (int): Chunk start offset.
+        end (int): Chunk end offset.
+
+    Returns:
+        bytes: EXIF data in TIFF format.
+    """
+    chunk_size = int.from_bytes(
+        image_data[start + 4:start + CHUNK_HEADER_SIZE],
+        'little',
+    )
+    exif_data = image_data[
+        start + CHUNK_HEADER_SIZE:start + CHUNK_HEADER_SIZE + chunk_size
+    ]
+    return exif_data.removeprefix(EXIF_HEADER)
+
+
+def find_webp_exif(image_data: bytes) -> bytes:
+    """Find EXIF data of WebP image.
+
+    Args:
+        image_data (bytes): WebP image data.
+
+    Returns:
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid WebP file.
+    """
+    for fourcc, start, end in iter_chunks(image_data):
+        if fourcc == EXIF_CHUNK:
+            return get_exif_payload(image_data, start, end)
+
+    return b''
+
+
+def split_webp_meta_parts(
+    image_data: ImageBuffer,
+) -> tuple[ImageParts, bytes]:
+    """Remove metadata chunks from WebP image and extract EXIF data.
+
+    Image without metadata is returned as a single view of source data.
+
+    Args:
+        image_data (ImageBuffer): WebP image data.
+
+    Returns:
+        ImageParts: Parts of WebP image data without metadata.
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid WebP file.
+    """
+    data_view = memoryview(image_data)
+    chunks: ImageParts = []
+    exif_data = b''
+    is_stripped = False
+    for fourcc, start, end in iter_chunks(image_data):
+        if fourcc == EXIF_CHUNK:
+            exif_data = get_exif_payload(image_data, start, end)
+        if fourcc in META_CHUNKS:
+            is_stripped = True
+            continue
+
+        if fourcc == VP8X:
+            if end - start <= CHUNK_HEADER_SIZE:
+                raise ValueError('Empty VP8X chunk')
+
+            chunk = bytearray(data_view[start:end])
+            is_stripped = is_stripped or bool(
+                chunk[CHUNK_HEADER_SIZE] & META_FLAGS,
+            )
+            chunk[CHUNK_HEADER_SIZE] &= ~META_FLAGS & 0xFF
+            chunks.append(bytes(chunk))
+        else:
+            chunks.append(data_view[start:end])
+
+    riff_size = len(WEBP) + sum(len(chunk) for chunk in chunks)
+    if not is_stripped and riff_size + CHUNK_HEADER_SIZE == len(image_data):
+        release_parts(chunks)
+        return [data_view], exif_data
+
+    return [RIFF, riff_size.to_bytes(4, 'little'), WEBP, *chunks], exif_data
+
+
+def split_webp_meta(image_data: bytes) -> tuple[bytes, bytes]:
+    """Remove metadata chunks from WebP image and extract EXIF data.
+
+    Args:
+        image_data (bytes): WebP image data.
+
+    Returns:
+        bytes: WebP image data without metadata.
+        bytes: EXIF data in TIFF format or empty bytes if there is no EXIF.
+
+    Raises:
+        ValueError: If data is not a valid WebP file.
+    """
+    no_meta_parts, exif_data = split_webp_meta_parts(image_data)
+    return b''.join(no_meta_parts), exif_data
+
+
+def strip_webp_meta(image_data: bytes) -> bytes:
+    """Remove metadata chunks from WebP image.
+
+    Args:
+        image_data (bytes): WebP image data.
+
+    Returns:
+        bytes: WebP image data without metadata.
+
+    Raises:
+        ValueError: If data is not a valid WebP file.
+    """
+    no_meta_image_data, _ = split_webp_meta(image_data)
+    return no_meta_image_data
@@ -6,8 +6,43 @@ Provide tools for reading images and processing their metadata.
 
 from io import BytesIO
 from pathlib import Path
+from typing import Callable, Optional
 
-from PIL.Image import open as open_image
+from image_meta_cleaner.formats import (
+    ImageBuffer,
+    ImageParts,
+    is_source_data,
+    release_parts,
+)
+from image_meta_cleaner.formats.jpeg import is_jpeg, split_jpeg_meta_parts
+from image_meta_cleaner.formats.png import is_png, split_png_meta_parts
+from image_meta_cleaner.formats.tiff import is_tiff, split_tiff_meta_parts
+from image_meta_cleaner.formats.webp import is_webp, split_webp_meta_parts
+
+# Extensions of supported images files.
+IMAGE_EXTENSIONS = frozenset((
+    '.tiff',
+    '.jpeg',
+    '.jpg',
+    '.png',
+    '.webp',
+    '.heic',
+))
+
+# Container-level metadata strippers that keep image data in place.
+META_PARTS_STRIPPERS: tuple[tuple[
+    Callable[[ImageBuffer], bool],
+    Callable[[ImageBuffer], tuple[ImageParts, ImageBuffer]],
+], ...] = (
+    (is_jpeg, split_jpeg_meta_parts),
+    (is_png, split_png_meta_parts),
+    (is_webp, split_webp_meta_parts),
+    (is_tiff, split_tiff_meta_parts),
+)
+
+# Default limit of pixels count of re-encoded images. Decoded bitmap
+# of such image takes 512 MiB in RGBA mode.
+DEFAULT_MAX_IMAGE_PIXELS = 128 * 1024 * 1024
 
 
 def is_image(file_path: Path) -> bool:
@@ -22,23 +57,135 @@ def is_image(file_path: Path) -> bool:
     Returns:
         bool: True if file of image type, False otherwise.
     """
-    extensions = {'.tiff', '.jpeg', '.jpg', '.png', '.webp', '.heic'}
-    return file_path.suffix.lower() in extensions
+    return file_path.suffix.lower() in IMAGE_EXTENSIONS
 
 
-def get_image_without_meta(image_data: bytes) -> bytes:
-    """Remove metadata from image.
+def get_reencoded_image_without_meta(
+    image_data: bytes,
+    max_pixels: int = DEFAULT_MAX_IMAGE_PIXELS,
+) -> bytes:
+    """Remove metadata from image by decoding and encoding it with Pillow.
+
+    Works for any format supported by Pillow, but slow and lossy.
+    Pillow is imported on first use, as most images are stripped
+    on the container level. Size of image is checked before decoding,
+    so decompression bombs are rejected without allocating bitmap.
+    Process-wide limit of Pillow is left as is, it is shared by
+    threads with different limits and still rejects larger images.
 
     Args:
         image_data (bytes): Image data.
+        max_pixels (int): Limit of pixels count, 0 for Pillow limit only.
 
     Returns:
         bytes: Image data without metadata.
+
+    Raises:
+        ValueError: If image has more pixels than limit.
     """
-    image = open_image(BytesIO(image_data))
+    from PIL import Image  # noqa: WPS433
+
+    image = Image.open(BytesIO(image_data))
+    pixels_count = image.width * image.height
+    if max_pixels and pixels_count > max_pixels:
+        raise ValueError('Image has {0} pixels, limit is {1}'.format(
+            pixels_count,
+            max_pixels,
+        ))
+
     image.info.clear()
     image.getexif().clear()
 
     image_stream = BytesIO()
     image.save(image_stream, image.format)
     return image_stream.getvalue()
+
+
+def split_image_meta(
+    image_data: bytes,
+    max_pixels: int = DEFAULT_MAX_IMAGE_PIXELS,
+) -> tuple[bytes, Optional[bytes]]:
+    """Remove metadata from image and extract EXIF data.
+
+    JPEG, PNG, WebP and TIFF images are stripped on the container level
+    without decoding, EXIF data is extracted during the same pass.
+    Other formats and files rejected by the container parsers are
+    re-encoded with `get_reencoded_image_without_meta`.
+    Images without metadata are found by the same pass and returned
+    as is, so they are not copied.
+
+    Args:
+        image_data (bytes): Image data.
+        max_pixels (int): Limit of pixels count of re-encoded images.
+
+    Returns:
+        bytes: Image data without metadata.
+        Optional[bytes]: EXIF data in TIFF format, empty bytes if \
+            image has no EXIF and None if image container was not parsed.
+    """
+    for is_format, split_meta_parts in META_PARTS_STRIPPERS:
+        if not is_format(image_data):
+            continue
+
+        try:
+            no_meta_parts, exif_data = split_meta_parts(image_data)
+        except ValueError:
+            break
+
+        if is_source_data(no_meta_parts, image_data):
+            release_parts(no_meta_parts)
+            return image_data, b''
+
+        no_meta_image_data = b''.join(no_meta_parts)
+        release_parts(no_meta_parts)
+        return no_meta_image_data, bytes(exif_data)
+
+    return get_reencoded_image_without_meta(image_data, max_pixels), None
+
+
+def split_image_meta_parts(
+    image_data: ImageBuffer,
+) -> tuple[Optional[ImageParts], ImageBuffer]:
+    """Remove metadata from image without copying image data.
+
+    Used for large files, which are memory mapped: only headers
+    are rewritten, pixel data is kept as views of source data.
+    File is parsed once, images without metadata are found
+    by the same pass.
+
+    Args:
+        image_data (ImageBuffer): Image data.
+
+    Returns:
+        Optional[ImageParts]: \
+            Parts of image data without metadata or None if image
+            has no metadata.
+        ImageBuffer: EXIF data in TIFF format or empty bytes.
+
+    Raises:
+        ValueError: If image container is not supported or not parsed.
+    """
+    for is_format, split_meta_parts in META_PARTS_STRIPPERS:
+        if not is_format(image_data):
+            continue
+
+        no_meta_parts, exif_data = split_meta_parts(image_data)
+        if is_source_data(no_meta_parts, image_data):
+            release_parts(no_meta_parts)
+            return None, b''
+        return no_meta_parts, exif_data
+
+    raise ValueError('Image container is not supported')
+
+
+def get_image_without_meta(image_data: bytes) -> bytes:
+    """Remove metadata from image.
+
+    Args:
+        image_data (bytes): Image data.
+
+    Returns:
+        bytes: Image data without metadata.
+    """
+    no_meta_image_data, _ = split_image_meta(image_data)
+    return no_meta_image_data
@@ -0,0 +1,389 @@
+"""Index store module.
+
+Provides persistent storages of files index. Text storage rewrites
+the whole `.imc` file on every save, SQLite storage applies changes
+incrementally and does not load index into memory.
+"""
+
+
+from pathlib import Path
+from typing import Iterator, Optional
+
+from image_meta_cleaner.checkpoint import write_file_atomically
+from image_meta_cleaner.files_index import FilesIndex, FileStat
+
+# Name of text index file.
+TEXT_INDEX_FILE_NAME = '.imc'
+
+# Name of SQLite index database.
+SQLITE_INDEX_FILE_NAME = '.imc.sqlite'
+
+# Supported index backends.
+INDEX_BACKENDS = ('text', 'sqlite')
+
+# Schema of SQLite index database.
+SQLITE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    size INTEGER,
+    mtime_ns INTEGER,
+    inode INTEGER
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dirs (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL
+) WITHOUT ROWID;
+'''
+
+
+class SqliteFilesIndex(FilesIndex):
+    """Files index stored in SQLite database.
+
+    Changes are written in a transaction that is committed on `commit`.
+    """
+
+    def __init__(self, database_path: Path) -> None:
+        """Open or create index database.
+
+        Args:
+            database_path (Path): Path to database file.
+        """
+        import sqlite3  # noqa: WPS433
+
+        super().__init__()
+        # Daemon scans root in thread, access is serialized by its lock
+        self._connection = sqlite3.connect(
+            database_path,
+            check_same_thread=False,
+        )
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        self._connection.executescript(SQLITE_SCHEMA)
+        self._connection.commit()
+
+    def __getitem__(self, file_path: Path) -> str:
+        """Get file hash by path.
+
+        Args:
+            file_path (Path): File path.
+
+        Returns:
+            str: File hash if file exists.
+
+        Raises:
+            KeyError: If file is not in index.
+        """
+        row = self._connection.execute(
+            'SELECT hash FROM files WHERE path = ?',
+            (str(file_path.absolute()),),
+        ).fetchone()
+        if row is None:
+            raise KeyError(file_path)
+        return row[0]  # type: ignore
+
+    def __setitem__(self, file_path: Path, file_hash: str) -> None:
+        """Set hash for file path.
+
+        Stored stat info of file is reset.
+
+        Args:
+            file_path (Path): File path.
+            file_hash (str): File content hash.
+        """
+        self._connection.execute(
+            'INSERT INTO files (path, hash) VALUES (?, ?) '
+            + 'ON CONFLICT (path) DO UPDATE SET hash = excluded.hash, '
+            + 'size = NULL, mtime_ns = NULL, inode = NULL',
+            (str(file_path.absolute()), file_hash),
+        )
+
+    def __delitem__(self, file_path: Path) -> None:  # noqa: WPS603
+        """Remove file path from index.
+
+        Args:
+            file_path (Path): File path.
+
+        Raises:
+            KeyError: If file is not in index.
+        """
+        cursor = self._connection.execute(
+            'DELETE FROM files WHERE path = ?',
+            (str(file_path.absolute()),),
+        )
+        if not cursor.rowcount:
+            raise KeyError(file_path)
+
+    def __iter__(self) -> Iterator[Path]:
+        """Return iterator over consisted files pathes.
+
+        Returns:
+            Iterator[Path]: Iterator over files pathes
+        """
+        rows = self._connection.execute('SELECT path FROM files').fetchall()
+        return (Path(row[0]) for row in rows)
+
+    def __len__(self) -> int:
+        """Return count of files in index.
+
+        Returns:
+            int: Count of files in index.
+        """
+        row = self._connection.execute('SELECT COUNT(*) FROM files').fetchone()
+        return row[0]  # type: ignore
+
+    def __contains__(self, file_path: object) -> bool:
+        """Check that file is in index.
+
+        Args:
+            file_path (object): File path.
+
+        Returns:
+            bool: True if file is in index.
+        """
+        if not isinstance(file_path, Path):
+            return False
+
+        row = self._connection.execute(
+            'SELECT 1 FROM files WHERE path = ?',
+            (str(file_path.absolute()),),
+        ).fetchone()
+        return row is not None
+
+    def __repr__(self) -> str:
+        """Return repr of index.
+
+        Returns:
+            str: Repr of files index.
+        """
+        return '{0}({1})'.format(type(self).__name__, len(self))
+
+    def get_stat(self, file_path: Path) -> Optional[FileStat]:
+        """Get stored stat info of file.
+
+        Args:
+            file_path (Path): File path.
+
+        Returns:
+            Optional[FileStat]: File stat info if it is stored.
+        """
+        row = self._connection.execute(
+            'SELECT size, mtime_ns, inode FROM files '
+            + 'WHERE path = ? AND size IS NOT NULL',
+            (str(file_path.absolute()),),
+        ).fetchone()
+        if row is None:
+            return None
+        return FileStat(*row)
+
+    def set_stat(self, file_path: Path, file_stat: FileStat) -> None:
+        """Store stat info of indexed file.
+
+        Args:
+            file_path (Path): File path.
+            file_stat (FileStat): File stat info.
+
+        Raises:
+            KeyError: If file is not in index.
+        """
+        cursor = self._connection.execute(
+            'UPDATE files SET size = ?, mtime_ns = ?, inode = ? '
+            + 'WHERE path = ?',
+            (*file_stat, str(file_path.absolute())),
+        )
+        if not cursor.rowcount:
+            raise KeyError(file_path)
+
+    def verify_stat(self, file_path: Path, file_stat: FileStat) -> bool:
+        """Verify that file was not changed since indexing.
+
+        Args:
+            file_path (Path): File path.
+            file_stat (FileStat): Actual file stat info.
+
+        Returns:
+            bool: True if file in index and stat info is same.
+        """
+        return self.get_stat(file_path) == file_stat
+
+    def iter_entries(self) -> Iterator[tuple[str, str, Optional[FileStat]]]:
+        """Iterate over indexed files without building their pathes.
+
+        Returns:
+            Iterator[tuple[str, str, Optional[FileStat]]]: \
+                Iterator over absolute files pathes, hashes and stat info.
+        """
+        rows = self._connection.execute(
+            'SELECT path, hash, size, mtime_ns, inode FROM files',
+        ).fetchall()
+        return (
+            (
+                path_str,
+                file_hash,
+                None if size is None else FileStat(size, mtime_ns, inode),
+            )
+            for path_str, file_hash, size, mtime_ns, inode in rows
+        )
+
+    def prune(self, seen_paths: set[Path]) -> None:
+        """Remove files that were not found from index.
+
+        Found pathes are loaded to temporary table, so files are
+        removed by one query without reading pathes of all files.
+
+        Args:
+            seen_paths (set[Path]): Absolute pathes of found files.
+        """
+        self._connection.execute(
+            'CREATE TEMP TABLE seen (path TEXT PRIMARY KEY) WITHOUT ROWID',
+        )
+        try:
+            self._connection.executemany(
+                'INSERT OR IGNORE INTO seen VALUES (?)',
+                ((str(file_path),) for file_path in seen_paths),
+            )
+            self._connection.execute(
+                'DELETE FROM files WHERE path NOT IN (SELECT path FROM seen)',
+            )
+        finally:
+            self._connection.execute('DROP TABLE temp.seen')
+
+    def get_dir_mtime(self, dir_path: Path) -> Optional[int]:
+        """Get stored modification time of directory.
+
+        Args:
+            dir_path (Path): Directory path.
+
+        Returns:
+            Optional[int]: Modification time in nanoseconds if it is stored.
+        """
+        row = self._connection.execute(
+            'SELECT mtime_ns FROM dirs WHERE path = ?',
+            (str(dir_path.absolute()),),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0]  # type: ignore
+
+    def set_dir_mtime(self, dir_path: Path, mtime_ns: Optional[int]) -> None:
+        """Store or reset modification time of scanned directory.
+
+        Args:
+            dir_path (Path): Directory path.
+            mtime_ns (Optional[int]): \
+                Modification time in nanoseconds or None to reset it.
+        """
+        if mtime_ns is None:
+            self._connection.execute(
+                'DELETE FROM dirs WHERE path = ?',
+                (str(dir_path.absolute()),),
+            )
+            return
+
+        self._connection.execute(
+            'INSERT INTO dirs (path, mtime_ns) VALUES (?, ?) '
+            + 'ON CONFLICT (path) DO UPDATE SET mtime_ns = excluded.mtime_ns',
+            (str(dir_path.absolute()), mtime_ns),
+        )
+
+    def iter_dirs(self) -> Iterator[Path]:
+        """Iterate over directories with stored modification time.
+
+        Returns:
+            Iterator[Path]: Iterator over directories pathes.
+        """
+        rows = self._connection.execute('SELECT path FROM dirs').fetchall()
+        return (Path(row[0]) for row in rows)
+
+    def commit(self) -> None:
+        """Commit index changes to database."""
+        self._connection.commit()
+
+    def close(self) -> None:
+        """Commit changes and close database."""
+        self._connection.commit()
+        self._connection.close()
+
+
+def get_files_index(source: Path, backend: str = 'text') -> FilesIndex:
+    """Get processed files index of directory.
+
+    Index is located in the source directory. If SQLite index does not
+    exist yet, it is created and filled from text index file.
+
+    Args:
+        source (Path): Path to the source directory.
+        backend (str): Index backend, one of `INDEX_BACKENDS`.
+
+    Returns:
+        FilesIndex: Processed files index.
+
+    Raises:
+        ValueError: If backend is unknown.
+    """
+    text_index_path = source / TEXT_INDEX_FILE_NAME
+    if backend == 'text':
+        if not text_index_path.exists():
+            return FilesIndex()
+        return FilesIndex.from_index_file(text_index_path.read_text())
+
+    if backend != 'sqlite':
+        raise ValueError('Unknown index backend: {0}'.format(backend))
+
+    database_path = source / SQLITE_INDEX_FILE_NAME
+    is_new_database = not database_path.exists()
+    index = SqliteFilesIndex(database_path)
+    if is_new_database and text_index_path.exists():
+        index.import_index_file(text_index_path.read_text())
+        index.commit()
+    return index
+
+
+def close_files_index(index: Optional[FilesIndex]) -> None:
+    """Close database of processed files index.
+
+    Args:
+        index (Optional[FilesIndex]): \
+            Processed files index, nothing is done for None and
+            in-memory index.
+    """
+    if isinstance(index, SqliteFilesIndex):
+        index.close()
+
+
+def get_rewritten_size(index: FilesIndex) -> int:
+    """Get count of entries rewritten on saving of index.
+
+    Args:
+        index (FilesIndex): Processed files index.
+
+    Returns:
+        int: \
+            Count of index entries for text index file and zero for
+            SQLite index, which changes are committed incrementally.
+    """
+    if isinstance(index, SqliteFilesIndex):
+        return 0
+    return len(index)
+
+
+def save_files_index(source: Path, index: FilesIndex) -> None:
+    """Save processed files index of directory.
+
+    SQLite index changes are committed, text index file is atomically
+    rewritten and synced to disk.
+
+    Args:
+        source (Path): Path to the source directory.
+        index (FilesIndex): Processed files index.
+    """
+    if isinstance(index, SqliteFilesIndex):
+        index.commit()
+        return
+
+    index_file_path = source / TEXT_INDEX_FILE_NAME
+    write_file_atomically(
+        index_file_path,
+        index.build_index_file().encode(),
+        sync=True,
+    )
@@ -0,0 +1,242 @@
+"""Leases module.
+
+Provides leases with expiry kept in files on shared filesystem, so
+nodes processing the same directory do not process the same files.
+Lease file is created exclusively, renewed by its holder and taken
+over by another node only after it is expired. Clocks of nodes are
+expected to be synchronized within small part of lease duration.
+"""
+
+
+import json
+import os
+import socket
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import time
+from typing import Optional
+
+from image_meta_cleaner.checkpoint import write_file_atomically
+
+# Suffix of lease files.
+LEASE_FILE_SUFFIX = '.lease'
+
+# Prefix of leases that mark nodes as alive.
+NODE_LEASE_PREFIX = 'node-'
+
+# Duration of leases in seconds by default.
+DEFAULT_LEASE_SECONDS = 60.0
+
+# Count of shards directory files are split to by default.
+DEFAULT_SHARDS_COUNT = 64
+
+
+def get_default_node_id() -> str:
+    """Get node id unique for process.
+
+    Returns:
+        str: Host name and process id.
+    """
+    return '{0}-{1}'.format(socket.gethostname(), os.getpid())
+
+
+@dataclass
+class ClusterSettings(object):
+    """Settings of cooperative processing by several nodes."""
+
+    # Node id, unique among nodes processing the same directory
+    node_id: str = field(default_factory=get_default_node_id)
+
+    # Count of shards, must be the same on all nodes
+    shards: int = DEFAULT_SHARDS_COUNT
+
+    # Duration of leases in seconds
+    lease_seconds: float = DEFAULT_LEASE_SECONDS
+
+
+@dataclass(frozen=True)
+class LeaseHolder(object):
+    """Content of lease file."""
+
+    node_id: str
+    expires: float
+
+
+def read_lease_file(
+    lease_path: Path,
+    lease_seconds: float,
+) -> Optional[LeaseHolder]:
+    """Read lease file.
+
+    Lease file that is not written yet or malformed expires
+    in lease duration after its modification.
+
+    Args:
+        lease_path (Path): Lease file path.
+        lease_seconds (float): Duration of leases in seconds.
+
+    Returns:
+        Optional[LeaseHolder]: Lease holder or None if file is missing.
+    """
+    try:
+        lease_data = lease_path.read_bytes()
+        lease_mtime = lease_path.stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+    try:
+        lease = json.loads(lease_data)
+        return LeaseHolder(str(lease['node']), float(lease['expires']))
+    except (ValueError, TypeError, KeyError):
+        return LeaseHolder('', lease_mtime + lease_seconds)
+
+
+class LeaseDir(object):
+    """Leases of node in shared directory.
+
+    Leases that are close to expiry are renewed by `renew`,
+    leases taken over by other nodes meanwhile are dropped.
+    """
+
+    def __init__(
+        self,
+        leases_dir: Path,
+        node_id: str,
+        lease_seconds: float = DEFAULT_LEASE_SECONDS,
+    ) -> None:
+        """Init leases.
+
+        Args:
+            leases_dir (Path): Directory of lease files.
+            node_id (str): Id of this node.
+            lease_seconds (float): Duration of leases in seconds.
+        """
+        self.leases_dir = leases_dir
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.held: dict[str, float] = {}
+
+    def acquire(self, name: str) -> bool:
+        """Take lease if it is free or expired.
+
+        Args:
+            name (str): Lease name.
+
+        Returns:
+            bool: True if lease is held by this node.
+        """
+        if name in self.held:
+            return True
+
+        self.leases_dir.mkdir(parents=True, exist_ok=True)
+        if self._create(name):
+            return True
+
+        holder = self.get_holder(name)
+        if holder is None:
+            return self._create(name)
+        if holder.node_id != self.node_id and holder.expires > time():
+            return False
+        return self._take_over(name, holder)
+
+    def renew(self) -> None:
+        """Extend leases which passed half of their duration."""
+        renew_time = time() + self.lease_seconds / 2
+        for name, expires in list(self.held.items()):
+            if expires > renew_time:
+                continue
+            holder = self.get_holder(name)
+            if holder is None or holder.node_id != self.node_id:
+                # Taken over by another node
+                self.held.pop(name)
+                continue
+            self.held[name] = self._write(name, atomically=True)
+
+    def release(self, name: str) -> None:
+        """Remove lease if it is held by this node.
+
+        Args:
+            name (str): Lease name.
+        """
+        if self.held.pop(name, None) is None:
+            return
+        holder = self.get_holder(name)
+        if holder is not None and holder.node_id == self.node_id:
+            self._get_path(name).unlink(missing_ok=True)
+
+    def get_holder(self, name: str) -> Optional[LeaseHolder]:
+        """Read lease file.
+
+        Args:
+            name (str): Lease name.
+
+        Returns:
+            Optional[LeaseHolder]: Lease holder or None if lease is free.
+        """
+        return read_lease_file(self._get_path(name), self.lease_seconds)
+
+    def count_alive(self, prefix: str) -> int:
+        """Count not expired leases with name prefix.
+
+        Args:
+            prefix (str): Leases names prefix.
+
+        Returns:
+            int: Count of leases.
+        """
+        now = time()
+        alive_count = 0
+        for lease_path in self.leases_dir.glob(
+            '{0}*{1}'.format(prefix, LEASE_FILE_SUFFIX),
+        ):
+            holder = self.get_holder(lease_path.name[:-len(LEASE_FILE_SUFFIX)])
+            if holder is not None and holder.expires > now:
+                alive_count += 1
+        return alive_count
+
+    def _get_path(self, name: str) -> Path:
+        return self.leases_dir / '{0}{1}'.format(name, LEASE_FILE_SUFFIX)
+
+    def _write(self, name: str, atomically: bool = False) -> float:
+        expires = time() + self.lease_seconds
+        lease_data = json.dumps({'node': self.node_id, 'expires': expires})
+        lease_path = self._get_path(name)
+        if atomically:
+            write_file_atomically(lease_path, lease_data.encode())
+            return expires
+
+        # Created file must not be replaced, so it is written in place
+        lease_fd = os.open(lease_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL)
+        with os.fdopen(lease_fd, 'w') as lease_file:
+            lease_file.write(lease_data)
+        return expires
+
+    def _create(self, name: str) -> bool:
+        try:
+            self.held[name] = self._write(name)
+        except FileExistsError:
+            return False
+        return True
+
+    def _take_over(self, name: str, holder: LeaseHolder) -> bool:
+        # Expired lease is moved aside first, so only one node removes it
+        lease_path = self._get_path(name)
+        stale_path = lease_path.with_name(
+            '.{0}.{1}.stale'.format(lease_path.name, self.node_id),
+        )
+        try:
+            os.rename(lease_path, stale_path)
+        except FileNotFoundError:
+            return False
+
+        if read_lease_file(stale_path, self.lease_seconds) != holder:
+            # Lease was renewed or taken by another node meanwhile
+            try:
+                os.link(stale_path, lease_path)
+            except FileExistsError:
+                pass
+            stale_path.unlink(missing_ok=True)
+            return False
+
+        stale_path.unlink(missing_ok=True)
+        return self._create(name)
@@ -7,8 +7,8 @@ from dataclasses import dataclass
 from io import BytesIO
 from typing import Optional
 
-from exifread import process_file
-from exifread.utils import get_gps_coords
+from image_meta_cleaner.formats import ImageBuffer
+from image_meta_cleaner.formats.exif import find_exif, read_gps_coords
 
 
 @dataclass
@@ -39,8 +39,34 @@ class Location(object):
         )
 
 
-def get_file_gps_location(file_data: bytes) -> Optional[Location]:
-    """Read location data from file.
+def get_exif_gps_location(exif_data: ImageBuffer) -> Optional[Location]:
+    """Read location data from EXIF data.
+
+    Only GPS tags are read.
+
+    Args:
+        exif_data (ImageBuffer): EXIF data in TIFF format.
+
+    Returns:
+        Optional[Location]: Location data.
+    """
+    try:
+        coords = read_gps_coords(exif_data)
+    except ValueError:
+        return None
+
+    if coords is None:
+        return None
+
+    latitude, longitude = coords
+    return Location(latitude, longitude)
+
+
+def get_exifread_gps_location(file_data: bytes) -> Optional[Location]:
+    """Read location data from file with exifread.
+
+    Supports all formats supported by exifread, but parses all tags.
+    Exifread is imported on first use, as it is only a fallback.
 
     Args:
         file_data (bytes): File data.
@@ -48,10 +74,34 @@ def get_file_gps_location(file_data: bytes) -> Optional[Location]:
     Returns:
         Optional[Location]: Location data.
     """
-    tags = process_file(BytesIO(file_data))
+    from exifread import process_file  # noqa: WPS433
+    from exifread.utils import get_gps_coords  # noqa: WPS433
+
+    tags = process_file(BytesIO(file_data), details=False)
     coords: tuple[int, int] | tuple[()] = get_gps_coords(tags)  # type: ignore
     if not coords:
         return None
 
     latitude, longitude = coords
     return Location(latitude, longitude)
+
+
+def get_file_gps_location(file_data: bytes) -> Optional[Location]:
+    """Read location data from file.
+
+    EXIF data of JPEG, PNG, WebP and TIFF files is found without parsing
+    of whole file and only GPS tags are read. Other formats are parsed
+    with exifread.
+
+    Args:
+        file_data (bytes): File data.
+
+    Returns:
+        Optional[Location]: Location data.
+    """
+    try:
+        exif_data = find_exif(file_data)
+    except ValueError:
+        return get_exifread_gps_location(file_data)
+
+    return get_exif_gps_location(exif_data)
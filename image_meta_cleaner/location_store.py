@@ -0,0 +1,626 @@
+"""Location store module.
+
+Provides persistent store of images locations with spatial queries.
+Locations are kept in columnar arrays and persisted in append-only
+binary log, so every cycle writes only changed records.
+"""
+
+
+import json
+import logging
+import math
+import os
+import struct
+from array import array
+from dataclasses import dataclass
+from heapq import heappush, heappushpop
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from image_meta_cleaner.checkpoint import write_file_atomically
+from image_meta_cleaner.location import Location
+
+# Name of location store file.
+LOCATION_STORE_FILE_NAME = '.imc.locations'
+
+# Magic bytes of location store file.
+LOCATION_STORE_MAGIC = b'IMCLOC1\n'
+
+# Header of record: latitude, longitude, hash size and path size.
+# Record with NaN coordinates removes file from store.
+RECORD_HEADER = struct.Struct('<ddHH')
+
+# Max size of encoded hash and path of record.
+MAX_RECORD_FIELD_SIZE = 0xFFFF
+
+# Size of spatial grid cell in degrees.
+GRID_CELL_SIZE = 1.0
+
+# Mean Earth radius in kilometers.
+EARTH_RADIUS = 6371.0088
+
+
+@dataclass
+class LocationRecord(object):
+    """Location of indexed file."""
+
+    file_path: Path
+    file_hash: str
+    location: Location
+
+
+def get_grid_cell(latitude: float, longitude: float) -> tuple[int, int]:
+    """Get spatial grid cell of coordinates.
+
+    Args:
+        latitude (float): Latitude in degrees.
+        longitude (float): Longitude in degrees.
+
+    Returns:
+        tuple[int, int]: Cell latitude and longitude indices.
+    """
+    return (
+        math.floor(latitude / GRID_CELL_SIZE),
+        math.floor(longitude / GRID_CELL_SIZE),
+    )
+
+
+def to_unit_vector(latitude: float, longitude: float) -> tuple[float, ...]:
+    """Convert coordinates to point on unit sphere.
+
+    Straight-line distance between such points grows with
+    great-circle distance, so it is used by nearest neighbour search.
+
+    Args:
+        latitude (float): Latitude in degrees.
+        longitude (float): Longitude in degrees.
+
+    Returns:
+        tuple[float, ...]: Point x, y and z coordinates.
+    """
+    lat_radians = math.radians(latitude)
+    lon_radians = math.radians(longitude)
+    return (
+        math.cos(lat_radians) * math.cos(lon_radians),
+        math.cos(lat_radians) * math.sin(lon_radians),
+        math.sin(lat_radians),
+    )
+
+
+def chord_to_kilometers(chord: float) -> float:
+    """Convert straight-line distance on unit sphere to kilometers.
+
+    Args:
+        chord (float): Distance between points on unit sphere.
+
+    Returns:
+        float: Great-circle distance in kilometers.
+    """
+    return 2 * EARTH_RADIUS * math.asin(min(chord / 2, 1))
+
+
+class KdTree(object):
+    """Static k-d tree of points on unit sphere.
+
+    Tree is implicit: median of every range of `rows` is its node.
+    """
+
+    def __init__(self, points: list[tuple[float, ...]], rows: list[int]):
+        """Build tree.
+
+        Args:
+            points (list[tuple[float, ...]]): Points by rows.
+            rows (list[int]): Rows to put in tree.
+        """
+        self.points = points
+        self.rows = rows
+        self._build(0, len(rows), 0)
+
+    def nearest(
+        self,
+        point: tuple[float, ...],
+        count: int,
+    ) -> list[tuple[float, int]]:
+        """Find nearest points.
+
+        Args:
+            point (tuple[float, ...]): Query point.
+            count (int): Count of points to find.
+
+        Returns:
+            list[tuple[float, int]]: Distances and rows sorted by distance.
+        """
+        # Max-heap of found points by negated squared distances
+        found: list[tuple[float, int]] = []
+        self._search(point, count, found, 0, len(self.rows), 0)
+        return sorted(
+            (math.sqrt(-negated_distance), row)
+            for negated_distance, row in found
+        )
+
+    def _build(self, start: int, end: int, axis: int) -> None:
+        if end - start <= 1:
+            return
+
+        self.rows[start:end] = sorted(
+            self.rows[start:end],
+            key=lambda row: self.points[row][axis],
+        )
+        middle = (start + end) // 2
+        self._build(start, middle, (axis + 1) % 3)
+        self._build(middle + 1, end, (axis + 1) % 3)
+
+    def _search(  # noqa: WPS211
+        self,
+        point: tuple[float, ...],
+        count: int,
+        found: list[tuple[float, int]],
+        start: int,
+        end: int,
+        axis: int,
+    ) -> None:
+        if start >= end:
+            return
+
+        middle = (start + end) // 2
+        row = self.rows[middle]
+        node = self.points[row]
+        distance = sum(
+            (node_coord - point_coord) ** 2
+            for node_coord, point_coord in zip(node, point)
+        )
+        if len(found) < count:
+            heappush(found, (-distance, row))
+        elif distance < -found[0][0]:
+            heappushpop(found, (-distance, row))
+
+        axis_distance = point[axis] - node[axis]
+        if axis_distance < 0:
+            near_range, far_range = (start, middle), (middle + 1, end)
+        else:
+            near_range, far_range = (middle + 1, end), (start, middle)
+        next_axis = (axis + 1) % 3
+        self._search(point, count, found, *near_range, next_axis)
+        if len(found) < count or axis_distance ** 2 < -found[0][0]:
+            self._search(point, count, found, *far_range, next_axis)
+
+
+class LocationStore(object):  # noqa: WPS214
+    """Store of images locations keyed by file path.
+
+    Coordinates are kept in arrays indexed by row. Updated and removed
+    files leave dead rows that are dropped on load and compaction.
+    """
+
+    def __init__(self, store_path: Optional[Path] = None) -> None:
+        """Load store from file if it exists.
+
+        Args:
+            store_path (Optional[Path]): \
+                Path to store file or None for in-memory store.
+
+        Raises:
+            ValueError: If store file is malformed.
+        """
+        self.store_path = store_path
+        self._latitudes = array('d')
+        self._longitudes = array('d')
+        self._alive = bytearray()
+        self._paths: list[str] = []
+        self._hashes: list[str] = []
+        self._rows: dict[str, int] = {}
+        self._grid: dict[tuple[int, int], array[int]] = {}
+        self._kd_tree: Optional[KdTree] = None
+        self._pending = bytearray()
+        self._file_records = 0
+        self._is_truncated = False
+        if store_path is not None and store_path.exists():
+            self._load(store_path.read_bytes())
+
+    def __len__(self) -> int:
+        """Return count of files with location.
+
+        Returns:
+            int: Count of files in store.
+        """
+        return len(self._rows)
+
+    def __contains__(self, file_path: object) -> bool:
+        """Check that file is in store.
+
+        Args:
+            file_path (object): File path.
+
+        Returns:
+            bool: True if file is in store.
+        """
+        if not isinstance(file_path, Path):
+            return False
+        return str(file_path.absolute()) in self._rows
+
+    def get(self, file_path: Path) -> Optional[LocationRecord]:
+        """Get location of file.
+
+        Args:
+            file_path (Path): File path.
+
+        Returns:
+            Optional[LocationRecord]: File location if file is in store.
+        """
+        row = self._rows.get(str(file_path.absolute()))
+        if row is None:
+            return None
+        return self._get_record(row)
+
+    def __iter__(self) -> Iterator[LocationRecord]:
+        """Iterate over stored locations.
+
+        Yields:
+            LocationRecord: File location.
+        """
+        for row in self._rows.values():
+            yield self._get_record(row)
+
+    def add(
+        self,
+        file_path: Path,
+        file_hash: str,
+        location: Optional[Location],
+    ) -> None:
+        """Set location of file.
+
+        Args:
+            file_path (Path): File path.
+            file_hash (str): File content hash.
+            location (Optional[Location]): \
+                File location or None to remove file from store.
+        """
+        path = str(file_path.absolute())
+        row = self._rows.get(path)
+        if location is not None and not can_pack_record(path, file_hash):
+            logging.warning('Location is not stored, too long: {0}'.format(
+                path,
+            ))
+            location = None
+        if location is None:
+            if row is not None:
+                self._kill_row(path, row)
+                self._pending += self._pack_record(
+                    path,
+                    '',
+                    math.nan,
+                    math.nan,
+                )
+            return
+
+        latitude, longitude = location.latitude, location.longitude
+        if row is not None:
+            if (
+                self._hashes[row] == file_hash
+                and self._latitudes[row] == latitude
+                and self._longitudes[row] == longitude
+            ):
+                return
+            self._kill_row(path, row)
+
+        self._append_row(path, file_hash, latitude, longitude)
+        self._pending += self._pack_record(
+            path,
+            file_hash,
+            latitude,
+            longitude,
+        )
+
+    def remove(self, file_path: Path) -> None:
+        """Remove file from store if it is there.
+
+        Args:
+            file_path (Path): File path.
+        """
+        self.add(file_path, '', None)
+
+    def prune(self, seen_paths: set[Path]) -> None:
+        """Remove files that were not found from store.
+
+        Args:
+            seen_paths (set[Path]): Absolute pathes of found files.
+        """
+        missing_paths = [
+            Path(path)
+            for path in self._rows
+            if Path(path) not in seen_paths
+        ]
+        for file_path in missing_paths:
+            self.remove(file_path)
+
+    def query_bbox(
+        self,
+        min_latitude: float,
+        min_longitude: float,
+        max_latitude: float,
+        max_longitude: float,
+    ) -> list[LocationRecord]:
+        """Find files located in bounding box.
+
+        Args:
+            min_latitude (float): South border.
+            min_longitude (float): West border.
+            max_latitude (float): North border.
+            max_longitude (float): East border.
+
+        Returns:
+            list[LocationRecord]: Files locations in bounding box.
+        """
+        min_cell = get_grid_cell(min_latitude, min_longitude)
+        max_cell = get_grid_cell(max_latitude, max_longitude)
+        cells_count = (
+            (max_cell[0] - min_cell[0] + 1)
+            * (max_cell[1] - min_cell[1] + 1)
+        )
+        if cells_count > len(self._grid):
+            # Box is large, so look through occupied cells only
+            rows: Iterable[int] = self._rows.values()
+        else:
+            rows = (
+                row
+                for lat_cell in range(min_cell[0], max_cell[0] + 1)
+                for lon_cell in range(min_cell[1], max_cell[1] + 1)
+                for row in self._grid.get((lat_cell, lon_cell), ())
+            )
+        return [
+            self._get_record(row)
+            for row in rows
+            if self._alive[row]
+            and min_latitude <= self._latitudes[row] <= max_latitude
+            and min_longitude <= self._longitudes[row] <= max_longitude
+        ]
+
+    def nearest(
+        self,
+        latitude: float,
+        longitude: float,
+        count: int = 1,
+    ) -> list[tuple[LocationRecord, float]]:
+        """Find files located nearest to point.
+
+        Args:
+            latitude (float): Point latitude.
+            longitude (float): Point longitude.
+            count (int): Count of files to find.
+
+        Returns:
+            list[tuple[LocationRecord, float]]: \
+                Files locations and great-circle distances in kilometers.
+        """
+        if self._kd_tree is None:
+            points = [
+                to_unit_vector(row_latitude, row_longitude)
+                for row_latitude, row_longitude in zip(
+                    self._latitudes,
+                    self._longitudes,
+                )
+            ]
+            self._kd_tree = KdTree(points, list(self._rows.values()))
+
+        found = self._kd_tree.nearest(
+            to_unit_vector(latitude, longitude),
+            count,
+        )
+        return [
+            (self._get_record(row), chord_to_kilometers(chord))
+            for chord, row in found
+        ]
+
+    def save(self) -> None:
+        """Append changes to store file and sync it to disk.
+
+        Store is saved at the same checkpoints as index, so both are
+        synced together. File is rewritten when it is new, has more dead
+        records than alive ones or its last record was not written
+        completely.
+        """
+        if self.store_path is None or not self._pending:
+            return
+
+        if (
+            self._is_truncated
+            or self._file_records > 2 * len(self._rows) + 1
+            or not self.store_path.exists()
+        ):
+            self._compact(self.store_path)
+            return
+
+        with open(self.store_path, 'ab') as store_file:
+            store_file.write(self._pending)
+            store_file.flush()
+            os.fsync(store_file.fileno())
+        self._pending.clear()
+
+    def export_csv(self, export_path: Path) -> None:
+        """Export locations to CSV file.
+
+        Args:
+            export_path (Path): Path to CSV file.
+        """
+        import csv  # noqa: WPS433
+
+        with open(export_path, 'w', newline='') as export_file:
+            writer = csv.writer(export_file)
+            writer.writerow(['path', 'hash', 'latitude', 'longitude'])
+            for record in self:
+                writer.writerow([
+                    str(record.file_path),
+                    record.file_hash,
+                    record.location.latitude,
+                    record.location.longitude,
+                ])
+
+    def export_geojson(self, export_path: Path) -> None:
+        """Export locations to GeoJSON file as points collection.
+
+        Args:
+            export_path (Path): Path to GeoJSON file.
+        """
+        features = [
+            {
+                'type': 'Feature',
+                'geometry': {
+                    'type': 'Point',
+                    'coordinates': [
+                        record.location.longitude,
+                        record.location.latitude,
+                    ],
+                },
+                'properties': {
+                    'path': str(record.file_path),
+                    'hash': record.file_hash,
+                },
+            }
+            for record in self
+        ]
+        export_path.write_text(json.dumps({
+            'type': 'FeatureCollection',
+            'features': features,
+        }))
+
+    def _get_record(self, row: int) -> LocationRecord:
+        return LocationRecord(
+            file_path=Path(self._paths[row]),
+            file_hash=self._hashes[row],
+            location=Location(self._latitudes[row], self._longitudes[row]),
+        )
+
+    def _append_row(
+        self,
+        path: str,
+        file_hash: str,
+        latitude: float,
+        longitude: float,
+    ) -> None:
+        row = len(self._paths)
+        self._latitudes.append(latitude)
+        self._longitudes.append(longitude)
+        self._alive.append(1)
+        self._paths.append(path)
+        self._hashes.append(file_hash)
+        self._rows[path] = row
+        cell = get_grid_cell(latitude, longitude)
+        self._grid.setdefault(cell, array('I')).append(row)
+        self._kd_tree = None
+
+    def _kill_row(self, path: str, row: int) -> None:
+        self._alive[row] = 0
+        self._rows.pop(path)
+        self._kd_tree = None
+
+    def _pack_record(
+        self,
+        path: str,
+        file_hash: str,
+        latitude: float,
+        longitude: float,
+    ) -> bytes:
+        self._file_records += 1
+        encoded_path = path.encode()
+        encoded_hash = file_hash.encode()
+        return RECORD_HEADER.pack(
+            latitude,
+            longitude,
+            len(encoded_hash),
+            len(encoded_path),
+        ) + encoded_hash + encoded_path
+
+    def _load(self, store_data: bytes) -> None:
+        if not store_data.startswith(LOCATION_STORE_MAGIC):
+            raise ValueError('Not a location store file')
+
+        position = len(LOCATION_STORE_MAGIC)
+        records: dict[str, tuple[str, float, float]] = {}
+        while position < len(store_data):
+            # Record can be cut by crash while appending, it is dropped
+            if position + RECORD_HEADER.size > len(store_data):
+                self._is_truncated = True
+                break
+            latitude, longitude, hash_size, path_size = (
+                RECORD_HEADER.unpack_from(store_data, position)
+            )
+            hash_start = position + RECORD_HEADER.size
+            path_start = hash_start + hash_size
+            position = path_start + path_size
+            if position > len(store_data):
+                self._is_truncated = True
+                break
+
+            path = store_data[path_start:position].decode()
+            if math.isnan(latitude):
+                records.pop(path, None)
+            else:
+                file_hash = store_data[hash_start:path_start].decode()
+                records[path] = (file_hash, latitude, longitude)
+            self._file_records += 1
+
+        for path, (file_hash, latitude, longitude) in records.items():
+            self._append_row(path, file_hash, latitude, longitude)
+
+    def _compact(self, store_path: Path) -> None:
+        self._file_records = 0
+        store_data = bytearray(LOCATION_STORE_MAGIC)
+        for record in self:
+            store_data += self._pack_record(
+                str(record.file_path),
+                record.file_hash,
+                record.location.latitude,
+                record.location.longitude,
+            )
+        write_file_atomically(store_path, bytes(store_data), sync=True)
+        self._pending.clear()
+        self._is_truncated = False
+
+
+def can_pack_record(path: str, file_hash: str) -> bool:
+    """Check that sizes of record fields fit in record header.
+
+    Args:
+        path (str): Absolute file path.
+        file_hash (str): File content hash.
+
+    Returns:
+        bool: True if path and hash are short enough.
+    """
+    return (
+        len(path.encode()) <= MAX_RECORD_FIELD_SIZE
+        and len(file_hash.encode()) <= MAX_RECORD_FIELD_SIZE
+    )
+
+
+def get_location_store(source: Path) -> LocationStore:
+    """Get location store of directory.
+
+    Args:
+        source (Path): Path to the source directory.
+
+    Returns:
+        LocationStore: Location store.
+    """
+    return LocationStore(source / LOCATION_STORE_FILE_NAME)
+
+
+def export_locations(source: Path, export_path: Path) -> int:
+    """Export locations of directory images.
+
+    Format is chosen by file extension: GeoJSON for `.geojson` and
+    `.json` files, CSV otherwise.
+
+    Args:
+        source (Path): Path to the source directory.
+        export_path (Path): Path to export file.
+
+    Returns:
+        int: Count of exported locations.
+    """
+    location_store = get_location_store(source)
+    if export_path.suffix.lower() in {'.geojson', '.json'}:
+        location_store.export_geojson(export_path)
+    else:
+        location_store.export_csv(export_path)
+    return len(location_store)
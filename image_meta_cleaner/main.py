@@ -3,17 +3,53 @@
 
 import logging
 import sys
+from argparse import ArgumentParser, Namespace
 from pathlib import Path
-from time import sleep
-
-from image_meta_cleaner.files_index import FilesIndex
-from image_meta_cleaner.images import is_image
+from time import monotonic, sleep
+from typing import Optional
+
+from image_meta_cleaner.audit import build_audit_report
+from image_meta_cleaner.checkpoint import CheckpointPolicy
+from image_meta_cleaner.files_index import (
+    DEFAULT_HASH_ALGORITHM,
+    HASH_ALGORITHMS,
+    FilesIndex,
+)
+from image_meta_cleaner.images import DEFAULT_MAX_IMAGE_PIXELS
+from image_meta_cleaner.index_store import (
+    INDEX_BACKENDS,
+    close_files_index,
+    get_files_index,
+)
+from image_meta_cleaner.leases import (
+    DEFAULT_LEASE_SECONDS,
+    DEFAULT_SHARDS_COUNT,
+    ClusterSettings,
+)
+from image_meta_cleaner.location_store import export_locations
+from image_meta_cleaner.metrics import (
+    METRICS_FORMATS,
+    MetricsRecorder,
+    profiled,
+)
+from image_meta_cleaner.pipeline import (
+    audit_dir,
+    iter_files_stats,
+    process_dir,
+    process_files_stats,
+)
 from image_meta_cleaner.processing import (
-    Err,
-    Ok,
-    ProcessingResult,
-    process_images,
+    DEFAULT_MAX_IN_FLIGHT_BYTES,
+    ImageLimits,
+    InFlightBudget,
 )
+from image_meta_cleaner.result_cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    ResultCache,
+)
+from image_meta_cleaner.scanner import ScanRules
+from image_meta_cleaner.settings import Settings
+from image_meta_cleaner.watcher import InotifyWatcher, create_watcher
 
 logging.basicConfig(
     format='%(asctime)s %(levelname)s %(message)s',  # noqa:WPS323
@@ -22,181 +58,380 @@ logging.basicConfig(
 )
 
 
-def get_files_index(source: Path) -> FilesIndex:
-    """Get processed files from index file.
+def watch_events(
+    source: Path,
+    watcher: InotifyWatcher,
+    delay: int,
+    settings: Settings,
+) -> None:
+    """Process changed files on filesystem events.
 
-    Index file is located in the same directory as the source
-    with the name '.imc'.
+    Whole directory is rescanned every `delay` seconds and
+    when events are lost. Index is loaded on the first changed image
+    and kept between events until the next rescan, so events of images
+    renamed by the tool itself are filtered out by their stat info.
 
     Args:
-        source (Path): Path to the source directory.
-
-    Returns:
-        FilesIndex: Processed files index.
+        source (Path): Directory path.
+        watcher (InotifyWatcher): Filesystem events watcher.
+        delay (int): Delay between full rescans in seconds.
+        settings (Settings): Processing settings.
     """
-    index_file_path = source / '.imc'
-    if not index_file_path.exists():
-        return FilesIndex()
-
-    index_file_data = index_file_path.read_text()
-    return FilesIndex.from_index_file(index_file_data)
-
-
-def save_files_index(source: Path, index: FilesIndex) -> None:
-    """Save processed files to index file.
+    index: Optional[FilesIndex] = None
+    rescan_time = monotonic()
+    try:
+        while source.exists():
+            changed_paths = watcher.poll(rescan_time + delay - monotonic())
+            if watcher.overflowed or monotonic() >= rescan_time + delay:
+                watcher.overflowed = False
+                close_files_index(index)
+                index = None
+                process_dir(source, settings)
+                rescan_time = monotonic()
+                continue
+
+            image_files = list(
+                iter_files_stats(source, changed_paths, settings),
+            )
+            if not image_files:
+                continue
+            if index is None:
+                index = get_files_index(source, settings.index_backend)
+            process_files_stats(source, image_files, index, settings)
+    finally:
+        close_files_index(index)
+
+
+def watch(
+    source: Path,
+    delay: int,
+    settings: Optional[Settings] = None,
+) -> None:
+    """Continuously process files in directory.
 
-    Index file is located in the same directory as the source
-    with the name '.imc'.
+    If filesystem events are enabled in settings and supported,
+    changed files are processed on events, otherwise directory is polled.
+    Directory shared with other nodes is always polled.
 
     Args:
-        source (Path): Path to the source directory.
-        index (FilesIndex): Processed files index.
+        source (Path): Directory path.
+        delay (int): \
+            Delay between processing in seconds. \
+            With filesystem events it is delay between full rescans.
+        settings (Optional[Settings]): Processing settings.
     """
-    index_file_path = source / '.imc'
-    index_file_data = index.build_index_file()
-    index_file_path.write_text(index_file_data)
-
-
-def get_image_location_info(result: ProcessingResult) -> str:
-    """Build string with image location info.
-
-    String format: `file_path latitude longitude`
+    settings = settings or Settings()
+    watcher = None
+    if settings.events and settings.cluster is None:
+        watcher = create_watcher(source)
+    if watcher is None:
+        if settings.events:
+            logging.warning('Filesystem events are unavailable, polling')
+        while source.exists():
+            process_dir(source, settings)
+            sleep(delay)
+        return
+
+    with watcher:
+        process_dir(source, settings)
+        watch_events(source, watcher, delay, settings)
+
+
+def parse_args(argv: list[str]) -> Namespace:
+    """Parse command line arguments.
 
     Args:
-        result (ProcessingResult): \
-            Result of image processing with pathes and location info.
+        argv (list[str]): Command line arguments without program name.
 
     Returns:
-        str: String with image location info.
+        Namespace: Parsed arguments.
     """
-    info_template = '{file_path:<80}\t{latitude:<9.6f}\t{longitude:<9.6f}'
-    if isinstance(result, Ok) and result.location is not None:
-        return info_template.format(
-            file_path=str(result.file_path),
-            latitude=result.location.latitude,
-            longitude=result.location.longitude,
-        )
-
-    return info_template.format(
-        file_path=str(result.file_path),
-        latitude=0,
-        longitude=0,
+    parser = ArgumentParser(
+        prog='imc',
+        description='Clean images metadata and extract location info.',
     )
-
-
-def save_locations(
-    source: Path,
-    results: list[ProcessingResult],
-) -> Path:
-    """Save locations info.
-
-    Locations stored in `location.txt` file
-
-    Args:
-        source (Path): Root directory path.
-        results (list[ProcessingResult]): \
-            Results of images processing with pathes and location info.
-
-    Returns:
-        Path: Path to the saved location info.
-    """
-    locations_info = '\n'.join(
-        get_image_location_info(result)
-        for result in results
+    parser.add_argument(
+        'source',
+        type=Path,
+        nargs='?',
+        help='images directory, not required by --serve, --daemon and --pipe',
     )
-    locations_path = source / 'locations.txt'
-    locations_path.write_text(locations_info)
-    return locations_path
-
-
-def get_dir_images(source: Path) -> list[tuple[Path, bytes]]:
-    """Iterate over images files in directory.
-
-    Args:
-        source (Path): Directory path.
-
-    Returns:
-        list[tuple[Path, bytes]]: Images pathes and contents
-    """
-    images: list[tuple[Path, bytes]] = []
-    for file_path in source.glob('**/*'):
-        if file_path.is_file() and is_image(file_path):
-            images.append((
-                file_path,
-                file_path.read_bytes(),
-            ))
-
-    return images
-
-
-def log_result(results: list[ProcessingResult]) -> None:
-    """Print processing result info.
-
-    Args:
-        results (list[ProcessingResult]): Results of images processing.
-    """
-    success_results: list[Ok] = []
-    failure_results: list[Err] = []
-    for result in results:
-        if isinstance(result, Ok):
-            success_results.append(result)
-        else:
-            failure_results.append(result)
-
-    logging.info('Processed: {total}\tSuccess: {success}\tFailure: {failure}'.format(  # noqa: E501
-        total=len(results),
-        success=len(success_results),
-        failure=len(failure_results),
-    ))
-    for failure in failure_results:
-        logging.warning('Fail to process {file_path}: {message}'.format(
-            file_path=failure.file_path,
-            message=failure.message,
-        ))
-        if failure.error is not None:
-            print(failure.error)
-
-
-def process_dir(source: Path) -> None:
-    """Process images in directory.
-
-    Args:
-        source (Path): Directory path.
-    """
-    index = get_files_index(source)
-    images = get_dir_images(source)
-    processing_results, new_index = process_images(images, index)
-    for result in processing_results:
-        if isinstance(result, Ok):
-            result.file_path.write_bytes(result.file_data)
-
-    save_locations(source, processing_results)
-    save_files_index(source, new_index)
-    log_result(processing_results)
-
-
-def watch(source: Path, delay: int) -> None:
-    """Continuously process files in directory.
-
-    Args:
-        source (Path): Directory path.
-        delay (int): Delay between processing in seconds.
-    """
-    while source.exists():
-        process_dir(source)
-        sleep(delay)
+    parser.add_argument(
+        'delay',
+        type=int,
+        nargs='?',
+        help='delay between processing in seconds, enables watch mode',
+    )
+    parser.add_argument(
+        '-w',
+        '--workers',
+        type=int,
+        default=1,
+        help='count of worker processes, 0 to use all CPU cores',
+    )
+    parser.add_argument(
+        '--max-in-flight-bytes',
+        type=int,
+        default=DEFAULT_MAX_IN_FLIGHT_BYTES,
+        help='limit of total size of images processed at once',
+    )
+    parser.add_argument(
+        '--max-in-flight-files',
+        type=int,
+        default=0,
+        help='limit of count of images processed at once, 0 for 4 per worker',
+    )
+    parser.add_argument(
+        '--max-image-bytes',
+        type=int,
+        default=0,
+        help='skip images larger than this size with error, 0 for no limit',
+    )
+    parser.add_argument(
+        '--max-image-pixels',
+        type=int,
+        default=DEFAULT_MAX_IMAGE_PIXELS,
+        help='skip re-encoded images with more pixels, 0 for Pillow limit',
+    )
+    parser.add_argument(
+        '--cache-max-bytes',
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help='limit of cached results for duplicated images, 0 to disable',
+    )
+    parser.add_argument(
+        '--hash',
+        choices=sorted(HASH_ALGORITHMS),
+        default=DEFAULT_HASH_ALGORITHM,
+        help='files hash algorithm, blake2b is faster without SHA extensions',
+    )
+    parser.add_argument(
+        '--checkpoint-files',
+        type=int,
+        default=CheckpointPolicy.files,
+        help='save index after processing of this count of files',
+    )
+    parser.add_argument(
+        '--checkpoint-seconds',
+        type=float,
+        default=CheckpointPolicy.seconds,
+        help='save index after this time of processing in seconds',
+    )
+    parser.add_argument(
+        '--include',
+        action='append',
+        default=[],
+        metavar='GLOB',
+        help='scan only matching files, e.g. "*.jpg" or "photos/*"',
+    )
+    parser.add_argument(
+        '--exclude',
+        action='append',
+        default=[],
+        metavar='GLOB',
+        help='skip matching files and directories, e.g. "node_modules"',
+    )
+    parser.add_argument(
+        '--max-depth',
+        type=int,
+        help='max depth of scanned subdirectories, 0 for top directory only',
+    )
+    parser.add_argument(
+        '--skip-unchanged-dirs',
+        action='store_true',
+        help=(
+            'do not list directories not changed since the last scan, '
+            + 'files modified in place are found by --events only'
+        ),
+    )
+    parser.add_argument(
+        '--archives',
+        action='store_true',
+        help='clean images in zip and tar archives, archives are rewritten',
+    )
+    parser.add_argument(
+        '--events',
+        action='store_true',
+        help='process files on filesystem events in watch mode',
+    )
+    parser.add_argument(
+        '--index',
+        choices=INDEX_BACKENDS,
+        default='text',
+        help='index backend, sqlite applies changes incrementally',
+    )
+    parser.add_argument(
+        '--cluster',
+        action='store_true',
+        help='share directory with other nodes through lease files',
+    )
+    parser.add_argument(
+        '--node-id',
+        help='node id in cluster mode, host name and process id by default',
+    )
+    parser.add_argument(
+        '--shards',
+        type=int,
+        default=DEFAULT_SHARDS_COUNT,
+        help='count of shards in cluster mode, the same on all nodes',
+    )
+    parser.add_argument(
+        '--lease-seconds',
+        type=float,
+        default=DEFAULT_LEASE_SECONDS,
+        help='duration of leases in cluster mode',
+    )
+    parser.add_argument(
+        '--serve',
+        metavar='ADDRESS',
+        help=(
+            'run HTTP server that cleans uploaded images on port, '
+            + 'host:port or unix socket path'
+        ),
+    )
+    parser.add_argument(
+        '--daemon',
+        type=Path,
+        metavar='CONFIG',
+        help='keep directories listed in JSON config clean by one process',
+    )
+    parser.add_argument(
+        '--pipe',
+        action='store_true',
+        help=(
+            'clean image from stdin to stdout and exit, '
+            + 'location is printed to stderr'
+        ),
+    )
+    parser.add_argument(
+        '--location-file',
+        type=Path,
+        metavar='PATH',
+        help='file to write location to in --pipe mode instead of stderr',
+    )
+    parser.add_argument(
+        '--batch',
+        action='store_true',
+        help=(
+            'process NUL-separated pathes from stdin, e.g. `find -print0`, '
+            + 'and exit'
+        ),
+    )
+    parser.add_argument(
+        '--audit',
+        action='store_true',
+        help='print metadata found in images without changing them and exit',
+    )
+    parser.add_argument(
+        '--export-locations',
+        type=Path,
+        metavar='PATH',
+        help='export stored locations to CSV or GeoJSON file and exit',
+    )
+    parser.add_argument(
+        '--metrics',
+        type=Path,
+        help='file to save processing stages metrics to after every cycle',
+    )
+    parser.add_argument(
+        '--metrics-format',
+        choices=METRICS_FORMATS,
+        default='jsonl',
+        help='metrics file format: JSON lines or Prometheus textfile',
+    )
+    parser.add_argument(
+        '--profile',
+        type=Path,
+        help='file to save cProfile stats to',
+    )
+    args = parser.parse_args(argv)
+    if args.source is None and not (
+        args.serve is not None or args.daemon is not None or args.pipe
+    ):
+        parser.error('the following arguments are required: source')
+    if args.daemon is not None and (
+        args.source is not None or args.delay is not None
+    ):
+        # Roots and their delays are set in config of daemon
+        parser.error('source and delay can not be used with --daemon')
+    return args
 
 
 if __name__ == '__main__':
-    match sys.argv:
-        case _, source:
-            process_dir(Path(source))
-            input('Press any key to exit...')
-        case _, source, delay if delay.isdecimal():
-            watch(Path(source), int(delay))
-            input('Press any key to exit...')
-        case _:
-            logging.error('Usage: imc source [delay]')
-            sys.exit(1)
+    if getattr(sys, 'frozen', False):
+        # Worker processes of frozen executable start here
+        from multiprocessing import freeze_support  # noqa: WPS433
+        freeze_support()
+    args = parse_args(sys.argv[1:])
+    cli_cache = None
+    if args.cache_max_bytes:
+        cli_cache = ResultCache(args.cache_max_bytes)
+    cli_settings = Settings(
+        workers=args.workers,
+        budget=InFlightBudget(
+            max_bytes=args.max_in_flight_bytes,
+            max_files=args.max_in_flight_files,
+        ),
+        limits=ImageLimits(
+            max_bytes=args.max_image_bytes,
+            max_pixels=args.max_image_pixels,
+        ),
+        index_backend=args.index,
+        events=args.events,
+        cache=cli_cache,
+        checkpoints=CheckpointPolicy(
+            files=args.checkpoint_files,
+            seconds=args.checkpoint_seconds,
+        ),
+        scan=ScanRules(
+            include=tuple(args.include),
+            exclude=tuple(args.exclude),
+            max_depth=args.max_depth,
+            skip_unchanged_dirs=args.skip_unchanged_dirs,
+            archives=args.archives,
+        ),
+        hash_algorithm=args.hash,
+    )
+    if args.cluster:
+        cli_settings.cluster = ClusterSettings(
+            shards=args.shards,
+            lease_seconds=args.lease_seconds,
+        )
+        if args.node_id is not None:
+            cli_settings.cluster.node_id = args.node_id
+    if args.metrics is not None:
+        cli_settings.metrics = MetricsRecorder(
+            args.metrics,
+            args.metrics_format,
+        )
+    if args.pipe or args.batch:
+        # Standard streams are used for data, so there is no exit prompt
+        from image_meta_cleaner.pipe import run_batch, run_pipe  # noqa: WPS433
+        with profiled(args.profile):
+            if args.pipe:
+                exit_code = run_pipe(cli_settings, args.location_file)
+            else:
+                exit_code = run_batch(args.source, cli_settings)
+        sys.exit(exit_code)
+    with profiled(args.profile):
+        if args.serve is not None:
+            from image_meta_cleaner.server import serve  # noqa: WPS433
+            serve(args.serve, cli_settings)
+        elif args.daemon is not None:
+            from image_meta_cleaner.daemon import run_daemon  # noqa: WPS433
+            run_daemon(args.daemon, cli_settings)
+        elif args.audit:
+            print(build_audit_report(audit_dir(args.source, cli_settings)))
+        elif args.export_locations is not None:
+            locations_count = export_locations(
+                args.source,
+                args.export_locations,
+            )
+            print('Exported {0} locations'.format(locations_count))
+        elif args.delay is None:
+            process_dir(args.source, cli_settings)
+        else:
+            watch(args.source, args.delay, cli_settings)
 
+    input('Press any key to exit...')
     print('See logs at imc.log')
@@ -0,0 +1,265 @@
+"""Metrics module.
+
+Collects latency histograms and bytes counters of processing stages
+and saves them as JSON lines or Prometheus textfile.
+"""
+
+
+import json
+import os
+from bisect import bisect_left
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from time import perf_counter, time
+from typing import Iterator, Optional
+
+# Processing stages in pipeline order.
+STAGES = (
+    'scan',
+    'index_check',
+    'read',
+    'hash',
+    'strip',
+    'gps_extract',
+    'write',
+    'index_save',
+)
+
+# Upper bounds of latency histogram buckets in seconds.
+LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1,
+    5,
+)
+
+# Supported metrics file formats.
+METRICS_FORMATS = ('jsonl', 'prometheus')
+
+# Prefix of Prometheus metrics names.
+PROMETHEUS_PREFIX = 'imc_stage'
+
+
+@dataclass
+class StageMetrics(object):
+    """Latency histogram and bytes counter of processing stage."""
+
+    count: int = 0
+    seconds: float = 0
+    bytes: int = 0  # noqa: WPS110
+
+    # Counts of observations per bucket, last one is for slower ones
+    buckets: list[int] = field(
+        default_factory=lambda: [0] * (len(LATENCY_BUCKETS) + 1),
+    )
+
+    def observe(self, seconds: float, size: int = 0) -> None:
+        """Register single stage run.
+
+        Args:
+            seconds (float): Stage latency.
+            size (int): Count of bytes handled by stage.
+        """
+        self.count += 1
+        self.seconds += seconds
+        self.bytes += size
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+
+    def merge(self, other: 'StageMetrics') -> None:
+        """Add observations of other stage metrics.
+
+        Args:
+            other (StageMetrics): Stage metrics to add.
+        """
+        self.count += other.count
+        self.seconds += other.seconds
+        self.bytes += other.bytes
+        for bucket_index, bucket_count in enumerate(other.buckets):
+            self.buckets[bucket_index] += bucket_count
+
+
+class Metrics(object):
+    """Metrics of processing stages."""
+
+    def __init__(self) -> None:
+        """Init empty metrics of all stages."""
+        self.stages = {stage: StageMetrics() for stage in STAGES}
+
+    def observe(self, stage: str, seconds: float, size: int = 0) -> None:
+        """Register single stage run.
+
+        Args:
+            stage (str): Stage name, one of `STAGES`.
+            seconds (float): Stage latency.
+            size (int): Count of bytes handled by stage.
+        """
+        self.stages[stage].observe(seconds, size)
+
+    @contextmanager
+    def measure(self, stage: str, size: int = 0) -> Iterator[None]:
+        """Measure latency of code block as stage run.
+
+        Args:
+            stage (str): Stage name, one of `STAGES`.
+            size (int): Count of bytes handled by stage.
+
+        Yields:
+            None: Code block is executed.
+        """
+        start_time = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, perf_counter() - start_time, size)
+
+    def merge(self, other: 'Metrics') -> None:
+        """Add observations of other metrics.
+
+        Used to collect metrics of worker processes.
+
+        Args:
+            other (Metrics): Metrics to add.
+        """
+        for stage, stage_metrics in other.stages.items():
+            self.stages[stage].merge(stage_metrics)
+
+    def to_dict(self) -> dict[str, dict[str, object]]:
+        """Convert metrics to JSON-serializable dict.
+
+        Returns:
+            dict[str, dict[str, object]]: Metrics of stages by names.
+        """
+        return {
+            stage: {
+                'count': stage_metrics.count,
+                'seconds': stage_metrics.seconds,
+                'bytes': stage_metrics.bytes,
+                'buckets': stage_metrics.buckets,
+            }
+            for stage, stage_metrics in self.stages.items()
+        }
+
+
+def build_prometheus_text(metrics: Metrics) -> str:
+    """Build Prometheus text exposition of metrics.
+
+    Args:
+        metrics (Metrics): Metrics to expose.
+
+    Returns:
+        str: Metrics in Prometheus text format.
+    """
+    seconds_name = '{0}_seconds'.format(PROMETHEUS_PREFIX)
+    bytes_name = '{0}_bytes_total'.format(PROMETHEUS_PREFIX)
+    lines = [
+        '# HELP {0} Latency of processing stages.'.format(seconds_name),
+        '# TYPE {0} histogram'.format(seconds_name),
+    ]
+    for stage, stage_metrics in metrics.stages.items():
+        cumulative_count = 0
+        bounds = [str(bound) for bound in LATENCY_BUCKETS] + ['+Inf']
+        for bound, bucket_count in zip(bounds, stage_metrics.buckets):
+            cumulative_count += bucket_count
+            lines.append('{0}_bucket{{stage="{1}",le="{2}"}} {3}'.format(
+                seconds_name, stage, bound, cumulative_count,
+            ))
+        lines.append('{0}_sum{{stage="{1}"}} {2}'.format(
+            seconds_name, stage, stage_metrics.seconds,
+        ))
+        lines.append('{0}_count{{stage="{1}"}} {2}'.format(
+            seconds_name, stage, stage_metrics.count,
+        ))
+
+    lines.append('# HELP {0} Bytes handled by processing stages.'.format(
+        bytes_name,
+    ))
+    lines.append('# TYPE {0} counter'.format(bytes_name))
+    for stage, stage_metrics in metrics.stages.items():  # noqa: WPS440
+        lines.append('{0}{{stage="{1}"}} {2}'.format(
+            bytes_name, stage, stage_metrics.bytes,
+        ))
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsRecorder(object):
+    """Recorder of metrics of processing cycles.
+
+    JSON lines file gets a line with metrics of every cycle.
+    Prometheus textfile is rewritten with metrics totals
+    since recorder creation, so it can be scraped by textfile collector.
+    """
+
+    def __init__(self, metrics_path: Path, metrics_format: str) -> None:
+        """Init recorder.
+
+        Args:
+            metrics_path (Path): Path to metrics file.
+            metrics_format (str): Metrics format, one of `METRICS_FORMATS`.
+
+        Raises:
+            ValueError: If metrics format is unknown.
+        """
+        if metrics_format not in METRICS_FORMATS:
+            raise ValueError(
+                'Unknown metrics format: {0}'.format(metrics_format),
+            )
+
+        self.metrics_path = metrics_path
+        self.metrics_format = metrics_format
+        self.total = Metrics()
+
+    def record(self, cycle: str, metrics: Metrics) -> None:
+        """Save metrics of processing cycle.
+
+        Args:
+            cycle (str): Kind of cycle, e.g. `dir` or `paths`.
+            metrics (Metrics): Metrics of cycle.
+        """
+        self.total.merge(metrics)
+        if self.metrics_format == 'jsonl':
+            record = {'time': time(), 'cycle': cycle, **metrics.to_dict()}
+            with open(self.metrics_path, 'a') as metrics_file:
+                metrics_file.write(json.dumps(record) + '\n')
+            return
+
+        # Collector must never read partially written file
+        temp_path = self.metrics_path.with_name(
+            '{0}.tmp'.format(self.metrics_path.name),
+        )
+        temp_path.write_text(build_prometheus_text(self.total))
+        os.replace(temp_path, self.metrics_path)
+
+
+@contextmanager
+def profiled(profile_path: Optional[Path]) -> Iterator[None]:
+    """Profile code block with cProfile.
+
+    Stats are saved even if code block is interrupted.
+
+    Args:
+        profile_path (Optional[Path]): \
+            Path to save stats to or None to disable profiling.
+
+    Yields:
+        None: Code block is executed.
+    """
+    if profile_path is None:
+        yield
+        return
+
+    import cProfile  # noqa: WPS433
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(profile_path)
@@ -0,0 +1,164 @@
+"""Pipe module.
+
+Provides filter modes for scripts. Image passed on standard input is
+cleaned to standard output, and batches of pathes separated by NUL bytes,
+as printed by `find -print0`, are processed in one process without
+scanning of directory.
+"""
+
+
+import os
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+
+from image_meta_cleaner.pipeline import get_image_location_info, process_paths
+from image_meta_cleaner.processing import (
+    Err,
+    Ok,
+    ProcessingResult,
+    process_image,
+)
+from image_meta_cleaner.settings import Settings
+
+# Path of image read from standard input used in results.
+STDIN_FILE_PATH = Path('-')
+
+# Separator of pathes in batch.
+PATHS_SEPARATOR = b'\x00'
+
+# Size of chunks of pathes batch read from stream.
+PATHS_CHUNK_SIZE = 64 * 1024
+
+
+def clean_stream(
+    input_stream: BinaryIO,
+    output_stream: BinaryIO,
+    settings: Optional[Settings] = None,
+) -> ProcessingResult:
+    """Remove metadata from image read from stream.
+
+    Cleaned image is written to output stream, nothing is written
+    if image is not cleaned. Input larger than size limit is read only
+    up to the limit.
+
+    Args:
+        input_stream (BinaryIO): Stream with image data.
+        output_stream (BinaryIO): Stream for cleaned image data.
+        settings (Optional[Settings]): Processing settings.
+
+    Returns:
+        ProcessingResult: Result without cleaned image data.
+    """
+    settings = settings or Settings()
+    max_bytes = settings.limits.max_bytes
+    if max_bytes:
+        file_data = input_stream.read(max_bytes + 1)
+    else:
+        file_data = input_stream.read()
+
+    file_result = process_image(
+        STDIN_FILE_PATH,
+        file_data,
+        hash_algorithm=settings.hash_algorithm,
+        limits=settings.limits,
+    )
+    if isinstance(file_result, Err):
+        return file_result
+
+    output_stream.write(file_result.file_data)
+    output_stream.flush()
+    return Ok(
+        file_path=file_result.file_path,
+        file_data=b'',
+        location=file_result.location,
+        file_hash=file_result.file_hash,
+        is_changed=file_result.is_changed,
+    )
+
+
+def run_pipe(
+    settings: Optional[Settings] = None,
+    location_path: Optional[Path] = None,
+) -> int:
+    """Clean image from standard input to standard output.
+
+    Location info is written to standard error or to location file
+    in the format of `locations.txt`.
+
+    Args:
+        settings (Optional[Settings]): Processing settings.
+        location_path (Optional[Path]): File to write location info to.
+
+    Returns:
+        int: Exit code, 1 if image is not cleaned.
+    """
+    file_result = clean_stream(sys.stdin.buffer, sys.stdout.buffer, settings)
+    if isinstance(file_result, Err):
+        print(
+            'Fail to process image: {0}: {1}'.format(
+                file_result.message,
+                file_result.error,
+            ),
+            file=sys.stderr,
+        )
+        return 1
+
+    location_info = get_image_location_info(file_result)
+    if location_path is None:
+        print(location_info, file=sys.stderr)
+    else:
+        location_path.write_text('{0}\n'.format(location_info))
+    return 0
+
+
+def iter_separated_paths(paths_stream: BinaryIO) -> Iterator[Path]:
+    """Read pathes separated by NUL bytes.
+
+    Pathes are decoded as file system names, so any bytes
+    are accepted. Empty pathes are skipped.
+
+    Args:
+        paths_stream (BinaryIO): Stream with separated pathes.
+
+    Yields:
+        Path: Read path.
+    """
+    tail = b''
+    while True:
+        chunk = paths_stream.read(PATHS_CHUNK_SIZE)
+        if not chunk:
+            break
+        *raw_paths, tail = (tail + chunk).split(PATHS_SEPARATOR)
+        for raw_path in raw_paths:
+            if raw_path:
+                yield Path(os.fsdecode(raw_path))
+    if tail:
+        yield Path(os.fsdecode(tail))
+
+
+def run_batch(source: Path, settings: Optional[Settings] = None) -> int:
+    """Process images with pathes separated by NUL bytes on standard input.
+
+    Images are processed as in directory `source`, which keeps
+    index and locations. Pathes outside of it are skipped.
+    Location info of processed images is printed to standard output.
+
+    Args:
+        source (Path): Root directory path.
+        settings (Optional[Settings]): Processing settings.
+
+    Returns:
+        int: Exit code, 1 if any image is not cleaned.
+    """
+    processing_results = process_paths(
+        source,
+        iter_separated_paths(sys.stdin.buffer),
+        settings,
+    )
+    for file_result in processing_results:
+        if isinstance(file_result, Ok):
+            print(get_image_location_info(file_result))
+    return int(any(
+        isinstance(file_result, Err) for file_result in processing_results
+    ))
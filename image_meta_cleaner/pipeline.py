@@ -0,0 +1,685 @@
+"""Pipeline module.
+
+Processes directories: scans images, cleans them in worker processes,
+writes results and keeps index and location store of directory.
+Shared by command line interface, daemon, cluster nodes and pipe modes,
+so entry point module is never imported by them.
+"""
+
+
+import logging
+from dataclasses import replace
+from functools import partial
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
+
+from image_meta_cleaner.archives import (
+    clean_archive,
+    is_archive,
+    iter_archives_members,
+    split_archive_files,
+)
+from image_meta_cleaner.audit import MetaReport, audit_image_file
+from image_meta_cleaner.checkpoint import (
+    Checkpointer,
+    replace_file,
+    write_file_atomically,
+)
+from image_meta_cleaner.files_index import FilesIndex, FileStat, get_file_stat
+from image_meta_cleaner.images import is_image
+from image_meta_cleaner.index_store import (
+    close_files_index,
+    get_files_index,
+    get_rewritten_size,
+    save_files_index,
+)
+from image_meta_cleaner.location_store import (
+    LocationStore,
+    get_location_store,
+)
+from image_meta_cleaner.metrics import Metrics
+from image_meta_cleaner.processing import (
+    Err,
+    Ok,
+    ProcessingResult,
+    iter_processed_image_files,
+)
+from image_meta_cleaner.scanner import DirScanner, ScanRules
+from image_meta_cleaner.settings import Settings
+
+
+def get_image_location_info(result: ProcessingResult) -> str:
+    """Build string with image location info.
+
+    String format: `file_path latitude longitude`
+
+    Args:
+        result (ProcessingResult): \
+            Result of image processing with pathes and location info.
+
+    Returns:
+        str: String with image location info.
+    """
+    info_template = '{file_path:<80}\t{latitude:<9.6f}\t{longitude:<9.6f}'
+    if isinstance(result, Ok) and result.location is not None:
+        return info_template.format(
+            file_path=str(result.file_path),
+            latitude=result.location.latitude,
+            longitude=result.location.longitude,
+        )
+
+    return info_template.format(
+        file_path=str(result.file_path),
+        latitude=0,
+        longitude=0,
+    )
+
+
+def save_locations(
+    source: Path,
+    results: list[ProcessingResult],
+) -> Path:
+    """Save locations info.
+
+    Locations stored in `location.txt` file
+
+    Args:
+        source (Path): Root directory path.
+        results (list[ProcessingResult]): \
+            Results of images processing with pathes and location info.
+
+    Returns:
+        Path: Path to the saved location info.
+    """
+    locations_info = '\n'.join(
+        get_image_location_info(result)
+        for result in results
+    )
+    locations_path = source / 'locations.txt'
+    locations_path.write_text(locations_info)
+    return locations_path
+
+
+def iter_dir_images(
+    source: Path,
+    metrics: Optional[Metrics] = None,
+) -> Iterator[tuple[Path, FileStat]]:
+    """Iterate over images files in directory.
+
+    Temporary files left by interrupted writing are removed.
+
+    Args:
+        source (Path): Directory path.
+        metrics (Optional[Metrics]): \
+            Metrics to register scan time of every image in.
+
+    Yields:
+        tuple[Path, FileStat]: Image path and stat info.
+    """
+    yield from DirScanner(source, metrics=metrics)
+
+
+def iter_changed_images(
+    images: Iterable[tuple[Path, FileStat]],
+    index: FilesIndex,
+    seen_paths: set[Path],
+    metrics: Optional[Metrics] = None,
+) -> Iterator[tuple[Path, FileStat]]:
+    """Filter images changed since indexing.
+
+    Images with the same stat info as stored in index are not yielded.
+    Pathes of all images are added to `seen_paths`.
+
+    Args:
+        images (Iterable[tuple[Path, FileStat]]): Images and stat info.
+        index (FilesIndex): Index with processed files.
+        seen_paths (set[Path]): Set to add images pathes to.
+        metrics (Optional[Metrics]): Metrics to register index checks in.
+
+    Yields:
+        tuple[Path, FileStat]: Changed image path and stat info.
+    """
+    metrics = metrics or Metrics()
+    for file_path, file_stat in images:
+        seen_paths.add(file_path.absolute())
+        with metrics.measure('index_check'):
+            is_unchanged = index.verify_stat(file_path, file_stat)
+        if not is_unchanged:
+            yield file_path, file_stat
+
+
+def get_dir_images(
+    source: Path,
+    index: Optional[FilesIndex] = None,
+) -> list[tuple[Path, bytes]]:
+    """Read images files in directory.
+
+    Args:
+        source (Path): Directory path.
+        index (Optional[FilesIndex]): \
+            Index with processed files. Unchanged images are skipped.
+
+    Returns:
+        list[tuple[Path, bytes]]: Images pathes and contents
+    """
+    changed_images = iter_changed_images(
+        iter_dir_images(source),
+        index or FilesIndex(),
+        set(),
+    )
+    return [
+        (file_path, file_path.read_bytes())
+        for file_path, _ in changed_images
+    ]
+
+
+def is_scanned(source: Path, file_path: Path, rules: ScanRules) -> bool:
+    """Check that file in directory is included by scan rules.
+
+    Args:
+        source (Path): Root directory path.
+        file_path (Path): File path.
+        rules (ScanRules): Scan rules.
+
+    Returns:
+        bool: True if file would be found by directory scan.
+    """
+    try:
+        relative_path = file_path.absolute().relative_to(source.absolute())
+    except ValueError:
+        return False
+    return rules.is_included(relative_path)
+
+
+def log_result(results: list[ProcessingResult]) -> None:
+    """Print processing result info.
+
+    Args:
+        results (list[ProcessingResult]): Results of images processing.
+    """
+    success_results: list[Ok] = []
+    failure_results: list[Err] = []
+    for result in results:
+        if isinstance(result, Ok):
+            success_results.append(result)
+        else:
+            failure_results.append(result)
+
+    logging.info('Processed: {total}\tSuccess: {success}\tFailure: {failure}'.format(  # noqa: E501
+        total=len(results),
+        success=len(success_results),
+        failure=len(failure_results),
+    ))
+    for failure in failure_results:
+        logging.warning('Fail to process {file_path}: {message}'.format(
+            file_path=failure.file_path,
+            message=failure.message,
+        ))
+        if failure.error is not None:
+            print(failure.error)
+
+
+def write_result(
+    file_path: Path,
+    file_stat: FileStat,
+    result: Optional[ProcessingResult],
+    index: FilesIndex,
+    metrics: Optional[Metrics] = None,
+) -> Optional[ProcessingResult]:
+    """Write cleaned image and update index.
+
+    Image is replaced atomically, but it is not synced to disk.
+    Images without metadata are only indexed.
+
+    Args:
+        file_path (Path): Image path.
+        file_stat (FileStat): Image stat info before processing.
+        result (Optional[ProcessingResult]): \
+            Processing result or None if image content is not changed.
+        index (FilesIndex): Index to update.
+        metrics (Optional[Metrics]): Metrics to register writing in.
+
+    Returns:
+        Optional[ProcessingResult]: \
+            Processing result without cleaned image data.
+    """
+    if result is None:
+        index.set_stat(file_path, file_stat)
+        return None
+
+    if isinstance(result, Err):
+        return result
+
+    metrics = metrics or Metrics()
+    if result.temp_path is not None:
+        # Large image is already written by worker
+        replace_file(result.temp_path, file_path)
+        file_stat = get_file_stat(file_path)
+    elif result.is_changed:
+        with metrics.measure('write', len(result.file_data)):
+            write_file_atomically(file_path, result.file_data)
+        file_stat = get_file_stat(file_path)
+    index[file_path] = result.file_hash
+    index.set_stat(file_path, file_stat)
+    # Cleaned data is released once written
+    return replace(result, file_data=b'', temp_path=None)
+
+
+def save_state(
+    source: Path,
+    index: FilesIndex,
+    location_store: LocationStore,
+    metrics: Metrics,
+) -> None:
+    """Save index and location store of directory.
+
+    Args:
+        source (Path): Root directory path.
+        index (FilesIndex): Index with processed files.
+        location_store (LocationStore): Store of images locations.
+        metrics (Metrics): Metrics to register saving in.
+    """
+    with metrics.measure('index_save'):
+        save_files_index(source, index)
+        location_store.save()
+
+
+def process_images_files(  # noqa: WPS211
+    source: Path,
+    image_files: Iterable[tuple[Path, FileStat]],
+    index: FilesIndex,
+    settings: Settings,
+    metrics: Metrics,
+    location_store: LocationStore,
+    checkpointer: Checkpointer,
+) -> list[ProcessingResult]:
+    """Process images files and save results.
+
+    Images are streamed through processing, writing and
+    indexing stages, so only images in flight are kept in memory.
+    Archives are processed after images member by member.
+    Index and location store are updated in place and saved by
+    checkpointer after batches of files, also when processing is
+    interrupted by exception.
+    Locations of processed images are also written to `locations.txt`.
+
+    Args:
+        source (Path): Root directory path.
+        image_files (Iterable[tuple[Path, FileStat]]): \
+            Images to process with their stat info.
+        index (FilesIndex): Index with processed files.
+        settings (Settings): Processing settings.
+        metrics (Metrics): Metrics to register stages runs in.
+        location_store (LocationStore): Store of images locations.
+        checkpointer (Checkpointer): Checkpointer of index.
+
+    Returns:
+        list[ProcessingResult]: Results without cleaned images data.
+    """
+    processing_results: list[ProcessingResult] = []
+    archive_files: list[tuple[Path, FileStat]] = []
+    try:
+        for file_path, file_stat, result in iter_processed_image_files(
+            split_archive_files(image_files, archive_files),
+            index,
+            settings.workers,
+            settings.budget,
+            metrics,
+            settings.cache,
+            settings.hash_algorithm,
+            settings.limits,
+        ):
+            stored_result = store_result(
+                file_path,
+                file_stat,
+                result,
+                index,
+                location_store,
+                checkpointer,
+                metrics,
+            )
+            if stored_result is not None:
+                processing_results.append(stored_result)
+        processing_results.extend(process_archive_files(
+            archive_files,
+            index,
+            settings,
+            metrics,
+            location_store,
+            checkpointer,
+        ))
+    except BaseException:
+        # Progress is saved to resume from it on the next run
+        checkpointer.checkpoint()
+        raise
+
+    save_locations(source, processing_results)
+    log_result(processing_results)
+    return processing_results
+
+
+def store_result(  # noqa: WPS211
+    file_path: Path,
+    file_stat: FileStat,
+    result: Optional[ProcessingResult],
+    index: FilesIndex,
+    location_store: LocationStore,
+    checkpointer: Checkpointer,
+    metrics: Metrics,
+) -> Optional[ProcessingResult]:
+    """Write cleaned image, update index and location store.
+
+    Args:
+        file_path (Path): Image path.
+        file_stat (FileStat): Image stat info before processing.
+        result (Optional[ProcessingResult]): \
+            Processing result or None if image content is not changed.
+        index (FilesIndex): Index to update.
+        location_store (LocationStore): Store of images locations.
+        checkpointer (Checkpointer): Checkpointer of index.
+        metrics (Metrics): Metrics to register writing in.
+
+    Returns:
+        Optional[ProcessingResult]: \
+            Processing result without cleaned image data.
+    """
+    written_result = write_result(file_path, file_stat, result, index, metrics)
+    if isinstance(written_result, Ok):
+        location_store.add(
+            file_path,
+            written_result.file_hash,
+            written_result.location,
+        )
+    checkpointer.add_file(
+        file_path,
+        isinstance(written_result, Ok) and written_result.is_changed,
+    )
+    return written_result
+
+
+def process_archive_files(  # noqa: WPS211
+    archive_files: list[tuple[Path, FileStat]],
+    index: FilesIndex,
+    settings: Settings,
+    metrics: Metrics,
+    location_store: LocationStore,
+    checkpointer: Checkpointer,
+) -> list[ProcessingResult]:
+    """Clean images in archives and save results.
+
+    Args:
+        archive_files (list[tuple[Path, FileStat]]): \
+            Archives to process with their stat info.
+        index (FilesIndex): Index with processed files.
+        settings (Settings): Processing settings.
+        metrics (Metrics): Metrics to register stages runs in.
+        location_store (LocationStore): Store of images locations.
+        checkpointer (Checkpointer): Checkpointer of index.
+
+    Returns:
+        list[ProcessingResult]: Results of images members.
+    """
+    processing_results: list[ProcessingResult] = []
+    for archive_path, _ in archive_files:
+        archive_results, is_written = clean_archive(
+            archive_path,
+            index,
+            metrics,
+            settings.hash_algorithm,
+            settings.limits,
+        )
+        for member_result in archive_results:
+            processing_results.append(member_result)
+            if isinstance(member_result, Ok):
+                location_store.add(
+                    member_result.file_path,
+                    member_result.file_hash,
+                    member_result.location,
+                )
+        checkpointer.add_file(archive_path, is_written)
+    return processing_results
+
+
+def finish_dir(  # noqa: WPS211
+    scanner: DirScanner,
+    seen_paths: set[Path],
+    processing_results: list[ProcessingResult],
+    index: FilesIndex,
+    location_store: LocationStore,
+    checkpointer: Checkpointer,
+) -> None:
+    """Prune and save index and location store after directory scan.
+
+    Args:
+        scanner (DirScanner): Finished scanner of directory.
+        seen_paths (set[Path]): Absolute pathes of found files.
+        processing_results (list[ProcessingResult]): \
+            Results of images processing.
+        index (FilesIndex): Index with processed files.
+        location_store (LocationStore): Store of images locations.
+        checkpointer (Checkpointer): Checkpointer of index.
+    """
+    for result in processing_results:
+        if isinstance(result, Err):
+            scanner.forget_dir(result.file_path.parent)
+    if scanner.rules.archives:
+        # Members of unchanged archives are not listed
+        seen_paths.update(list(iter_archives_members(index, seen_paths)))
+    index.prune(seen_paths)
+    scanner.update_index()
+    location_store.prune(seen_paths)
+    checkpointer.checkpoint()
+
+
+def process_dir(source: Path, settings: Optional[Settings] = None) -> None:
+    """Process images in directory.
+
+    Files that are not found anymore are removed from index.
+    Index is saved periodically, so interrupted processing
+    is resumed from the last checkpoint. With cluster settings
+    directory is shared with other nodes by `process_dir_shared`.
+
+    Args:
+        source (Path): Directory path.
+        settings (Optional[Settings]): Processing settings.
+    """
+    settings = settings or Settings()
+    if settings.cluster is not None:
+        # Imported on first use, as cluster module imports this one
+        from image_meta_cleaner.cluster import (  # noqa: WPS433
+            process_dir_shared,
+        )
+        process_dir_shared(source, settings, settings.cluster)
+        return
+
+    metrics = Metrics()
+    index = get_files_index(source, settings.index_backend)
+    try:
+        location_store = get_location_store(source)
+        checkpointer = Checkpointer(
+            partial(save_state, source, index, location_store, metrics),
+            settings.checkpoints,
+            partial(get_rewritten_size, index),
+        )
+        scanner = DirScanner(source, settings.scan, index, metrics)
+        seen_paths: set[Path] = set()
+        changed_images = iter_changed_images(
+            scanner,
+            index,
+            seen_paths,
+            metrics,
+        )
+        processing_results = process_images_files(
+            source,
+            changed_images,
+            index,
+            settings,
+            metrics,
+            location_store,
+            checkpointer,
+        )
+        finish_dir(
+            scanner,
+            seen_paths,
+            processing_results,
+            index,
+            location_store,
+            checkpointer,
+        )
+    finally:
+        close_files_index(index)
+    if settings.metrics is not None:
+        settings.metrics.record('dir', metrics)
+
+
+def iter_files_stats(
+    source: Path,
+    file_paths: Iterable[Path],
+    settings: Settings,
+) -> Iterator[tuple[Path, FileStat]]:
+    """Filter images and archives by scan rules and get their stat info.
+
+    Files are filtered by names before any filesystem access, so
+    index, locations and temporary files written by the tool itself
+    are skipped for free. Files deleted before they are stat-ed are
+    skipped too.
+
+    Args:
+        source (Path): Root directory path.
+        file_paths (Iterable[Path]): Files pathes.
+        settings (Settings): Processing settings.
+
+    Yields:
+        tuple[Path, FileStat]: File path and stat info.
+    """
+    for file_path in file_paths:
+        if not (
+            is_image(file_path)
+            or (settings.scan.archives and is_archive(file_path))
+        ) or not is_scanned(source, file_path, settings.scan):
+            continue
+        try:
+            if not file_path.is_file():
+                continue
+            file_stat = get_file_stat(file_path)
+        except OSError:
+            continue
+        yield file_path, file_stat
+
+
+def process_files_stats(
+    source: Path,
+    image_files: Iterable[tuple[Path, FileStat]],
+    index: FilesIndex,
+    settings: Settings,
+) -> list[ProcessingResult]:
+    """Process changed images of directory with known stat info.
+
+    Args:
+        source (Path): Root directory path.
+        image_files (Iterable[tuple[Path, FileStat]]): \
+            Images pathes and stat info.
+        index (FilesIndex): Index with processed files.
+        settings (Settings): Processing settings.
+
+    Returns:
+        list[ProcessingResult]: Results without cleaned images data.
+    """
+    metrics = Metrics()
+    changed_images = list(
+        iter_changed_images(image_files, index, set(), metrics),
+    )
+    if not changed_images:
+        return []
+
+    location_store = get_location_store(source)
+    checkpointer = Checkpointer(
+        partial(save_state, source, index, location_store, metrics),
+        settings.checkpoints,
+        partial(get_rewritten_size, index),
+    )
+    processing_results = process_images_files(
+        source,
+        changed_images,
+        index,
+        settings,
+        metrics,
+        location_store,
+        checkpointer,
+    )
+    checkpointer.checkpoint()
+    if settings.metrics is not None:
+        settings.metrics.record('paths', metrics)
+    return processing_results
+
+
+def process_paths(
+    source: Path,
+    file_paths: Iterable[Path],
+    settings: Optional[Settings] = None,
+) -> list[ProcessingResult]:
+    """Process provided images in directory.
+
+    Non-image, missing, unchanged files and files excluded by
+    scan rules are skipped. Index entries of other files are kept.
+    Index is not loaded if no images are left after filtering.
+
+    Args:
+        source (Path): Root directory path.
+        file_paths (Iterable[Path]): Pathes of files to process.
+        settings (Optional[Settings]): Processing settings.
+
+    Returns:
+        list[ProcessingResult]: Results without cleaned images data.
+    """
+    settings = settings or Settings()
+    image_files = list(iter_files_stats(source, file_paths, settings))
+    if not image_files:
+        return []
+
+    index = get_files_index(source, settings.index_backend)
+    try:
+        return process_files_stats(source, image_files, index, settings)
+    finally:
+        close_files_index(index)
+
+
+def audit_dir(
+    source: Path,
+    settings: Optional[Settings] = None,
+) -> list[tuple[Path, Optional[MetaReport]]]:
+    """Find metadata of images in directory without changing them.
+
+    Only headers of images are read, index is neither used nor updated.
+
+    Args:
+        source (Path): Directory path.
+        settings (Optional[Settings]): Processing settings.
+
+    Returns:
+        list[tuple[Path, Optional[MetaReport]]]: \
+            Images pathes with found metadata, None for images
+            that were not read or parsed.
+    """
+    settings = settings or Settings()
+    reports: list[tuple[Path, Optional[MetaReport]]] = []
+    for file_path, _ in DirScanner(
+        source,
+        replace(settings.scan, archives=False),
+        remove_temp_files=False,
+    ):
+        try:
+            report = audit_image_file(file_path)
+        except OSError:
+            report = None
+        reports.append((file_path, report))
+
+    logging.info('Audited: {total}\tWith metadata: {meta}\tUnknown: {unknown}'.format(  # noqa: E501
+        total=len(reports),
+        meta=sum(
+            report is not None and report.has_meta
+            for _, report in reports
+        ),
+        unknown=sum(report is None for _, report in reports),
+    ))
+    return reports
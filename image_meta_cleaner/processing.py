@@ -5,13 +5,46 @@ and removing of metadata.
 """
 
 
+import os
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextlib import ExitStack
 from dataclasses import dataclass
+from mmap import ACCESS_READ, mmap
 from pathlib import Path
-from typing import Optional
+from time import perf_counter
+from typing import BinaryIO, Iterable, Iterator, Optional
 
-from image_meta_cleaner.files_index import FilesIndex, hash_file_data
-from image_meta_cleaner.images import get_image_without_meta
-from image_meta_cleaner.location import Location, get_file_gps_location
+from image_meta_cleaner.checkpoint import get_temp_path
+from image_meta_cleaner.files_index import (
+    DEFAULT_HASH_ALGORITHM,
+    FilesIndex,
+    FileStat,
+    create_hasher,
+    format_file_hash,
+    get_file_stat,
+    get_hash_algorithm,
+    hash_file_data,
+    hash_file_stream,
+    verify_file_hash,
+)
+from image_meta_cleaner.formats import ImageParts, release_parts
+from image_meta_cleaner.images import (
+    DEFAULT_MAX_IMAGE_PIXELS,
+    split_image_meta,
+    split_image_meta_parts,
+)
+from image_meta_cleaner.location import (
+    Location,
+    get_exif_gps_location,
+    get_file_gps_location,
+)
+from image_meta_cleaner.metrics import Metrics
+from image_meta_cleaner.result_cache import (
+    CachedResult,
+    ResultCache,
+    get_worker_cache,
+)
 
 
 @dataclass
@@ -22,6 +55,11 @@ class Ok(object):
     file_data: bytes
     location: Optional[Location]
     file_hash: str
+    # False if image has no metadata and is kept as is
+    is_changed: bool = True
+    # Temporary file with cleaned image of large file, which is
+    # written by parts instead of being kept in `file_data`
+    temp_path: Optional[Path] = None
 
 
 @dataclass
@@ -36,23 +74,112 @@ class Err(object):
 # Result of image processing.
 ProcessingResult = Ok | Err
 
+# Indexed files of this size are hashed by chunks before reading,
+# so unchanged large files are never read into memory.
+STREAMED_HASH_MIN_SIZE = 8 * 1024 * 1024
 
-def process_image(file_path: Path, file_data: bytes) -> ProcessingResult:
+# Result of image file processing in worker process.
+WorkerResult = tuple[Optional[ProcessingResult], Metrics]
+
+# Default limit of total size of files in flight.
+DEFAULT_MAX_IN_FLIGHT_BYTES = 256 * 1024 * 1024
+
+# Files of this size are memory mapped and cleaned image is written
+# by parts, so neither source nor cleaned image is read into memory.
+DEFAULT_MAPPED_MIN_SIZE = 64 * 1024 * 1024
+
+# Size of chunks of cleaned image parts written to file.
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class InFlightBudget(object):
+    """Limits of files that are read or processed but not yet consumed.
+
+    Size of files is estimated by their size on disk.
+    Single file larger than limit is processed alone.
+    """
+
+    max_bytes: int = DEFAULT_MAX_IN_FLIGHT_BYTES
+    max_files: int = 0  # 0 for 4 files per worker
+
+
+@dataclass
+class ImageLimits(object):
+    """Limits of processed images.
+
+    Larger images fail with `Err`, so oversized files and decompression
+    bombs do not run workers out of memory.
+    """
+
+    max_bytes: int = 0  # 0 for no limit
+    # Limit of pixels of re-encoded images, 0 for Pillow limit only
+    max_pixels: int = DEFAULT_MAX_IMAGE_PIXELS
+    # Size of files that are memory mapped and never re-encoded
+    mapped_min_size: int = DEFAULT_MAPPED_MIN_SIZE
+
+
+def check_image_size(
+    file_path: Path,
+    file_size: int,
+    limits: ImageLimits,
+) -> Optional[Err]:
+    """Check that image fits size limit.
+
+    Args:
+        file_path (Path): File path.
+        file_size (int): File size.
+        limits (ImageLimits): Limits of images.
+
+    Returns:
+        Optional[Err]: Failure result if image is too large.
+    """
+    if not limits.max_bytes or file_size <= limits.max_bytes:
+        return None
+    return Err(
+        file_path=file_path,
+        message='Image is too large',
+        error=ValueError('Image has {0} bytes, limit is {1}'.format(
+            file_size,
+            limits.max_bytes,
+        )),
+    )
+
+
+def process_image(
+    file_path: Path,
+    file_data: bytes,
+    metrics: Optional[Metrics] = None,
+    hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+    limits: Optional[ImageLimits] = None,
+) -> ProcessingResult:
     """Process image file.
 
     Extract location info and remove metadata.
+    Images without metadata are not rewritten.
 
     Args:
         file_path (Path): File path.
         file_data (bytes): File content.
+        metrics (Optional[Metrics]): Metrics to register stages runs in.
+        hash_algorithm (str): Algorithm to hash processed file with.
+        limits (Optional[ImageLimits]): Limits of images.
 
     Returns:
         ProcessingResult: Result with processing info.
     """
-    location = get_file_gps_location(file_data)
+    metrics = metrics or Metrics()
+    limits = limits or ImageLimits()
+    size_error = check_image_size(file_path, len(file_data), limits)
+    if size_error is not None:
+        return size_error
 
     try:
-        no_meta_file_data = get_image_without_meta(file_data)
+        with metrics.measure('strip', len(file_data)):
+            no_meta_file_data, exif_data = split_image_meta(
+                file_data,
+                limits.max_pixels,
+            )
     except Exception as metadata_error:
         return Err(
             file_path=file_path,
@@ -60,12 +187,22 @@ def process_image(file_path: Path, file_data: bytes) -> ProcessingResult:
             error=metadata_error,
         )
 
-    no_meta_file_hash = hash_file_data(no_meta_file_data)
+    # EXIF data found by stripper is reused to not parse file twice
+    with metrics.measure('gps_extract', len(exif_data or file_data)):
+        if exif_data is None:
+            location = get_file_gps_location(file_data)
+        else:
+            location = get_exif_gps_location(exif_data)
+
+    with metrics.measure('hash', len(no_meta_file_data)):
+        no_meta_file_hash = hash_file_data(no_meta_file_data, hash_algorithm)
     return Ok(
         file_path=file_path,
         file_data=no_meta_file_data,
         location=location,
         file_hash=no_meta_file_hash,
+        # Images without metadata are returned by stripper as is
+        is_changed=no_meta_file_data is not file_data,
     )
 
 
@@ -100,3 +237,468 @@ def process_images(
                 new_index[file_path] = file_result.file_hash
 
     return processing_results, new_index
+
+
+def verify_file_stream(image_file: BinaryIO, file_hash: str) -> bool:
+    """Verify file with hash by chunks without reading it into memory.
+
+    Args:
+        image_file (BinaryIO): Binary file opened for reading.
+        file_hash (str): File hash made by any algorithm.
+
+    Returns:
+        bool: True if file has the same hash.
+    """
+    try:
+        streamed_hash = hash_file_stream(
+            image_file,
+            get_hash_algorithm(file_hash),
+        )
+    except ValueError:
+        return False
+    finally:
+        image_file.seek(0)
+    return streamed_hash == file_hash
+
+
+def read_changed_file(
+    file_path: Path,
+    file_hash: Optional[str] = None,
+) -> Optional[bytes]:
+    """Read file if its content does not match indexed hash.
+
+    Large files are hashed by chunks before reading,
+    so unchanged ones are not read into memory.
+
+    Args:
+        file_path (Path): File path.
+        file_hash (Optional[str]): Indexed file hash.
+
+    Returns:
+        Optional[bytes]: File data or None if large file is not changed.
+    """
+    with open(file_path, 'rb') as image_file:
+        file_size = os.fstat(image_file.fileno()).st_size
+        if (
+            file_hash is not None
+            and file_size >= STREAMED_HASH_MIN_SIZE
+            and verify_file_stream(image_file, file_hash)
+        ):
+            return None
+        return image_file.read()
+
+
+def write_image_parts(
+    file_path: Path,
+    image_parts: ImageParts,
+    hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+) -> str:
+    """Write image by parts and hash it.
+
+    Parts are written and hashed by chunks, so views of mapped file
+    are read from disk once and are not copied to memory as a whole.
+
+    Args:
+        file_path (Path): File path.
+        image_parts (ImageParts): Parts of image.
+        hash_algorithm (str): Algorithm to hash image with.
+
+    Returns:
+        str: Hash of written image.
+    """
+    hasher = create_hasher(hash_algorithm)
+    with open(file_path, 'wb') as image_file:
+        for part in image_parts:
+            part_view = memoryview(part)
+            for offset in range(0, len(part_view), WRITE_CHUNK_SIZE):
+                chunk = part_view[offset:offset + WRITE_CHUNK_SIZE]
+                hasher.update(chunk)
+                image_file.write(chunk)
+                chunk.release()
+            part_view.release()
+    return format_file_hash(hash_algorithm, hasher.hexdigest())
+
+
+def process_mapped_image_file(  # noqa: WPS210
+    file_path: Path,
+    file_hash: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+    hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+) -> Optional[ProcessingResult]:
+    """Process large image file without reading it into memory.
+
+    File is memory mapped and stripped on the container level, so only
+    headers are read and rewritten in memory. Cleaned image is written
+    by parts to temporary file, which replaces source file on writing
+    of result. Images with unsupported containers are not re-encoded,
+    as their decoded bitmaps would not fit into memory.
+
+    Args:
+        file_path (Path): File path.
+        file_hash (Optional[str]): \
+            Indexed file hash. File is not processed if its content matches.
+        metrics (Optional[Metrics]): Metrics to register stages runs in.
+        hash_algorithm (str): Algorithm to hash files with.
+
+    Returns:
+        Optional[ProcessingResult]: \
+            Result without cleaned image data or None if file
+            is not changed.
+
+    Raises:
+        OSError: If file can not be read or cleaned image written.
+    """
+    metrics = metrics or Metrics()
+    with open(file_path, 'rb') as image_file:
+        file_size = os.fstat(image_file.fileno()).st_size
+        if file_hash is not None:
+            with metrics.measure('hash', file_size):
+                if verify_file_stream(image_file, file_hash):
+                    return None
+
+        with mmap(image_file.fileno(), 0, access=ACCESS_READ) as image_data:
+            try:
+                with metrics.measure('strip', file_size):
+                    no_meta_parts, exif_data = split_image_meta_parts(
+                        image_data,
+                    )
+            except ValueError as metadata_error:
+                return Err(
+                    file_path=file_path,
+                    message='Cannot remove metadata',
+                    error=metadata_error,
+                )
+
+            with metrics.measure('gps_extract', len(exif_data)):
+                location = get_exif_gps_location(exif_data)
+
+            if no_meta_parts is None:
+                with metrics.measure('hash', file_size):
+                    return Ok(
+                        file_path=file_path,
+                        file_data=b'',
+                        location=location,
+                        file_hash=hash_file_stream(image_file, hash_algorithm),
+                        is_changed=False,
+                    )
+
+            temp_path = get_temp_path(file_path)
+            try:
+                with metrics.measure('write', file_size):
+                    no_meta_file_hash = write_image_parts(
+                        temp_path,
+                        no_meta_parts,
+                        hash_algorithm,
+                    )
+            except OSError:
+                temp_path.unlink(missing_ok=True)
+                raise
+            finally:
+                # Mapping can not be closed while its views exist
+                release_parts(no_meta_parts)
+
+    return Ok(
+        file_path=file_path,
+        file_data=b'',
+        location=location,
+        file_hash=no_meta_file_hash,
+        temp_path=temp_path,
+    )
+
+
+def process_image_file(  # noqa: WPS210, WPS212, WPS231
+    file_path: Path,
+    file_hash: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+    cache: Optional[ResultCache] = None,
+    hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+    limits: Optional[ImageLimits] = None,
+) -> Optional[ProcessingResult]:
+    """Read and process image file.
+
+    If result for the same file content is cached, it is reused.
+    Large files are processed with `process_mapped_image_file`
+    and are not cached.
+
+    Args:
+        file_path (Path): File path.
+        file_hash (Optional[str]): \
+            Indexed file hash. File is not processed if its content matches.
+            Hash can be made with any supported algorithm.
+        metrics (Optional[Metrics]): Metrics to register stages runs in.
+        cache (Optional[ResultCache]): Cache of processing results.
+        hash_algorithm (str): Algorithm to hash files with.
+        limits (Optional[ImageLimits]): Limits of images.
+
+    Returns:
+        Optional[ProcessingResult]: \
+            Result with processing info or None if file is not changed.
+    """
+    metrics = metrics or Metrics()
+    limits = limits or ImageLimits()
+    start_time = perf_counter()
+    try:
+        file_size = os.stat(file_path).st_size
+    except OSError as stat_error:
+        return Err(
+            file_path=file_path,
+            message='Cannot read file',
+            error=stat_error,
+        )
+    size_error = check_image_size(file_path, file_size, limits)
+    if size_error is not None:
+        return size_error
+    if file_size >= limits.mapped_min_size:
+        try:
+            return process_mapped_image_file(
+                file_path,
+                file_hash,
+                metrics,
+                hash_algorithm,
+            )
+        except OSError as mapped_error:
+            return Err(
+                file_path=file_path,
+                message='Cannot clean large file',
+                error=mapped_error,
+            )
+
+    try:
+        file_data = read_changed_file(file_path, file_hash)
+    except OSError as read_error:
+        return Err(
+            file_path=file_path,
+            message='Cannot read file',
+            error=read_error,
+        )
+    metrics.observe('read', perf_counter() - start_time, len(file_data or b''))
+    if file_data is None:
+        return None
+
+    if file_hash is None and cache is None:
+        return process_image(
+            file_path,
+            file_data,
+            metrics,
+            hash_algorithm,
+            limits,
+        )
+
+    with metrics.measure('hash', len(file_data)):
+        source_hash = hash_file_data(file_data, hash_algorithm)
+        # Files indexed with another algorithm are verified with it
+        is_unchanged = file_hash == source_hash or (
+            file_hash is not None
+            and get_hash_algorithm(file_hash) != hash_algorithm
+            and verify_file_hash(file_hash, file_data)
+        )
+    if is_unchanged:
+        return None
+
+    cached_result = cache.get(source_hash) if cache is not None else None
+    if cached_result is not None:
+        return Ok(
+            file_path=file_path,
+            file_data=cached_result.file_data,
+            location=cached_result.location,
+            file_hash=cached_result.file_hash,
+            is_changed=cached_result.file_hash != source_hash,
+        )
+
+    file_result = process_image(
+        file_path,
+        file_data,
+        metrics,
+        hash_algorithm,
+        limits,
+    )
+    if cache is not None and isinstance(file_result, Ok):
+        cache.put(source_hash, CachedResult(
+            file_data=file_result.file_data,
+            location=file_result.location,
+            file_hash=file_result.file_hash,
+        ))
+    return file_result
+
+
+def process_image_file_in_worker(
+    file_path: Path,
+    file_hash: Optional[str] = None,
+    cache_max_bytes: int = 0,
+    hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+    limits: Optional[ImageLimits] = None,
+) -> WorkerResult:
+    """Read and process image file in worker process.
+
+    Every worker has its own results cache.
+
+    Args:
+        file_path (Path): File path.
+        file_hash (Optional[str]): \
+            Indexed file hash. File is not processed if its content matches.
+        cache_max_bytes (int): Size of worker cache, 0 to disable cache.
+        hash_algorithm (str): Algorithm to hash files with.
+        limits (Optional[ImageLimits]): Limits of images.
+
+    Returns:
+        Optional[ProcessingResult]: Result of `process_image_file`.
+        Metrics: Metrics of file processing to merge in main process.
+    """
+    metrics = Metrics()
+    cache = get_worker_cache(cache_max_bytes) if cache_max_bytes else None
+    file_result = process_image_file(
+        file_path,
+        file_hash,
+        metrics,
+        cache,
+        hash_algorithm,
+        limits,
+    )
+    return file_result, metrics
+
+
+def get_workers_count(workers: int) -> int:
+    """Get count of worker processes.
+
+    Args:
+        workers (int): Requested count of workers, 0 to use all CPU cores.
+
+    Returns:
+        int: Count of worker processes.
+    """
+    if workers < 1:
+        return os.cpu_count() or 1
+    return workers
+
+
+def iter_processed_image_files(  # noqa: WPS231
+    image_files: Iterable[tuple[Path, FileStat]],
+    index: FilesIndex,
+    workers: int = 1,
+    budget: Optional[InFlightBudget] = None,
+    metrics: Optional[Metrics] = None,
+    cache: Optional[ResultCache] = None,
+    hash_algorithm: str = DEFAULT_HASH_ALGORITHM,
+    limits: Optional[ImageLimits] = None,
+) -> Iterator[tuple[Path, FileStat, Optional[ProcessingResult]]]:
+    """Lazily process image files, possibly in parallel.
+
+    Only files pathes and indexed hashes are sent to workers,
+    files are read there. Count and size of files that are submitted
+    but not yet consumed are limited by budget, so memory usage does not
+    depend on count of files. Results are yielded in the order of files.
+
+    Args:
+        image_files (Iterable[tuple[Path, FileStat]]): \
+            Files to process with their stat info.
+        index (FilesIndex): Index with processed files.
+        workers (int): Count of worker processes, 0 to use all CPU cores.
+        budget (Optional[InFlightBudget]): Limits of files in flight.
+        metrics (Optional[Metrics]): \
+            Metrics to register stages runs in, including ones of workers.
+        cache (Optional[ResultCache]): \
+            Cache of processing results. Workers get their own caches
+            with size of this one divided between them.
+        hash_algorithm (str): Algorithm to hash files with.
+        limits (Optional[ImageLimits]): Limits of images.
+
+    Yields:
+        tuple[Path, FileStat, Optional[ProcessingResult]]: \
+            File path, stat info and result of `process_image_file`.
+    """
+    metrics = metrics or Metrics()
+    workers = get_workers_count(workers)
+    if workers == 1:
+        for file_path, file_stat in image_files:
+            yield file_path, file_stat, process_image_file(
+                file_path,
+                index.get(file_path),
+                metrics,
+                cache,
+                hash_algorithm,
+                limits,
+            )
+        return
+
+    budget = budget or InFlightBudget()
+    max_files = budget.max_files or workers * 4
+    cache_max_bytes = cache.max_bytes // workers if cache is not None else 0
+    pending: deque[tuple[Path, FileStat, Future[WorkerResult]]] = deque()
+    pending_bytes = 0
+    with ExitStack() as exit_stack:
+        executor: Optional[Executor] = None
+        for file_path, file_stat in image_files:
+            while pending and (
+                len(pending) >= max_files
+                or pending_bytes + file_stat.size > budget.max_bytes
+            ):
+                done_path, done_stat, future = pending.popleft()
+                pending_bytes -= done_stat.size
+                done_result, done_metrics = future.result()
+                metrics.merge(done_metrics)
+                yield done_path, done_stat, done_result
+
+            if executor is None:
+                # Imported on first use, as it loads multiprocessing
+                from concurrent.futures import (  # noqa: WPS433
+                    ProcessPoolExecutor,
+                )
+                executor = exit_stack.enter_context(
+                    ProcessPoolExecutor(workers),
+                )
+            pending.append((file_path, file_stat, executor.submit(
+                process_image_file_in_worker,
+                file_path,
+                index.get(file_path),
+                cache_max_bytes,
+                hash_algorithm,
+                limits,
+            )))
+            pending_bytes += file_stat.size
+
+        while pending:
+            done_path, done_stat, future = pending.popleft()
+            done_result, done_metrics = future.result()
+            metrics.merge(done_metrics)
+            yield done_path, done_stat, done_result
+
+
+def process_image_files(
+    file_paths: list[Path],
+    index: FilesIndex,
+    workers: int = 1,
+) -> tuple[list[ProcessingResult], FilesIndex]:
+    """Process image files, possibly in parallel.
+
+    Same as `process_images`, but images are read from files
+    with `iter_processed_image_files`.
+    Results and index are independent from workers count.
+
+    Args:
+        file_paths (list[Path]): Images files to process.
+        index (FilesIndex): Index with processed files.
+        workers (int): Count of worker processes, 0 to use all CPU cores.
+
+    Returns:
+        list[ProcessingResult]: Processing results.
+        FilesIndex: Update files index.
+    """
+    processing_results: list[ProcessingResult] = []
+    new_index = FilesIndex()
+    image_files = (
+        (file_path, get_file_stat(file_path))
+        for file_path in file_paths
+    )
+    for file_path, _, file_result in iter_processed_image_files(
+        image_files,
+        index,
+        workers,
+    ):
+        if file_result is None:
+            new_index[file_path] = index[file_path]
+        else:
+            processing_results.append(file_result)
+            if isinstance(file_result, Ok):
+                new_index[file_path] = file_result.file_hash
+
+    return processing_results, new_index
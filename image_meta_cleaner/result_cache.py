@@ -0,0 +1,105 @@
+"""Result cache module.
+
+Provides cache of processing results keyed by hash of original
+file content, so copies of the same image are cleaned only once.
+"""
+
+
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Optional
+
+from image_meta_cleaner.location import Location
+
+# Default limit of total size of cached images.
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class CachedResult(object):
+    """Result of image processing stored in cache."""
+
+    file_data: bytes
+    location: Optional[Location]
+    file_hash: str
+
+
+class ResultCache(object):
+    """Cache of processing results with least recently used eviction.
+
+    Size of cache is measured by total size of cleaned images.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        """Init empty cache.
+
+        Args:
+            max_bytes (int): Limit of total size of cached images.
+        """
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._results: OrderedDict[str, CachedResult] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return count of cached results.
+
+        Returns:
+            int: Count of cached results.
+        """
+        return len(self._results)
+
+    def get(self, source_hash: str) -> Optional[CachedResult]:
+        """Get cached result and mark it as recently used.
+
+        Args:
+            source_hash (str): Hash of original file content.
+
+        Returns:
+            Optional[CachedResult]: Cached result if it exists.
+        """
+        cached_result = self._results.get(source_hash)
+        if cached_result is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._results.move_to_end(source_hash)
+        return cached_result
+
+    def put(self, source_hash: str, cached_result: CachedResult) -> None:
+        """Cache result, evicting least recently used ones.
+
+        Results larger than cache are not cached.
+
+        Args:
+            source_hash (str): Hash of original file content.
+            cached_result (CachedResult): Result to cache.
+        """
+        result_size = len(cached_result.file_data)
+        if result_size > self.max_bytes:
+            return
+
+        old_result = self._results.pop(source_hash, None)
+        if old_result is not None:
+            self.size -= len(old_result.file_data)
+        self._results[source_hash] = cached_result
+        self.size += result_size
+        while self.size > self.max_bytes:
+            _, evicted_result = self._results.popitem(last=False)
+            self.size -= len(evicted_result.file_data)
+
+
+@lru_cache(maxsize=1)
+def get_worker_cache(max_bytes: int) -> ResultCache:
+    """Get cache of current worker process.
+
+    Args:
+        max_bytes (int): Limit of total size of cached images.
+
+    Returns:
+        ResultCache: Cache that lives as long as worker process.
+    """
+    return ResultCache(max_bytes)
@@ -0,0 +1,361 @@
+"""Scanner module.
+
+Provides fast directory scanner based on `os.scandir`. Files stat info
+is taken from directory entries, excluded subtrees are not walked and
+directories that were not changed since the last scan can be skipped
+without listing.
+"""
+
+
+import os
+from contextlib import suppress
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePath
+from time import perf_counter, time_ns
+from typing import Iterator, Optional
+
+from image_meta_cleaner.archives import ARCHIVE_EXTENSIONS
+from image_meta_cleaner.checkpoint import TEMP_FILE_SUFFIX
+from image_meta_cleaner.files_index import FilesIndex, FileStat, get_file_stat
+from image_meta_cleaner.images import IMAGE_EXTENSIONS
+from image_meta_cleaner.metrics import Metrics
+
+# Directories changed this recently are always listed, because they
+# can be changed again within the same modification time tick.
+RACY_MTIME_NS = 2 * 10 ** 9
+
+# Temporary files modified this recently can still be written
+# by running workers, so only older ones are removed.
+TEMP_FILE_GRACE_NS = 10 * 60 * 10 ** 9
+
+
+@dataclass
+class ScanRules(object):
+    """Rules of directory scanning.
+
+    Patterns without slash are matched against names of files and
+    directories, other patterns are matched against pathes relative
+    to the scanned directory, e.g. `raw/*` or `*.png`.
+    """
+
+    # Patterns of included files, empty to include all images
+    include: tuple[str, ...] = ()
+
+    # Patterns of excluded files and directories
+    exclude: tuple[str, ...] = ()
+
+    # Max depth of scanned subdirectories, 0 to scan only top directory
+    max_depth: Optional[int] = None
+
+    # Skip directories which modification time is the same as
+    # at the last scan. Files modified in place are not detected then,
+    # so it is intended for filesystem events watch mode.
+    skip_unchanged_dirs: bool = False
+
+    # Also scan zip and tar archives to clean images in them
+    archives: bool = False
+
+    def is_excluded(self, relative_path: PurePath) -> bool:
+        """Check that file or directory is excluded.
+
+        Args:
+            relative_path (PurePath): Path relative to scanned directory.
+
+        Returns:
+            bool: True if path matches any exclude pattern.
+        """
+        return match_any(relative_path, self.exclude)
+
+    def is_included(self, relative_path: PurePath) -> bool:
+        """Check that file should be scanned.
+
+        Args:
+            relative_path (PurePath): File path relative to scanned directory.
+
+        Returns:
+            bool: True if file is included and not excluded.
+        """
+        max_depth = self.max_depth
+        if max_depth is not None and len(relative_path.parts) > max_depth + 1:
+            return False
+        if any(
+            self.is_excluded(parent)
+            for parent in relative_path.parents
+            if parent.parts
+        ):
+            return False
+        if self.is_excluded(relative_path):
+            return False
+        return not self.include or match_any(relative_path, self.include)
+
+
+def match_any(relative_path: PurePath, patterns: tuple[str, ...]) -> bool:
+    """Check that path matches any pattern.
+
+    Args:
+        relative_path (PurePath): Path relative to scanned directory.
+        patterns (tuple[str, ...]): Glob patterns.
+
+    Returns:
+        bool: True if path matches any pattern.
+    """
+    for pattern in patterns:
+        if '/' in pattern:
+            subject = relative_path.as_posix()
+        else:
+            subject = relative_path.name
+        if fnmatchcase(subject, pattern):
+            return True
+    return False
+
+
+def get_entry_stat(entry: os.DirEntry[str]) -> FileStat:
+    """Get file stat info from directory entry.
+
+    Stat info is cached by directory entry and on Windows it is
+    obtained while listing directory. Inode is read separately,
+    because it is not included in cached stat info on Windows.
+
+    Args:
+        entry (os.DirEntry[str]): Directory entry.
+
+    Returns:
+        FileStat: File size, modification time and inode.
+    """
+    stat_result = entry.stat()
+    return FileStat(
+        size=stat_result.st_size,
+        mtime_ns=stat_result.st_mtime_ns,
+        inode=entry.inode(),
+    )
+
+
+def remove_stale_temp_file(entry: os.DirEntry[str]) -> None:
+    """Remove temporary file left by interrupted writing.
+
+    Workers of daemon and async cleaner write temporary files while
+    directories are scanned, so recently modified files are kept,
+    and files renamed or removed by their writers are ignored.
+
+    Args:
+        entry (os.DirEntry[str]): Directory entry of temporary file.
+    """
+    with suppress(OSError):
+        mtime_ns = entry.stat(follow_symlinks=False).st_mtime_ns
+        if time_ns() - mtime_ns > TEMP_FILE_GRACE_NS:
+            os.unlink(entry.path)
+
+
+class DirScanner(object):
+    """Scanner of images in directory tree.
+
+    Modification times of scanned directories are collected while
+    scanning and should be stored in index with `update_index` after
+    found files are processed.
+    """
+
+    def __init__(
+        self,
+        source: Path,
+        rules: Optional[ScanRules] = None,
+        index: Optional[FilesIndex] = None,
+        metrics: Optional[Metrics] = None,
+        remove_temp_files: bool = True,
+    ) -> None:
+        """Init scanner.
+
+        Args:
+            source (Path): Scanned directory.
+            rules (Optional[ScanRules]): Scanning rules.
+            index (Optional[FilesIndex]): \
+                Index with files and directories found at the last scan.
+            metrics (Optional[Metrics]): \
+                Metrics to register scan time of every image in.
+            remove_temp_files (bool): \
+                Remove temporary files left by interrupted writing.
+                Files modified within `TEMP_FILE_GRACE_NS` are kept.
+        """
+        self.source = source
+        self.rules = rules or ScanRules()
+        self.index = index if index is not None else FilesIndex()
+        self.metrics = metrics or Metrics()
+        self.remove_temp_files = remove_temp_files
+        self.dirs_mtimes: dict[Path, int] = {}
+        self.skipped_dirs_count = 0
+        self._indexed_files: dict[Path, list[Path]] = {}
+        self._indexed_dirs: dict[Path, list[Path]] = {}
+        self._is_indexed_loaded = False
+        self._unrecorded_dirs: set[Path] = set()
+
+    def __iter__(self) -> Iterator[tuple[Path, FileStat]]:
+        """Scan directory tree.
+
+        Temporary files left by interrupted writing are removed.
+
+        Yields:
+            tuple[Path, FileStat]: Image path and stat info.
+        """
+        start_time = perf_counter()
+        pending_dirs = [(self.source, PurePath())]
+        while pending_dirs:
+            dir_path, relative_dir = pending_dirs.pop()
+            subdirs: list[tuple[Path, PurePath]] = []
+            for file_path, file_stat in self._scan_dir(
+                dir_path,
+                relative_dir,
+                subdirs,
+            ):
+                # Time of skipping of non-image files is included
+                self.metrics.observe('scan', perf_counter() - start_time)
+                yield file_path, file_stat
+                start_time = perf_counter()
+
+            max_depth = self.rules.max_depth
+            if max_depth is None or len(relative_dir.parts) < max_depth:
+                pending_dirs.extend(reversed(subdirs))
+            else:
+                self._unrecorded_dirs.update(
+                    subdir_path.absolute() for subdir_path, _ in subdirs
+                )
+
+    def forget_dir(self, dir_path: Path) -> None:
+        """Do not store modification time of directory.
+
+        Used for directories with files that failed to process,
+        so they are listed again at the next scan.
+
+        Args:
+            dir_path (Path): Directory path.
+        """
+        self._unrecorded_dirs.add(dir_path.absolute())
+
+    def update_index(self) -> None:
+        """Store modification times of scanned directories in index.
+
+        Directories that were not found are removed from index.
+        Directories that contain not recorded subdirectories, e.g.
+        excluded ones, are not recorded, because skipping them would
+        hide such subdirectories from the next scans.
+        """
+        for unrecorded_dir in self._unrecorded_dirs:
+            self.dirs_mtimes.pop(unrecorded_dir, None)
+            for parent_dir in unrecorded_dir.parents:
+                self.dirs_mtimes.pop(parent_dir, None)
+        for dir_path in self.index.iter_dirs():
+            if dir_path not in self.dirs_mtimes:
+                self.index.set_dir_mtime(dir_path, None)
+        for dir_path, mtime_ns in self.dirs_mtimes.items():  # noqa: WPS440
+            self.index.set_dir_mtime(dir_path, mtime_ns)
+
+    def _scan_dir(
+        self,
+        dir_path: Path,
+        relative_dir: PurePath,
+        subdirs: list[tuple[Path, PurePath]],
+    ) -> Iterator[tuple[Path, FileStat]]:
+        try:
+            mtime_ns = dir_path.stat().st_mtime_ns
+        except OSError:
+            return
+
+        absolute_path = dir_path.absolute()
+        if time_ns() - mtime_ns > RACY_MTIME_NS:
+            self.dirs_mtimes[absolute_path] = mtime_ns
+        else:
+            self._unrecorded_dirs.add(absolute_path)
+        if (
+            self.rules.skip_unchanged_dirs
+            and self.index.get_dir_mtime(absolute_path) == mtime_ns
+        ):
+            self.skipped_dirs_count += 1
+            yield from self._iter_indexed_dir(
+                absolute_path,
+                relative_dir,
+                subdirs,
+            )
+            return
+
+        try:
+            entries = list(os.scandir(dir_path))
+        except OSError:
+            self.forget_dir(absolute_path)
+            return
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                relative_path = relative_dir / entry.name
+                if self.rules.is_excluded(relative_path):
+                    self.forget_dir(Path(entry.path))
+                else:
+                    subdirs.append((Path(entry.path), relative_path))
+            elif entry.name.endswith(TEMP_FILE_SUFFIX):
+                if self.remove_temp_files:
+                    remove_stale_temp_file(entry)
+            elif self._is_image_file(entry, relative_dir):
+                yield Path(entry.path), get_entry_stat(entry)
+
+    def _is_image_file(
+        self,
+        entry: os.DirEntry[str],
+        relative_dir: PurePath,
+    ) -> bool:
+        # Paths objects are built only for images, as most entries are not
+        extension = os.path.splitext(entry.name)[1].lower()
+        if extension not in IMAGE_EXTENSIONS and not (
+            self.rules.archives and extension in ARCHIVE_EXTENSIONS
+        ):
+            return False
+
+        try:
+            is_file = entry.is_file()
+        except OSError:
+            return False
+        return is_file and self._is_included(relative_dir, entry.name)
+
+    def _is_included(self, relative_dir: PurePath, name: str) -> bool:
+        if not self.rules.include and not self.rules.exclude:
+            return True
+
+        relative_path = relative_dir / name
+        if self.rules.is_excluded(relative_path):
+            return False
+        return (
+            not self.rules.include
+            or match_any(relative_path, self.rules.include)
+        )
+
+    def _iter_indexed_dir(
+        self,
+        dir_path: Path,
+        relative_dir: PurePath,
+        subdirs: list[tuple[Path, PurePath]],
+    ) -> Iterator[tuple[Path, FileStat]]:
+        if not self._is_indexed_loaded:
+            self._is_indexed_loaded = True
+            for file_path in self.index:
+                self._indexed_files.setdefault(file_path.parent, []).append(
+                    file_path,
+                )
+            for indexed_dir in self.index.iter_dirs():
+                self._indexed_dirs.setdefault(indexed_dir.parent, []).append(
+                    indexed_dir,
+                )
+
+        for subdir_path in self._indexed_dirs.get(dir_path, ()):
+            relative_path = relative_dir / subdir_path.name
+            if self.rules.is_excluded(relative_path):
+                self.forget_dir(subdir_path)
+            else:
+                subdirs.append((subdir_path, relative_path))
+
+        for file_path in self._indexed_files.get(dir_path, ()):
+            if not self._is_included(relative_dir, file_path.name):
+                continue
+            file_stat = self.index.get_stat(file_path)
+            if file_stat is None:
+                try:
+                    file_stat = get_file_stat(file_path)
+                except OSError:
+                    continue
+            yield file_path, file_stat
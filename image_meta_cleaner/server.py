@@ -0,0 +1,418 @@
+"""Server module.
+
+Provides HTTP server that cleans uploaded images. Image is sent as
+request body and cleaned image is returned as response body, location
+is returned in headers. Server listens on TCP port or unix socket and
+keeps image libraries and results cache warm between requests.
+
+API:
+    `POST /clean`: image in body, cleaned image in response body,
+        `X-Image-Location` header with location JSON or `null` and
+        `X-Image-Hash` header with cleaned image hash.
+    `GET /health`: JSON with cache statistics.
+"""
+
+
+import json
+import logging
+import signal
+import socket
+import socketserver
+from concurrent.futures import Executor, ProcessPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from threading import Condition, Lock
+from typing import Any, Optional
+
+from PIL.Image import init as init_image_plugins
+
+from image_meta_cleaner.files_index import hash_file_data
+from image_meta_cleaner.processing import (
+    InFlightBudget,
+    Ok,
+    ProcessingResult,
+    get_workers_count,
+    process_image,
+)
+from image_meta_cleaner.result_cache import CachedResult
+from image_meta_cleaner.settings import Settings
+
+# Host of server started by port only.
+DEFAULT_HOST = '127.0.0.1'
+
+# Path of cleaning endpoint.
+CLEAN_PATH = '/clean'
+
+# Path of health check endpoint.
+HEALTH_PATH = '/health'
+
+# Name of uploaded image used in processing results.
+UPLOAD_FILE_NAME = Path('upload')
+
+# Response header with image location JSON.
+LOCATION_HEADER = 'X-Image-Location'
+
+# Response header with cleaned image hash.
+HASH_HEADER = 'X-Image-Hash'
+
+
+def warm_up() -> None:
+    """Load image libraries, so first request is not slowed."""
+    import exifread  # noqa: F401, WPS433
+
+    init_image_plugins()
+
+
+def parse_server_address(address: str) -> tuple[str, int] | Path:
+    """Parse server address.
+
+    Args:
+        address (str): Port, `host:port` or unix socket path.
+
+    Returns:
+        tuple[str, int] | Path: Host and port or unix socket path.
+    """
+    if address.isdigit():
+        return DEFAULT_HOST, int(address)
+
+    host, separator, port = address.rpartition(':')
+    if separator and port.isdigit():
+        return host or DEFAULT_HOST, int(port)
+    return Path(address)
+
+
+class UploadsLimiter(object):
+    """Limiter of uploads in flight shared by request handlers threads.
+
+    Upload takes its place before body is read and frees it after
+    response is sent, so waiting bodies stay in socket buffers.
+    """
+
+    def __init__(self, budget: InFlightBudget, max_files: int) -> None:
+        """Init limiter.
+
+        Args:
+            budget (InFlightBudget): Limits of uploads in flight.
+            max_files (int): Limit of count of uploads in flight.
+        """
+        self.max_bytes = budget.max_bytes
+        self.max_files = max_files
+        self.files_count = 0
+        self.bytes_count = 0
+        self._condition = Condition()
+
+    def acquire(self, file_size: int) -> None:
+        """Wait until upload fits into budget and take its place.
+
+        Args:
+            file_size (int): Upload size.
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: not self.files_count or (
+                self.files_count < self.max_files
+                and self.bytes_count + file_size <= self.max_bytes
+            ))
+            self.files_count += 1
+            self.bytes_count += file_size
+
+    def release(self, file_size: int) -> None:
+        """Free place of handled upload.
+
+        Args:
+            file_size (int): Upload size.
+        """
+        with self._condition:
+            self.files_count -= 1
+            self.bytes_count -= file_size
+            self._condition.notify_all()
+
+
+class CleaningService(object):
+    """Cleaner of uploaded images shared by request handlers.
+
+    Results are cached by hash of uploaded image. Images are processed
+    in worker processes if there are several workers, otherwise
+    in request handler threads. Total size and count of uploads
+    in flight are limited by `budget`, 4 per worker by default.
+    """
+
+    def __init__(self, settings: Optional[Settings] = None) -> None:
+        """Init service.
+
+        Args:
+            settings (Optional[Settings]): Processing settings.
+        """
+        self.settings = settings or Settings()
+        self.max_upload_size = self.settings.budget.max_bytes
+        self._cache_lock = Lock()
+        self._executor: Optional[Executor] = None
+        workers = get_workers_count(self.settings.workers)
+        self.limiter = UploadsLimiter(
+            self.settings.budget,
+            self.settings.budget.max_files or workers * 4,
+        )
+        if workers > 1:
+            self._executor = ProcessPoolExecutor(workers, initializer=warm_up)
+        warm_up()
+
+    def clean(self, file_data: bytes) -> ProcessingResult:
+        """Remove metadata from uploaded image.
+
+        Args:
+            file_data (bytes): Image data.
+
+        Returns:
+            ProcessingResult: Result with cleaned image data.
+        """
+        cache = self.settings.cache
+        hash_algorithm = self.settings.hash_algorithm
+        source_hash = hash_file_data(file_data, hash_algorithm)
+        if cache is not None:
+            with self._cache_lock:
+                cached_result = cache.get(source_hash)
+            if cached_result is not None:
+                return Ok(
+                    file_path=UPLOAD_FILE_NAME,
+                    file_data=cached_result.file_data,
+                    location=cached_result.location,
+                    file_hash=cached_result.file_hash,
+                    is_changed=cached_result.file_hash != source_hash,
+                )
+
+        if self._executor is None:
+            file_result = process_image(
+                UPLOAD_FILE_NAME,
+                file_data,
+                hash_algorithm=hash_algorithm,
+                limits=self.settings.limits,
+            )
+        else:
+            file_result = self._executor.submit(
+                process_image,
+                UPLOAD_FILE_NAME,
+                file_data,
+                hash_algorithm=hash_algorithm,
+                limits=self.settings.limits,
+            ).result()
+
+        if cache is not None and isinstance(file_result, Ok):
+            with self._cache_lock:
+                cache.put(source_hash, CachedResult(
+                    file_data=file_result.file_data,
+                    location=file_result.location,
+                    file_hash=file_result.file_hash,
+                ))
+        return file_result
+
+    def get_health(self) -> dict[str, Any]:
+        """Get service state.
+
+        Returns:
+            dict[str, Any]: Status and cache statistics.
+        """
+        cache = self.settings.cache
+        if cache is None:
+            return {'status': 'ok', 'cache': None}
+
+        with self._cache_lock:
+            return {'status': 'ok', 'cache': {
+                'hits': cache.hits,
+                'misses': cache.misses,
+                'size': cache.size,
+            }}
+
+    def close(self) -> None:
+        """Shut down worker processes."""
+        if self._executor is not None:
+            self._executor.shutdown()
+
+
+class CleaningRequestHandler(BaseHTTPRequestHandler):
+    """Handler of cleaning requests."""
+
+    server: 'CleaningServer'
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self) -> None:  # noqa: N802
+        """Handle health check request."""
+        if self.path != HEALTH_PATH:
+            self.send_json(HTTPStatus.NOT_FOUND, {'error': 'Not found'})
+            return
+        self.send_json(HTTPStatus.OK, self.server.service.get_health())
+
+    def do_POST(self) -> None:  # noqa: N802
+        """Handle cleaning request."""
+        if self.path != CLEAN_PATH:
+            self.send_json(HTTPStatus.NOT_FOUND, {'error': 'Not found'})
+            return
+
+        content_length = self.headers.get('Content-Length', '')
+        if not content_length.isdigit():
+            self.send_json(HTTPStatus.LENGTH_REQUIRED, {
+                'error': 'Content-Length is required',
+            })
+            return
+        if int(content_length) > self.server.service.max_upload_size:
+            self.close_connection = True
+            self.send_json(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {
+                'error': 'Image is too large',
+            })
+            return
+
+        file_size = int(content_length)
+        limiter = self.server.service.limiter
+        limiter.acquire(file_size)
+        try:
+            self.send_cleaned_image(self.rfile.read(file_size))
+        finally:
+            limiter.release(file_size)
+
+    def send_cleaned_image(self, file_data: bytes) -> None:
+        """Clean uploaded image and send it.
+
+        Args:
+            file_data (bytes): Image data.
+        """
+        file_result = self.server.service.clean(file_data)
+        if not isinstance(file_result, Ok):
+            self.send_json(HTTPStatus.UNPROCESSABLE_ENTITY, {
+                'error': file_result.message,
+            })
+            return
+
+        location = None
+        if file_result.location is not None:
+            location = {
+                'latitude': file_result.location.latitude,
+                'longitude': file_result.location.longitude,
+            }
+        self.send_response(HTTPStatus.OK)
+        self.send_header(
+            'Content-Type',
+            self.headers.get('Content-Type', 'application/octet-stream'),
+        )
+        self.send_header('Content-Length', str(len(file_result.file_data)))
+        self.send_header(LOCATION_HEADER, json.dumps(location))
+        self.send_header(HASH_HEADER, file_result.file_hash)
+        self.end_headers()
+        self.wfile.write(file_result.file_data)
+
+    def send_json(self, status: HTTPStatus, response: dict[str, Any]) -> None:
+        """Send JSON response.
+
+        Args:
+            status (HTTPStatus): Response status.
+            response (dict[str, Any]): Response body.
+        """
+        response_data = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(response_data)))
+        self.end_headers()
+        self.wfile.write(response_data)
+
+    def address_string(self) -> str:
+        """Get client address for logs.
+
+        Returns:
+            str: Client host, empty for unix socket clients.
+        """
+        if isinstance(self.client_address, tuple):
+            return str(self.client_address[0])
+        return str(self.client_address)
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: WPS125
+        """Log request to module log instead of stderr.
+
+        Args:
+            format (str): Message format.
+            args (Any): Message arguments.
+        """
+        logging.info('%s %s', self.address_string(), format % args)
+
+
+class CleaningServer(ThreadingHTTPServer):
+    """HTTP server on TCP port or unix socket with cleaning service."""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        server_address: tuple[str, int] | Path,
+        service: CleaningService,
+    ) -> None:
+        """Init server and start listening.
+
+        Stale unix socket file left by previous server is removed.
+
+        Args:
+            server_address (tuple[str, int] | Path): \
+                Host and port or unix socket path.
+            service (CleaningService): Cleaning service.
+        """
+        self.service = service
+        self.socket_path: Optional[Path] = None
+        bound_address: Any = server_address
+        if isinstance(server_address, Path):
+            self.socket_path = server_address
+            self.address_family = socket.AF_UNIX
+            server_address.unlink(missing_ok=True)
+            bound_address = str(server_address)
+        super().__init__(bound_address, CleaningRequestHandler)
+
+    def server_bind(self) -> None:
+        """Bind socket, unix socket has no host name."""
+        if self.socket_path is None:
+            super().server_bind()
+            return
+
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = str(self.socket_path)
+        self.server_port = 0
+
+    def server_close(self) -> None:
+        """Close socket and remove unix socket file."""
+        super().server_close()
+        if self.socket_path is not None:
+            self.socket_path.unlink(missing_ok=True)
+
+
+def create_server(
+    address: str,
+    settings: Optional[Settings] = None,
+) -> CleaningServer:
+    """Create cleaning server.
+
+    Args:
+        address (str): Port, `host:port` or unix socket path.
+        settings (Optional[Settings]): Processing settings.
+
+    Returns:
+        CleaningServer: Listening server.
+    """
+    return CleaningServer(
+        parse_server_address(address),
+        CleaningService(settings),
+    )
+
+
+def serve(address: str, settings: Optional[Settings] = None) -> None:
+    """Run cleaning server until interrupted.
+
+    Server is stopped gracefully on SIGINT and SIGTERM,
+    so unix socket file is removed.
+
+    Args:
+        address (str): Port, `host:port` or unix socket path.
+        settings (Optional[Settings]): Processing settings.
+    """
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    with create_server(address, settings) as server:
+        logging.info('Serving on {0}'.format(address))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logging.info('Server is stopped')
+        finally:
+            server.service.close()
@@ -0,0 +1,57 @@
+"""Settings module.
+
+Contains settings of directory processing shared by command line
+interface and processing functions.
+"""
+
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+from image_meta_cleaner.checkpoint import CheckpointPolicy
+from image_meta_cleaner.files_index import DEFAULT_HASH_ALGORITHM
+from image_meta_cleaner.leases import ClusterSettings
+from image_meta_cleaner.metrics import MetricsRecorder
+from image_meta_cleaner.processing import ImageLimits, InFlightBudget
+from image_meta_cleaner.result_cache import ResultCache
+from image_meta_cleaner.scanner import ScanRules
+
+
+@dataclass
+class Settings(object):
+    """Settings of directory processing."""
+
+    # Count of worker processes, 0 to use all CPU cores
+    workers: int = 1
+
+    # Limits of images in flight
+    budget: InFlightBudget = field(default_factory=InFlightBudget)
+
+    # Limits of size of single image
+    limits: ImageLimits = field(default_factory=ImageLimits)
+
+    # Index backend: `text` or `sqlite`
+    index_backend: str = 'text'
+
+    # Process files on filesystem events in watch mode
+    events: bool = False
+
+    # Recorder of processing stages metrics, None to disable metrics
+    metrics: Optional[MetricsRecorder] = None
+
+    # Cache of processing results of duplicated images, None to disable
+    cache: Optional[ResultCache] = field(default_factory=ResultCache)
+
+    # Frequency of index checkpoints during processing
+    checkpoints: CheckpointPolicy = field(default_factory=CheckpointPolicy)
+
+    # Rules of directory scanning
+    scan: ScanRules = field(default_factory=ScanRules)
+
+    # Algorithm to hash files with, files indexed with another
+    # algorithm are rehashed only when they are changed
+    hash_algorithm: str = DEFAULT_HASH_ALGORITHM
+
+    # Share directory with other nodes through lease files,
+    # None to process whole directory alone
+    cluster: Optional[ClusterSettings] = None
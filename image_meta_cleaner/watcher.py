@@ -0,0 +1,241 @@
+"""Watcher module.
+
+Provides filesystem events watcher based on Linux inotify.
+Used by watch mode to process only created and modified files
+instead of rescanning the whole directory.
+"""
+
+
+import os
+import select
+import struct
+import sys
+from pathlib import Path
+from time import monotonic
+from typing import Optional
+
+# File was modified.
+IN_MODIFY = 0x00000002
+
+# File opened for writing was closed.
+IN_CLOSE_WRITE = 0x00000008
+
+# File was moved into watched directory.
+IN_MOVED_TO = 0x00000080
+
+# File or directory was created in watched directory.
+IN_CREATE = 0x00000100
+
+# Events queue overflowed, some events are lost.
+IN_Q_OVERFLOW = 0x00004000
+
+# Watch was removed.
+IN_IGNORED = 0x00008000
+
+# Subject of event is a directory.
+IN_ISDIR = 0x40000000
+
+# Events watched in every directory.
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# Header of inotify event: watch descriptor, mask, cookie and name size.
+EVENT_HEADER = struct.Struct('iIII')
+
+# Size of buffer for reading events.
+EVENTS_BUFFER_SIZE = 64 * 1024
+
+
+class InotifyWatcher(object):
+    """Recursive watcher of created and modified files.
+
+    Changed files are reported only after they were not changed for
+    `settle_delay` seconds, so files that are still being written
+    are not processed.
+    """
+
+    def __init__(self, source: Path, settle_delay: float = 1) -> None:
+        """Init inotify instance and watch directories tree.
+
+        Args:
+            source (Path): Watched directory.
+            settle_delay (float): \
+                Time in seconds file must stay unchanged to be reported.
+
+        Raises:
+            OSError: If inotify is not available.
+        """
+        import ctypes  # noqa: WPS433
+        import ctypes.util  # noqa: WPS433, WPS440
+
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+
+        self.settle_delay = settle_delay
+        self.overflowed = False
+        self._watched_dirs: dict[int, Path] = {}
+        self._changed_files: dict[Path, float] = {}
+        self.add_tree(source, report_files=False)
+
+    def __enter__(self) -> 'InotifyWatcher':
+        """Enter context.
+
+        Returns:
+            InotifyWatcher: Watcher itself.
+        """
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        """Close watcher on context exit.
+
+        Args:
+            exc_info (object): Exception info.
+        """
+        self.close()
+
+    def close(self) -> None:
+        """Close inotify instance."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def add_tree(self, directory: Path, report_files: bool = True) -> None:
+        """Watch directory and all its subdirectories.
+
+        Files found in new directories should be reported as changed,
+        because they could be created before watch was added.
+
+        Args:
+            directory (Path): Directory path.
+            report_files (bool): Report found files as changed.
+        """
+        for dir_path, _, file_names in os.walk(directory):
+            watch_descriptor = self._libc.inotify_add_watch(
+                self._fd,
+                os.fsencode(dir_path),
+                WATCH_MASK,
+            )
+            if watch_descriptor >= 0:
+                self._watched_dirs[watch_descriptor] = Path(dir_path)
+            for file_name in file_names if report_files else ():
+                self._changed_files[Path(dir_path, file_name)] = monotonic()
+
+    def read_events(self, timeout: float) -> None:
+        """Wait for events and register changed files.
+
+        Args:
+            timeout (float): Max waiting time in seconds.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return
+
+        try:
+            events_data = os.read(self._fd, EVENTS_BUFFER_SIZE)
+        except BlockingIOError:
+            return
+
+        position = 0
+        while position + EVENT_HEADER.size <= len(events_data):
+            watch_descriptor, mask, _, name_size = EVENT_HEADER.unpack_from(
+                events_data,
+                position,
+            )
+            name_start = position + EVENT_HEADER.size
+            name = events_data[name_start:name_start + name_size]
+            position = name_start + name_size
+            self.handle_event(watch_descriptor, mask, name.rstrip(b'\x00'))
+
+    def handle_event(
+        self,
+        watch_descriptor: int,
+        mask: int,
+        name: bytes,
+    ) -> None:
+        """Register single inotify event.
+
+        Args:
+            watch_descriptor (int): Watch descriptor of directory.
+            mask (int): Event mask.
+            name (bytes): Name of file in directory.
+        """
+        if mask & IN_Q_OVERFLOW:
+            self.overflowed = True
+            return
+
+        if mask & IN_IGNORED:
+            self._watched_dirs.pop(watch_descriptor, None)
+            return
+
+        directory = self._watched_dirs.get(watch_descriptor)
+        if directory is None or not name:
+            return
+
+        file_path = directory / os.fsdecode(name)
+        if mask & IN_ISDIR:
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self.add_tree(file_path)
+        elif mask & (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO):
+            self._changed_files[file_path] = monotonic()
+
+    def poll(self, timeout: float) -> list[Path]:
+        """Wait for settled changed files.
+
+        Args:
+            timeout (float): Max waiting time in seconds.
+
+        Returns:
+            list[Path]: Files that were changed and settled.
+        """
+        deadline = monotonic() + timeout
+        while True:
+            settled_files = self.pop_settled_files()
+            remaining_time = deadline - monotonic()
+            if settled_files or self.overflowed or remaining_time <= 0:
+                return settled_files
+
+            if self._changed_files:
+                remaining_time = min(remaining_time, self.settle_delay)
+            self.read_events(remaining_time)
+
+    def pop_settled_files(self) -> list[Path]:
+        """Pop files that were not changed for settle delay.
+
+        Returns:
+            list[Path]: Settled files.
+        """
+        settle_time = monotonic() - self.settle_delay
+        settled_files = [
+            file_path
+            for file_path, change_time in self._changed_files.items()
+            if change_time <= settle_time
+        ]
+        for file_path in settled_files:
+            self._changed_files.pop(file_path)
+        return settled_files
+
+
+def create_watcher(
+    source: Path,
+    settle_delay: float = 1,
+) -> Optional[InotifyWatcher]:
+    """Create filesystem events watcher if it is supported.
+
+    Args:
+        source (Path): Watched directory.
+        settle_delay (float): \
+            Time in seconds file must stay unchanged to be reported.
+
+    Returns:
+        Optional[InotifyWatcher]: Watcher or None if events are unavailable.
+    """
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        return InotifyWatcher(source, settle_delay)
+    except (OSError, AttributeError):
+        return None
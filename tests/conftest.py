@@ -4,13 +4,20 @@ Contains shared fixtures for tests.
 """
 
 
+from io import BytesIO
 from pathlib import Path
 
 import pytest
+from PIL.Image import Exif
+from PIL.Image import new as new_image
+from PIL.Image import open as open_image
 
 # Number of images in the `assets` directory.
 TOTAL_IMAGES_COUNT = 4
 
+# EXIF tags describing image layout and thumbnail.
+IMAGE_STRUCTURE_TAGS = (256, 257, 259, 274, 282, 283, 296, 513, 514, 531)
+
 
 @pytest.fixture
 def assets_dir() -> Path:
@@ -20,3 +27,41 @@ def assets_dir() -> Path:
         Path: Path to the `assets` directory.
     """
     return Path('tests/assets')
+
+
+@pytest.fixture
+def exif_data(assets_dir: Path) -> bytes:
+    """Return EXIF block with GPS info of `1.jpg` image.
+
+    Args:
+        assets_dir (Path): Path to the `assets` directory.
+
+    Returns:
+        bytes: Raw EXIF data.
+    """
+    with open_image(assets_dir / '1.jpg') as image:
+        return image.info['exif']  # type: ignore
+
+
+def make_image(image_format: str, exif_data: bytes = b'') -> bytes:
+    """Build small image of provided format.
+
+    Image structure tags of EXIF data are replaced with actual ones.
+
+    Args:
+        image_format (str): Pillow format name.
+        exif_data (bytes): EXIF data to embed in image.
+
+    Returns:
+        bytes: Image data.
+    """
+    image = new_image('RGB', (64, 48), (10, 200, 30))
+    exif = Exif()
+    if exif_data:
+        exif.load(exif_data)
+        for tag in IMAGE_STRUCTURE_TAGS:
+            exif.pop(tag, None)
+
+    image_stream = BytesIO()
+    image.save(image_stream, image_format, exif=exif)
+    return image_stream.getvalue()
@@ -0,0 +1,94 @@
+"""Tests for asyncio module."""
+
+import asyncio
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from image_meta_cleaner.aio import AsyncCleaner, InFlightLimiter
+from image_meta_cleaner.audit import audit_image_file
+from image_meta_cleaner.processing import InFlightBudget, Ok
+from image_meta_cleaner.settings import Settings
+from tests.conftest import TOTAL_IMAGES_COUNT
+
+
+def test_in_flight_limiter() -> None:
+    """Test that InFlightLimiter limits count and size of images."""
+    async def run_images() -> int:  # noqa: WPS430
+        limiter = InFlightLimiter(InFlightBudget(max_bytes=10), max_files=2)
+        max_files_count = 0
+
+        async def run_image(file_size: int) -> None:  # noqa: WPS430
+            nonlocal max_files_count  # noqa: WPS420
+            await limiter.acquire(file_size)
+            max_files_count = max(max_files_count, limiter.files_count)
+            assert limiter.files_count == 1 or limiter.bytes_count <= 10
+            await asyncio.sleep(0)
+            await limiter.release(file_size)
+
+        await asyncio.gather(*(
+            run_image(file_size)
+            for file_size in (4, 4, 4, 20, 1, 1)
+        ))
+        assert (limiter.files_count, limiter.bytes_count) == (0, 0)
+        return max_files_count
+
+    assert asyncio.run(run_images()) == 2
+
+
+def test_clean_bytes(assets_dir: Path) -> None:
+    """Test AsyncCleaner.clean_bytes method.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    async def clean_images() -> list[Ok]:  # noqa: WPS430
+        with ThreadPoolExecutor(2) as executor:
+            async with AsyncCleaner(executor=executor) as cleaner:
+                file_results = await asyncio.gather(*(
+                    cleaner.clean_bytes(
+                        image_path.read_bytes(),
+                        image_path.name,
+                    )
+                    for image_path in sorted(assets_dir.glob('*.jpg'))
+                ))
+                assert cleaner.metrics.stages['strip'].count == len(
+                    file_results,
+                )
+        return [
+            file_result
+            for file_result in file_results
+            if isinstance(file_result, Ok)
+        ]
+
+    file_results = asyncio.run(clean_images())
+    assert len(file_results) == TOTAL_IMAGES_COUNT
+    assert file_results[0].file_path == Path('1.jpg')
+    assert file_results[0].location is not None
+    assert file_results[0].is_changed
+    assert not file_results[-1].is_changed
+
+
+def test_iter_dir(assets_dir: Path, tmp_path: Path) -> None:
+    """Test AsyncCleaner.iter_dir method in worker processes.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    for image_path in assets_dir.glob('*.jpg'):
+        shutil.copy(image_path, tmp_path)
+
+    async def clean_dir() -> list[Path]:  # noqa: WPS430
+        async with AsyncCleaner(Settings(workers=2)) as cleaner:
+            return [
+                file_result.file_path
+                async for file_result in cleaner.iter_dir(tmp_path)
+                if isinstance(file_result, Ok)
+            ]
+
+    assert sorted(asyncio.run(clean_dir())) == sorted(tmp_path.glob('*.jpg'))
+    for image_path in tmp_path.glob('*.jpg'):  # noqa: WPS440
+        meta_report = audit_image_file(image_path)
+        assert meta_report is not None
+        assert not meta_report.has_meta
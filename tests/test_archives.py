@@ -0,0 +1,226 @@
+"""Tests for archives module."""
+
+import struct
+import tarfile
+from io import BytesIO
+from pathlib import Path
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
+
+import pytest
+
+from image_meta_cleaner import archives
+from image_meta_cleaner.archives import (
+    clean_archive,
+    copy_zip_info,
+    get_member_archive,
+    get_member_path,
+)
+from image_meta_cleaner.audit import audit_image_meta
+from image_meta_cleaner.files_index import FilesIndex
+from image_meta_cleaner.pipeline import process_dir
+from image_meta_cleaner.processing import Err, Ok
+from image_meta_cleaner.scanner import ScanRules
+from image_meta_cleaner.settings import Settings
+
+# Members of test archives in order.
+MEMBER_NAMES = ('photos', 'photos/1.jpg', 'notes.txt', 'photos/4.jpg')
+
+
+def write_archive(archive_path: Path, assets_dir: Path) -> None:
+    """Write zip or tar archive with images and text member.
+
+    Args:
+        archive_path (Path): Archive path.
+        assets_dir (Path): Assets directory path.
+    """
+    members = {
+        'photos/1.jpg': (assets_dir / '1.jpg').read_bytes(),
+        'notes.txt': b'notes',
+        'photos/4.jpg': (assets_dir / '4.jpg').read_bytes(),
+    }
+    if archive_path.suffix == '.zip':
+        with ZipFile(archive_path, 'w', ZIP_DEFLATED) as archive_zip:
+            archive_zip.mkdir('photos')
+            for member_name, member_data in members.items():
+                archive_zip.writestr(member_name, member_data)
+        return
+
+    with tarfile.open(archive_path, 'w') as archive_tar:
+        dir_info = tarfile.TarInfo('photos')
+        dir_info.type = tarfile.DIRTYPE
+        archive_tar.addfile(dir_info)
+        for member_name, member_data in members.items():  # noqa: WPS440
+            member_info = tarfile.TarInfo(member_name)
+            member_info.size = len(member_data)
+            archive_tar.addfile(member_info, BytesIO(member_data))
+
+
+def read_archive(archive_path: Path) -> dict[str, bytes]:
+    """Read members of zip or tar archive.
+
+    Args:
+        archive_path (Path): Archive path.
+
+    Returns:
+        dict[str, bytes]: \
+            Members names without trailing slash and contents in order.
+    """
+    if archive_path.suffix == '.zip':
+        with ZipFile(archive_path) as archive_zip:
+            return {
+                member_name.rstrip('/'): archive_zip.read(member_name)
+                for member_name in archive_zip.namelist()
+            }
+
+    members: dict[str, bytes] = {}
+    with tarfile.open(archive_path) as archive_tar:
+        for member_info in archive_tar:
+            member_file = archive_tar.extractfile(member_info)
+            members[member_info.name] = (
+                member_file.read() if member_file is not None else b''
+            )
+    return members
+
+
+def test_member_path() -> None:
+    """Test pathes of archives members."""
+    member_path = get_member_path(Path('/a/b.zip'), 'c/d.jpg')
+    assert member_path == Path('/a/b.zip!/c/d.jpg')
+    assert get_member_archive(member_path) == Path('/a/b.zip')
+    assert get_member_archive(Path('/a/b!/c.jpg')) is None
+
+
+@pytest.mark.parametrize('archive_name', ['photos.zip', 'photos.tar'])
+def test_clean_archive(
+    archive_name: str,
+    assets_dir: Path,
+    tmp_path: Path,
+) -> None:
+    """Test clean_archive function.
+
+    Args:
+        archive_name (str): Archive file name.
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    archive_path = tmp_path / archive_name
+    write_archive(archive_path, assets_dir)
+    index = FilesIndex()
+    member_results, is_written = clean_archive(archive_path, index)
+    assert is_written
+    assert [
+        member_result.file_path for member_result in member_results
+    ] == [
+        get_member_path(archive_path, 'photos/1.jpg'),
+        get_member_path(archive_path, 'photos/4.jpg'),
+    ]
+    member_result = member_results[0]
+    assert isinstance(member_result, Ok)
+    assert member_result.location is not None
+
+    members = read_archive(archive_path)
+    assert tuple(members) == MEMBER_NAMES
+    assert members['notes.txt'] == b'notes'
+    meta_report = audit_image_meta(members['photos/1.jpg'])
+    assert meta_report is not None
+    assert not meta_report.has_meta
+    assert get_member_path(archive_path, 'photos/1.jpg') in index
+
+    # Cleaned archive is recognized by hash
+    archive_path.touch()
+    assert clean_archive(archive_path, index) == ([], False)
+
+    # Cleaned members are not processed again
+    del index[archive_path]  # noqa: WPS420
+    assert clean_archive(archive_path, index) == ([], False)
+
+
+def test_copy_zip_info() -> None:
+    """Test that zip member attributes are kept except zip64 records."""
+    timestamp_record = struct.pack('<HHBI', 0x5455, 5, 1, 1700000000)
+    owner_record = struct.pack('<HHBBIBI', 0x7875, 11, 1, 4, 1000, 4, 1000)
+    zip64_record = struct.pack('<HHQ', 0x0001, 8, 2 ** 33)
+    member_info = ZipInfo('photos/1.jpg', (2023, 1, 2, 3, 4, 6))
+    member_info.extra = timestamp_record + zip64_record + owner_record
+    member_info.internal_attr = 1
+    member_info.external_attr = 0o100644 << 16
+    member_info.create_version = 30
+
+    target_info = copy_zip_info(member_info)
+    assert target_info.extra == timestamp_record + owner_record
+    assert target_info.internal_attr == 1
+    assert target_info.external_attr == 0o100644 << 16
+    assert target_info.create_version == 30
+    assert target_info.date_time == member_info.date_time
+
+
+def test_process_dir_archives(assets_dir: Path, tmp_path: Path) -> None:
+    """Test processing of archives in directory.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    archive_path = tmp_path / 'photos.zip'
+    write_archive(archive_path, assets_dir)
+    settings = Settings(scan=ScanRules(archives=True))
+    process_dir(tmp_path, settings)
+    locations_info = (tmp_path / 'locations.txt').read_text()
+    assert 'photos.zip!/photos/1.jpg' in locations_info
+
+    # Members of unchanged archive are kept in index
+    process_dir(tmp_path, settings)
+    index = FilesIndex.from_index_file((tmp_path / '.imc').read_text())
+    assert get_member_path(archive_path, 'photos/4.jpg') in index
+
+
+def test_encrypted_archive(assets_dir: Path, tmp_path: Path) -> None:
+    """Test that archive with encrypted members is reported as failed.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    archive_path = tmp_path / 'photos.zip'
+    write_archive(archive_path, assets_dir)
+    # Mark members as encrypted in local and central directory headers
+    archive_data = bytearray(archive_path.read_bytes())
+    for signature, flags_offset in ((b'PK\x03\x04', 6), (b'PK\x01\x02', 8)):
+        header_start = archive_data.find(signature)
+        while header_start >= 0:
+            archive_data[header_start + flags_offset] |= 1
+            header_start = archive_data.find(signature, header_start + 1)
+    archive_path.write_bytes(archive_data)
+
+    member_results, is_written = clean_archive(archive_path, FilesIndex())
+    assert not is_written
+    assert len(member_results) == 1
+    assert isinstance(member_results[0], Err)
+    assert archive_path.read_bytes() == archive_data
+    assert [path.name for path in tmp_path.iterdir()] == ['photos.zip']
+
+
+def test_interrupted_archive(
+    assets_dir: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that temporary file is removed on unexpected errors.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    archive_path = tmp_path / 'photos.zip'
+    write_archive(archive_path, assets_dir)
+    archive_data = archive_path.read_bytes()
+
+    def clean_members(*args: object) -> None:
+        raise MemoryError()
+
+    monkeypatch.setattr(archives, 'clean_zip_archive', clean_members)
+    with pytest.raises(MemoryError):
+        clean_archive(archive_path, FilesIndex())
+    assert archive_path.read_bytes() == archive_data
+    assert [path.name for path in tmp_path.iterdir()] == ['photos.zip']
@@ -0,0 +1,81 @@
+"""Tests for audit module."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from image_meta_cleaner.audit import (
+    MetaReport,
+    audit_image_file,
+    audit_image_meta,
+    build_audit_report,
+)
+from image_meta_cleaner.files_index import get_file_stat
+from image_meta_cleaner.pipeline import audit_dir, process_dir
+from tests.conftest import make_image
+
+
+@pytest.mark.parametrize('image_format', ['PNG', 'WEBP', 'TIFF'])
+def test_audit_image_meta(image_format: str, exif_data: bytes) -> None:
+    """Test audit_image_meta function.
+
+    Args:
+        image_format (str): Pillow format name.
+        exif_data (bytes): EXIF data with GPS info.
+    """
+    report = audit_image_meta(make_image(image_format, exif_data))
+    assert report is not None
+    assert report.image_format == image_format.lower()
+    assert report.exif_size
+    assert report.has_gps
+
+    report = audit_image_meta(make_image(image_format))
+    assert report is not None
+    assert not report.has_gps
+
+    assert audit_image_meta(b'not an image') is None
+
+
+def test_audit_image_file(assets_dir: Path) -> None:
+    """Test audit_image_file function and audit report.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    report = audit_image_file(assets_dir / '1.jpg')
+    assert report == MetaReport('jpeg', exif_size=1242, has_gps=True)
+    assert audit_image_file(assets_dir / '1.json') is None
+    assert build_audit_report([
+        (Path('1.jpg'), report),
+        (Path('1.json'), None),
+    ]).splitlines() == [
+        'path\tformat\texif\tgps\txmp\tiptc\tother\ttotal',
+        '1.jpg\tjpeg\t1242\t1\t0\t0\t0\t1242',
+        '1.json\tunknown',
+    ]
+
+
+def test_skip_images_without_meta(assets_dir: Path, tmp_path: Path) -> None:
+    """Test that images without metadata are audited and not rewritten.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    for image_path in assets_dir.glob('*.jpg'):
+        shutil.copy(image_path, tmp_path)
+    (tmp_path / '.5.jpg.imc-tmp').write_bytes(b'temp')
+    reports = dict(audit_dir(tmp_path))
+    assert len(reports) == 4
+    assert (tmp_path / '.5.jpg.imc-tmp').exists()
+    assert not list(tmp_path.glob('.imc*'))
+
+    no_meta_report = reports[tmp_path / '4.jpg']
+    assert no_meta_report is not None
+    assert not no_meta_report.has_meta
+    no_meta_stat = get_file_stat(tmp_path / '4.jpg')
+    meta_stat = get_file_stat(tmp_path / '1.jpg')
+    process_dir(tmp_path)
+    assert get_file_stat(tmp_path / '4.jpg') == no_meta_stat
+    assert get_file_stat(tmp_path / '1.jpg').inode != meta_stat.inode
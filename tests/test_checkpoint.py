@@ -0,0 +1,134 @@
+"""Tests for checkpoint module."""
+
+import os
+import shutil
+import subprocess  # noqa: S404
+import sys
+from pathlib import Path
+
+from image_meta_cleaner.checkpoint import (
+    CheckpointPolicy,
+    Checkpointer,
+    get_temp_path,
+    write_file_atomically,
+)
+from image_meta_cleaner.files_index import get_file_stat
+from image_meta_cleaner.index_store import get_files_index
+from tests.conftest import TOTAL_IMAGES_COUNT
+
+# Script that processes directory and crashes after writing two images.
+CRASHING_SCRIPT = '''
+import os, sys
+from pathlib import Path
+from image_meta_cleaner import pipeline
+from image_meta_cleaner.checkpoint import CheckpointPolicy
+from image_meta_cleaner.settings import Settings
+
+written_files = []
+original_write_result = pipeline.write_result
+
+def write_result(*args):
+    if len(written_files) == 2:
+        os._exit(1)
+    written_files.append(args[0])
+    return original_write_result(*args)
+
+pipeline.write_result = write_result
+pipeline.process_dir(Path(sys.argv[1]), Settings(
+    checkpoints=CheckpointPolicy(files=1),
+))
+'''
+
+
+def test_write_file_atomically(tmp_path: Path) -> None:
+    """Test write_file_atomically function.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    file_path = tmp_path / 'image.jpg'
+    write_file_atomically(file_path, b'old', sync=True)
+    os.chmod(file_path, 0o600)
+    write_file_atomically(file_path, b'new')
+    assert file_path.read_bytes() == b'new'
+    assert file_path.stat().st_mode & 0o777 == 0o600
+    assert not get_temp_path(file_path).exists()
+
+
+def test_checkpointer(tmp_path: Path) -> None:
+    """Test Checkpointer class.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    saves: list[int] = []
+    checkpointer = Checkpointer(
+        lambda: saves.append(len(saves)),
+        CheckpointPolicy(files=3, seconds=60),
+    )
+    for file_index in range(7):
+        file_path = tmp_path / '{0}.jpg'.format(file_index)
+        file_path.write_bytes(b'data')
+        checkpointer.add_file(file_path, is_written=file_index % 2 == 0)
+    assert len(saves) == 2
+
+    checkpointer.policy.seconds = 0
+    checkpointer.add_file(tmp_path / 'missing.jpg', is_written=True)
+    assert len(saves) == 3
+
+
+def test_checkpointer_growth(tmp_path: Path) -> None:
+    """Test that checkpoints of rewritten state become rarer.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    saves: list[int] = []
+    checkpointer = Checkpointer(
+        lambda: saves.append(len(saves)),
+        CheckpointPolicy(files=10, seconds=60, growth=0.5),
+        lambda: len(saves) * 100,
+    )
+    for _ in range(100):
+        checkpointer.add_file(tmp_path / 'missing.jpg', is_written=False)
+    # Limits of files are 10, 50 and 100
+    assert len(saves) == 2
+
+
+def test_crash_resume(assets_dir: Path, tmp_path: Path) -> None:
+    """Test that processing is resumed after crash.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    for image_path in assets_dir.glob('*.jpg'):
+        shutil.copy(image_path, source)
+    completed_process = subprocess.run(  # noqa: S603
+        [sys.executable, '-c', CRASHING_SCRIPT, str(source)],
+        env={**os.environ, 'PYTHONPATH': str(Path.cwd())},
+        cwd=tmp_path,
+        check=False,
+    )
+    assert completed_process.returncode == 1
+
+    # Two written images are saved in index by checkpoints
+    index = get_files_index(source)
+    assert len(index) == 2
+    for file_path in index:
+        assert index.verify_stat(file_path, get_file_stat(file_path))
+        assert index.verify_file(file_path, file_path.read_bytes())
+
+    subprocess.run(  # noqa: S603
+        [sys.executable, '-m', 'image_meta_cleaner.main', str(source)],
+        env={**os.environ, 'PYTHONPATH': str(Path.cwd())},
+        cwd=tmp_path,
+        input=b'\n',
+        check=True,
+        capture_output=True,
+    )
+    index = get_files_index(source)
+    assert len(index) == TOTAL_IMAGES_COUNT
+    assert 'Processed: 2\t' in (tmp_path / 'imc.log').read_text()
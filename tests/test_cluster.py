@@ -0,0 +1,161 @@
+"""Tests for cluster module."""
+
+import os
+import shutil
+import subprocess  # noqa: S404
+import sys
+import time
+from pathlib import Path
+from typing import Optional
+
+from image_meta_cleaner.audit import audit_image_file
+from image_meta_cleaner.cluster import (
+    DELTAS_DIR_NAME,
+    LEASES_DIR_NAME,
+    process_dir_shared,
+)
+from image_meta_cleaner.index_store import SqliteFilesIndex, get_files_index
+from image_meta_cleaner.leases import ClusterSettings
+from image_meta_cleaner.settings import Settings
+
+# Count of images in shared directory.
+SHARED_IMAGES_COUNT = 24
+
+# Count of shards of shared directory, every shard has images.
+SHARED_SHARDS_COUNT = 3
+
+# Script that processes shared directory as slow node and prints
+# names of processed files. Node with gate file prints ready line
+# and waits for gate file before processing.
+NODE_SCRIPT = '''
+import sys
+import time
+from pathlib import Path
+from image_meta_cleaner import cluster
+from image_meta_cleaner.leases import ClusterSettings
+from image_meta_cleaner.settings import Settings
+
+if len(sys.argv) > 4:
+    print('ready', flush=True)
+    while not Path(sys.argv[4]).exists():
+        time.sleep(0.01)
+
+write_result = cluster.write_result
+
+def write_result_slowly(*args, **kwargs):
+    time.sleep(0.1)
+    return write_result(*args, **kwargs)
+
+cluster.write_result = write_result_slowly
+file_results = cluster.process_dir_shared(
+    Path(sys.argv[1]),
+    Settings(),
+    ClusterSettings(sys.argv[2], shards=int(sys.argv[3]), lease_seconds=1),
+)
+for file_result in file_results:
+    print(file_result.file_path.name)
+'''
+
+
+def start_node(
+    source: Path,
+    node_id: str,
+    gate_path: Optional[Path] = None,
+) -> subprocess.Popen[str]:
+    """Start node processing shared directory.
+
+    Args:
+        source (Path): Shared directory path.
+        node_id (str): Node id.
+        gate_path (Optional[Path]): \
+            File to wait for before processing, after ready line.
+
+    Returns:
+        subprocess.Popen[str]: Node process with output pipe.
+    """
+    node_args = [str(source), node_id, str(SHARED_SHARDS_COUNT)]
+    if gate_path is not None:
+        node_args.append(str(gate_path))
+    return subprocess.Popen(  # noqa: S603
+        [sys.executable, '-c', NODE_SCRIPT, *node_args],
+        env={**os.environ, 'PYTHONPATH': str(Path.cwd())},
+        cwd=source.parent,
+        stdout=subprocess.PIPE,
+        text=True,
+    )
+
+
+def test_process_dir_shared(assets_dir: Path, tmp_path: Path) -> None:
+    """Test processing of directory by several nodes at once.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    source = tmp_path / 'source'
+    source.mkdir()
+    images_names = sorted(
+        '{0}.jpg'.format(image_index)
+        for image_index in range(SHARED_IMAGES_COUNT)
+    )
+    for image_name in images_names:
+        shutil.copy(assets_dir / '1.jpg', source / image_name)
+
+    # Nodes that join later get shards of the first one, they are
+    # started in advance, so they join right after it claims shards
+    gate_path = tmp_path / 'gate'
+    late_nodes = [
+        start_node(source, node_id, gate_path)
+        for node_id in ('second', 'third')
+    ]
+    for late_node in late_nodes:
+        assert late_node.stdout is not None
+        assert late_node.stdout.readline() == 'ready\n'
+    nodes = [start_node(source, 'first'), *late_nodes]
+    leases_dir = source / LEASES_DIR_NAME
+    while not leases_dir.exists() or not list(leases_dir.glob('shard-*')):
+        assert nodes[0].poll() is None
+        time.sleep(0.01)
+    gate_path.touch()
+    nodes_outputs = [node.communicate()[0].split() for node in nodes]
+    assert [node.returncode for node in nodes] == [0, 0, 0]
+    assert all(nodes_outputs)
+
+    # Last node processes files of shards left by others and merges deltas
+    last_results = process_dir_shared(
+        source,
+        Settings(),
+        ClusterSettings('last', shards=SHARED_SHARDS_COUNT),
+    )
+    processed_names = [
+        file_result.file_path.name for file_result in last_results
+    ]
+    for node_output in nodes_outputs:
+        processed_names.extend(node_output)
+    assert sorted(processed_names) == images_names
+    assert not list((source / DELTAS_DIR_NAME).iterdir())
+    assert not list(leases_dir.glob('*.lease'))
+    index = get_files_index(source)
+    assert len(index) == SHARED_IMAGES_COUNT
+    for image_path in index:
+        meta_report = audit_image_file(image_path)
+        assert meta_report is not None
+        assert not meta_report.has_meta
+
+
+def test_process_dir_shared_sqlite(assets_dir: Path, tmp_path: Path) -> None:
+    """Test that node does not lock shared SQLite index.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    shutil.copy(assets_dir / '1.jpg', tmp_path / '1.jpg')
+    shutil.copy(assets_dir / '4.jpg', tmp_path / '4.jpg')
+    settings = Settings(index_backend='sqlite')
+    process_dir_shared(tmp_path, settings, ClusterSettings('solo', shards=4))
+    assert not list((tmp_path / DELTAS_DIR_NAME).iterdir())
+    index = get_files_index(tmp_path, 'sqlite')
+    assert isinstance(index, SqliteFilesIndex)
+    assert len(index) == 2
+    index.close()
@@ -0,0 +1,154 @@
+"""Tests for daemon module."""
+
+import json
+import shutil
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable
+
+import pytest
+
+from image_meta_cleaner.audit import audit_image_file
+from image_meta_cleaner.daemon import Daemon, DaemonRoot, load_daemon_roots
+from image_meta_cleaner.files_index import FilesIndex
+from image_meta_cleaner.pipeline import store_result
+from image_meta_cleaner.processing import InFlightBudget
+from image_meta_cleaner.settings import Settings
+
+
+class RecordingExecutor(ThreadPoolExecutor):
+    """Executor that records pathes of submitted images."""
+
+    def __init__(self) -> None:
+        """Init executor with single thread."""
+        super().__init__(1)
+        self.submitted_paths: list[Path] = []
+
+    def submit(
+        self,
+        fn: Callable[..., Any],
+        /,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Future[Any]:
+        """Record image path and submit job.
+
+        Args:
+            fn (Callable[..., Any]): Job function.
+            args (Any): Job arguments starting with image path.
+            kwargs (Any): Job keyword arguments.
+
+        Returns:
+            Future[Any]: Job future.
+        """
+        self.submitted_paths.append(args[0])
+        return super().submit(fn, *args, **kwargs)
+
+
+def make_root(source: Path, image_path: Path, count: int) -> Path:
+    """Fill root directory with copies of image.
+
+    Args:
+        source (Path): Root directory path.
+        image_path (Path): Copied image path.
+        count (int): Count of copies.
+
+    Returns:
+        Path: Root directory path.
+    """
+    source.mkdir()
+    for copy_index in range(count):
+        shutil.copy(image_path, source / '{0}.jpg'.format(copy_index))
+    return source
+
+
+def test_daemon_roots(assets_dir: Path, tmp_path: Path) -> None:
+    """Test that roots share workers in proportion to priorities.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    image_path = assets_dir / '1.jpg'
+    roots = [
+        DaemonRoot(make_root(tmp_path / 'high', image_path, 8), priority=2),
+        DaemonRoot(make_root(tmp_path / 'low', image_path, 8)),
+    ]
+    settings = Settings(budget=InFlightBudget(max_files=1))
+    with RecordingExecutor() as executor:
+        Daemon(roots, settings, executor).run(once=True)
+
+    high_count = sum(
+        file_path.parent.name == 'high'
+        for file_path in executor.submitted_paths[:9]
+    )
+    assert high_count == 6
+    for root in roots:
+        index = FilesIndex.from_index_file((root.source / '.imc').read_text())
+        assert len(index) == 8
+        meta_report = audit_image_file(root.source / '0.jpg')
+        assert meta_report is not None
+        assert not meta_report.has_meta
+
+
+def test_daemon_root_error(
+    assets_dir: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that error of root does not stop other roots.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    def store_failing_result(file_path: Path, *args: Any) -> Any:
+        if file_path.parent.name == 'failing':
+            raise OSError('Disk is full')
+        return store_result(file_path, *args)
+
+    monkeypatch.setattr(
+        'image_meta_cleaner.daemon.store_result',
+        store_failing_result,
+    )
+    image_path = assets_dir / '1.jpg'
+    broken_source = make_root(tmp_path / 'broken', image_path, 1)
+    (broken_source / '.imc').mkdir()
+    roots = [
+        DaemonRoot(make_root(tmp_path / 'failing', image_path, 4)),
+        DaemonRoot(broken_source),
+        DaemonRoot(make_root(tmp_path / 'good', image_path, 4)),
+    ]
+    with ThreadPoolExecutor(1) as executor:
+        Daemon(roots, executor=executor).run(once=True)
+
+    for root_name, indexed_count in (('failing', 0), ('good', 4)):
+        index_path = tmp_path / root_name / '.imc'
+        index = FilesIndex.from_index_file(index_path.read_text())
+        assert len(index) == indexed_count
+
+
+def test_load_daemon_roots(tmp_path: Path) -> None:
+    """Test load_daemon_roots function.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    config_path = tmp_path / 'roots.json'
+    config_path.write_text(json.dumps({'roots': [
+        {'source': 'a', 'priority': 3, 'exclude': ['raw']},
+        {'source': '/b', 'delay': 5, 'hash': 'blake2b'},
+    ]}))
+    first_root, second_root = load_daemon_roots(config_path, delay=30)
+    assert first_root.source == tmp_path / 'a'
+    assert first_root.priority == 3
+    assert first_root.delay == 30
+    assert first_root.settings.scan.exclude == ('raw',)
+    assert second_root.source == Path('/b')
+    assert second_root.delay == 5
+    assert second_root.settings.hash_algorithm == 'blake2b'
+
+    config_path.write_text(json.dumps([{'source': 'a', 'index': 'csv'}]))
+    with pytest.raises(ValueError, match='index backend'):
+        load_daemon_roots(config_path)
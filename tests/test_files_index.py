@@ -0,0 +1,138 @@
+"""Tests for files index module."""
+
+import hashlib
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+
+from image_meta_cleaner import processing
+from image_meta_cleaner.files_index import (
+    HASH_CHUNK_SIZE,
+    FilesIndex,
+    FileStat,
+    get_file_stat,
+    get_hash_algorithm,
+    hash_file_data,
+    hash_file_stream,
+)
+
+
+def test_verify_stat(assets_dir: Path) -> None:
+    """Test FilesIndex stat info verification.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    image_path = assets_dir / '1.jpg'
+    image_stat = get_file_stat(image_path)
+    index = FilesIndex()
+    assert not index.verify_stat(image_path, image_stat)
+
+    index.add_file(image_path, image_path.read_bytes(), image_stat)
+    assert index.verify_stat(image_path, image_stat)
+    assert not index.verify_stat(
+        image_path,
+        image_stat._replace(mtime_ns=image_stat.mtime_ns + 1),
+    )
+
+    # hash update resets stat info
+    index[image_path] = 'None'
+    assert index.get_stat(image_path) is None
+    assert not index.verify_stat(image_path, image_stat)
+
+
+def test_index_file(assets_dir: Path) -> None:
+    """Test building and reading of index file.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    index = FilesIndex({assets_dir / '1.jpg': hash_file_data(b'1')})
+    index[assets_dir / '2.jpg'] = hash_file_data(b'2')
+    index.set_stat(assets_dir / '2.jpg', FileStat(1, 2, 3))
+
+    restored_index = FilesIndex.from_index_file(index.build_index_file())
+    assert dict(restored_index) == dict(index)
+    assert restored_index.get_stat(assets_dir / '1.jpg') is None
+    assert restored_index.get_stat(assets_dir / '2.jpg') == FileStat(1, 2, 3)
+
+    # index files without stat info are supported
+    old_index_file = (assets_dir / '.imc').read_text()
+    assert len(FilesIndex.from_index_file(old_index_file)) == 2
+
+
+def test_hash_algorithms(
+    assets_dir: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test hashing with selectable algorithms.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    file_data = bytes(range(256)) * (HASH_CHUNK_SIZE // 100)
+    sha256_hash = hash_file_data(file_data)
+    blake2b_hash = hash_file_data(file_data, 'blake2b')
+    assert sha256_hash == hashlib.sha256(file_data).hexdigest()
+    assert blake2b_hash.startswith('blake2b:')
+    assert get_hash_algorithm(sha256_hash) == 'sha256'
+    assert get_hash_algorithm(blake2b_hash) == 'blake2b'
+    assert hash_file_stream(BytesIO(file_data), 'blake2b') == blake2b_hash
+
+    # files indexed with other algorithm are verified with it
+    image_path = tmp_path / '1.jpg'
+    image_path.write_bytes((assets_dir / '1.jpg').read_bytes())
+    index = FilesIndex()
+    image_data = image_path.read_bytes()
+    index.add_file(image_path, image_data, hash_algorithm='blake2b')
+    assert index.verify_file(image_path, image_data)
+    assert processing.process_image_file(image_path, index[image_path]) is None
+
+    # large files are hashed by chunks without reading
+    monkeypatch.setattr(processing, 'STREAMED_HASH_MIN_SIZE', 0)
+    assert processing.process_image_file(image_path, index[image_path]) is None
+    assert processing.process_image_file(image_path, sha256_hash) is not None
+    assert not index.verify_file(image_path, b'changed')
+    restored_index = FilesIndex.from_index_file(index.build_index_file())
+    assert restored_index[image_path] == index[image_path]
+
+
+def test_compact_storage(tmp_path: Path) -> None:
+    """Test hashes and stat info stored in index buffers.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    files_hashes = {
+        tmp_path / 'a.jpg': hash_file_data(b'a'),
+        tmp_path / 'b.jpg': hash_file_data(b'b', 'blake2b'),
+        tmp_path / 'sub' / 'c.jpg': 'None',
+        tmp_path / 'sub' / 'd.jpg': 'sha256:{0}'.format('AB' * 32),
+        tmp_path / 'e.jpg': 'md5:{0}'.format('ab' * 64),
+    }
+    index = FilesIndex(files_hashes)
+    assert dict(index) == files_hashes
+    index.set_stat(tmp_path / 'a.jpg', FileStat(1, -2, 2 ** 64 - 1))
+    assert index.get_stat(tmp_path / 'a.jpg') == FileStat(1, -2, 2 ** 64 - 1)
+
+    # slots of removed files are reused without stale data
+    del index[tmp_path / 'a.jpg']  # noqa: WPS420
+    index[tmp_path / 'f.jpg'] = 'None'
+    assert index.get_stat(tmp_path / 'f.jpg') is None
+    assert index[tmp_path / 'f.jpg'] == 'None'
+    assert tmp_path / 'a.jpg' not in index
+    assert len(index) == len(files_hashes)
+
+    # directories records are kept while they have files or mtime
+    index.set_dir_mtime(tmp_path / 'sub', 1)
+    del index[tmp_path / 'sub' / 'c.jpg']  # noqa: WPS420
+    del index[tmp_path / 'sub' / 'd.jpg']  # noqa: WPS420
+    assert list(index.iter_dirs()) == [tmp_path / 'sub']
+    index.set_dir_mtime(tmp_path / 'sub', None)
+    assert not list(index.iter_dirs())
+    restored_index = FilesIndex.from_index_file(index.build_index_file())
+    assert dict(restored_index) == dict(index)
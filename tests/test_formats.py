@@ -0,0 +1,143 @@
+"""Tests for image formats package."""
+
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from PIL.Image import new as new_image
+from PIL.Image import open as open_image
+
+from image_meta_cleaner.formats.jpeg import iter_segments, strip_jpeg_meta
+from image_meta_cleaner.formats.png import iter_chunks as iter_png_chunks
+from image_meta_cleaner.formats.png import strip_png_meta
+from image_meta_cleaner.formats.tiff import strip_tiff_meta
+from image_meta_cleaner.formats.webp import iter_chunks as iter_webp_chunks
+from image_meta_cleaner.formats.webp import strip_webp_meta
+from tests.conftest import make_image
+
+
+def test_strip_jpeg_meta(assets_dir: Path) -> None:
+    """Test strip_jpeg_meta function.
+
+    Args:
+        assets_dir (Path): Path to assets directory.
+    """
+    image_data = (assets_dir / '1.jpg').read_bytes()
+    no_meta_image_data = strip_jpeg_meta(image_data)
+    markers = [marker for marker, _, _ in iter_segments(no_meta_image_data)]
+    assert 0xE1 not in markers
+    assert 0xE0 in markers
+    assert len(no_meta_image_data) < len(image_data)
+
+    # comments and fill bytes before markers are removed
+    image_data = b''.join((
+        image_data[:2],
+        b'\xff\xff\xfe\x00\x06test',
+        image_data[2:],
+    ))
+    assert strip_jpeg_meta(image_data) == no_meta_image_data
+
+    # appended images with their own metadata are dropped
+    appended_image_data = b''.join((
+        (assets_dir / '4.jpg').read_bytes(),
+        (assets_dir / '1.jpg').read_bytes(),
+    ))
+    no_meta_image_data = strip_jpeg_meta(appended_image_data)
+    assert no_meta_image_data.endswith(b'\xff\xd9')
+    assert b'Exif' not in no_meta_image_data
+    assert no_meta_image_data == strip_jpeg_meta(
+        (assets_dir / '4.jpg').read_bytes(),
+    )
+
+    with pytest.raises(ValueError, match='Not a JPEG'):
+        strip_jpeg_meta(b'not a jpeg')
+
+    with pytest.raises(ValueError, match='Invalid segment size'):
+        strip_jpeg_meta(image_data[:100])
+
+
+def test_strip_progressive_jpeg_meta() -> None:
+    """Test strip_jpeg_meta function with segments between scans."""
+    image_buffer = BytesIO()
+    image = new_image('RGB', (64, 48), (10, 200, 30))
+    image.save(image_buffer, 'JPEG', progressive=True)
+    image_data = image_buffer.getvalue()
+    scans_starts = [
+        start
+        for marker, start, _ in iter_segments(image_data, scans=True)
+        if marker == 0xDA
+    ]
+    assert len(scans_starts) > 1
+
+    second_scan_start = scans_starts[1]
+    commented_image_data = b''.join((
+        image_data[:second_scan_start],
+        b'\xff\xfe\x00\x06test\xff\xe1\x00\x0aExif\x00\x00ab',
+        image_data[second_scan_start:],
+    ))
+    no_meta_image_data = strip_jpeg_meta(commented_image_data)
+    assert no_meta_image_data == strip_jpeg_meta(image_data)
+    assert open_image(BytesIO(no_meta_image_data)).size == image.size
+
+
+def test_strip_png_meta(exif_data: bytes) -> None:
+    """Test strip_png_meta function.
+
+    Args:
+        exif_data (bytes): EXIF data with GPS info.
+    """
+    image_data = make_image('PNG', exif_data)
+    no_meta_image_data = strip_png_meta(image_data)
+    chunks_types = {
+        chunk_type for chunk_type, _, _ in iter_png_chunks(no_meta_image_data)
+    }
+    assert b'eXIf' not in chunks_types
+    assert b'IDAT' in chunks_types
+
+    image = open_image(BytesIO(no_meta_image_data))
+    assert not len(image.getexif())
+    assert image.tobytes() == open_image(BytesIO(image_data)).tobytes()
+
+    with pytest.raises(ValueError, match='Image trailer not found'):
+        strip_png_meta(image_data[:40])
+
+
+def test_strip_webp_meta(exif_data: bytes) -> None:
+    """Test strip_webp_meta function.
+
+    Args:
+        exif_data (bytes): EXIF data with GPS info.
+    """
+    image_data = make_image('WEBP', exif_data)
+    no_meta_image_data = strip_webp_meta(image_data)
+    fourccs = [
+        fourcc for fourcc, _, _ in iter_webp_chunks(no_meta_image_data)
+    ]
+    assert b'EXIF' not in fourccs
+    assert no_meta_image_data[20] & 0x08 == 0
+
+    image = open_image(BytesIO(no_meta_image_data))
+    assert not len(image.getexif())
+    assert image.tobytes() == open_image(BytesIO(image_data)).tobytes()
+
+
+def test_strip_tiff_meta(exif_data: bytes) -> None:
+    """Test strip_tiff_meta function.
+
+    Args:
+        exif_data (bytes): EXIF data with GPS info.
+    """
+    image_data = make_image('TIFF', exif_data)
+    no_meta_image_data = strip_tiff_meta(image_data)
+    assert len(no_meta_image_data) == len(image_data)
+    assert b'Xiaomi' in image_data
+    assert b'Xiaomi' not in no_meta_image_data
+
+    image = open_image(BytesIO(no_meta_image_data))
+    exif = image.getexif()
+    assert 0x8825 not in exif
+    assert 0x8769 not in exif
+    assert image.tobytes() == open_image(BytesIO(image_data)).tobytes()
+
+    with pytest.raises(ValueError, match='out of file'):
+        strip_tiff_meta(image_data[:100])
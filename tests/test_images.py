@@ -3,9 +3,16 @@
 from io import BytesIO
 from pathlib import Path
 
+import pytest
 from PIL.Image import open as open_image
 
-from image_meta_cleaner.images import get_image_without_meta, is_image
+from image_meta_cleaner.images import (
+    get_image_without_meta,
+    is_image,
+    split_image_meta,
+    split_image_meta_parts,
+)
+from tests.conftest import make_image
 
 
 def test_is_image(assets_dir: Path) -> None:
@@ -33,3 +40,45 @@ def test_get_image_without_meta(assets_dir: Path) -> None:
 
     image = open_image(BytesIO(no_meta_image_data))
     assert not len(image.getexif())
+
+
+def test_get_image_without_meta_lossless(assets_dir: Path) -> None:
+    """Test that JPEG metadata is stripped without re-encoding.
+
+    Args:
+        assets_dir (Path): Path to assets directory.
+    """
+    image_data = (assets_dir / '1.jpg').read_bytes()
+    no_meta_image_data = get_image_without_meta(image_data)
+    assert b'Exif\x00\x00' not in no_meta_image_data
+    assert image_data.endswith(no_meta_image_data[-100000:])
+
+    image = open_image(BytesIO(no_meta_image_data))
+    source_image = open_image(BytesIO(image_data))
+    assert image.tobytes() == source_image.tobytes()
+    assert image.info.get('icc_profile') == source_image.info['icc_profile']
+
+    # image without metadata is not changed
+    image_data = (assets_dir / '4.jpg').read_bytes()
+    assert get_image_without_meta(image_data) == image_data
+
+
+@pytest.mark.parametrize('image_format', ['JPEG', 'PNG', 'WEBP', 'TIFF'])
+def test_split_image_meta_unchanged(
+    image_format: str,
+    exif_data: bytes,
+) -> None:
+    """Test that images without metadata are returned as is.
+
+    Args:
+        image_format (str): Format of image.
+        exif_data (bytes): EXIF data with GPS info.
+    """
+    image_data = make_image(image_format, exif_data)
+    no_meta_image_data, exif = split_image_meta(image_data)
+    assert no_meta_image_data != image_data
+    assert exif
+
+    assert split_image_meta(no_meta_image_data) == (no_meta_image_data, b'')
+    assert split_image_meta(no_meta_image_data)[0] is no_meta_image_data
+    assert split_image_meta_parts(no_meta_image_data) == (None, b'')
@@ -0,0 +1,83 @@
+"""Tests for index store module."""
+
+from pathlib import Path
+
+import pytest
+
+from image_meta_cleaner.files_index import FilesIndex, FileStat
+from image_meta_cleaner.index_store import (
+    SqliteFilesIndex,
+    close_files_index,
+    get_files_index,
+    save_files_index,
+)
+
+
+def test_sqlite_files_index(tmp_path: Path) -> None:
+    """Test SqliteFilesIndex mapping interface and persistence.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    database_path = tmp_path / 'index.sqlite'
+    index = SqliteFilesIndex(database_path)
+    index[tmp_path / '1.jpg'] = 'hash1'
+    index[tmp_path / '2.jpg'] = 'hash2'
+    index.set_stat(tmp_path / '2.jpg', FileStat(1, 2, 3))
+    assert len(index) == 2
+    assert tmp_path / '1.jpg' in index
+    assert index.verify_stat(tmp_path / '2.jpg', FileStat(1, 2, 3))
+
+    del index[tmp_path / '1.jpg']  # noqa: WPS420
+    with pytest.raises(KeyError):
+        index.set_stat(tmp_path / '1.jpg', FileStat(1, 2, 3))
+    index.close()
+
+    restored_index = SqliteFilesIndex(database_path)
+    assert dict(restored_index) == {tmp_path / '2.jpg': 'hash2'}
+    assert restored_index.get_stat(tmp_path / '2.jpg') == FileStat(1, 2, 3)
+
+    # hash update resets stat info
+    restored_index[tmp_path / '2.jpg'] = 'hash3'
+    assert restored_index.get_stat(tmp_path / '2.jpg') is None
+    restored_index.close()
+
+
+def test_sqlite_index_import(tmp_path: Path) -> None:
+    """Test that SQLite index is created from text index file.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    text_index = FilesIndex({tmp_path / '1.jpg': 'hash1'})
+    text_index.set_stat(tmp_path / '1.jpg', FileStat(1, 2, 3))
+    save_files_index(tmp_path, text_index)
+
+    index = get_files_index(tmp_path, 'sqlite')
+    assert isinstance(index, SqliteFilesIndex)
+    assert index.build_index_file() == text_index.build_index_file()
+    index.close()
+
+    with pytest.raises(ValueError, match='Unknown index backend'):
+        get_files_index(tmp_path, 'csv')
+
+
+@pytest.mark.parametrize('backend', ['text', 'sqlite'])
+def test_prune(tmp_path: Path, backend: str) -> None:
+    """Test that files that were not found are removed from index.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+        backend (str): Index backend.
+    """
+    index = get_files_index(tmp_path, backend)
+    for file_name in ('1.jpg', '2.jpg', 'sub/3.jpg', 'sub/4.jpg'):
+        index[tmp_path / file_name] = 'hash'
+    index.set_dir_mtime(tmp_path / 'sub', 1)
+    index.prune({tmp_path / '1.jpg', tmp_path / 'sub' / '4.jpg'})
+    assert sorted(index) == [tmp_path / '1.jpg', tmp_path / 'sub' / '4.jpg']
+    assert index.get_dir_mtime(tmp_path / 'sub') == 1
+
+    index.prune(set())
+    assert not len(index)
+    close_files_index(index)
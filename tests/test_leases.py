@@ -0,0 +1,33 @@
+"""Tests for leases module."""
+
+import json
+from pathlib import Path
+
+from image_meta_cleaner.leases import LeaseDir
+
+
+def test_lease_dir(tmp_path: Path) -> None:
+    """Test that lease is held by one node until it expires.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    first_node = LeaseDir(tmp_path, 'first', lease_seconds=60)
+    second_node = LeaseDir(tmp_path, 'second', lease_seconds=60)
+    assert first_node.acquire('shard-1')
+    assert not second_node.acquire('shard-1')
+    assert second_node.count_alive('shard-') == 1
+
+    # Expired lease is taken over and dropped by its previous holder
+    lease_path = tmp_path / 'shard-1.lease'
+    lease_path.write_text(json.dumps({'node': 'first', 'expires': 0}))
+    assert second_node.acquire('shard-1')
+    first_node.held['shard-1'] = 0
+    first_node.renew()
+    assert 'shard-1' not in first_node.held
+    first_node.release('shard-1')
+    assert lease_path.exists()
+
+    second_node.release('shard-1')
+    assert not lease_path.exists()
+    assert first_node.acquire('shard-1')
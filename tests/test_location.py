@@ -3,7 +3,14 @@
 import json
 from pathlib import Path
 
-from image_meta_cleaner.location import Location, get_file_gps_location
+import pytest
+
+from image_meta_cleaner.location import (
+    Location,
+    get_exif_gps_location,
+    get_file_gps_location,
+)
+from tests.conftest import make_image
 
 
 def get_location_from_json(path: Path) -> Location:
@@ -41,3 +48,34 @@ def test_get_file_gps_location(assets_dir: Path) -> None:
     image_path = assets_dir / '4.jpg'
     image_data = image_path.read_bytes()
     assert get_file_gps_location(image_data) is None
+
+
+@pytest.mark.parametrize('image_format', ['JPEG', 'PNG', 'WEBP', 'TIFF'])
+def test_get_file_gps_location_formats(
+    assets_dir: Path,
+    exif_data: bytes,
+    image_format: str,
+) -> None:
+    """Test that GPS location is read from EXIF of all supported formats.
+
+    Args:
+        assets_dir (Path): Path to the `assets` directory.
+        exif_data (bytes): EXIF data with GPS info.
+        image_format (str): Pillow format name.
+    """
+    correct_location = get_location_from_json(assets_dir / '1.json')
+    image_data = make_image(image_format, exif_data)
+    assert get_file_gps_location(image_data) == correct_location
+    assert get_file_gps_location(make_image(image_format)) is None
+
+
+def test_get_exif_gps_location(exif_data: bytes) -> None:
+    """Test get_exif_gps_location function.
+
+    Args:
+        exif_data (bytes): EXIF data with GPS info.
+    """
+    exif_data = exif_data.removeprefix(b'Exif\x00\x00')
+    assert get_exif_gps_location(exif_data) is not None
+    assert get_exif_gps_location(b'') is None
+    assert get_exif_gps_location(exif_data[:20]) is None
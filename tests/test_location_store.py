@@ -0,0 +1,144 @@
+"""Tests for location store module."""
+
+import csv
+import json
+import math
+import random
+from pathlib import Path
+
+from image_meta_cleaner.location import Location
+from image_meta_cleaner.location_store import (
+    LocationStore,
+    export_locations,
+    get_location_store,
+)
+
+
+def get_distance(first: Location, second: Location) -> float:
+    """Get great-circle distance between locations with haversine formula.
+
+    Args:
+        first (Location): First location.
+        second (Location): Second location.
+
+    Returns:
+        float: Distance in radians.
+    """
+    first_lat = math.radians(first.latitude)
+    second_lat = math.radians(second.latitude)
+    haversine = (
+        math.sin((second_lat - first_lat) / 2) ** 2
+        + math.cos(first_lat) * math.cos(second_lat)
+        * math.sin(math.radians(second.longitude - first.longitude) / 2) ** 2
+    )
+    return 2 * math.asin(math.sqrt(haversine))
+
+
+def test_location_store(tmp_path: Path) -> None:
+    """Test LocationStore persistence.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    store = get_location_store(tmp_path)
+    store.add(tmp_path / '1.jpg', 'hash1', Location(10, 20))
+    store.add(tmp_path / '2.jpg', 'hash2', Location(-10, -20))
+    store.add(tmp_path / '3.jpg', 'hash3', None)
+    store.save()
+    assert len(store) == 2
+
+    # Update, removal and pruning are appended to file
+    store = get_location_store(tmp_path)
+    store.add(tmp_path / '1.jpg', 'hash4', Location(11, 21))
+    store.remove(tmp_path / '2.jpg')
+    store.add(tmp_path / '5.jpg', 'hash5', Location(0, 0))
+    store.prune({(tmp_path / '1.jpg').absolute()})
+    store.save()
+
+    store = get_location_store(tmp_path)
+    assert len(store) == 1
+    assert tmp_path / '2.jpg' not in store
+    record = store.get(tmp_path / '1.jpg')
+    assert record is not None
+    assert record.file_hash == 'hash4'
+    assert record.location == Location(11, 21)
+
+    # Last record was cut while appending
+    store_path = tmp_path / '.imc.locations'
+    store_path.write_bytes(store_path.read_bytes()[:-3])
+    store = get_location_store(tmp_path)
+    assert len(store) == 0
+    store.add(tmp_path / '6.jpg', 'hash6', Location(1, 2))
+    store.save()
+    assert len(get_location_store(tmp_path)) == 1
+
+    # Paths too long for record header are skipped
+    long_path = tmp_path / '{0}.jpg'.format('a' * 70000)
+    store.add(long_path, 'hash7', Location(3, 4))
+    store.add(tmp_path / '8.jpg', 'hash8', Location(5, 6))
+    store.save()
+    store = get_location_store(tmp_path)
+    assert len(store) == 2
+    assert long_path not in store
+
+
+def test_location_store_queries() -> None:
+    """Test LocationStore bounding box and nearest neighbour queries."""
+    rng = random.Random(0)
+    store = LocationStore()
+    for file_index in range(500):
+        store.add(
+            Path('{0}.jpg'.format(file_index)),
+            str(file_index),
+            Location(rng.uniform(-90, 90), rng.uniform(-180, 180)),
+        )
+    records = list(store)
+
+    in_box = store.query_bbox(-10, -30, 20, 40)
+    expected_in_box = [
+        record
+        for record in records
+        if -10 <= record.location.latitude <= 20
+        and -30 <= record.location.longitude <= 40
+    ]
+    assert sorted(record.file_hash for record in in_box) == sorted(
+        record.file_hash for record in expected_in_box
+    )
+    assert len(store.query_bbox(-90, -180, 90, 180)) == len(records)
+
+    nearest = store.nearest(89, 179, count=5)
+    assert len(nearest) == 5
+    distances = [distance for _, distance in nearest]
+    assert distances == sorted(distances)
+
+    # Nearest neighbours match brute force search
+    brute_force = sorted(
+        records,
+        key=lambda record: get_distance(record.location, Location(89, 179)),
+    )
+    assert [record for record, _ in nearest] == brute_force[:5]
+    store.remove(brute_force[0].file_path)
+    assert store.nearest(89, 179)[0][0] == brute_force[1]
+
+
+def test_export_locations(tmp_path: Path) -> None:
+    """Test export_locations function.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    store = get_location_store(tmp_path)
+    store.add(tmp_path / '1.jpg', 'hash1', Location(10, 20))
+    store.save()
+
+    csv_path = tmp_path / 'locations.csv'
+    assert export_locations(tmp_path, csv_path) == 1
+    with open(csv_path, newline='') as csv_file:
+        rows = list(csv.DictReader(csv_file))
+    assert rows[0]['hash'] == 'hash1'
+    assert float(rows[0]['latitude']) == 10
+
+    geojson_path = tmp_path / 'locations.geojson'
+    assert export_locations(tmp_path, geojson_path) == 1
+    feature = json.loads(geojson_path.read_text())['features'][0]
+    assert feature['geometry']['coordinates'] == [20, 10]
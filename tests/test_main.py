@@ -0,0 +1,24 @@
+"""Tests for main module."""
+
+from pathlib import Path
+
+import pytest
+
+from benchmarks.startup import get_imported_heavy_modules
+from image_meta_cleaner.main import parse_args
+
+
+def test_lazy_imports(tmp_path: Path) -> None:
+    """Test that entry point does not import heavy modules at startup.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    assert not get_imported_heavy_modules(tmp_path)
+
+
+def test_parse_daemon_args() -> None:
+    """Test that daemon does not ignore source and delay arguments."""
+    assert parse_args(['--daemon', 'imc.json']).daemon == Path('imc.json')
+    with pytest.raises(SystemExit):
+        parse_args(['--daemon', 'imc.json', 'photos', '30'])
@@ -0,0 +1,108 @@
+"""Tests for metrics module."""
+
+import json
+from pathlib import Path
+
+from image_meta_cleaner.files_index import FilesIndex, get_file_stat
+from image_meta_cleaner.metrics import (
+    LATENCY_BUCKETS,
+    STAGES,
+    Metrics,
+    MetricsRecorder,
+    build_prometheus_text,
+)
+from image_meta_cleaner.processing import iter_processed_image_files
+from tests.conftest import TOTAL_IMAGES_COUNT
+
+
+def test_metrics() -> None:
+    """Test Metrics class."""
+    metrics = Metrics()
+    metrics.observe('read', 0.0002, 100)
+    metrics.observe('read', 10, 50)
+    with metrics.measure('write', 10):
+        metrics.observe('strip', 0)
+
+    read_metrics = metrics.stages['read']
+    assert read_metrics.count == 2
+    assert read_metrics.bytes == 150
+    assert read_metrics.buckets[1] == 1
+    assert read_metrics.buckets[len(LATENCY_BUCKETS)] == 1
+    assert metrics.stages['write'].count == 1
+    assert metrics.stages['strip'].buckets[0] == 1
+
+    other_metrics = Metrics()
+    other_metrics.merge(metrics)
+    other_metrics.merge(metrics)
+    assert other_metrics.stages['read'].count == 4
+    assert other_metrics.stages['read'].buckets[1] == 2
+    assert other_metrics.stages['write'].bytes == 20
+
+
+def test_build_prometheus_text() -> None:
+    """Test build_prometheus_text function."""
+    metrics = Metrics()
+    metrics.observe('hash', 0.003, 1024)
+    metrics.observe('hash', 0.2, 1024)
+    text = build_prometheus_text(metrics)
+    assert 'imc_stage_seconds_bucket{stage="hash",le="0.001"} 0' in text
+    assert 'imc_stage_seconds_bucket{stage="hash",le="0.005"} 1' in text
+    assert 'imc_stage_seconds_bucket{stage="hash",le="+Inf"} 2' in text
+    assert 'imc_stage_seconds_count{stage="hash"} 2' in text
+    assert 'imc_stage_bytes_total{stage="hash"} 2048' in text
+
+
+def test_metrics_recorder(tmp_path: Path) -> None:
+    """Test MetricsRecorder class.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    metrics = Metrics()
+    metrics.observe('scan', 0.1)
+
+    jsonl_path = tmp_path / 'metrics.jsonl'
+    recorder = MetricsRecorder(jsonl_path, 'jsonl')
+    recorder.record('dir', metrics)
+    recorder.record('paths', metrics)
+    records = [
+        json.loads(line)
+        for line in jsonl_path.read_text().splitlines()
+    ]
+    assert [record['cycle'] for record in records] == ['dir', 'paths']
+    assert records[1]['scan']['count'] == 1
+
+    prometheus_path = tmp_path / 'imc.prom'
+    recorder = MetricsRecorder(prometheus_path, 'prometheus')
+    recorder.record('dir', metrics)
+    recorder.record('dir', metrics)
+    # Prometheus textfile contains totals of all cycles
+    text = prometheus_path.read_text()
+    assert 'imc_stage_seconds_count{stage="scan"} 2' in text
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_workers_metrics(assets_dir: Path) -> None:
+    """Test that metrics of worker processes are collected.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    image_files = [
+        (file_path, get_file_stat(file_path))
+        for file_path in sorted(assets_dir.glob('*.jpg'))
+    ]
+    for workers in (1, 2):
+        metrics = Metrics()
+        for _ in iter_processed_image_files(
+            image_files,
+            FilesIndex(),
+            workers,
+            metrics=metrics,
+        ):
+            assert set(metrics.stages) == set(STAGES)
+        assert metrics.stages['read'].count == TOTAL_IMAGES_COUNT
+        assert metrics.stages['strip'].count == TOTAL_IMAGES_COUNT
+        assert metrics.stages['read'].bytes == sum(
+            file_stat.size for _, file_stat in image_files
+        )
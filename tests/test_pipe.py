@@ -0,0 +1,45 @@
+"""Tests for pipe module."""
+
+from io import BytesIO
+from pathlib import Path
+
+from image_meta_cleaner.audit import audit_image_meta
+from image_meta_cleaner.pipe import clean_stream, iter_separated_paths
+from image_meta_cleaner.processing import Err, ImageLimits, Ok
+from image_meta_cleaner.settings import Settings
+
+
+def test_clean_stream(assets_dir: Path) -> None:
+    """Test clean_stream function.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    image_data = (assets_dir / '1.jpg').read_bytes()
+    output_stream = BytesIO()
+    file_result = clean_stream(BytesIO(image_data), output_stream)
+    assert isinstance(file_result, Ok)
+    assert file_result.location is not None
+    meta_report = audit_image_meta(output_stream.getvalue())
+    assert meta_report is not None
+    assert not meta_report.has_meta
+
+    # Nothing is written for oversized image
+    output_stream = BytesIO()
+    file_result = clean_stream(
+        BytesIO(image_data),
+        output_stream,
+        Settings(limits=ImageLimits(max_bytes=1024)),
+    )
+    assert isinstance(file_result, Err)
+    assert not output_stream.getvalue()
+
+
+def test_iter_separated_paths() -> None:
+    """Test iter_separated_paths function."""
+    paths_data = b'a.jpg\x00dir/b c.jpg\x00\x00\xff.jpg'
+    assert list(iter_separated_paths(BytesIO(paths_data))) == [
+        Path('a.jpg'),
+        Path('dir/b c.jpg'),
+        Path(b'\xff.jpg'.decode(errors='surrogateescape')),
+    ]
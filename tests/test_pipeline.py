@@ -0,0 +1,61 @@
+"""Tests for pipeline module."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+
+from image_meta_cleaner import pipeline
+from image_meta_cleaner.pipeline import process_dir, process_paths
+from image_meta_cleaner.settings import Settings
+
+
+def test_process_paths(
+    assets_dir: Path,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """Test that only existing scanned images are processed.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+        monkeypatch (pytest.MonkeyPatch): Pytest monkeypatch fixture.
+    """
+    image_path = tmp_path / '1.jpg'
+    shutil.copy(assets_dir / '1.jpg', image_path)
+    (tmp_path / 'dir.jpg').mkdir()
+    changed_paths = [
+        image_path,
+        tmp_path / 'missing.jpg',
+        tmp_path / 'dir.jpg',
+        tmp_path / '.imc',
+        tmp_path / 'locations.txt',
+    ]
+    processing_results = process_paths(tmp_path, changed_paths)
+    assert [result.file_path for result in processing_results] == [
+        image_path,
+    ]
+    # Cleaned image is unchanged and index is not loaded without images
+    assert not process_paths(tmp_path, changed_paths)
+    monkeypatch.setattr(pipeline, 'get_files_index', None)
+    assert not process_paths(tmp_path, changed_paths[1:])
+
+
+def test_sqlite_index_closed(assets_dir: Path, tmp_path: Path) -> None:
+    """Test that SQLite index is closed after processing.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    shutil.copy(assets_dir / '1.jpg', tmp_path)
+    settings = Settings(index_backend='sqlite')
+    process_dir(tmp_path, settings)
+    # Write-ahead log is removed by the last closed connection
+    assert (tmp_path / '.imc.sqlite').exists()
+    assert not (tmp_path / '.imc.sqlite-wal').exists()
+
+    shutil.copy(assets_dir / '4.jpg', tmp_path)
+    assert process_paths(tmp_path, [tmp_path / '4.jpg'], settings)
+    assert not (tmp_path / '.imc.sqlite-wal').exists()
@@ -2,10 +2,27 @@
 
 from pathlib import Path
 
-from image_meta_cleaner.files_index import FilesIndex, hash_file_data
-from image_meta_cleaner.images import is_image
-from image_meta_cleaner.processing import Ok, process_image, process_images
-from tests.conftest import TOTAL_IMAGES_COUNT
+import pytest
+from PIL import Image
+
+from image_meta_cleaner.files_index import (
+    FilesIndex,
+    get_file_stat,
+    hash_file_data,
+)
+from image_meta_cleaner.images import is_image, split_image_meta
+from image_meta_cleaner.processing import (
+    Err,
+    ImageLimits,
+    InFlightBudget,
+    Ok,
+    iter_processed_image_files,
+    process_image,
+    process_image_file,
+    process_image_files,
+    process_images,
+)
+from tests.conftest import TOTAL_IMAGES_COUNT, make_image
 
 
 def test_process_image(assets_dir: Path) -> None:
@@ -57,3 +74,124 @@ def test_process_images(assets_dir: Path) -> None:
     assert len(new_index) == TOTAL_IMAGES_COUNT
     assert index[images[0][0]] != new_index[images[0][0]]
     assert index[images[1][0]] == new_index[images[1][0]]
+
+
+def test_process_image_files(assets_dir: Path) -> None:
+    """Test process_image_files function.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    file_paths = sorted(
+        file_path
+        for file_path in assets_dir.glob('**/*')
+        if is_image(file_path)
+    )
+    index = FilesIndex()
+    index.add_file(file_paths[1], file_paths[1].read_bytes())
+
+    serial_results, serial_index = process_image_files(file_paths, index)
+    assert len(serial_results) == TOTAL_IMAGES_COUNT - 1
+    assert len(serial_index) == TOTAL_IMAGES_COUNT
+
+    # Results are the same and in the same order with workers pool
+    parallel_results, parallel_index = process_image_files(
+        file_paths,
+        index,
+        workers=2,
+    )
+    assert parallel_results == serial_results
+    assert list(parallel_index.items()) == list(serial_index.items())
+
+
+def test_iter_processed_image_files(assets_dir: Path) -> None:
+    """Test iter_processed_image_files function.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    image_files = [
+        (file_path, get_file_stat(file_path))
+        for file_path in sorted(assets_dir.glob('*.jpg'))
+    ]
+    consumed_files = []
+    # Files are not submitted until previous ones are consumed
+    for file_path, file_stat, file_result in iter_processed_image_files(
+        iter(image_files),
+        FilesIndex(),
+        workers=2,
+        budget=InFlightBudget(max_bytes=1, max_files=2),
+    ):
+        consumed_files.append((file_path, file_stat))
+        assert isinstance(file_result, Ok)
+        assert file_result.file_path == file_path
+
+    assert consumed_files == image_files
+
+
+@pytest.mark.parametrize('image_format', ['JPEG', 'PNG', 'WEBP', 'TIFF'])
+def test_process_mapped_image_file(
+    image_format: str,
+    exif_data: bytes,
+    tmp_path: Path,
+) -> None:
+    """Test processing of large files by parts.
+
+    Args:
+        image_format (str): Pillow format name.
+        exif_data (bytes): EXIF data with GPS info.
+        tmp_path (Path): Temporary directory path.
+    """
+    image_data = make_image(image_format, exif_data)
+    image_path = tmp_path / 'image'
+    image_path.write_bytes(image_data)
+    limits = ImageLimits(mapped_min_size=1)
+    file_result = process_image_file(image_path, limits=limits)
+    assert isinstance(file_result, Ok)
+    assert file_result.location is not None
+    assert file_result.file_data == b''
+    assert file_result.temp_path is not None
+
+    # Cleaned image is the same as the one stripped in memory
+    no_meta_image_data, _ = split_image_meta(image_data)
+    assert file_result.temp_path.read_bytes() == no_meta_image_data
+    assert file_result.file_hash == hash_file_data(no_meta_image_data)
+
+    file_result.temp_path.replace(image_path)
+    file_result = process_image_file(image_path, limits=limits)
+    assert isinstance(file_result, Ok)
+    assert not file_result.is_changed
+    assert file_result.temp_path is None
+    assert process_image_file(
+        image_path,
+        file_result.file_hash,
+        limits=limits,
+    ) is None
+
+
+def test_image_limits(assets_dir: Path) -> None:
+    """Test that images larger than limits fail.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+    """
+    image_path = assets_dir / '1.jpg'
+    file_result = process_image_file(
+        image_path,
+        limits=ImageLimits(max_bytes=1024),
+    )
+    assert isinstance(file_result, Err)
+    assert file_result.message == 'Image is too large'
+
+    # Images that are re-encoded are limited by pixels count
+    image_data = make_image('GIF')
+    pillow_max_pixels = Image.MAX_IMAGE_PIXELS
+    file_result = process_image(
+        image_path,
+        image_data,
+        limits=ImageLimits(max_pixels=1024),
+    )
+    assert isinstance(file_result, Err)
+    assert 'pixels' in str(file_result.error)
+    assert Image.MAX_IMAGE_PIXELS == pillow_max_pixels
+    assert isinstance(process_image(image_path, image_data), Ok)
@@ -0,0 +1,65 @@
+"""Tests for result cache module."""
+
+import shutil
+from pathlib import Path
+
+from image_meta_cleaner.files_index import FilesIndex, get_file_stat
+from image_meta_cleaner.location import Location
+from image_meta_cleaner.processing import Ok, iter_processed_image_files
+from image_meta_cleaner.result_cache import CachedResult, ResultCache
+
+
+def test_result_cache() -> None:
+    """Test ResultCache eviction."""
+    cache = ResultCache(max_bytes=10)
+    cache.put('a', CachedResult(b'1234', Location(1, 2), 'a-clean'))
+    cache.put('b', CachedResult(b'1234', None, 'b-clean'))
+    assert cache.get('a') is not None
+
+    # `b` is least recently used
+    cache.put('c', CachedResult(b'1234', None, 'c-clean'))
+    assert cache.get('b') is None
+    assert cache.get('a') is not None
+    assert cache.get('c') is not None
+    assert cache.size == 8
+
+    # Result larger than cache is not cached
+    cache.put('d', CachedResult(b'1' * 11, None, 'd-clean'))
+    assert cache.get('d') is None
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_duplicated_images(assets_dir: Path, tmp_path: Path) -> None:
+    """Test that duplicated images are processed once.
+
+    Args:
+        assets_dir (Path): Assets directory path.
+        tmp_path (Path): Temporary directory path.
+    """
+    image_paths = [tmp_path / 'original.jpg', tmp_path / 'copy.jpg']
+    for image_path in image_paths:
+        shutil.copy(assets_dir / '1.jpg', image_path)
+    image_files = [
+        (image_path, get_file_stat(image_path))
+        for image_path in image_paths
+    ]
+
+    cache = ResultCache()
+    index = FilesIndex()
+    results = [
+        file_result
+        for _, _, file_result in iter_processed_image_files(
+            image_files,
+            index,
+            cache=cache,
+        )
+    ]
+    assert (cache.hits, cache.misses) == (1, 1)
+    original_result, copy_result = results
+    assert isinstance(original_result, Ok)
+    assert isinstance(copy_result, Ok)
+    assert copy_result.file_path == image_paths[1]
+    assert copy_result.file_data == original_result.file_data
+    assert copy_result.location == original_result.location
+    assert copy_result.file_hash == original_result.file_hash
@@ -0,0 +1,147 @@
+"""Tests for scanner module."""
+
+import os
+from pathlib import Path, PurePath
+from time import time_ns
+
+from image_meta_cleaner.files_index import FilesIndex
+from image_meta_cleaner.scanner import (
+    TEMP_FILE_GRACE_NS,
+    DirScanner,
+    ScanRules,
+)
+
+# Files of scanned tree.
+TREE_FILES = (
+    '1.jpg',
+    'notes.txt',
+    'a/2.png',
+    'a/b/3.webp',
+    'a/b/.3.webp.imc-tmp',
+    'a/raw/4.jpg',
+    'c/5.JPG',
+)
+
+
+def make_tree(root: Path) -> None:
+    """Create scanned tree with directories modified long ago.
+
+    Args:
+        root (Path): Root directory path.
+    """
+    for file_name in TREE_FILES:
+        file_path = root / file_name
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(b'image')
+    set_old_mtimes(root)
+
+    # temporary files of interrupted writing are older than grace period
+    stale_mtime = time_ns() - 2 * TEMP_FILE_GRACE_NS
+    os.utime(root / 'a/b/.3.webp.imc-tmp', ns=(stale_mtime, stale_mtime))
+
+
+def set_old_mtimes(root: Path) -> None:
+    """Set modification times of directories to a minute ago.
+
+    Args:
+        root (Path): Root directory path.
+    """
+    old_mtime = time_ns() - 60 * 10 ** 9
+    for dir_path, _, _ in os.walk(root):
+        os.utime(dir_path, ns=(old_mtime, old_mtime))
+
+
+def scan(root: Path, rules: ScanRules) -> set[str]:
+    """Scan tree.
+
+    Args:
+        root (Path): Root directory path.
+        rules (ScanRules): Scan rules.
+
+    Returns:
+        set[str]: Found files pathes relative to root.
+    """
+    return {
+        file_path.relative_to(root).as_posix()
+        for file_path, _ in DirScanner(root, rules)
+    }
+
+
+def test_scan_rules(tmp_path: Path) -> None:
+    """Test scanning with rules.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    make_tree(tmp_path)
+    all_images = {'1.jpg', 'a/2.png', 'a/b/3.webp', 'a/raw/4.jpg', 'c/5.JPG'}
+    assert scan(tmp_path, ScanRules()) == all_images
+    assert not (tmp_path / 'a/b/.3.webp.imc-tmp').exists()
+
+    # temporary files that can be written by workers are kept
+    (tmp_path / 'a/.2.png.imc-tmp').write_bytes(b'image')
+    assert scan(tmp_path, ScanRules()) == all_images
+    assert (tmp_path / 'a/.2.png.imc-tmp').exists()
+    (tmp_path / 'a/.2.png.imc-tmp').unlink()
+
+    assert scan(tmp_path, ScanRules(max_depth=0)) == {'1.jpg'}
+    assert scan(tmp_path, ScanRules(max_depth=1)) == {
+        '1.jpg',
+        'a/2.png',
+        'c/5.JPG',
+    }
+    assert scan(tmp_path, ScanRules(exclude=('raw', 'a/b'))) == {
+        '1.jpg',
+        'a/2.png',
+        'c/5.JPG',
+    }
+    assert scan(tmp_path, ScanRules(include=('*.jpg',))) == {
+        '1.jpg',
+        'a/raw/4.jpg',
+    }
+    assert scan(tmp_path, ScanRules(include=('a/*',))) == {
+        'a/2.png',
+        'a/b/3.webp',
+        'a/raw/4.jpg',
+    }
+
+    rules = ScanRules(exclude=('raw',), max_depth=2)
+    assert rules.is_included(PurePath('a/b/3.webp'))
+    assert not rules.is_included(PurePath('a/raw/4.jpg'))
+    assert not rules.is_included(PurePath('a/b/c/6.jpg'))
+
+
+def test_skip_unchanged_dirs(tmp_path: Path) -> None:
+    """Test skipping of directories that were not changed.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    make_tree(tmp_path)
+    (tmp_path / 'a/b/.3.webp.imc-tmp').unlink()
+    set_old_mtimes(tmp_path)
+    rules = ScanRules(exclude=('raw',), skip_unchanged_dirs=True)
+    index = FilesIndex()
+    scanner = DirScanner(tmp_path, rules, index)
+    found_files = list(scanner)
+    for file_path, file_stat in found_files:
+        index.add_file(file_path, b'image', file_stat)
+    scanner.update_index()
+
+    scanner = DirScanner(tmp_path, rules, index)
+    assert sorted(scanner) == sorted(
+        (file_path.absolute(), file_stat)
+        for file_path, file_stat in found_files
+    )
+    # Directories with excluded `raw` subdirectory are listed
+    assert scanner.skipped_dirs_count == 2
+    scanner.update_index()
+    assert len(list(index.iter_dirs())) == 2
+
+    (tmp_path / 'a/b/6.jpg').write_bytes(b'image')
+    set_old_mtimes(tmp_path / 'a/b')
+    scanner = DirScanner(tmp_path, rules, index)
+    assert (tmp_path / 'a/b/6.jpg') in {
+        file_path for file_path, _ in scanner
+    }
+    assert scanner.skipped_dirs_count == 1
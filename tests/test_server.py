@@ -0,0 +1,132 @@
+"""Tests for server module."""
+
+import json
+import socket
+from http.client import HTTPConnection
+from pathlib import Path
+from threading import Thread
+from typing import Iterator
+
+import pytest
+
+from image_meta_cleaner.audit import audit_image_meta
+from image_meta_cleaner.processing import InFlightBudget
+from image_meta_cleaner.server import (
+    CleaningServer,
+    UploadsLimiter,
+    create_server,
+    parse_server_address,
+)
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """HTTP connection over unix socket."""
+
+    def __init__(self, socket_path: Path) -> None:
+        """Init connection.
+
+        Args:
+            socket_path (Path): Unix socket path.
+        """
+        super().__init__('localhost')
+        self.socket_path = socket_path
+
+    def connect(self) -> None:
+        """Connect to unix socket."""
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(str(self.socket_path))
+
+
+@pytest.fixture(params=['tcp', 'unix'])
+def server(
+    request: pytest.FixtureRequest,
+    tmp_path: Path,
+) -> Iterator[CleaningServer]:
+    """Run server in thread.
+
+    Args:
+        request (pytest.FixtureRequest): Fixture request with socket type.
+        tmp_path (Path): Temporary directory path.
+
+    Yields:
+        CleaningServer: Running server.
+    """
+    address = '127.0.0.1:0'
+    if request.param == 'unix':
+        address = str(tmp_path / 'imc.sock')
+    with create_server(address) as cleaning_server:
+        server_thread = Thread(target=cleaning_server.serve_forever)
+        server_thread.start()
+        yield cleaning_server
+        cleaning_server.shutdown()
+        server_thread.join()
+
+
+def connect(server: CleaningServer) -> HTTPConnection:
+    """Create connection to server.
+
+    Args:
+        server (CleaningServer): Running server.
+
+    Returns:
+        HTTPConnection: Connection.
+    """
+    if server.socket_path is not None:
+        return UnixHTTPConnection(server.socket_path)
+    return HTTPConnection(*server.server_address[:2])  # type: ignore
+
+
+def test_parse_server_address() -> None:
+    """Test parse_server_address function."""
+    assert parse_server_address('8080') == ('127.0.0.1', 8080)
+    assert parse_server_address('0.0.0.0:80') == ('0.0.0.0', 80)
+    assert parse_server_address('/run/imc.sock') == Path('/run/imc.sock')
+
+
+def test_clean_upload(server: CleaningServer, assets_dir: Path) -> None:
+    """Test cleaning of uploaded images.
+
+    Args:
+        server (CleaningServer): Running server.
+        assets_dir (Path): Assets directory path.
+    """
+    connection = connect(server)
+    image_data = (assets_dir / '1.jpg').read_bytes()
+    for _ in range(2):
+        connection.request('POST', '/clean', image_data, {
+            'Content-Type': 'image/jpeg',
+        })
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.getheader('Content-Type') == 'image/jpeg'
+        location = json.loads(response.getheader('X-Image-Location', ''))
+        assert location['latitude'] == pytest.approx(57.91748, abs=1e-5)
+        meta_report = audit_image_meta(response.read())
+        assert meta_report is not None
+        assert not meta_report.has_meta
+
+    connection.request('POST', '/clean', b'not an image')
+    response = connection.getresponse()
+    assert response.status == 422
+    assert json.loads(response.read())['error'] == 'Cannot remove metadata'
+
+    connection.request('GET', '/health')
+    response = connection.getresponse()
+    assert json.loads(response.read())['cache']['hits'] == 1
+    connection.close()
+
+
+def test_uploads_limiter() -> None:
+    """Test that uploads in flight are limited by total size."""
+    limiter = UploadsLimiter(InFlightBudget(max_bytes=100), max_files=4)
+    limiter.acquire(60)
+    waiting_thread = Thread(target=limiter.acquire, args=(60,))
+    waiting_thread.start()
+    waiting_thread.join(0.1)
+    assert waiting_thread.is_alive()
+    assert limiter.bytes_count == 60
+
+    limiter.release(60)
+    waiting_thread.join()
+    assert limiter.bytes_count == 60
+    assert limiter.files_count == 1
@@ -0,0 +1,38 @@
+"""Tests for watcher module."""
+
+from pathlib import Path
+
+import pytest
+
+from image_meta_cleaner.watcher import create_watcher
+
+
+def test_inotify_watcher(tmp_path: Path) -> None:
+    """Test that watcher reports settled created and modified files.
+
+    Args:
+        tmp_path (Path): Temporary directory path.
+    """
+    (tmp_path / 'old.jpg').write_bytes(b'old')
+    watcher = create_watcher(tmp_path, settle_delay=0.1)
+    if watcher is None:
+        pytest.skip('Filesystem events are unavailable')
+
+    with watcher:
+        # Existing files are not reported
+        assert not watcher.poll(0.2)
+
+        (tmp_path / 'new.jpg').write_bytes(b'new')
+        (tmp_path / 'sub').mkdir()
+        (tmp_path / 'sub' / 'nested.jpg').write_bytes(b'nested')
+        expected_files = {
+            tmp_path / 'new.jpg',
+            tmp_path / 'sub' / 'nested.jpg',
+        }
+        changed_files: set[Path] = set()
+        for _ in range(10):
+            changed_files.update(watcher.poll(0.5))
+            if changed_files == expected_files:
+                break
+
+        assert changed_files == expected_files